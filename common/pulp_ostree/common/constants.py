@@ -12,6 +12,7 @@ REPO_NOTE_OSTREE = 'OSTREE'
 # Scratchpad
 REMOTE = 'remote'
 SUMMARY = 'summary'
+STATISTICS = 'statistics'
 
 
 # Plugins
@@ -22,15 +23,70 @@ CLI_WEB_DISTRIBUTOR_ID = 'ostree_web_distributor_name_cli'
 
 # Configuration
 DEFAULT_DEPTH = 0
+DEFAULT_DELTA_CACHE_SIZE = 10240
+# The maximum number of branches pulled together when pipelined.
+PIPELINE_CHUNK_SIZE = 20
+DEFAULT_METADATA_KEYS = [
+    'version',
+    'ostree.endoflife',
+    'ostree.endoflife-rebase',
+    'ostree.ref-binding',
+    'rpmostree.inputhash',
+]
 IMPORTER_CONFIG_KEY_BRANCHES = 'branches'
+IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES = 'exclude_branches'
 IMPORTER_CONFIG_KEY_DEPTH = 'depth'
+IMPORTER_CONFIG_KEY_BRANCH_DEPTH = 'branch_depth'
 IMPORTER_CONFIG_KEY_GPG_KEYS = 'gpg_keys'
+IMPORTER_CONFIG_KEY_SUBDIRS = 'subdirs'
+IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT = 'low_speed_limit'
+IMPORTER_CONFIG_KEY_LOW_SPEED_TIME = 'low_speed_time'
+IMPORTER_CONFIG_KEY_HTTP2 = 'http2'
+IMPORTER_CONFIG_KEY_CONTENT_URL = 'content_url'
+IMPORTER_CONFIG_KEY_MIRRORLIST = 'mirrorlist'
+IMPORTER_CONFIG_KEY_LOCALCACHE = 'localcache'
+IMPORTER_CONFIG_KEY_OBJECT_POOL = 'object_pool'
+IMPORTER_CONFIG_KEY_PIPELINED = 'pipelined'
+IMPORTER_CONFIG_KEY_FSYNC = 'fsync'
+IMPORTER_CONFIG_KEY_METADATA_KEYS = 'metadata_keys'
 IMPORTER_CONFIG_FILE_PATH = 'server/plugins.conf.d/ostree_importer.json'
 DISTRIBUTOR_CONFIG_KEY_PUBLISH_DIRECTORY = 'ostree_publish_directory'
 DISTRIBUTOR_CONFIG_VALUE_PUBLISH_DIRECTORY = '/var/lib/pulp/published/ostree'
 DISTRIBUTOR_CONFIG_FILE_PATH = 'server/plugins.conf.d/ostree_distributor.json'
 DISTRIBUTOR_CONFIG_KEY_RELATIVE_PATH = 'relative_path'
 DISTRIBUTOR_CONFIG_KEY_DEPTH = 'depth'
+DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH = 'branch_depth'
+DISTRIBUTOR_CONFIG_KEY_STATIC_DELTAS = 'static_deltas'
+DISTRIBUTOR_CONFIG_KEY_DELTA_CACHE_SIZE = 'delta_cache_size'
+CONFIG_KEY_PROFILE = 'profile'
+CONFIG_KEY_TRACE = 'trace'
+# The directory containing trace files relative to the pulp working directory.
+TRACE_DIRECTORY = 'ostree/trace'
+CONFIG_KEY_METRICS_DIRECTORY = 'metrics_directory'
+CONFIG_KEY_SERVICE = 'service'
+
+
+# Reports
+MEASUREMENT = 'measurement'
+SELECTED_BRANCHES = 'branches'
+PULL_GROUPS = 'groups'
+PULL_NETWORK = 'network'
+PULL_CONTENT = 'content'
+PULL_METHOD = 'method'
+PULL_LOCALCACHE = 'localcache'
+PULL_FSYNC = 'fsync'
+POOL_SUMMARY = 'pool'
+
+
+# Pull methods
+PULL_METHOD_FETCH = 'fetch'
+PULL_METHOD_HARDLINK = 'hardlink'
+PULL_METHOD_COPY = 'copy'
+
+
+# Metrics
+METRICS_SYNC = 'sync'
+METRICS_PUBLISH = 'publish'
 
 
 # Steps
@@ -38,7 +94,10 @@ IMPORT_STEP_MAIN = 'import_main'
 IMPORT_STEP_CREATE_REPOSITORY = 'import_create_repository'
 IMPORT_STEP_SUMMARY = 'import_summary'
 IMPORT_STEP_PULL = 'import_pull'
+IMPORT_STEP_POOL = 'import_pool'
 IMPORT_STEP_ADD_UNITS = 'import_add_unit'
+IMPORT_STEP_DIFF = 'import_diff'
+IMPORT_STEP_STATISTICS = 'import_statistics'
 IMPORT_STEP_CLEAN = 'import_clean'
 
 PUBLISH_STEP_WEB_PUBLISHER = 'ostree_publish_step_web'
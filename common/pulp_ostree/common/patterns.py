@@ -0,0 +1,150 @@
+"""
+Branch selection patterns.
+
+A pattern is one of:
+ - A regular expression when prefixed with: ^
+ - A glob (shell wildcard) when it contains any of: * ? [
+ - Otherwise, an exact branch name.
+"""
+
+import re
+
+from fnmatch import translate
+
+
+REGEX = '^'
+GLOB = '*?['
+
+
+def is_regex(pattern):
+    """
+    Get whether the pattern is a regular expression.
+
+    :param pattern: A branch pattern.
+    :type pattern: str
+    :rtype: bool
+    """
+    return pattern.startswith(REGEX)
+
+
+def is_glob(pattern):
+    """
+    Get whether the pattern is a glob.
+
+    :param pattern: A branch pattern.
+    :type pattern: str
+    :rtype: bool
+    """
+    return not is_regex(pattern) and any(c in pattern for c in GLOB)
+
+
+def is_pattern(pattern):
+    """
+    Get whether the pattern needs to be resolved against a list of branches.
+
+    :param pattern: A branch pattern.
+    :type pattern: str
+    :rtype: bool
+    """
+    return is_regex(pattern) or is_glob(pattern)
+
+
+def matcher(pattern):
+    """
+    Build a function used to match branches.
+
+    :param pattern: A branch pattern.
+    :type pattern: str
+    :return: A function that returns True when the branch matches.
+    :rtype: callable
+    :raises ValueError: when the regular expression is not valid.
+    """
+    if is_regex(pattern):
+        try:
+            match = re.compile(pattern).match
+        except re.error, e:
+            raise ValueError('{0}: {1}'.format(pattern, e))
+        return lambda branch: match(branch) is not None
+    if is_glob(pattern):
+        match = re.compile(translate(pattern)).match
+        return lambda branch: match(branch) is not None
+    return lambda branch: branch == pattern
+
+
+def validate(patterns):
+    """
+    Validate a list of branch patterns.
+
+    :param patterns: A list of branch patterns.
+    :type patterns: list
+    :raises ValueError: when a regular expression is not valid.
+    """
+    for pattern in patterns or []:
+        matcher(pattern)
+
+
+def literals(patterns):
+    """
+    Get the exact branch names.
+
+    :param patterns: A list of branch patterns.
+    :type patterns: list
+    :return: The patterns that are not globs or regular expressions.
+    :rtype: list
+    """
+    return [p for p in patterns if not is_pattern(p)]
+
+
+def select(branches, include=None, exclude=None):
+    """
+    Select branches matching the include patterns and none of the exclude patterns.
+
+    :param branches: A list of branch names.
+    :type branches: list
+    :param include: A list of branch patterns.  None = ALL.
+    :type include: list
+    :param exclude: A list of branch patterns.
+    :type exclude: list
+    :return: The selected branches, in order.
+    :rtype: list
+    :raises ValueError: when a regular expression is not valid.
+    """
+    excluded = [matcher(p) for p in exclude or []]
+    if include is None:
+        included = [lambda branch: True]
+    else:
+        included = [matcher(p) for p in include]
+    selected = []
+    for branch in branches:
+        if not any(m(branch) for m in included):
+            continue
+        if any(m(branch) for m in excluded):
+            continue
+        selected.append(branch)
+    return selected
+
+
+def depth(branch, mapping, default):
+    """
+    Get the history depth for a branch using a mapping of branch pattern to depth.
+    An exact branch name takes precedence over patterns.  When more than one
+    pattern matches, the deepest is used.  Note: -1 is infinite.
+
+    :param branch: A branch name.
+    :type branch: str
+    :param mapping: A mapping of branch pattern to depth.
+    :type mapping: dict
+    :param default: The depth used when nothing matches.
+    :type default: int
+    :return: The depth.
+    :rtype: int
+    :raises ValueError: when a regular expression is not valid.
+    """
+    if branch in mapping:
+        return int(mapping[branch])
+    matched = [int(d) for p, d in mapping.items() if is_pattern(p) and matcher(p)(branch)]
+    if not matched:
+        return default
+    if -1 in matched:
+        return -1
+    return max(matched)
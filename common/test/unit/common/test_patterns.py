@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from pulp_ostree.common import patterns
+
+
+BRANCHES = [
+    'fedora/24/x86_64/atomic-host',
+    'fedora/24/aarch64/atomic-host',
+    'fedora/25/x86_64/atomic-host',
+    'fedora/25/x86_64/testing/atomic-host',
+    'centos/7/x86_64/atomic-host',
+]
+
+
+class TestPatterns(TestCase):
+
+    def test_kind(self):
+        self.assertTrue(patterns.is_regex('^fedora/.+'))
+        self.assertFalse(patterns.is_glob('^fedora/.+'))
+        self.assertTrue(patterns.is_glob('fedora/*'))
+        self.assertTrue(patterns.is_glob('fedora/2[45]'))
+        self.assertFalse(patterns.is_pattern('fedora/24/x86_64/atomic-host'))
+
+    def test_matcher(self):
+        self.assertTrue(patterns.matcher('fedora/24')('fedora/24'))
+        self.assertFalse(patterns.matcher('fedora/24')('fedora/24/x86_64'))
+        self.assertTrue(patterns.matcher('fedora/*')('fedora/24/x86_64'))
+        self.assertFalse(patterns.matcher('fedora/*')('centos/7'))
+        self.assertTrue(patterns.matcher('^fedora/2[45]/')('fedora/24/x86_64'))
+        self.assertFalse(patterns.matcher('^fedora/2[45]$')('fedora/24/x86_64'))
+
+    def test_validate(self):
+        patterns.validate(None)
+        patterns.validate(['fedora/*', '^centos/[0-9]+/'])
+        self.assertRaises(ValueError, patterns.validate, ['^fedora/(24'])
+
+    def test_literals(self):
+        self.assertEqual(
+            patterns.literals(['fedora/24', 'fedora/*', '^centos']),
+            ['fedora/24'])
+
+    def test_select(self):
+        selected = patterns.select(
+            BRANCHES,
+            include=['fedora/*/x86_64/*', 'centos/7/x86_64/atomic-host'],
+            exclude=['^.+/testing/'])
+        self.assertEqual(
+            selected,
+            [
+                'fedora/24/x86_64/atomic-host',
+                'fedora/25/x86_64/atomic-host',
+                'centos/7/x86_64/atomic-host',
+            ])
+
+    def test_select_all(self):
+        self.assertEqual(patterns.select(BRANCHES), BRANCHES)
+        self.assertEqual(
+            patterns.select(BRANCHES, exclude=['fedora/*']),
+            ['centos/7/x86_64/atomic-host'])
+
+    def test_select_nothing(self):
+        self.assertEqual(patterns.select(BRANCHES, include=[]), [])
+        self.assertEqual(patterns.select(BRANCHES, include=['debian/*']), [])
+
+    def test_depth(self):
+        mapping = {
+            'fedora/24/x86_64/atomic-host': 2,
+            'fedora/*': 1,
+            '^fedora/2[45]/x86_64/': 5,
+            '^centos/': -1,
+            'centos/*': 3,
+        }
+        self.assertEqual(patterns.depth('fedora/24/x86_64/atomic-host', mapping, 0), 2)
+        self.assertEqual(patterns.depth('fedora/25/x86_64/atomic-host', mapping, 0), 5)
+        self.assertEqual(patterns.depth('fedora/24/aarch64/atomic-host', mapping, 0), 1)
+        self.assertEqual(patterns.depth('centos/7/x86_64/atomic-host', mapping, 0), -1)
+        self.assertEqual(patterns.depth('debian/9', mapping, 7), 7)
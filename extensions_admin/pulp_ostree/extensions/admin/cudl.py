@@ -8,9 +8,11 @@ from pulp.client.commands.repo.cudl import ListRepositoriesCommand
 from pulp.client.commands.repo.cudl import UpdateRepositoryCommand
 from pulp.client.commands.repo.importer_config import ImporterConfigMixin
 from pulp.common.constants import REPO_NOTE_TYPE_KEY
-from pulp.client.extensions.extensions import PulpCliOption
+from pulp.common.plugins import importer_constants
+from pulp.client.extensions.extensions import PulpCliOption, PulpCliOptionGroup
 
-from pulp_ostree.common import constants
+from pulp_ostree.common import constants, patterns
+from pulp_ostree.extensions.admin import stats
 
 
 description = \
@@ -26,19 +28,88 @@ OPT_RELATIVE_PATH = PulpCliOption('--relative-path', description, required=False
 
 DESC_FEED = _('URL for the upstream ostree repo')
 
-description = _("a branch to sync from the upstream repository. This option "
-                "may be specified multiple times")
+description = _("a branch to sync from the upstream repository. This may be an exact "
+                "name, a glob (eg: fedora/*/x86_64/*) or a regular expression "
+                "prefixed with ^. This option may be specified multiple times")
 
 OPT_BRANCH = PulpCliOption(
     '--branch', description, aliases=['-b'], required=False, allow_multiple=True)
 
+description = _("a branch to exclude from the sync. This may be an exact name, a glob "
+                "or a regular expression prefixed with ^. This option may be "
+                "specified multiple times")
+
+OPT_EXCLUDE_BRANCH = PulpCliOption(
+    '--exclude-branch', description, required=False, allow_multiple=True)
+
+description = _("an absolute path to a subdirectory to be pulled. Only the listed "
+                "subdirectories of each commit are synchronized. This option "
+                "may be specified multiple times")
+
+OPT_SUBDIR = PulpCliOption(
+    '--subdir', description, required=False, allow_multiple=True)
+
 description = _("the absolute path to an exported GPG key. This option "
                 "may be specified multiple times")
 
 OPT_GPG_KEY = PulpCliOption(
     '--gpg-key', description, aliases=['-k'], required=False, allow_multiple=True)
 
+description = _("maximum average download rate (bytes/second); the pull is paused as "
+                "needed while it runs ahead of this rate")
+
+OPT_MAX_SPEED = PulpCliOption(
+    '--max-speed', description, required=False,
+    parse_func=okaara_parsers.parse_positive_int)
+
+description = _("a download slower than this (bytes/second) for the low speed time is "
+                "aborted; defaults to the libostree setting")
+
+OPT_LOW_SPEED_LIMIT = PulpCliOption(
+    '--low-speed-limit', description, required=False,
+    parse_func=okaara_parsers.parse_positive_int)
+
+description = _("the time (seconds) a download may stay below the low speed limit "
+                "before it is aborted; defaults to the libostree setting")
+
+OPT_LOW_SPEED_TIME = PulpCliOption(
+    '--low-speed-time', description, required=False,
+    parse_func=okaara_parsers.parse_positive_int)
+
+description = _('if "true", HTTP/2 is used when supported by the upstream server; '
+                'defaults to the libostree setting')
 
+OPT_HTTP2 = PulpCliOption(
+    '--http2', description, required=False, parse_func=okaara_parsers.parse_boolean)
+
+description = _("URL used to fetch file objects (content). The commits and summary are "
+                "always fetched using the feed. An empty value clears the URL")
+
+OPT_CONTENT_URL = PulpCliOption('--content-url', description, required=False)
+
+description = _("URL of a list of mirrors (one URL per line) used to fetch file objects "
+                "(content). The commits and summary are always fetched using the feed. "
+                "An empty value clears the URL")
+
+OPT_MIRRORLIST = PulpCliOption('--mirrorlist', description, required=False)
+
+NETWORK_OPTIONS = [
+    (OPT_MAX_SPEED, importer_constants.KEY_MAX_SPEED),
+    (OPT_LOW_SPEED_LIMIT, constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT),
+    (OPT_LOW_SPEED_TIME, constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME),
+    (OPT_HTTP2, constants.IMPORTER_CONFIG_KEY_HTTP2),
+]
+
+GROUP_NAME_CONTENT = _('Content')
+
+CONTENT_OPTIONS = [
+    (OPT_CONTENT_URL, constants.IMPORTER_CONFIG_KEY_CONTENT_URL),
+    (OPT_MIRRORLIST, constants.IMPORTER_CONFIG_KEY_MIRRORLIST),
+]
+
+
+# the concurrent downloads cannot be limited using libostree so the
+# throttling options are replaced by: --max-speed
 IMPORTER_CONFIGURATION_FLAGS = dict(
     include_ssl=True,
     include_sync=True,
@@ -64,6 +135,28 @@ def read(path):
         raise arg_utils.InvalidConfig(msg)
 
 
+def content_group():
+    """
+    Get the group of options used to fetch file objects (content).
+    """
+    group = PulpCliOptionGroup(GROUP_NAME_CONTENT)
+    for option, _key in CONTENT_OPTIONS:
+        group.add_option(option)
+    return group
+
+
+def validated(branches):
+    """
+    Validate branch patterns.
+    """
+    try:
+        patterns.validate(branches)
+    except ValueError, e:
+        msg = _('Invalid branch pattern: %(e)s' % {'e': e})
+        raise arg_utils.InvalidConfig(msg)
+    return branches
+
+
 class CreateOSTreeRepositoryCommand(CreateAndConfigureRepositoryCommand, ImporterConfigMixin):
     default_notes = {REPO_NOTE_TYPE_KEY: constants.REPO_NOTE_OSTREE}
     IMPORTER_TYPE_ID = constants.WEB_IMPORTER_TYPE_ID
@@ -74,7 +167,12 @@ class CreateOSTreeRepositoryCommand(CreateAndConfigureRepositoryCommand, Importe
         self.add_option(OPT_AUTO_PUBLISH)
         self.add_option(OPT_RELATIVE_PATH)
         self.add_option(OPT_BRANCH)
+        self.add_option(OPT_EXCLUDE_BRANCH)
+        self.add_option(OPT_SUBDIR)
         self.add_option(OPT_GPG_KEY)
+        for option, _key in NETWORK_OPTIONS:
+            self.add_option(option)
+        self.add_option_group(content_group())
         self.options_bundle.opt_feed.description = DESC_FEED
 
     def _describe_distributors(self, user_input):
@@ -131,10 +229,24 @@ class CreateOSTreeRepositoryCommand(CreateAndConfigureRepositoryCommand, Importe
         config = self.parse_user_input(user_input)
         branch_list = user_input.pop(OPT_BRANCH.keyword, None)
         if branch_list:
-            config[constants.IMPORTER_CONFIG_KEY_BRANCHES] = branch_list
+            config[constants.IMPORTER_CONFIG_KEY_BRANCHES] = validated(branch_list)
+        branch_list = user_input.pop(OPT_EXCLUDE_BRANCH.keyword, None)
+        if branch_list:
+            config[constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES] = validated(branch_list)
+        subdirs = user_input.pop(OPT_SUBDIR.keyword, None)
+        if subdirs:
+            config[constants.IMPORTER_CONFIG_KEY_SUBDIRS] = subdirs
         paths = user_input.pop(OPT_GPG_KEY.keyword, None)
         if paths:
             config[constants.IMPORTER_CONFIG_KEY_GPG_KEYS] = map(read, paths)
+        for option, key in NETWORK_OPTIONS:
+            value = user_input.pop(option.keyword, None)
+            if value is not None:
+                config[key] = value
+        for option, key in CONTENT_OPTIONS:
+            value = user_input.pop(option.keyword, None)
+            if value:
+                config[key] = value
         return config
 
 
@@ -145,7 +257,12 @@ class UpdateOSTreeRepositoryCommand(UpdateRepositoryCommand, ImporterConfigMixin
         ImporterConfigMixin.__init__(self, **IMPORTER_CONFIGURATION_FLAGS)
         self.add_option(OPT_AUTO_PUBLISH)
         self.add_option(OPT_BRANCH)
+        self.add_option(OPT_EXCLUDE_BRANCH)
+        self.add_option(OPT_SUBDIR)
         self.add_option(OPT_GPG_KEY)
+        for option, _key in NETWORK_OPTIONS:
+            self.add_option(option)
+        self.add_option_group(content_group())
         self.options_bundle.opt_feed.description = DESC_FEED
 
     def run(self, **kwargs):
@@ -158,7 +275,21 @@ class UpdateOSTreeRepositoryCommand(UpdateRepositoryCommand, ImporterConfigMixin
             value = kwargs.pop(OPT_BRANCH.keyword)
             if value == CLEAR_THE_LIST:
                 value = None
-            importer_config[constants.IMPORTER_CONFIG_KEY_BRANCHES] = value
+            importer_config[constants.IMPORTER_CONFIG_KEY_BRANCHES] = validated(value)
+
+        # excluded branch list
+        if OPT_EXCLUDE_BRANCH.keyword in kwargs:
+            value = kwargs.pop(OPT_EXCLUDE_BRANCH.keyword)
+            if value == CLEAR_THE_LIST:
+                value = None
+            importer_config[constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES] = validated(value)
+
+        # subdirectory list
+        if OPT_SUBDIR.keyword in kwargs:
+            value = kwargs.pop(OPT_SUBDIR.keyword)
+            if value == CLEAR_THE_LIST:
+                value = None
+            importer_config[constants.IMPORTER_CONFIG_KEY_SUBDIRS] = value
 
         # gpg key list
         if OPT_GPG_KEY.keyword in kwargs:
@@ -169,6 +300,18 @@ class UpdateOSTreeRepositoryCommand(UpdateRepositoryCommand, ImporterConfigMixin
                 value = map(read, value)
             importer_config[constants.IMPORTER_CONFIG_KEY_GPG_KEYS] = value
 
+        # network
+        for option, key in NETWORK_OPTIONS:
+            value = kwargs.pop(option.keyword, None)
+            if value is not None:
+                importer_config[key] = value
+
+        # content (an empty value clears the URL)
+        for option, key in CONTENT_OPTIONS:
+            value = kwargs.pop(option.keyword, None)
+            if value is not None:
+                importer_config[key] = value or None
+
         # Remove importer specific keys
         for key in importer_config.keys():
             kwargs.pop(key, None)
@@ -192,6 +335,20 @@ class UpdateOSTreeRepositoryCommand(UpdateRepositoryCommand, ImporterConfigMixin
 
 class ListOSTreeRepositoriesCommand(ListRepositoriesCommand):
 
+    FIELDS = [
+        'id',
+        'display_name',
+        'description',
+        'content_unit_counts',
+        'notes'
+    ]
+
+    DETAILS = [
+        'importers',
+        'distributors',
+        'statistics'
+    ]
+
     def __init__(self, context):
         repos_title = _('OSTree Repositories')
         super(ListOSTreeRepositoriesCommand, self).__init__(context, repos_title=repos_title)
@@ -201,6 +358,32 @@ class ListOSTreeRepositoriesCommand(ListRepositoriesCommand):
         # called in succession, saving the round trip to the server.
         self.all_repos_cache = None
 
+    def display_repositories(self, **kwargs):
+        """
+        Display the ostree repositories.
+        The scratchpad is not displayed so, with details, the summary of the
+        statistics stored in the scratchpad is rendered as: statistics.
+
+        :param kwargs: The parsed user input.
+        :type kwargs: dict
+        """
+        self.prompt.render_title(self.repos_title)
+        query_params = {}
+        filters = list(self.FIELDS)
+        if kwargs.get('details'):
+            query_params['details'] = True
+            filters.extend(self.DETAILS)
+        if kwargs.get('fields'):
+            filters = kwargs['fields'].split(',')
+            if 'id' not in filters:
+                filters.insert(0, 'id')
+        repositories = []
+        for repo in self.get_repositories(query_params, **kwargs):
+            repo = dict(repo)
+            repo['statistics'] = stats.summary(repo) or _('not computed')
+            repositories.append(repo)
+        self.prompt.render_document_list(repositories, filters=filters, order=filters)
+
     def get_repositories(self, query_params, **kwargs):
         """
         Get a list of all the ostree repositories that match the specified query params
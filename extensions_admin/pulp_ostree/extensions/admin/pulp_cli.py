@@ -7,6 +7,7 @@ from pulp_ostree.common import constants
 from pulp_ostree.extensions.admin.cudl import CreateOSTreeRepositoryCommand
 from pulp_ostree.extensions.admin.cudl import UpdateOSTreeRepositoryCommand
 from pulp_ostree.extensions.admin.cudl import ListOSTreeRepositoriesCommand
+from pulp_ostree.extensions.admin.stats import StatisticsCommand
 from pulp_ostree.extensions.admin.unit import CopyCommand, RemoveCommand, SearchCommand
 
 
@@ -55,6 +56,7 @@ def add_repo_section(context, parent_section):
     repo_section.add_command(CopyCommand(context))
     repo_section.add_command(RemoveCommand(context))
     repo_section.add_command(SearchCommand(context))
+    repo_section.add_command(StatisticsCommand(context))
 
     return repo_section
 
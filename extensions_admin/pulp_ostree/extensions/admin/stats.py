@@ -0,0 +1,90 @@
+from gettext import gettext as _
+
+from pulp.client.commands.options import OPTION_REPO_ID
+from pulp.client.extensions.extensions import PulpCliCommand
+
+from pulp_ostree.common import constants
+
+
+NAME = 'stats'
+DESCRIPTION = _('display repository statistics')
+
+
+def summary(repository):
+    """
+    Get the summary of the statistics stored in the repository scratchpad.
+
+    :param repository: A repository.
+    :type repository: dict
+    :return: The summary.  None = not computed.
+    :rtype: dict
+    """
+    statistics = repository.get('scratchpad', {}).get(constants.STATISTICS)
+    if not statistics:
+        return None
+    return dict((k, statistics[k]) for k in StatisticsCommand.ORDER)
+
+
+class StatisticsCommand(PulpCliCommand):
+    """
+    Display the repository statistics computed after each sync and publish.
+    """
+
+    TITLE = _('Repository Statistics')
+
+    ORDER = [
+        'computed',
+        'objects',
+        'bytes',
+        'unique_objects',
+        'unique_bytes'
+    ]
+
+    BRANCHES_TITLE = _('Branches')
+
+    BRANCH_ORDER = [
+        'branch',
+        'commit',
+        'remote_id',
+        'objects',
+        'bytes'
+    ]
+
+    STORAGE_TITLE = _('Shared Storage')
+
+    STORAGE_ORDER = [
+        'remote_id',
+        'objects',
+        'bytes'
+    ]
+
+    def __init__(self, context):
+        """
+        :param context: A command context.
+        :type context: pulp.client.extensions.core.ClientContext
+        """
+        super(StatisticsCommand, self).__init__(NAME, DESCRIPTION, self.run)
+        self.context = context
+        self.add_option(OPTION_REPO_ID)
+
+    def run(self, **kwargs):
+        """
+        Run the command
+        :param kwargs: Keyword arguments.
+        :type kwargs: dict
+        """
+        prompt = self.context.prompt
+        repo_id = kwargs[OPTION_REPO_ID.keyword]
+        repository = self.context.server.repo.repository(repo_id).response_body
+        statistics = repository.get('scratchpad', {}).get(constants.STATISTICS)
+        prompt.render_title(self.TITLE)
+        if not statistics:
+            msg = _('Statistics not available. They are computed by sync and publish.')
+            prompt.render_paragraph(msg)
+            return
+        prompt.render_document(summary(repository), order=self.ORDER)
+        prompt.render_title(self.BRANCHES_TITLE)
+        prompt.render_document_list(statistics['branches'], order=self.BRANCH_ORDER)
+        prompt.render_title(self.STORAGE_TITLE)
+        prompt.render_document_list(
+            statistics['storage'], filters=self.STORAGE_ORDER, order=self.STORAGE_ORDER)
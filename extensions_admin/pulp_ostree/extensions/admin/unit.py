@@ -60,13 +60,15 @@ class SearchCommand(DisplayUnitAssociationsCommand):
         'remote_id',
         'branch',
         'commit',
-        'version'
+        'version',
+        'partial'
     ]
 
     @staticmethod
     def transform(unit):
         """
         Transform the specified unit into document to be displayed.
+        The partial flag is included only for partial commits.
         :param unit: A content unit to be transformed.
         :type unit: dict
         :return: A document.
@@ -82,6 +84,8 @@ class SearchCommand(DisplayUnitAssociationsCommand):
             'commit': metadata['commit'],
             'version': metadata['metadata'].get('version')
         }
+        if metadata.get('partial'):
+            document['partial'] = True
         return document
 
     def __init__(self, context):
@@ -3,7 +3,7 @@ import unittest
 from mock import Mock, patch
 from pulp.client.arg_utils import InvalidConfig
 from pulp.common.constants import REPO_NOTE_TYPE_KEY
-from pulp.common.plugins.importer_constants import KEY_FEED
+from pulp.common.plugins.importer_constants import KEY_FEED, KEY_MAX_SPEED
 from pulp.devel.unit.util import compare_dict
 
 from pulp_ostree.common import constants
@@ -103,10 +103,16 @@ class TestCreateOSTreerRepositoryCommand(unittest.TestCase):
         command = cudl.CreateOSTreeRepositoryCommand(Mock())
         read.side_effect = hash
         paths = ['path-1', 'path-2']
-        branches = ['apple', 'orange']
+        branches = ['apple', 'orange/*']
+        excluded = ['^orange/.+/testing']
         user_input = {
             'branch': branches,
-            'gpg-key': paths
+            'exclude-branch': excluded,
+            'subdir': ['/usr/share'],
+            'gpg-key': paths,
+            'low-speed-time': 30,
+            'http2': False,
+            'mirrorlist': 'http://mirrors'
         }
         result = command._parse_importer_config(user_input)
         self.assertEqual(
@@ -114,10 +120,42 @@ class TestCreateOSTreerRepositoryCommand(unittest.TestCase):
             [((p,), {}) for p in paths])
         target_result = {
             constants.IMPORTER_CONFIG_KEY_BRANCHES: branches,
-            constants.IMPORTER_CONFIG_KEY_GPG_KEYS: map(hash, paths)
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: excluded,
+            constants.IMPORTER_CONFIG_KEY_SUBDIRS: ['/usr/share'],
+            constants.IMPORTER_CONFIG_KEY_GPG_KEYS: map(hash, paths),
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME: 30,
+            constants.IMPORTER_CONFIG_KEY_HTTP2: False,
+            constants.IMPORTER_CONFIG_KEY_MIRRORLIST: 'http://mirrors'
         }
         compare_dict(result, target_result)
 
+    def test_describe_importers_invalid_pattern(self):
+        command = cudl.CreateOSTreeRepositoryCommand(Mock())
+        user_input = {
+            'branch': ['^apple/(1'],
+        }
+        self.assertRaises(InvalidConfig, command._parse_importer_config, user_input)
+
+    def test_throttling_options(self):
+        command = cudl.CreateOSTreeRepositoryCommand(Mock())
+        names = [o.name for o in command.all_options()]
+        self.assertTrue('--max-speed' in names)
+        self.assertFalse('--max-downloads' in names)
+
+    def test_content_options(self):
+        command = cudl.CreateOSTreeRepositoryCommand(Mock())
+        groups = dict((g.name, g) for g in command.option_groups)
+        group = groups[cudl.GROUP_NAME_CONTENT]
+        self.assertEqual(group.options, [cudl.OPT_CONTENT_URL, cudl.OPT_MIRRORLIST])
+
+    def test_describe_importers_empty_content(self):
+        command = cudl.CreateOSTreeRepositoryCommand(Mock())
+        user_input = {
+            'content-url': '',
+        }
+        result = command._parse_importer_config(user_input)
+        self.assertFalse(constants.IMPORTER_CONFIG_KEY_CONTENT_URL in result)
+
 
 class TestUpdateOSTreeRepositoryCommand(unittest.TestCase):
 
@@ -176,6 +214,80 @@ class TestUpdateOSTreeRepositoryCommand(unittest.TestCase):
         self.context.server.repo.update.assert_called_once_with('foo-repo', repo_config,
                                                                 importer_config, None)
 
+    def test_repo_update_importer_exclude_branches(self):
+        user_input = {
+            'exclude-branch': ['^.+/testing/'],
+            'repo-id': 'foo-repo'
+        }
+        self.command.run(**user_input)
+
+        importer_config = {
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: ['^.+/testing/']
+        }
+        self.context.server.repo.update.assert_called_once_with(
+            'foo-repo', {}, importer_config, None)
+
+    def test_repo_update_importer_remove_exclude_branches(self):
+        user_input = {
+            'exclude-branch': [''],
+            'repo-id': 'foo-repo'
+        }
+        self.command.run(**user_input)
+
+        importer_config = {
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: None
+        }
+        self.context.server.repo.update.assert_called_once_with(
+            'foo-repo', {}, importer_config, None)
+
+    def test_repo_update_importer_subdirs(self):
+        user_input = {
+            'subdir': ['/usr/share'],
+            'repo-id': 'foo-repo'
+        }
+        self.command.run(**user_input)
+
+        importer_config = {
+            constants.IMPORTER_CONFIG_KEY_SUBDIRS: ['/usr/share']
+        }
+        self.context.server.repo.update.assert_called_once_with(
+            'foo-repo', {}, importer_config, None)
+
+    def test_repo_update_importer_network(self):
+        user_input = {
+            'max-speed': 1024,
+            'low-speed-limit': 10,
+            'low-speed-time': 30,
+            'http2': True,
+            'content-url': 'http://mirror',
+            'repo-id': 'foo-repo'
+        }
+        self.command.run(**user_input)
+
+        importer_config = {
+            KEY_MAX_SPEED: 1024,
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT: 10,
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME: 30,
+            constants.IMPORTER_CONFIG_KEY_HTTP2: True,
+            constants.IMPORTER_CONFIG_KEY_CONTENT_URL: 'http://mirror'
+        }
+        self.context.server.repo.update.assert_called_once_with(
+            'foo-repo', {}, importer_config, None)
+
+    def test_repo_update_importer_clear_content(self):
+        user_input = {
+            'content-url': '',
+            'mirrorlist': None,
+            'repo-id': 'foo-repo'
+        }
+        self.command.run(**user_input)
+
+        importer_config = {
+            constants.IMPORTER_CONFIG_KEY_CONTENT_URL: None
+        }
+        self.context.server.repo.update.assert_called_once_with(
+            'foo-repo', {}, importer_config, None)
+
     def test_repo_update_importer_remove_gpg_keys(self):
         repo_id = 'test'
         user_input = {
@@ -211,6 +323,78 @@ class TestListOSTreeRepositoriesCommand(unittest.TestCase):
         self.assertFalse(self.context.server.repo.repositories.called)
         self.assertEquals('foo', result)
 
+    def test_display_repositories(self):
+        statistics = {
+            'fingerprint': '1234',
+            'computed': '2016-01-01T00:00:00',
+            'objects': 3,
+            'bytes': 60,
+            'unique_objects': 2,
+            'unique_bytes': 30,
+            'branches': [],
+            'storage': [],
+        }
+        repos = [
+            {
+                'id': 'computed',
+                'notes': {REPO_NOTE_TYPE_KEY: constants.REPO_NOTE_OSTREE},
+                'scratchpad': {constants.STATISTICS: statistics}
+            },
+            {
+                'id': 'not-computed',
+                'notes': {REPO_NOTE_TYPE_KEY: constants.REPO_NOTE_OSTREE},
+                'scratchpad': {}
+            }
+        ]
+        self.context.server.repo.repositories.return_value.response_body = repos
+
+        # test
+        command = cudl.ListOSTreeRepositoriesCommand(self.context)
+        command.display_repositories(details=True, fields=None)
+
+        # validation
+        filters = command.FIELDS + command.DETAILS
+        self.context.server.repo.repositories.assert_called_once_with({'details': True})
+        self.context.prompt.render_document_list.assert_called_once_with(
+            [
+                dict(
+                    repos[0],
+                    statistics={
+                        'computed': '2016-01-01T00:00:00',
+                        'objects': 3,
+                        'bytes': 60,
+                        'unique_objects': 2,
+                        'unique_bytes': 30,
+                    }),
+                dict(repos[1], statistics='not computed'),
+            ],
+            filters=filters,
+            order=filters)
+
+    def test_display_repositories_no_details(self):
+        self.context.server.repo.repositories.return_value.response_body = []
+
+        # test
+        command = cudl.ListOSTreeRepositoriesCommand(self.context)
+        command.display_repositories(details=False, fields=None)
+
+        # validation
+        self.context.server.repo.repositories.assert_called_once_with({})
+        self.context.prompt.render_document_list.assert_called_once_with(
+            [], filters=command.FIELDS, order=command.FIELDS)
+
+    def test_display_repositories_fields(self):
+        self.context.server.repo.repositories.return_value.response_body = []
+
+        # test
+        command = cudl.ListOSTreeRepositoriesCommand(self.context)
+        command.display_repositories(details=False, fields='statistics')
+
+        # validation
+        filters = ['id', 'statistics']
+        self.context.prompt.render_document_list.assert_called_once_with(
+            [], filters=filters, order=filters)
+
     def test_get_repositories(self):
         # Setup
         repos = [
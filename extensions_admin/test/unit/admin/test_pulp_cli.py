@@ -12,6 +12,7 @@ from pulp.client.commands.repo.sync_publish import PublishStatusCommand,\
 from pulp.client.extensions.core import PulpCli
 
 from pulp_ostree.extensions.admin import pulp_cli
+from pulp_ostree.extensions.admin.stats import StatisticsCommand
 
 
 class TestInitialize(unittest.TestCase):
@@ -37,6 +38,7 @@ class TestInitialize(unittest.TestCase):
         self.assertTrue(isinstance(repo_section.commands['copy'], UnitCopyCommand))
         self.assertTrue(isinstance(repo_section.commands['remove'], UnitRemoveCommand))
         self.assertTrue(isinstance(repo_section.commands['search'], UnitAssociationCriteriaCommand))
+        self.assertTrue(isinstance(repo_section.commands['stats'], StatisticsCommand))
 
         section = repo_section.subsections['sync']
         self.assertTrue(isinstance(section.commands['run'], RunSyncRepositoryCommand))
@@ -0,0 +1,73 @@
+import unittest
+
+from mock import Mock
+
+from pulp.client.commands.options import OPTION_REPO_ID
+
+from pulp_ostree.common import constants
+from pulp_ostree.extensions.admin.stats import StatisticsCommand
+
+
+class TestStatisticsCommand(unittest.TestCase):
+
+    def test_init(self):
+        context = Mock()
+        command = StatisticsCommand(context)
+        self.assertEqual(command.context, context)
+        self.assertEqual(command.name, 'stats')
+        self.assertTrue(OPTION_REPO_ID in command.options)
+
+    def test_run(self):
+        statistics = {
+            'fingerprint': '1234',
+            'computed': '2016-01-01T00:00:00',
+            'objects': 3,
+            'bytes': 60,
+            'unique_objects': 2,
+            'unique_bytes': 30,
+            'branches': [{'branch': 'b1'}],
+            'storage': [{'remote_id': 'r1'}],
+        }
+        repository = {
+            'scratchpad': {
+                constants.STATISTICS: statistics
+            }
+        }
+        context = Mock()
+        context.server.repo.repository.return_value.response_body = repository
+
+        # test
+        command = StatisticsCommand(context)
+        command.run(**{OPTION_REPO_ID.keyword: 'repo-1'})
+
+        # validation
+        context.server.repo.repository.assert_called_once_with('repo-1')
+        context.prompt.render_document.assert_called_once_with(
+            {
+                'computed': '2016-01-01T00:00:00',
+                'objects': 3,
+                'bytes': 60,
+                'unique_objects': 2,
+                'unique_bytes': 30,
+            },
+            order=StatisticsCommand.ORDER)
+        self.assertEqual(
+            context.prompt.render_document_list.call_args_list,
+            [
+                ((statistics['branches'],), dict(order=StatisticsCommand.BRANCH_ORDER)),
+                ((statistics['storage'],), dict(
+                    filters=StatisticsCommand.STORAGE_ORDER,
+                    order=StatisticsCommand.STORAGE_ORDER)),
+            ])
+
+    def test_run_not_computed(self):
+        context = Mock()
+        context.server.repo.repository.return_value.response_body = {'scratchpad': {}}
+
+        # test
+        command = StatisticsCommand(context)
+        command.run(**{OPTION_REPO_ID.keyword: 'repo-1'})
+
+        # validation
+        self.assertTrue(context.prompt.render_paragraph.called)
+        self.assertFalse(context.prompt.render_document.called)
@@ -73,6 +73,26 @@ class TestSearchCommand(TestCase):
                 'version': 6
             })
 
+    def test_transform_partial(self):
+        unit = {
+            'unit_id': 0,
+            'created': 1,
+            'updated': 2,
+            'metadata': {
+                'remote_id': 3,
+                'branch': 4,
+                'commit': 5,
+                'metadata': {},
+                'partial': True
+            }
+        }
+
+        # test
+        document = SearchCommand.transform(unit)
+
+        # validation
+        self.assertEqual(document['partial'], True)
+
     @patch('pulp_ostree.extensions.admin.unit.SearchCommand.transform')
     def test_run(self, transform):
         repo_id = 'test-repo'
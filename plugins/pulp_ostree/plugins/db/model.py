@@ -1,10 +1,16 @@
+import json
+import zlib
+
 from datetime import datetime
+from fnmatch import fnmatchcase
 from hashlib import sha256
 
-from mongoengine import DateTimeField, StringField, DictField
-from pulp.server.db.model import SharedContentUnit
+from mongoengine import (
+    BinaryField, BooleanField, DateTimeField, DictField, IntField, StringField)
+from pulp.server.db.model import AutoRetryDocument, SharedContentUnit
 
 from pulp_ostree.common import constants
+from pulp_ostree.plugins.nevra import NEVRA
 
 
 def generate_remote_id(url):
@@ -21,6 +27,41 @@ def generate_remote_id(url):
     return h.hexdigest()
 
 
+def encode_keys(metadata):
+    """
+    Replace '.' with '-' within the keys of commit metadata.
+    Keys stored in mongo may not contain '.'.
+
+    :param metadata: The commit metadata.
+    :type metadata: dict
+    :return: The updated dictionary.
+    :rtype: dict
+    """
+    return dict([(k.replace('.', '-'), v) for k, v in metadata.items()])
+
+
+def split_metadata(metadata, keys):
+    """
+    Split commit metadata into the keys stored inline in the unit
+    and the keys stored out of band.
+
+    :param metadata: The commit metadata.
+    :type metadata: dict
+    :param keys: A list of key (glob) patterns stored inline.
+    :type keys: list
+    :return: A tuple of: (inline, extra).
+    :rtype: tuple
+    """
+    inline = {}
+    extra = {}
+    for key, value in metadata.items():
+        if any(fnmatchcase(key, p) for p in keys):
+            inline[key] = value
+        else:
+            extra[key] = value
+    return inline, extra
+
+
 class MetadataField(DictField):
     """
     Commit metadata.
@@ -35,7 +76,7 @@ class MetadataField(DictField):
         :return: The updated dictionary.
         :rtype: dict
         """
-        return dict([(k.replace('.', '-'), v) for k, v in value.items()])
+        return encode_keys(value)
 
     def validate(self, value):
         """
@@ -65,8 +106,23 @@ class Branch(SharedContentUnit):
     :type commit: str
     :cvar created: The created (UTC) timestamp.
     :type created: datetime
-    :cvar metadata: The commit metadata.
+    :cvar metadata: The commit metadata stored inline.
     :type metadata: dict
+    :cvar extra_metadata: The complete commit metadata is stored in a CommitMetadata document.
+    :type extra_metadata: bool
+    :cvar partial: Only subdirectories of the commit are stored.
+    :type partial: bool
+    :cvar historical: The commit has only been found in the history of the branch
+        and has never been the branch head.
+    :type historical: bool
+    :cvar parent: The parent commit.  None = no parent.
+    :type parent: str
+    :cvar generation: The commit generation number.  Increases by one from the
+        parent and orders the commits on a branch.
+    :type generation: int
+    :cvar disconnected: The parent commit has not been recorded because it
+        has not been pulled so the history before this commit is not known.
+    :type disconnected: bool
     """
 
     # key
@@ -76,6 +132,12 @@ class Branch(SharedContentUnit):
     # other
     created = DateTimeField(db_field='_created', required=True)
     metadata = MetadataField()
+    extra_metadata = BooleanField(default=False)
+    partial = BooleanField(default=False)
+    historical = BooleanField(default=False)
+    parent = StringField()
+    generation = IntField()
+    disconnected = BooleanField(default=False)
 
     unit_key_fields = (
         'remote_id',
@@ -86,7 +148,9 @@ class Branch(SharedContentUnit):
     meta = {
         'allow_inheritance': False,
         'collection': 'units_ostree',
-        'indexes': []
+        'indexes': [
+            {'fields': ['remote_id', 'branch', 'generation']},
+        ]
     }
 
     # backward compatibility
@@ -109,6 +173,21 @@ class Branch(SharedContentUnit):
         super(Branch, cls).pre_save_signal(sender, document, **kwargs)
         document.created = datetime.utcnow()
 
+    @property
+    def commit_metadata(self):
+        """
+        The complete commit metadata.
+        The metadata stored out of band is loaded on demand.
+
+        :return: The commit metadata with '.' replaced by '-' within keys.
+        :rtype: dict
+        """
+        if self.extra_metadata:
+            document = CommitMetadata.objects(commit=self.commit).first()
+            if document is not None:
+                return document.load()
+        return encode_keys(self.metadata or {})
+
     @property
     def storage_provider(self):
         """
@@ -128,3 +207,218 @@ class Branch(SharedContentUnit):
         :rtype: str
         """
         return self.remote_id
+
+
+class CommitMetadata(AutoRetryDocument):
+    """
+    The complete metadata of a commit with keys not stored inline in the branch units.
+    The metadata is compressed and shared by all units for the commit.  The
+    inline keys are selected by each importer so the complete metadata is
+    stored rather than only the keys not stored inline by one importer.
+
+    :cvar commit: A commit.
+    :type commit: str
+    :cvar data: The compressed (JSON) metadata.
+    :type data: str
+    """
+
+    commit = StringField(primary_key=True)
+    data = BinaryField()
+
+    meta = {
+        'allow_inheritance': False,
+        'collection': 'units_ostree_metadata',
+    }
+
+    @classmethod
+    def store(cls, commit, metadata):
+        """
+        Store commit metadata.
+
+        :param commit: A commit.
+        :type commit: str
+        :param metadata: The commit metadata.
+        :type metadata: dict
+        :return: The stored document.
+        :rtype: CommitMetadata
+        """
+        data = zlib.compress(json.dumps(encode_keys(metadata), sort_keys=True))
+        document = cls(commit=commit, data=data)
+        document.save()
+        return document
+
+    def load(self):
+        """
+        Load the stored commit metadata.
+
+        :return: The commit metadata with '.' replaced by '-' within keys.
+        :rtype: dict
+        """
+        return json.loads(zlib.decompress(self.data))
+
+
+class CommitDiff(AutoRetryDocument):
+    """
+    The (cached) paths changed between two commits.
+
+    :cvar commits: The commit pair: <from>..<to>.
+    :type commits: str
+    :cvar data: The compressed (JSON) list of: (change, path).
+    :type data: str
+    """
+
+    commits = StringField(primary_key=True)
+    data = BinaryField()
+
+    meta = {
+        'allow_inheritance': False,
+        'collection': 'units_ostree_diffs',
+    }
+
+    @staticmethod
+    def key(from_commit, to_commit):
+        """
+        Get the key for a commit pair.
+
+        :param from_commit: The (older) commit hash.
+        :type from_commit: str
+        :param to_commit: The (newer) commit hash.
+        :type to_commit: str
+        :return: The key.
+        :rtype: str
+        """
+        return '{0}..{1}'.format(from_commit, to_commit)
+
+    @classmethod
+    def store(cls, from_commit, to_commit, changes):
+        """
+        Store the changes between two commits.
+
+        :param from_commit: The (older) commit hash.
+        :type from_commit: str
+        :param to_commit: The (newer) commit hash.
+        :type to_commit: str
+        :param changes: A list of: (change, path).
+        :type changes: list
+        :return: The stored document.
+        :rtype: CommitDiff
+        """
+        data = zlib.compress(json.dumps(changes))
+        document = cls(commits=cls.key(from_commit, to_commit), data=data)
+        document.save()
+        return document
+
+    def load(self):
+        """
+        Load the stored changes.
+
+        :return: A list of: (change, path).
+        :rtype: list
+        """
+        return [tuple(c) for c in json.loads(zlib.decompress(self.data))]
+
+
+class CommitObjects(AutoRetryDocument):
+    """
+    The (cached) objects reachable from a commit used to compute statistics.
+    Commits are immutable so the objects are traversed only once.
+
+    :cvar commit: A commit.
+    :type commit: str
+    :cvar data: The compressed (JSON) list of: (checksum, type, size).
+    :type data: str
+    """
+
+    commit = StringField(primary_key=True)
+    data = BinaryField()
+
+    meta = {
+        'allow_inheritance': False,
+        'collection': 'units_ostree_objects',
+    }
+
+    @classmethod
+    def store(cls, commit, objects):
+        """
+        Store the objects reachable from a commit.
+
+        :param commit: A commit.
+        :type commit: str
+        :param objects: A dictionary of object sizes (bytes) keyed by: (checksum, type).
+        :type objects: dict
+        :return: The stored document.
+        :rtype: CommitObjects
+        """
+        data = zlib.compress(json.dumps([k + (v,) for k, v in sorted(objects.items())]))
+        document = cls(commit=commit, data=data)
+        document.save()
+        return document
+
+    def load(self):
+        """
+        Load the stored objects.
+
+        :return: A dictionary of object sizes (bytes) keyed by: (checksum, type).
+        :rtype: dict
+        """
+        return dict(((c, t), n) for c, t, n in json.loads(zlib.decompress(self.data)))
+
+
+class Package(AutoRetryDocument):
+    """
+    A package (rpm) contained in the tree of a commit.
+
+    :cvar commit: A commit.
+    :type commit: str
+    :cvar name: The package name.
+    :type name: str
+    :cvar epoch: The package epoch.
+    :type epoch: int
+    :cvar version: The package version.
+    :type version: str
+    :cvar release: The package release.
+    :type release: str
+    :cvar arch: The package architecture.
+    :type arch: str
+    """
+
+    commit = StringField(required=True)
+    name = StringField(required=True)
+    epoch = IntField(default=0)
+    version = StringField(required=True)
+    release = StringField(required=True)
+    arch = StringField()
+
+    meta = {
+        'allow_inheritance': False,
+        'collection': 'units_ostree_packages',
+        'indexes': ['commit', 'name'],
+    }
+
+    @property
+    def nevra(self):
+        """
+        :return: The package NEVRA.
+        :rtype: pulp_ostree.plugins.nevra.NEVRA
+        """
+        return NEVRA(self.name, self.epoch, self.version, self.release, self.arch)
+
+
+class PackageIndex(AutoRetryDocument):
+    """
+    Records that the packages in a commit have been indexed.
+    Commits without packages are recorded so that they are not read again.
+
+    :cvar commit: A commit.
+    :type commit: str
+    :cvar packages: The number of packages indexed.
+    :type packages: int
+    """
+
+    commit = StringField(primary_key=True)
+    packages = IntField(default=0)
+
+    meta = {
+        'allow_inheritance': False,
+        'collection': 'units_ostree_package_index',
+    }
@@ -0,0 +1,274 @@
+"""
+Shared static delta store.
+
+Static deltas published by any repository are kept in shared storage
+keyed by: (from commit, to commit, parameters) so that repositories
+publishing the same commits link the stored delta rather than generating
+it again.  The least recently used deltas are evicted when the store
+exceeds a size limit.
+
+The store is laid out as:
+  <root>/deltas/<key[:2]>/<key[2:]>/<delta files>
+"""
+
+import base64
+import binascii
+import errno
+import json
+import os
+import shutil
+
+from hashlib import sha256
+from logging import getLogger
+
+
+log = getLogger(__name__)
+
+
+DELTAS = 'deltas'
+TMP = '.tmp'
+
+# The libostree defaults, fixed so stored deltas match the parameters used.
+PARAMS = {
+    'min-fallback-size': 4,
+    'max-chunk-size': 32,
+}
+
+
+def b64(checksum):
+    """
+    Get the modified base64 encoding of a checksum used for delta paths.
+
+    :param checksum: A (hex) checksum.
+    :type checksum: str
+    :return: The encoded checksum.
+    :rtype: str
+    """
+    encoded = base64.b64encode(binascii.unhexlify(checksum))
+    return encoded.rstrip('=').replace('/', '_')
+
+
+def relative_path(from_commit, to_commit):
+    """
+    Get the path of a static delta relative to the repository.
+
+    :param from_commit: The (older) commit hash.  None = from scratch.
+    :type from_commit: str
+    :param to_commit: The (newer) commit hash.
+    :type to_commit: str
+    :return: The relative path.
+    :rtype: str
+    """
+    to_commit = b64(to_commit)
+    if from_commit:
+        from_commit = b64(from_commit)
+        return os.path.join(DELTAS, from_commit[:2], '-'.join((from_commit[2:], to_commit)))
+    return os.path.join(DELTAS, to_commit[:2], to_commit[2:])
+
+
+def link(path, destination):
+    """
+    Link a file.  Copied when on another filesystem.
+
+    :param path: The absolute path to a file.
+    :type path: str
+    :param destination: The absolute path to the link.
+    :type destination: str
+    """
+    try:
+        os.link(path, destination)
+    except OSError, e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copy2(path, destination)
+
+
+def mkdir(path):
+    """
+    Create a directory (and parents) as needed.
+
+    :param path: The absolute path to a directory.
+    :type path: str
+    """
+    try:
+        os.makedirs(path)
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class DeltaStore(object):
+    """
+    A static delta store.
+
+    :ivar path: The absolute path to the store.
+    :type path: str
+    """
+
+    @staticmethod
+    def find(storage_dir):
+        """
+        Get the store for a repository in shared storage.
+
+        :param storage_dir: The absolute path to a repository in shared storage.
+        :type storage_dir: str
+        :return: The store.
+        :rtype: DeltaStore
+        """
+        root = os.path.dirname(os.path.dirname(storage_dir))
+        return DeltaStore(os.path.join(root, DELTAS))
+
+    @staticmethod
+    def key(from_commit, to_commit, params):
+        """
+        Get the key for a delta.
+
+        :param from_commit: The (older) commit hash.
+        :type from_commit: str
+        :param to_commit: The (newer) commit hash.
+        :type to_commit: str
+        :param params: The generation parameters.
+        :type params: dict
+        :return: The key.
+        :rtype: str
+        """
+        h = sha256()
+        h.update(json.dumps([from_commit, to_commit, sorted(params.items())]))
+        return h.hexdigest()
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the store.
+        :type path: str
+        """
+        self.path = path
+
+    def _path(self, key):
+        """
+        Get the path to a stored delta.
+
+        :param key: The delta key.
+        :type key: str
+        :return: The absolute path.
+        :rtype: str
+        """
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def get(self, key, destination):
+        """
+        Link a stored delta into a repository and mark it used.
+
+        :param key: The delta key.
+        :type key: str
+        :param destination: The absolute path to the delta in the repository.
+        :type destination: str
+        :return: True when found.
+        :rtype: bool
+        """
+        path = self._path(key)
+        try:
+            names = os.listdir(path)
+            mkdir(destination)
+            for name in names:
+                link(os.path.join(path, name), os.path.join(destination, name))
+            os.utime(path, None)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            # not stored or evicted while linking
+            shutil.rmtree(destination, ignore_errors=True)
+            return False
+        return True
+
+    def add(self, key, source):
+        """
+        Add a delta generated in a repository.
+
+        :param key: The delta key.
+        :type key: str
+        :param source: The absolute path to the delta in the repository.
+        :type source: str
+        """
+        path = self._path(key)
+        tmp = '{0}{1}{2}'.format(path, TMP, os.getpid())
+        shutil.rmtree(tmp, ignore_errors=True)
+        mkdir(tmp)
+        for name in os.listdir(source):
+            link(os.path.join(source, name), os.path.join(tmp, name))
+        try:
+            os.rename(tmp, path)
+        except OSError, e:
+            if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+            # added concurrently
+            shutil.rmtree(tmp)
+
+    def entries(self):
+        """
+        Get the stored deltas.
+
+        :return: A list of: (last used, bytes, path) sorted by last used.
+        :rtype: list
+        """
+        entries = []
+        if not os.path.isdir(self.path):
+            return entries
+        for prefix in os.listdir(self.path):
+            for name in os.listdir(os.path.join(self.path, prefix)):
+                if TMP in name:
+                    continue
+                path = os.path.join(self.path, prefix, name)
+                size = sum(
+                    os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                entries.append((os.stat(path).st_mtime, size, path))
+        return sorted(entries)
+
+    def evict(self, max_size):
+        """
+        Remove the least recently used deltas until the store is within the size limit.
+
+        :param max_size: The maximum size of the store (bytes).
+        :type max_size: int
+        :return: The number of deltas removed.
+        :rtype: int
+        """
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+def publish(store, repository, from_commit, to_commit, params=PARAMS):
+    """
+    Publish a static delta in a repository.
+    The delta is linked from the store when found.  Otherwise, the delta
+    is generated in the repository and added to the store.
+
+    :param store: The delta store.
+    :type store: DeltaStore
+    :param repository: The repository.
+    :type repository: pulp_ostree.plugins.lib.Repository
+    :param from_commit: The (older) commit hash.
+    :type from_commit: str
+    :param to_commit: The (newer) commit hash.
+    :type to_commit: str
+    :param params: The generation parameters.
+    :type params: dict
+    :return: True when linked from the store.
+    :rtype: bool
+    :raises LibError:
+    """
+    key = DeltaStore.key(from_commit, to_commit, params)
+    destination = os.path.join(repository.path, relative_path(from_commit, to_commit))
+    if store.get(key, destination):
+        log.debug('delta: {0}-{1} linked from: {2}'.format(from_commit, to_commit, store.path))
+        return True
+    repository.generate_delta(from_commit, to_commit, params)
+    store.add(key, destination)
+    return False
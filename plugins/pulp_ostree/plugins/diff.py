@@ -0,0 +1,88 @@
+"""
+Cached commit diffs.
+
+The paths added, removed and modified between two commits are computed
+by walking only the directory trees that differ and are cached keyed by
+the commit pair.  The diffs between consecutive branch heads are computed
+after each sync.
+"""
+
+import sys
+
+from argparse import ArgumentParser
+from logging import basicConfig, getLogger
+
+from pulp.server.db import connection
+
+from pulp_ostree.plugins import lib
+from pulp_ostree.plugins.db import model
+
+
+log = getLogger(__name__)
+
+
+DEFAULT_LIMIT = 100
+
+
+def get(repository, from_commit, to_commit):
+    """
+    Get the paths changed between two commits.
+    The diff is computed and cached as needed.
+
+    :param repository: The repository containing both commits.
+    :type repository: pulp_ostree.plugins.lib.Repository
+    :param from_commit: The (older) commit hash.
+    :type from_commit: str
+    :param to_commit: The (newer) commit hash.
+    :type to_commit: str
+    :return: A list of: (change, path) sorted by path.
+    :rtype: list
+    :raises LibError:
+    """
+    key = model.CommitDiff.key(from_commit, to_commit)
+    document = model.CommitDiff.objects(commits=key).first()
+    if document is not None:
+        return document.load()
+    changes = repository.diff(from_commit, to_commit)
+    model.CommitDiff.store(from_commit, to_commit, changes)
+    return changes
+
+
+def get_parser():
+    parser = ArgumentParser(description='List the paths changed between two ostree commits.')
+    parser.add_argument('from_commit', help='the older commit')
+    parser.add_argument('to_commit', help='the newer commit')
+    parser.add_argument('--offset', type=int, default=0, help='the first change listed')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT,
+                        help='the number of changes listed (default: 100)')
+    return parser
+
+
+def main(argv=None):
+    """
+    List a page of the paths changed between two commits.
+    """
+    args = get_parser().parse_args(argv)
+    basicConfig(level='INFO', format='%(message)s')
+    connection.initialize()
+    unit = model.Branch.objects(commit=args.to_commit).only('remote_id').first()
+    if unit is None:
+        log.error('commit: {0} not found'.format(args.to_commit))
+        return 1
+    repository = lib.Repository(unit.storage_path)
+    try:
+        changes = get(repository, args.from_commit, args.to_commit)
+    except lib.LibError, e:
+        log.error('diff failed: {0}'.format(e))
+        return 1
+    for change, path in changes[args.offset:args.offset + args.limit]:
+        log.info('{0} {1}'.format(change, path))
+    log.info('changes: {0}-{1} of {2}'.format(
+        min(args.offset + 1, len(changes)),
+        min(args.offset + args.limit, len(changes)),
+        len(changes)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,7 +2,8 @@ from gettext import gettext as _
 import logging
 import os
 
-from pulp_ostree.common import constants
+from pulp_ostree.common import constants, patterns
+from pulp_ostree.plugins import metrics, tracing
 
 from mongoengine import Q
 from pulp.server.db import model
@@ -21,6 +22,39 @@ def validate_config(repo, config):
     :return: tuple of (bool, str) to describe the result
     :rtype:  tuple
     """
+    branch_depth = config.get(constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH) or {}
+    if not isinstance(branch_depth, dict):
+        return False, _('%(k)s must be a dictionary') % {
+            'k': constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH}
+    try:
+        patterns.validate(branch_depth.keys())
+    except ValueError, e:
+        return False, _('Invalid branch pattern: %(e)s') % {'e': e}
+    try:
+        int(config.get(constants.DISTRIBUTOR_CONFIG_KEY_DEPTH, constants.DEFAULT_DEPTH))
+        map(int, branch_depth.values())
+    except (TypeError, ValueError):
+        return False, _('Depth must be an integer')
+    if config.get(constants.DISTRIBUTOR_CONFIG_KEY_STATIC_DELTAS) not in (None, True, False):
+        return False, _('%(k)s must be a boolean') % {
+            'k': constants.DISTRIBUTOR_CONFIG_KEY_STATIC_DELTAS}
+    try:
+        size = config.get(constants.DISTRIBUTOR_CONFIG_KEY_DELTA_CACHE_SIZE)
+        if size is not None and int(size) < 1:
+            raise ValueError()
+    except (TypeError, ValueError):
+        return False, _('%(k)s must be a positive integer') % {
+            'k': constants.DISTRIBUTOR_CONFIG_KEY_DELTA_CACHE_SIZE}
+    try:
+        tracing.validate(config.get(constants.CONFIG_KEY_TRACE))
+    except ValueError:
+        return False, _('%(k)s must be a file name') % {'k': constants.CONFIG_KEY_TRACE}
+    try:
+        metrics.validate(config.get(constants.CONFIG_KEY_METRICS_DIRECTORY))
+    except ValueError:
+        return False, _('%(k)s must be the absolute path to an existing directory') % {
+            'k': constants.CONFIG_KEY_METRICS_DIRECTORY}
+
     repo_obj = repo.repo_obj
     relative_path = get_repo_relative_path(repo_obj, config)
     error_msgs = _check_for_relative_path_conflicts(repo_obj.repo_id, relative_path)
@@ -98,6 +132,23 @@ def get_repo_relative_path(repo, config):
     return path
 
 
+def get_importer_subdirs(repo):
+    """
+    Get the subdirectories pulled by the importer of the given repository.
+    Branch units are shared by repositories with the same feed so the
+    subdirectories are not recorded on the units.
+
+    :param repo: repository to get the subdirectories for
+    :type  repo: pulp.server.db.model.Repository
+    :return: A list of absolute paths.  None = ALL.
+    :rtype: list
+    """
+    importer = model.Importer.objects(repo_id=repo.repo_id).first()
+    if importer is None:
+        return None
+    return (importer.config or {}).get(constants.IMPORTER_CONFIG_KEY_SUBDIRS) or None
+
+
 def _check_for_relative_path_conflicts(repo_id, relative_path):
     """
     Check that a relative path does not conflict with existing distributors' relative paths.
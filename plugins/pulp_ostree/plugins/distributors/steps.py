@@ -8,8 +8,9 @@ from pulp.plugins.util.misc import mkdir
 from pulp.plugins.util.publish_step import PluginStep, AtomicDirectoryPublishStep
 from pulp.server.controllers.repository import get_unit_model_querysets
 
-from pulp_ostree.common import constants
-from pulp_ostree.plugins import lib
+from pulp_ostree.common import constants, patterns
+from pulp_ostree.plugins import deltas, lib, metrics, service, stats
+from pulp_ostree.plugins.instrumentation import Instrumented, measured
 from pulp_ostree.plugins.distributors import configuration
 from pulp_ostree.plugins.db.model import Branch
 
@@ -43,7 +44,7 @@ class WebPublisher(PluginStep):
             plugin_type=constants.WEB_DISTRIBUTOR_TYPE_ID,
             **kwargs)
         self.publish_dir = os.path.join(self.get_working_dir(), repo.id)
-        atomic_publish = AtomicDirectoryPublishStep(
+        atomic_publish = AtomicPublish(
             self.get_working_dir(),
             [(repo.id, configuration.get_web_publish_dir(repo.repo_obj, config))],
             configuration.get_master_publish_dir(repo.repo_obj, config),
@@ -55,20 +56,58 @@ class WebPublisher(PluginStep):
         mkdir(self.publish_dir)
 
 
-class MainStep(PluginStep):
+class MainStep(Instrumented, PluginStep):
 
     def __init__(self, **kwargs):
         super(MainStep, self).__init__(constants.PUBLISH_STEP_MAIN, **kwargs)
         self.context = None
         self.redirect_context = None
         self.description = _('Publish Trees')
+        self.summary_size = None
 
     @property
     def depth(self):
         depth = self.parent.config.get(
-            constants.IMPORTER_CONFIG_KEY_DEPTH, constants.DEFAULT_DEPTH)
+            constants.DISTRIBUTOR_CONFIG_KEY_DEPTH, constants.DEFAULT_DEPTH)
         return int(depth)
 
+    @property
+    def branch_depth(self):
+        return self.parent.config.get(constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH) or {}
+
+    @property
+    def static_deltas(self):
+        return self.parent.config.get(constants.DISTRIBUTOR_CONFIG_KEY_STATIC_DELTAS, False)
+
+    @property
+    def delta_cache_size(self):
+        """
+        The maximum size of the shared static delta store.
+
+        :return: The size (bytes).
+        :rtype: int
+        """
+        size = self.parent.config.get(
+            constants.DISTRIBUTOR_CONFIG_KEY_DELTA_CACHE_SIZE, constants.DEFAULT_DELTA_CACHE_SIZE)
+        return int(size) * 1024 * 1024
+
+    @property
+    def subdirs(self):
+        return configuration.get_importer_subdirs(self.get_repo().repo_obj)
+
+    @property
+    def lib(self):
+        """
+        The lib API.  Served by the ostree service when configured.
+
+        :return: The lib module or the service library.
+        """
+        path = self.parent.config.get(constants.CONFIG_KEY_SERVICE)
+        if path:
+            return service.Library(path)
+        return lib
+
+    @measured
     def process_main(self, item=None):
         """
         Publish the repository.
@@ -76,42 +115,132 @@ class MainStep(PluginStep):
         perform a (local) pull which links objects in this repository to
         objects in the *backing* repository at the storage path.  This starts
         with the branch HEAD commit and then includes all referenced objects.
+        The history published for each branch is limited by the distributor
+        depth (or branch depth) regardless of the history in storage.
+        Only the subdirectories pulled by the repository importer are published.
+        When enabled, a static delta from the parent of each branch head
+        is published before the summary is generated.
+        The pulls and branch refs (all set at once) are written in a
+        single transaction with fsync disabled.  The repository is flushed to disk using a
+        single filesystem sync before it is (atomically) published.
+        Last, the repository statistics are updated.
         """
         path = self.parent.publish_dir
-        repository = lib.Repository(path)
+        _lib = self.lib
+        repository = _lib.Repository(path)
         repository.create()
-        for unit in self._get_units():
-            repository.pull_local(unit.storage_path, [unit.commit], self.depth)
-            MainStep._add_ref(path, unit.branch, unit.commit)
-        summary = lib.Summary(repository)
+        repository.disable_fsync()
+        units = self._get_units()
+        default = self.depth
+        branch_depth = self.branch_depth
+        subdirs = self.subdirs
+        refs = {}
+        with repository.transaction() as transaction:
+            for unit in units:
+                depth = patterns.depth(unit.branch, branch_depth, default)
+                repository.pull_local(
+                    unit.storage_path, [unit.commit], depth, subdirs, transaction=True)
+                refs[unit.branch] = unit.commit
+                self.measurement.items += 1
+            transaction.set_refs(refs)
+        if self.static_deltas:
+            self._publish_deltas(repository, units)
+        summary = _lib.Summary(repository)
         summary.generate()
+        repository.sync()
+        self.summary_size = os.path.getsize(os.path.join(path, 'summary'))
+        self._update_statistics(units)
+
+    def collect(self, registry, labels):
+        """
+        Collect the step metrics including the summary size.
+
+        :param registry: The metrics registry.
+        :type registry: pulp_ostree.plugins.metrics.Registry
+        :param labels: The repo_id and remote_id labels.
+        :type labels: dict
+        """
+        super(MainStep, self).collect(registry, labels)
+        if self.summary_size is None:
+            return
+        labels = dict(labels, step=self.step_id)
+        registry.gauge(metrics.SUMMARY_BYTES).set(self.summary_size, **labels)
+
+    def _update_statistics(self, units):
+        """
+        Update the repository statistics.
+        Statistics are informational so failures are logged rather than
+        failing the publish.
+
+        :param units: The published units.
+        :type units: iterable
+        """
+        repository = self.get_repo()
+        try:
+            stats.update(repository.repo_obj, units, self.lib)
+        except lib.LibError:
+            _LOG.exception('update statistics failed for repository: {0}'.format(repository.id))
+
+    def _publish_deltas(self, repository, units):
+        """
+        Publish a static delta from the parent of each branch head.
+        Deltas are linked from the store in shared storage when found and
+        otherwise generated and added to the store.  The least recently used
+        deltas are evicted when the store exceeds the size limit.  Deltas
+        cannot be generated for partial commits and are skipped.  Deltas are
+        optional so failures are logged rather than failing the publish.
+
+        :param repository: The published repository.
+        :type repository: pulp_ostree.plugins.lib.Repository
+        :param units: The published units.
+        :type units: iterable
+        """
+        stores = {}
+        for unit in units:
+            parent = None
+            try:
+                if repository.partial(unit.commit):
+                    continue
+                parent = repository.parent(unit.commit)
+                if not parent or not repository.has_commit(parent):
+                    # the parent is not published
+                    continue
+                if repository.partial(parent):
+                    continue
+                store = deltas.DeltaStore.find(unit.storage_path)
+                stores[store.path] = store
+                deltas.publish(store, repository, parent, unit.commit)
+            except Exception:
+                _LOG.exception('delta: {0}-{1} not published'.format(parent, unit.commit))
+        for store in stores.values():
+            store.evict(self.delta_cache_size)
 
     def _get_units(self):
         """
         Get the collection of units to be published.
         The collection contains only the newest unit for each branch.
+        The commit metadata is not used and is not fetched.
+        Historical commits are published with the branch heads based on the depth.
         :return: An iterable of units to publish.
         :rtype: iterable
         """
         units_by_branch = {}
-        units = itertools.chain(*get_unit_model_querysets(self.get_repo().id, Branch))
+        querysets = get_unit_model_querysets(self.get_repo().id, Branch)
+        units = itertools.chain(
+            *[q.filter(historical__ne=True).exclude('metadata') for q in querysets])
         for unit in sorted(units, key=lambda u: u.created):
             units_by_branch[unit.branch] = unit
         return units_by_branch.values()
 
-    @staticmethod
-    def _add_ref(path, branch, commit):
-        """
-        Write a branch (ref) file into the published repository.
-        :param path: The absolute path to the repository.
-        :type path: str
-        :param branch: The branch relative path.
-        :type branch: str
-        :param commit: The commit hash.
-        :type commit: str
-        """
-        path = os.path.join(path, 'refs', 'heads', os.path.dirname(branch))
-        mkdir(path)
-        path = os.path.join(path, os.path.basename(branch))
-        with open(path, 'w+') as fp:
-            fp.write(commit)
+
+class AtomicPublish(Instrumented, AtomicDirectoryPublishStep):
+    """
+    Atomically make the published repository available.
+    """
+
+    @measured
+    def process_main(self, item=None):
+        """
+        Atomically swap the published directory.
+        """
+        super(AtomicPublish, self).process_main(item)
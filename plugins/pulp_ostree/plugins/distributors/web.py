@@ -5,10 +5,13 @@ import shutil
 
 from pulp.common.config import read_json_config
 from pulp.plugins.distributor import Distributor
+from pulp.server.config import config as pulp_conf
 
 from pulp_ostree.common import constants
 from pulp_ostree.plugins.distributors import configuration
 from pulp_ostree.plugins.distributors.steps import WebPublisher
+from pulp_ostree.plugins.metrics import Metrics
+from pulp_ostree.plugins.tracing import Tracing
 
 PLUGIN_DEFAULT_CONFIG = {
     constants.DISTRIBUTOR_CONFIG_KEY_PUBLISH_DIRECTORY:
@@ -84,7 +87,15 @@ class WebDistributor(Distributor):
         """
         _logger.debug('Publishing ostree repository: %s' % repo.id)
         self._publisher = WebPublisher(repo, publish_conduit, config)
-        return self._publisher.process_lifecycle()
+        metrics = Metrics(
+            config.get(constants.CONFIG_KEY_METRICS_DIRECTORY),
+            self._publisher,
+            constants.METRICS_PUBLISH,
+            repo.id)
+        trace = config.get(constants.CONFIG_KEY_TRACE)
+        with Tracing(trace, pulp_conf.get('server', 'working_directory')):
+            with metrics:
+                return self._publisher.process_lifecycle()
 
     def cancel_publish_repo(self):
         """
@@ -0,0 +1,292 @@
+"""
+Commit history (ancestry) of branches.
+
+Each commit unit records the parent commit and a generation number that
+increases by one from the parent.  The history pulled with each branch head
+is walked incrementally, stopping at commits already recorded, so ancestry
+queries are answered by the database without loading commit objects.
+Commits are disconnected when their parent has not been pulled and queries
+across a disconnected commit are answered as not known.
+"""
+
+import sys
+
+from argparse import ArgumentParser
+from logging import basicConfig, getLogger
+
+from pulp.server.db import connection
+
+from pulp_ostree.plugins.db import model
+
+
+log = getLogger(__name__)
+
+
+def ancestry(repository, remote_id, branch, commit):
+    """
+    Get the ancestry of the commits on a branch that have not been recorded.
+    The history of a branch is recorded in segments.  Each segment is a chain
+    of commits and the oldest commit in a segment is disconnected when its
+    parent has not been pulled.  A chain that does not reach a recorded commit
+    is numbered above the generations recorded on the branch.  Includes the
+    history (pulled) beyond the oldest commit of each disconnected segment when
+    the history depth has been increased.  The recorded generations above
+    the added history are increased (updated) as needed to keep the
+    generations increasing from parent to child.  Recorded commits that are
+    no longer disconnected are updated.
+
+    :param repository: The repository containing the commit.
+    :type repository: pulp_ostree.plugins.lib.Repository
+    :param remote_id: Uniquely identifies the remote repository.
+    :type remote_id: str
+    :param branch: The branch path.
+    :type branch: str
+    :param commit: The branch head commit hash.
+    :type commit: str
+    :return: A list of: (commit, parent, generation, disconnected) sorted by generation.
+    :rtype: list
+    """
+    known = {}
+    units = model.Branch.objects(
+        remote_id=remote_id,
+        branch=branch,
+        generation__ne=None).only('commit', 'parent', 'generation', 'disconnected')
+    for unit in units:
+        known[unit.commit] = [unit.parent, unit.generation, unit.disconnected]
+    recorded = set(known)
+    added = {}
+
+    chain = walk(repository, commit, known)
+    if chain:
+        _, parent = chain[-1]
+        if parent in known:
+            generation = known[parent][1] + len(chain)
+        else:
+            generation = maximum(known) + len(chain)
+        for n, (c, p) in enumerate(chain):
+            added[c] = [p, generation - n, False]
+        known.update(added)
+
+    segments = [c for c in known if known[c][2] or disconnected(c, known)]
+    for oldest in sorted(segments, key=lambda c: known[c][1], reverse=True):
+        parent, generation, _ = known[oldest]
+        tail = walk(repository, parent, known)
+        if tail:
+            below = [e[1] for e in known.values() if e[1] < generation]
+            room = generation - max(below or [-1]) - 1
+            if room < len(tail):
+                shift(remote_id, branch, known, generation, len(tail) - room)
+                generation = known[oldest][1]
+            for n, (c, p) in enumerate(tail, 1):
+                added[c] = known[c] = [p, generation - n, False]
+        if oldest in recorded and disconnected(oldest, known) != known[oldest][2]:
+            known[oldest][2] = not known[oldest][2]
+            model.Branch.objects(
+                remote_id=remote_id,
+                branch=branch,
+                commit=oldest).update(set__disconnected=known[oldest][2])
+
+    for c in added:
+        added[c][2] = disconnected(c, known)
+    chain = [(c, p, g, d) for c, (p, g, d) in added.items()]
+    return sorted(chain, key=lambda a: a[2])
+
+
+def maximum(known):
+    """
+    Get the highest generation recorded.
+
+    :param known: The recorded commits.  {commit: [parent, generation, disconnected]}
+    :type known: dict
+    :return: The highest generation.  -1 = none recorded.
+    :rtype: int
+    """
+    return max([e[1] for e in known.values()] or [-1])
+
+
+def disconnected(commit, known):
+    """
+    Get whether the parent of a commit has not been recorded.
+
+    :param commit: A commit hash.
+    :type commit: str
+    :param known: The recorded commits.  {commit: [parent, generation, disconnected]}
+    :type known: dict
+    :return: True if disconnected.
+    :rtype: bool
+    """
+    parent = known[commit][0]
+    return parent is not None and parent not in known
+
+
+def shift(remote_id, branch, known, generation, n):
+    """
+    Increase the generations at or above a generation on a branch.
+
+    :param remote_id: Uniquely identifies the remote repository.
+    :type remote_id: str
+    :param branch: The branch path.
+    :type branch: str
+    :param known: The recorded commits.  {commit: [parent, generation, disconnected]}
+    :type known: dict
+    :param generation: The lowest generation increased.
+    :type generation: int
+    :param n: The increase.
+    :type n: int
+    """
+    model.Branch.objects(
+        remote_id=remote_id,
+        branch=branch,
+        generation__gte=generation).update(inc__generation=n)
+    for entry in known.values():
+        if entry[1] >= generation:
+            entry[1] += n
+
+
+def walk(repository, commit, known):
+    """
+    Walk the history of a commit, newest first, until a recorded commit,
+    the first commit or a commit that has not been pulled is reached.
+
+    :param repository: The repository containing the commit.
+    :type repository: pulp_ostree.plugins.lib.Repository
+    :param commit: A commit hash.  None = no commit.
+    :type commit: str
+    :param known: The recorded commits.
+    :type known: collection
+    :return: A list of: (commit, parent).
+    :rtype: list
+    """
+    chain = []
+    while commit and commit not in known and repository.has_commit(commit):
+        parent = repository.parent(commit)
+        chain.append((commit, parent))
+        commit = parent
+    return chain
+
+
+def between(remote_id, branch, ancestor, commit):
+    """
+    Get the commits on a branch after an ancestor up to and including a commit.
+
+    :param remote_id: Uniquely identifies the remote repository.
+    :type remote_id: str
+    :param branch: The branch path.
+    :type branch: str
+    :param ancestor: The older commit hash.
+    :type ancestor: str
+    :param commit: The newer commit hash.
+    :type commit: str
+    :return: A list of commit hashes, newest first.  None = not an ancestor.
+    :rtype: list
+    :raises Unknown: when the history between the commits has not been pulled.
+    """
+    unit = model.Branch.objects(
+        remote_id=remote_id,
+        branch=branch,
+        commit=ancestor).only('generation').first()
+    if unit is None or unit.generation is None:
+        return None
+    units = model.Branch.objects(
+        remote_id=remote_id,
+        branch=branch,
+        generation__gte=unit.generation).only('commit', 'parent', 'disconnected')
+    units = dict((u.commit, u) for u in units)
+    commits = []
+    while commit in units:
+        if commit == ancestor:
+            return commits
+        commits.append(commit)
+        unit = units[commit]
+        if unit.disconnected:
+            raise Unknown(ancestor, commit)
+        commit = unit.parent
+    return None
+
+
+def is_ancestor(remote_id, branch, ancestor, commit):
+    """
+    Get whether a commit is an ancestor of (or the same as) another commit on a branch.
+
+    :param remote_id: Uniquely identifies the remote repository.
+    :type remote_id: str
+    :param branch: The branch path.
+    :type branch: str
+    :param ancestor: The older commit hash.
+    :type ancestor: str
+    :param commit: The newer commit hash.
+    :type commit: str
+    :return: True if an ancestor.  None = not known.
+    :rtype: bool
+    """
+    try:
+        return between(remote_id, branch, ancestor, commit) is not None
+    except Unknown:
+        return None
+
+
+class Unknown(Exception):
+    """
+    The history between two commits is not known because
+    commits between them have not been pulled.
+    """
+
+    def __init__(self, ancestor, commit):
+        """
+        :param ancestor: The older commit hash.
+        :type ancestor: str
+        :param commit: The disconnected commit hash.
+        :type commit: str
+        """
+        super(Unknown, self).__init__(
+            'history between: {0} and: {1} not pulled'.format(ancestor, commit))
+
+
+def get_parser():
+    parser = ArgumentParser(description='Query the history of branches in ostree repositories.')
+    commands = parser.add_subparsers(dest='command')
+    _between = commands.add_parser(
+        'between', help='list the commits on a branch after an ancestor up to a commit')
+    _ancestor = commands.add_parser(
+        'is-ancestor', help='determine whether a commit is an ancestor of another commit')
+    for command in (_between, _ancestor):
+        command.add_argument('branch', help='the branch')
+        command.add_argument('ancestor', help='the older commit')
+        command.add_argument('commit', help='the newer commit')
+    return parser
+
+
+def main(argv=None):
+    """
+    Query the history of a branch.
+    The exit status of is-ancestor is: 0 = ancestor, 1 = not an ancestor
+    and 2 = not known.
+    """
+    args = get_parser().parse_args(argv)
+    basicConfig(level='INFO', format='%(message)s')
+    connection.initialize()
+    unit = model.Branch.objects(
+        branch=args.branch,
+        commit=args.commit).only('remote_id').first()
+    if unit is None:
+        log.error('commit: {0} not found on branch: {1}'.format(args.commit, args.branch))
+        return 1
+    if args.command == 'is-ancestor':
+        found = is_ancestor(unit.remote_id, args.branch, args.ancestor, args.commit)
+        log.info({True: 'yes', False: 'no', None: 'unknown'}[found])
+        return {True: 0, False: 1, None: 2}[found]
+    try:
+        commits = between(unit.remote_id, args.branch, args.ancestor, args.commit)
+    except Unknown, e:
+        log.error(str(e))
+        return 2
+    if commits is None:
+        log.error('commit: {0} is not an ancestor of: {1}'.format(args.ancestor, args.commit))
+        return 1
+    for commit in commits:
+        log.info(commit)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
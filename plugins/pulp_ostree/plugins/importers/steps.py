@@ -1,7 +1,14 @@
+import itertools
 import os
+import sys
+import threading
+import time
 
+from ConfigParser import Error as ConfigParserError, RawConfigParser
 from gettext import gettext as _
+from glob import glob
 from logging import getLogger
+from Queue import Queue
 from urlparse import urlparse, urlunparse
 
 from gnupg import GPG
@@ -11,12 +18,14 @@ from mongoengine import NotUniqueError
 from pulp.common.plugins import importer_constants
 from pulp.plugins.util.publish_step import PluginStep, SaveUnitsStep
 from pulp.server.content.storage import SharedStorage
-from pulp.server.controllers.repository import associate_single_unit
+from pulp.server.controllers.repository import associate_single_unit, get_unit_model_querysets
 from pulp.server.exceptions import PulpCodedException
 
-from pulp_ostree.common import constants, errors
+from pulp_ostree.common import constants, errors, patterns
 from pulp_ostree.plugins.db import model
-from pulp_ostree.plugins import lib
+from pulp_ostree.plugins import diff, history, lib, metrics, packages, service, stats
+from pulp_ostree.plugins.instrumentation import Instrumented, measured
+from pulp_ostree.plugins.pool import ObjectPool
 
 
 log = getLogger(__name__)
@@ -24,10 +33,20 @@ log = getLogger(__name__)
 
 ALL = None  # all branches (refs)
 
+# The libostree default repository mode and the modes known by other names.
+REPO_MODE_BARE = 'bare'
+REPO_MODE_ALIASES = {'archive': 'archive-z2'}
+
 
 class Main(PluginStep):
     """
     The main synchronization step.
+    The storage directory is resolved and the local repository is opened
+    once and shared by all of the child steps.  The repository is closed
+    when the task finishes.
+
+    :ivar add_units: The step used to add content units.
+    :type add_units: Add
     """
 
     def __init__(self, **kwargs):
@@ -38,10 +57,18 @@ class Main(PluginStep):
         if not self.feed_url:
             raise PulpCodedException(errors.OST0004)
         self.remote_id = model.generate_remote_id(self.feed_url)
+        self._storage_dir = None
+        self._repository = None
+        self.resolved = None
+        self.add_units = Add()
         self.add_child(Create())
         self.add_child(Summary())
         self.add_child(Pull())
-        self.add_child(Add())
+        if self.object_pool:
+            self.add_child(Pool())
+        self.add_child(self.add_units)
+        self.add_child(Diff())
+        self.add_child(Statistics())
         self.add_child(Clean())
 
     @property
@@ -49,26 +76,275 @@ class Main(PluginStep):
         return self.config.get(importer_constants.KEY_FEED)
 
     @property
-    def branches(self):
+    def pipelined(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_PIPELINED, False)
+
+    @property
+    def object_pool(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_OBJECT_POOL, False)
+
+    @property
+    def fsync(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_FSYNC, True)
+
+    @property
+    def metadata_keys(self):
+        """
+        The commit metadata key (glob) patterns stored inline in the units.
+
+        :return: A list of patterns.
+        :rtype: list
+        """
+        keys = self.config.get(constants.IMPORTER_CONFIG_KEY_METADATA_KEYS)
+        if keys is None:
+            keys = constants.DEFAULT_METADATA_KEYS
+        return keys
+
+    @property
+    def local_path(self):
+        """
+        The path to the upstream repository when the feed is on the local filesystem
+        and can be imported directly.  Feeds with GPG validation, a content URL or
+        a mirrorlist configured are pulled through the remote so that signatures
+        are verified and content is fetched from where it is configured.  Feeds
+        with subdirectories configured are pulled through the remote so that
+        the refs are written in the namespace of the remote.
+
+        :return: The absolute path.  None = pulled through the remote.
+        :rtype: str
+        """
+        url = urlparse(self.feed_url)
+        if url.scheme != 'file':
+            return None
+        if self.config.get(constants.IMPORTER_CONFIG_KEY_GPG_KEYS):
+            return None
+        if self.content_url or self.mirrorlist or self.subdirs:
+            return None
+        return url.path
+
+    @property
+    def content_url(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_CONTENT_URL)
+
+    @property
+    def mirrorlist(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_MIRRORLIST)
+
+    @property
+    def content(self):
+        """
+        Where content is fetched from.  The commits and summary are always
+        fetched from the feed URL.  File objects are fetched from the mirrors
+        listed in the mirrorlist or the content URL when specified.
+
+        :return: A dictionary of: url, content_url, mirrorlist.
+        :rtype: dict
+        """
+        return dict(
+            url=self.feed_url,
+            content_url=self.content_url,
+            mirrorlist=self.mirrorlist)
+
+    @property
+    def patterns(self):
         return self.config.get(constants.IMPORTER_CONFIG_KEY_BRANCHES, ALL)
 
+    @property
+    def excluded(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES) or []
+
+    @property
+    def branches(self):
+        """
+        The branches to be synchronized.
+        The configured patterns until resolved by the Summary step.
+
+        :return: A list of branches.  None = ALL.
+        :rtype: list
+        """
+        if self.resolved is None:
+            return self.patterns
+        return self.resolved
+
+    def resolve(self, branches):
+        """
+        Resolve the branch patterns against the branches listed in the
+        upstream summary.  When the upstream has no summary, only exact
+        branch names can be selected.
+
+        :param branches: The branches listed in the upstream summary.
+        :type branches: list
+        :return: The selected branches.  None = ALL.
+        :rtype: list
+        """
+        include = self.patterns
+        exclude = self.excluded
+        expand = exclude or self.branch_depth or self.pipelined
+        if include is ALL and not (expand and branches):
+            self.resolved = ALL
+        elif branches:
+            self.resolved = patterns.select(branches, include, exclude)
+        else:
+            log.warning('upstream summary not found, only exact branch names selected')
+            self.resolved = patterns.select(patterns.literals(include), exclude=exclude)
+        return self.resolved
+
     @property
     def depth(self):
         depth = self.config.get(constants.IMPORTER_CONFIG_KEY_DEPTH, constants.DEFAULT_DEPTH)
         return int(depth)
 
+    @property
+    def subdirs(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_SUBDIRS) or None
+
+    @property
+    def network(self):
+        """
+        The effective network settings applied to the pull.
+
+        :return: A dictionary of settings keyed by configuration key.
+            None = the libostree default.
+        :rtype: dict
+        """
+        http2 = self.config.get(constants.IMPORTER_CONFIG_KEY_HTTP2)
+        network = {
+            importer_constants.KEY_MAX_SPEED: None,
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT: None,
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME: None,
+            constants.IMPORTER_CONFIG_KEY_HTTP2: http2,
+        }
+        for key in (importer_constants.KEY_MAX_SPEED,
+                    constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT,
+                    constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME):
+            value = self.config.get(key)
+            if value is not None:
+                network[key] = int(value)
+        return network
+
+    @property
+    def branch_depth(self):
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH) or {}
+
+    @property
+    def groups(self):
+        """
+        The branches grouped by history depth.
+        Each group is pulled separately so branches are grouped to
+        ensure the fewest pulls.  When pipelined, each group is split
+        into chunks of (at most) PIPELINE_CHUNK_SIZE branches so units
+        can be added as each chunk finishes without a pull per branch.
+
+        :return: A list of: (branches, depth).
+        :rtype: list
+        """
+        branches = self.branches
+        if branches is ALL:
+            return [(branches, self.depth)]
+        if self.branch_depth:
+            groups = {}
+            for branch in branches:
+                depth = patterns.depth(branch, self.branch_depth, self.depth)
+                groups.setdefault(depth, []).append(branch)
+            groups = [(groups[d], d) for d in sorted(groups)]
+        else:
+            groups = [(branches, self.depth)]
+        if self.pipelined:
+            size = constants.PIPELINE_CHUNK_SIZE
+            groups = [
+                (_branches[n:n + size], d)
+                for _branches, d in groups for n in range(0, len(_branches), size)
+            ]
+        return groups
+
     @property
     def repo_id(self):
         return self.get_repo().id
 
     @property
     def storage_dir(self):
-        storage_id = self.remote_id
-        with SharedStorage(constants.STORAGE_PROVIDER, storage_id) as storage:
-            return storage.content_dir
+        if self._storage_dir is None:
+            storage_id = self.remote_id
+            with SharedStorage(constants.STORAGE_PROVIDER, storage_id) as storage:
+                self._storage_dir = storage.content_dir
+        return self._storage_dir
+
+    @property
+    def localcache(self):
+        """
+        The other shared storage repositories on the same filesystem.
+        Used as local caches by the pull so that objects already in storage
+        are hard linked instead of downloaded.
+
+        :return: A list of absolute paths.
+        :rtype: list
+        """
+        if not self.config.get(constants.IMPORTER_CONFIG_KEY_LOCALCACHE, True):
+            return []
+        storage_dir = self.storage_dir
+        pattern = os.path.join(os.path.dirname(os.path.dirname(storage_dir)), '*', 'content')
+        paths = []
+        try:
+            device = os.stat(storage_dir).st_dev
+        except OSError:
+            return paths
+        for path in sorted(glob(pattern)):
+            if path == storage_dir:
+                continue
+            try:
+                objects = os.stat(os.path.join(path, 'objects'))
+            except OSError:
+                continue
+            if objects.st_dev == device:
+                paths.append(path)
+        return paths
+
+    @property
+    def lib(self):
+        """
+        The lib API used by the child steps.
+        Served by the ostree service when configured.
 
+        :return: The lib module or the service library.
+        """
+        path = self.config.get(constants.CONFIG_KEY_SERVICE)
+        if path:
+            return service.Library(path)
+        return lib
+
+    @property
+    def repository(self):
+        """
+        The local ostree repository shared by the child steps.
+
+        :return: The repository.
+        :rtype: lib.Repository
+        """
+        if self._repository is None:
+            self._repository = self.lib.Repository(self.storage_dir)
+        return self._repository
+
+    def process_lifecycle(self):
+        """
+        Process the step lifecycle and close the shared repository.
+
+        :return: The final report.
+        """
+        try:
+            return super(Main, self).process_lifecycle()
+        finally:
+            self.close()
 
-class Create(PluginStep):
+    def close(self):
+        """
+        Close the shared repository.
+        """
+        if self._repository is not None:
+            self._repository.close()
+            self._repository = None
+
+
+class Create(Instrumented, PluginStep):
     """
     Ensure the local ostree repository has been created
     and the configured.  A temporary remote is created using the repo_id as
@@ -80,6 +356,7 @@ class Create(PluginStep):
         super(Create, self).__init__(step_type=constants.IMPORT_STEP_CREATE_REPOSITORY)
         self.description = _('Create Local Repository')
 
+    @measured
     def process_main(self, item=None):
         """
         Ensure the local ostree repository has been created
@@ -90,7 +367,7 @@ class Create(PluginStep):
         """
         path = self.parent.storage_dir
         try:
-            repository = lib.Repository(path)
+            repository = self.parent.repository
             try:
                 repository.open()
             except lib.LibError:
@@ -102,7 +379,7 @@ class Create(PluginStep):
             raise pe
 
 
-class Summary(PluginStep):
+class Summary(Instrumented, PluginStep):
     """
     Update the summary information stored in the repository scratchpad.
     """
@@ -110,19 +387,24 @@ class Summary(PluginStep):
     def __init__(self):
         super(Summary, self).__init__(step_type=constants.IMPORT_STEP_SUMMARY)
         self.description = _('Update Summary')
+        self.selected = None
 
+    @measured
     def process_main(self, item=None):
         """
         Add/update the remote summary information in the
-        repository scratchpad.
+        repository scratchpad and resolve the branch patterns.
+        The commit metadata decoded here is cached by the shared
+        repository for use by the Add step.
         """
         try:
-            lib_repository = lib.Repository(self.parent.storage_dir)
-            remote = lib.Remote(self.parent.repo_id, lib_repository)
+            remote = self.parent.lib.Remote(self.parent.repo_id, self.parent.repository)
             refs = [r.dict() for r in remote.list_refs()]
         except lib.LibError, le:
             pe = PulpCodedException(errors.OST0005, reason=str(le))
             raise pe
+        self.measurement.items = len(refs)
+        self.selected = self.parent.resolve([r['name'] for r in refs])
         repository = self.get_repo().repo_obj
         map(self.clean_metadata, refs)
         repository.scratchpad.update({
@@ -132,6 +414,17 @@ class Summary(PluginStep):
         })
         repository.save()
 
+    def get_progress_report(self):
+        """
+        The progress report with the selected branches included.
+
+        :return: The progress report.
+        :rtype: dict
+        """
+        report = super(Summary, self).get_progress_report()
+        report[constants.SELECTED_BRANCHES] = self.selected
+        return report
+
     @staticmethod
     def clean_metadata(ref):
         """
@@ -146,95 +439,671 @@ class Summary(PluginStep):
         ref[key] = dict((k.replace('.', '-'), v) for k, v in ref[key].items())
 
 
-class Pull(PluginStep):
+class Pull(Instrumented, PluginStep):
     """
     Pull each of the specified branches.
+    Branches are imported directly from a feed on the local filesystem
+    unless it must be pulled through the remote.  See: Main.local_path.
+    Objects are hard linked when both repositories are on the same
+    filesystem and copied (reflinked when supported) otherwise.
+
+    :ivar groups: The pulls: [{branches: <list>, depth: <int>}].
+    :type groups: list
+    :ivar group: The description of the group being pulled.
+    :type group: str
+    :ivar fetched: The total objects fetched by completed pulls.
+    :type fetched: int
+    :ivar bytes_transferred: The total bytes downloaded by completed pulls.
+    :type bytes_transferred: int
+    :ivar network: The effective network settings.
+    :type network: dict
+    :ivar source: Where content is fetched from.  See: Main.content.
+    :type source: dict
+    :ivar elapsed: The total time (seconds) spent in completed pulls.
+    :type elapsed: float
+    :ivar method: How objects are pulled (fetch|hardlink|copy).
+    :type method: str
+    :ivar caches: The local cache repositories offered to the pull.
+    :type caches: list
+    :ivar cached: The total objects found in local caches by completed pulls.
+    :type cached: int
+    :ivar fsync: Each object is fsynced as it is written.  When False, the
+        pulls are written in a transaction committed by a consistency barrier.
+    :type fsync: bool
+    :ivar transaction: The open transaction.  None = not batched.
+    :type transaction: lib.Transaction
     """
 
     def __init__(self):
         super(Pull, self).__init__(step_type=constants.IMPORT_STEP_PULL)
         self.description = _('Pull Remote Branches')
-
+        self.progress = None
+        self.groups = []
+        self.group = ''
+        self.fetched = 0
+        self.bytes_transferred = 0
+        self.network = {}
+        self.source = {}
+        self.elapsed = 0.0
+        self.method = None
+        self.caches = []
+        self.cached = 0
+        self.fsync = True
+        self.transaction = None
+
+    @measured
     def process_main(self, item=None):
         """
         Pull each of the specified branches using the temporary remote
-        configured using the repo_id as the remote_id.
+        configured using the repo_id as the remote_id.  When pipelined,
+        content units are added as each group finishes pulling while the
+        next group is pulled.  See: _pipeline().  When fsync is disabled,
+        the pulls are written in a transaction committed by a consistency
+        barrier at the end (or after each group when pipelined).
+
+        :raises PulpCodedException:
+        """
+        repository = self.parent.repository
+        if self.parent.branches == []:
+            self.progress_details = _('no branches selected')
+            return
+        self.network = self.parent.network
+        self.source = self.parent.content
+        path = self.parent.local_path
+        self.method = self._method(repository, path)
+        if not path:
+            self.caches = self.parent.localcache
+        self.fsync = self.parent.fsync
+        if not self.fsync:
+            repository.disable_fsync()
+        groups = self.parent.groups
+        self.groups = [dict(branches=b, depth=d) for b, d in groups]
+        try:
+            if self.parent.pipelined and len(groups) > 1:
+                self._pipeline(path, groups)
+            else:
+                for n in range(1, len(groups) + 1):
+                    self._fetch(repository, path, n, groups)
+            self._barrier(repository)
+        finally:
+            self._abort()
+
+    def _fetch(self, repository, path, n, groups):
+        """
+        Pull (or import) a group of branches.
 
+        :param repository: The local repository.
+        :type repository: lib.Repository
+        :param path: The path to the upstream repository on the local filesystem.
+            None = a remote feed.
+        :type path: str
+        :param n: The group number (1 based).
+        :type n: int
+        :param groups: The groups: [(branches, depth)].
+        :type groups: list
+        :raises PulpCodedException:
+        """
+        branches, depth = groups[n - 1]
+        if len(groups) > 1:
+            self.group = 'group %(n)d/%(t)d depth=%(d)d: ' % dict(
+                n=n, t=len(groups), d=depth)
+        if not self.fsync and self.transaction is None:
+            self._prepare(repository)
+        if path:
+            self._import(repository, path, branches, depth, self.parent.subdirs)
+        else:
+            self._pull(
+                repository,
+                self.parent.repo_id,
+                branches,
+                depth,
+                self.parent.subdirs)
+
+    def _pipeline(self, path, groups):
+        """
+        Pull the groups in a worker thread while the content units are added
+        for the groups already pulled.  The worker uses its own repository
+        handle (a separate session when served by the ostree service) so the
+        pulls and the reads made by the Add step are not serialized.  Each
+        group is committed by the consistency barrier before it is queued so
+        units are added only for content that is in place.  When adding units
+        fails, the worker stops after the group being pulled.
+
+        :param path: The path to the upstream repository on the local filesystem.
+            None = a remote feed.
+        :type path: str
+        :param groups: The groups: [(branches, depth)].
+        :type groups: list
         :raises PulpCodedException:
         """
-        self._pull(
-            self.parent.storage_dir,
-            self.parent.repo_id,
-            self.parent.branches,
-            self.parent.depth)
+        repository = self.parent.lib.Repository(self.parent.storage_dir)
+        pulled = Queue()
+        stopped = threading.Event()
+        failed = []
 
-    def _pull(self, path, remote_id, refs, depth):
+        def worker():
+            try:
+                for n, (branches, depth) in enumerate(groups, 1):
+                    if stopped.is_set():
+                        break
+                    self._fetch(repository, path, n, groups)
+                    self._barrier(repository)
+                    pulled.put(branches)
+            except Exception:
+                failed.append(sys.exc_info())
+            finally:
+                pulled.put(None)
+
+        if not self.fsync:
+            repository.disable_fsync()
+        thread = threading.Thread(target=worker, name='pull')
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                branches = pulled.get()
+                if branches is None:
+                    break
+                self.parent.add_units.add(branches)
+        finally:
+            stopped.set()
+            thread.join()
+            self._abort()
+            repository.close()
+        if failed:
+            raise failed[0][0], failed[0][1], failed[0][2]
+
+    def _prepare(self, repository):
         """
-        Pull the specified branch.
+        Prepare the transaction used by the pulls.
+        Objects are written into the transaction staging directory and are
+        moved into the repository only when the transaction is committed.
+        The staging directory of a pull interrupted before the consistency
+        barrier is discarded by libostree so the objects are fetched again.
 
-        :param path: The absolute path to the local repository.
+        :param repository: The local repository.
+        :type repository: lib.Repository
+        :raises PulpCodedException:
+        """
+        transaction = repository.transaction()
+        try:
+            transaction.prepare()
+        except lib.LibError, le:
+            pe = PulpCodedException(errors.OST0002, reason=str(le))
+            raise pe
+        self.transaction = transaction
+
+    def _barrier(self, repository):
+        """
+        The consistency barrier.
+        The objects written by the pulls are flushed to disk using a single
+        filesystem sync and only then is the transaction committed which
+        moves the objects into place and writes the refs.  A final sync
+        makes the refs durable.  Does nothing when no transaction is open.
+
+        :param repository: The local repository.
+        :type repository: lib.Repository
+        :raises PulpCodedException:
+        """
+        if self.transaction is None:
+            return
+        self.progress_details = self.group + 'syncing to disk'
+        self.report_progress(force=True)
+        try:
+            repository.sync()
+            self.transaction.commit()
+            self.transaction = None
+            repository.sync()
+        except (lib.LibError, OSError), e:
+            pe = PulpCodedException(errors.OST0002, reason=str(e))
+            raise pe
+
+    def _abort(self):
+        """
+        Abort the open transaction (if any) after a failed pull.
+        """
+        if self.transaction is None:
+            return
+        try:
+            self.transaction.abort()
+        except lib.LibError:
+            log.exception('abort transaction failed')
+        self.transaction = None
+
+    @staticmethod
+    def _method(repository, path):
+        """
+        Determine how objects will be pulled.
+
+        :param repository: The local repository.
+        :type repository: lib.Repository
+        :param path: The path to the upstream repository on the local filesystem.
+            None = a remote feed.
         :type path: str
+        :return: The pull method (fetch|hardlink|copy).
+        :rtype: str
+        """
+        if not path:
+            return constants.PULL_METHOD_FETCH
+        try:
+            source = os.stat(os.path.join(path, 'objects'))
+            target = os.stat(os.path.join(repository.path, 'objects'))
+        except OSError:
+            return constants.PULL_METHOD_COPY
+        if source.st_dev != target.st_dev:
+            return constants.PULL_METHOD_COPY
+        # libostree only hardlinks objects between repositories with the same mode
+        mode = Pull._mode(path)
+        if mode is None or mode != Pull._mode(repository.path):
+            return constants.PULL_METHOD_COPY
+        return constants.PULL_METHOD_HARDLINK
+
+    @staticmethod
+    def _mode(path):
+        """
+        Read the mode of a repository on the local filesystem.
+
+        :param path: The path to the repository.
+        :type path: str
+        :return: The repository mode.  None = not known.
+        :rtype: str
+        """
+        parser = RawConfigParser()
+        try:
+            parser.read(os.path.join(path, 'config'))
+            if not parser.has_section('core'):
+                return None
+            if not parser.has_option('core', 'mode'):
+                return REPO_MODE_BARE
+            mode = parser.get('core', 'mode')
+        except ConfigParserError:
+            return None
+        return REPO_MODE_ALIASES.get(mode, mode)
+
+    def _import(self, repository, path, refs, depth, subdirs=None):
+        """
+        Import the specified branches from a repository on the local filesystem.
+
+        :param repository: The local repository.
+        :type repository: lib.Repository
+        :param path: The path to the upstream repository.
+        :type path: str
+        :param refs: The refs to pull.
+        :type refs: list
+        :param depth: The tree traversal depth.
+        :type depth: int
+        :param subdirs: The subdirectories to pull.  None = ALL.
+        :type subdirs: list
+        :raises PulpCodedException:
+        """
+        self.progress_details = self.group + 'importing (%(m)s)' % dict(m=self.method)
+        self.report_progress(force=True)
+        started = time.time()
+        try:
+            repository.pull_local(
+                path, refs, depth, subdirs, transaction=self.transaction is not None)
+        except lib.LibError, le:
+            pe = PulpCodedException(errors.OST0002, reason=str(le))
+            raise pe
+        self.elapsed += time.time() - started
+
+    def _pull(self, repository, remote_id, refs, depth, subdirs=None):
+        """
+        Pull the specified branches.
+
+        :param repository: The local repository.
+        :type repository: lib.Repository
         :param remote_id: The remote ID.
         :type remote_id: str
         :param refs: The refs to pull.
         :type refs: list
         :param depth: The tree traversal depth.
         :type depth: int
+        :param subdirs: The subdirectories to pull.  None = ALL.
+        :type subdirs: list
         :raises PulpCodedException:
         """
+        network = self.network
+
         def report_progress(report):
             data = dict(
                 f=report.fetched,
                 r=report.requested,
                 p=report.percent
             )
-            self.progress_details = 'fetching %(f)d/%(r)d %(p)d%%' % data
+            self.progress_details = self.group + 'fetching %(f)d/%(r)d %(p)d%%' % data
+            self.progress = report
+            self.measurement.items = self.fetched + report.fetched
             self.report_progress(force=True)
 
+        self.progress = None
+        started = time.time()
         try:
-            repository = lib.Repository(path)
-            repository.pull(remote_id, refs, report_progress, depth)
+            repository.pull(
+                remote_id,
+                refs,
+                report_progress,
+                depth,
+                subdirs,
+                max_speed=network.get(importer_constants.KEY_MAX_SPEED),
+                low_speed_limit=network.get(constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT),
+                low_speed_time=network.get(constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME),
+                localcache=self.caches,
+                transaction=self.transaction is not None)
         except lib.LibError, le:
             pe = PulpCodedException(errors.OST0002, reason=str(le))
             raise pe
+        self.elapsed += time.time() - started
+        if self.progress is not None:
+            self.fetched += self.progress.fetched
+            self.bytes_transferred += self.progress.bytes_transferred
+            self.cached += self.progress.localcache
+
+    @property
+    def content(self):
+        """
+        Where content was fetched from and the measured throughput
+        of the completed pulls.
+
+        :return: The content source with: bytes_transferred, seconds and
+            throughput (bytes/second) added.
+        :rtype: dict
+        """
+        if self.elapsed:
+            throughput = int(self.bytes_transferred / self.elapsed)
+        else:
+            throughput = 0
+        return dict(
+            self.source,
+            bytes_transferred=self.bytes_transferred,
+            seconds=round(self.elapsed, 3),
+            throughput=throughput)
+
+    def get_progress_report(self):
+        """
+        The progress report with the pull groups, the effective
+        network settings, the content source, the pull method, the
+        local cache usage and the fsync policy included.
+
+        :return: The progress report.
+        :rtype: dict
+        """
+        report = super(Pull, self).get_progress_report()
+        report[constants.PULL_GROUPS] = self.groups
+        report[constants.PULL_NETWORK] = self.network
+        report[constants.PULL_CONTENT] = self.content
+        report[constants.PULL_METHOD] = self.method
+        report[constants.PULL_LOCALCACHE] = dict(repositories=self.caches, objects=self.cached)
+        report[constants.PULL_FSYNC] = dict(enabled=self.fsync)
+        return report
+
+    def collect(self, registry, labels):
+        """
+        Collect the step metrics including the totals for all of the pulls.
+
+        :param registry: The metrics registry.
+        :type registry: pulp_ostree.plugins.metrics.Registry
+        :param labels: The repo_id and remote_id labels.
+        :type labels: dict
+        """
+        super(Pull, self).collect(registry, labels)
+        labels = dict(labels, step=self.step_id)
+        registry.gauge(metrics.BYTES_PULLED).set(self.bytes_transferred, **labels)
+        registry.gauge(metrics.OBJECTS_FETCHED).set(self.fetched, **labels)
+        registry.gauge(metrics.OBJECTS_LOCALCACHE).set(self.cached, **labels)
 
 
-class Add(SaveUnitsStep):
+class Pool(Instrumented, PluginStep):
+    """
+    Add the objects in the local repository to the object pool.
+    Objects already pooled are replaced by links into the pool.
+    Only the objects written since the repository was last pooled are added.
+
+    :ivar summary: What was done.
+    :type summary: pulp_ostree.plugins.pool.Summary
+    """
+
+    def __init__(self):
+        super(Pool, self).__init__(step_type=constants.IMPORT_STEP_POOL)
+        self.description = _('Pool Objects')
+        self.summary = None
+
+    @measured
+    def process_main(self, item=None):
+        """
+        Add the objects in the local repository to the object pool.
+        """
+        storage_dir = self.parent.storage_dir
+        pool = ObjectPool.find(storage_dir)
+        self.summary = pool.add(storage_dir, incremental=True)
+        self.measurement.items = self.summary.objects
+
+    def get_progress_report(self):
+        """
+        The progress report with the pool summary included.
+
+        :return: The progress report.
+        :rtype: dict
+        """
+        report = super(Pool, self).get_progress_report()
+        if self.summary is not None:
+            report[constants.POOL_SUMMARY] = self.summary.dict()
+        return report
+
+
+class Add(Instrumented, SaveUnitsStep):
     """
     Add content units.
+    Units are added for each branch head and for the commits in the
+    history pulled with the head (historical).
+
+    :ivar added: The branches added: {(branch, commit)}.
+    :type added: set
     """
 
     def __init__(self):
         super(Add, self).__init__(step_type=constants.IMPORT_STEP_ADD_UNITS)
         self.description = _('Add Content Units')
+        self.added = set()
 
+    @measured
     def process_main(self, item=None):
         """
         Find all branch (heads) in the local repository and
-        create content units for them.
-        """
-        lib_repository = lib.Repository(self.parent.storage_dir)
-        for ref in lib_repository.list_refs():
-            # the branches listed here can have an undesired prefix ending with a ":"
-            branch = ref.path.split(':')[-1]
-            if self.parent.branches is not ALL:
-                if branch not in self.parent.branches:
+        create content units for them.  Units record whether only
+        subdirectories of the commit are stored.
+        """
+        self.add(self.parent.branches)
+
+    def add(self, branches):
+        """
+        Create and associate content units for the specified branches.
+        Used by the Pull step to add units as each group finishes pulling
+        when pipelined.  Branches already added are skipped.
+        Mirrored refs have no prefix.  Refs pulled with subdirectories are
+        prefixed by the remote (repo_id) ending with a ":".  Only the refs
+        in the namespace written by this repository are added.  When branches
+        are specified, only their refs are read from the repository.
+
+        :param branches: A list of branches.  None = ALL.
+        :type branches: list
+        """
+        repository = self.parent.repository
+        namespace = self.parent.repo_id if self.parent.subdirs else ''
+        if branches is ALL:
+            refs = repository.list_refs()
+        else:
+            if namespace:
+                names = ['{0}:{1}'.format(namespace, b) for b in branches]
+            else:
+                names = branches
+            refs = repository.list_refs(names)
+        for ref in refs:
+            prefix, _, branch = ref.path.rpartition(':')
+            if prefix != namespace:
+                # pulled by another repository
+                log.debug('skipping ref in another namespace: {0}'.format(ref.path))
+                continue
+            if branches is not ALL:
+                if branch not in branches:
                     # not listed
                     log.debug('skipping non-selected branch: {0}'.format(branch))
                     continue
-            unit = model.Branch(
-                remote_id=self.parent.remote_id,
+            if (branch, ref.commit) in self.added:
+                continue
+            head = (None, None, False)
+            for commit, parent, generation, disconnected in history.ancestry(
+                    repository, self.parent.remote_id, branch, ref.commit):
+                if commit == ref.commit:
+                    head = (parent, generation, disconnected)
+                    continue
+                metadata = repository.commit_metadata(commit)
+                self._add(branch, commit, metadata, True, parent, generation, disconnected)
+            self._add(branch, ref.commit, ref.metadata, False, *head)
+            self.added.add((branch, ref.commit))
+
+    def _add(self, branch, commit, metadata, historical, parent, generation, disconnected):
+        """
+        Create and associate the content unit for a commit.
+        Units are shared by repositories with the same feed and are not updated
+        using the importer configuration.  The complete metadata is immutable
+        and stored only once for each commit.  The ancestry is updated only for
+        units that have not recorded it and the partial flag is cleared once
+        the commit is complete in storage.  The package index is informational
+        so failures are logged rather than failing the synchronization.
+
+        :param branch: The branch path.
+        :type branch: str
+        :param commit: A commit hash.
+        :type commit: str
+        :param metadata: The commit metadata.
+        :type metadata: dict
+        :param historical: The commit is in the history of the branch head.
+        :type historical: bool
+        :param parent: The parent commit hash.  None = no parent or not known.
+        :type parent: str
+        :param generation: The commit generation.  None = not known.
+        :type generation: int
+        :param disconnected: The parent commit has not been recorded.
+        :type disconnected: bool
+        """
+        repository = self.parent.repository
+        partial = repository.partial(commit)
+        inline, extra = model.split_metadata(metadata, self.parent.metadata_keys)
+        if extra and model.CommitMetadata.objects(commit=commit).only('commit').first() is None:
+            model.CommitMetadata.store(commit, metadata)
+        unit = model.Branch(
+            remote_id=self.parent.remote_id,
+            branch=branch,
+            commit=commit,
+            metadata=inline,
+            extra_metadata=bool(extra),
+            partial=partial,
+            historical=historical,
+            parent=parent,
+            generation=generation,
+            disconnected=disconnected)
+        try:
+            unit.save()
+        except NotUniqueError:
+            unit = model.Branch.objects.get(**unit.unit_key)
+            update = {}
+            if unit.partial and not partial:
+                update.update(partial=False)
+            if unit.historical and not historical:
+                update.update(historical=False)
+            if unit.generation is None and generation is not None:
+                update.update(
+                    parent=parent,
+                    generation=generation,
+                    disconnected=disconnected)
+            if update:
+                model.Branch.objects(id=unit.id).update(
+                    **dict(('set__' + k, v) for k, v in update.items()))
+                for name, value in update.items():
+                    setattr(unit, name, value)
+        associate_single_unit(self.get_repo().repo_obj, unit)
+        try:
+            packages.index(repository, commit, metadata, partial)
+        except Exception:
+            log.exception('package index: {0} failed'.format(commit))
+        self.measurement.items += 1
+
+    def collect(self, registry, labels):
+        """
+        Collect the step metrics including the number of units added.
+
+        :param registry: The metrics registry.
+        :type registry: pulp_ostree.plugins.metrics.Registry
+        :param labels: The repo_id and remote_id labels.
+        :type labels: dict
+        """
+        super(Add, self).collect(registry, labels)
+        labels = dict(labels, step=self.step_id)
+        registry.gauge(metrics.UNITS_ADDED).set(self.measurement.items, **labels)
+
+
+class Diff(Instrumented, PluginStep):
+    """
+    Compute the diffs between the previous and the new head of each branch.
+    """
+
+    def __init__(self):
+        super(Diff, self).__init__(step_type=constants.IMPORT_STEP_DIFF)
+        self.description = _('Compute Diffs')
+
+    @measured
+    def process_main(self, item=None):
+        """
+        Compute (and cache) the diff between the previous head and the
+        head added for each branch.  Diffs are informational so failures
+        are logged rather than failing the synchronization.
+        """
+        repository = self.parent.repository
+        remote_id = self.parent.remote_id
+        for branch, commit in sorted(self.parent.add_units.added):
+            previous = model.Branch.objects(
+                remote_id=remote_id,
                 branch=branch,
-                commit=ref.commit,
-                metadata=ref.metadata)
+                historical__ne=True,
+                commit__ne=commit).order_by('-created').only('commit').first()
+            if previous is None:
+                continue
             try:
-                unit.save()
-            except NotUniqueError:
-                unit = model.Branch.objects.get(**unit.unit_key)
-            associate_single_unit(self.get_repo().repo_obj, unit)
+                if not repository.has_commit(previous.commit):
+                    continue
+                diff.get(repository, previous.commit, commit)
+                self.measurement.items += 1
+            except Exception:
+                log.exception('diff: {0}..{1} failed'.format(previous.commit, commit))
 
 
-class Clean(PluginStep):
+class Statistics(Instrumented, PluginStep):
+    """
+    Update the repository statistics.
+    """
+
+    def __init__(self):
+        super(Statistics, self).__init__(step_type=constants.IMPORT_STEP_STATISTICS)
+        self.description = _('Update Statistics')
+
+    @measured
+    def process_main(self, item=None):
+        """
+        Update the repository statistics stored in the repository scratchpad.
+        Statistics are informational so failures are logged rather than
+        failing the synchronization.
+        """
+        repository = self.get_repo()
+        querysets = get_unit_model_querysets(repository.id, model.Branch)
+        units = itertools.chain(*[q.filter(historical__ne=True) for q in querysets])
+        try:
+            stats.update(repository.repo_obj, units, self.parent.lib)
+        except lib.LibError:
+            log.exception('update statistics failed for repository: {0}'.format(repository.id))
+
+
+class Clean(Instrumented, PluginStep):
     """
     Clean up after import.
     """
@@ -243,16 +1112,15 @@ class Clean(PluginStep):
         super(Clean, self).__init__(step_type=constants.IMPORT_STEP_CLEAN)
         self.description = _('Clean')
 
+    @measured
     def process_main(self, item=None):
         """
         Clean up after import:
          - Delete the remote used for the pull.
         """
-        path = self.parent.storage_dir
         remote_id = self.parent.repo_id
         try:
-            repository = lib.Repository(path)
-            remote = lib.Remote(remote_id, repository)
+            remote = self.parent.lib.Remote(remote_id, self.parent.repository)
             remote.delete()
         except lib.LibError, le:
             pe = PulpCodedException(errors.OST0003, id=remote_id, reason=str(le))
@@ -292,6 +1160,26 @@ class Remote(object):
         """
         return self.step.parent.feed_url
 
+    @property
+    def content_url(self):
+        """
+        The content URL.
+
+        :return: The URL used to fetch file objects.
+        :rtype: str
+        """
+        return self.step.parent.content_url
+
+    @property
+    def mirrorlist(self):
+        """
+        The mirrorlist URL.
+
+        :return: The URL of the list of mirrors used to fetch file objects.
+        :rtype: str
+        """
+        return self.step.parent.mirrorlist
+
     @property
     def remote_id(self):
         """
@@ -399,6 +1287,16 @@ class Remote(object):
         key_ids = [key['keyid'] for key in gpg.list_keys()]
         return path, key_ids
 
+    @property
+    def http2(self):
+        """
+        The HTTP/2 flag.
+
+        :return: True if HTTP/2 is enabled.  None = libostree default.
+        :rtype: bool
+        """
+        return self.config.get(constants.IMPORTER_CONFIG_KEY_HTTP2)
+
     @property
     def proxy_url(self):
         """
@@ -430,14 +1328,17 @@ class Remote(object):
         Add (or replace) this remote to the repository.
         """
         path, key_ids = self.gpg_keys
-        impl = lib.Remote(self.remote_id, self.repository)
+        impl = self.step.parent.lib.Remote(self.remote_id, self.repository)
         impl.url = self.url
+        impl.content_url = self.content_url
+        impl.mirrorlist = self.mirrorlist
         impl.ssl_key_path = self.ssl_key_path
         impl.ssl_cert_path = self.ssl_cert_path
         impl.ssl_ca_path = self.ssl_ca_path
         impl.ssl_validation = self.ssl_validation
         impl.gpg_validation = len(key_ids) > 0
         impl.proxy_url = self.proxy_url
+        impl.http2 = self.http2
         impl.update()
         if key_ids:
             impl.import_key(path, key_ids)
@@ -3,10 +3,15 @@ import sys
 from gettext import gettext as _
 
 from pulp.common.config import read_json_config
+from pulp.common.plugins import importer_constants
 from pulp.plugins.importer import Importer
+from pulp.server.config import config as pulp_conf
 
-from pulp_ostree.common import constants
+from pulp_ostree.common import constants, patterns
+from pulp_ostree.plugins import metrics, tracing
 from pulp_ostree.plugins.importers.steps import Main
+from pulp_ostree.plugins.metrics import Metrics
+from pulp_ostree.plugins.tracing import Tracing
 
 
 def entry_point():
@@ -55,6 +60,63 @@ class WebImporter(Importer):
         :param config: plugin configuration
         :type  config: pulp.plugins.config.PluginCallConfiguration
         """
+        branch_depth = config.get(constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH) or {}
+        if not isinstance(branch_depth, dict):
+            return False, _('%(k)s must be a dictionary') % {
+                'k': constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH}
+        try:
+            patterns.validate(config.get(constants.IMPORTER_CONFIG_KEY_BRANCHES))
+            patterns.validate(config.get(constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES))
+            patterns.validate(branch_depth.keys())
+        except ValueError, e:
+            return False, _('Invalid branch pattern: %(e)s') % {'e': e}
+        try:
+            map(int, branch_depth.values())
+        except (TypeError, ValueError):
+            return False, _('Branch depth must be an integer')
+        subdirs = config.get(constants.IMPORTER_CONFIG_KEY_SUBDIRS)
+        if subdirs is not None:
+            if not isinstance(subdirs, list) or \
+                    not all(isinstance(p, basestring) for p in subdirs):
+                return False, _('%(k)s must be a list of strings') % {
+                    'k': constants.IMPORTER_CONFIG_KEY_SUBDIRS}
+            for path in subdirs:
+                if not path.startswith('/'):
+                    return False, _('Subdirectory: %(p)s must be absolute') % {'p': path}
+        if config.get(importer_constants.KEY_MAX_DOWNLOADS) is not None:
+            return False, _('%(k)s is not supported by libostree') % {
+                'k': importer_constants.KEY_MAX_DOWNLOADS}
+        for key in (importer_constants.KEY_MAX_SPEED,
+                    constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT,
+                    constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME):
+            value = config.get(key)
+            if value is None:
+                continue
+            try:
+                if int(value) < 1:
+                    raise ValueError()
+            except (TypeError, ValueError):
+                return False, _('%(k)s must be a positive integer') % {'k': key}
+        if config.get(constants.IMPORTER_CONFIG_KEY_CONTENT_URL) and \
+                config.get(constants.IMPORTER_CONFIG_KEY_MIRRORLIST):
+            return False, _('Only one of: content_url, mirrorlist may be specified')
+        if config.get(constants.IMPORTER_CONFIG_KEY_HTTP2) not in (None, True, False):
+            return False, _('%(k)s must be a boolean') % {'k': constants.IMPORTER_CONFIG_KEY_HTTP2}
+        try:
+            tracing.validate(config.get(constants.CONFIG_KEY_TRACE))
+        except ValueError:
+            return False, _('%(k)s must be a file name') % {'k': constants.CONFIG_KEY_TRACE}
+        try:
+            metrics.validate(config.get(constants.CONFIG_KEY_METRICS_DIRECTORY))
+        except ValueError:
+            return False, _('%(k)s must be the absolute path to an existing directory') % {
+                'k': constants.CONFIG_KEY_METRICS_DIRECTORY}
+        metadata_keys = config.get(constants.IMPORTER_CONFIG_KEY_METADATA_KEYS)
+        if metadata_keys is not None:
+            if not isinstance(metadata_keys, list) or \
+                    not all(isinstance(k, basestring) for k in metadata_keys):
+                return False, _('%(k)s must be a list of strings') % {
+                    'k': constants.IMPORTER_CONFIG_KEY_METADATA_KEYS}
         return True, ''
 
     def sync_repo(self, repo, conduit, config):
@@ -88,7 +150,16 @@ class WebImporter(Importer):
         :rtype:  pulp.plugins.model.SyncReport
         """
         step = Main(repo=repo, conduit=conduit, config=config)
-        report = step.process_lifecycle()
+        metrics = Metrics(
+            config.get(constants.CONFIG_KEY_METRICS_DIRECTORY),
+            step,
+            constants.METRICS_SYNC,
+            repo.id,
+            step.remote_id)
+        trace = config.get(constants.CONFIG_KEY_TRACE)
+        with Tracing(trace, pulp_conf.get('server', 'working_directory')):
+            with metrics:
+                report = step.process_lifecycle()
         return report
 
     def import_units(self, source, destination, conduit, config, units=None):
@@ -0,0 +1,158 @@
+import os
+import resource
+import time
+
+from cProfile import Profile
+from logging import getLogger
+
+from pulp_ostree.common import constants
+from pulp_ostree.plugins import metrics
+
+
+log = getLogger(__name__)
+
+
+class Measurement(object):
+    """
+    Step resource usage.
+
+    :ivar wall: The elapsed (wall clock) time in seconds.
+    :type wall: float
+    :ivar cpu: The CPU (user + system) time in seconds.
+    :type cpu: float
+    :ivar rss: The increase of the peak resident set size (KB).
+    :type rss: int
+    :ivar items: The number of items processed.
+    :type items: int
+    """
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rss = 0
+        self.items = 0
+        self._started = None
+
+    @staticmethod
+    def _sample():
+        """
+        Sample the current resource usage.
+
+        :return: A tuple of: (wall, cpu, rss)
+        :rtype: tuple
+        """
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return time.time(), usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+    def start(self):
+        """
+        Start measuring.
+        """
+        self._started = self._sample()
+
+    def stop(self):
+        """
+        Stop measuring.
+        Measurements are accumulated when started and stopped more than once.
+        """
+        if self._started is None:
+            return
+        wall, cpu, rss = self._sample()
+        self.wall += wall - self._started[0]
+        self.cpu += cpu - self._started[1]
+        self.rss += rss - self._started[2]
+        self._started = None
+
+    def dict(self):
+        """
+        Convert to a dictionary.
+
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return dict(
+            wall=round(self.wall, 3),
+            cpu=round(self.cpu, 3),
+            rss=self.rss,
+            items=self.items)
+
+
+class Instrumented(object):
+    """
+    Step mixin that includes the step measurement in the progress report.
+    Used with the @measured decorator on process_main().
+
+    :ivar measurement: The step measurement.
+    :type measurement: Measurement
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(Instrumented, self).__init__(*args, **kwargs)
+        self.measurement = Measurement()
+
+    @property
+    def profiled(self):
+        """
+        Profiling is enabled in the plugin configuration.
+
+        :return: True if enabled.
+        :rtype: bool
+        """
+        return bool(self.get_config().get(constants.CONFIG_KEY_PROFILE, False))
+
+    def get_progress_report(self):
+        """
+        The progress report with the measurement included.
+
+        :return: The progress report.
+        :rtype: dict
+        """
+        report = super(Instrumented, self).get_progress_report()
+        report[constants.MEASUREMENT] = self.measurement.dict()
+        return report
+
+    def collect(self, registry, labels):
+        """
+        Collect the step metrics.
+
+        :param registry: The metrics registry.
+        :type registry: pulp_ostree.plugins.metrics.Registry
+        :param labels: The repo_id and remote_id labels.
+        :type labels: dict
+        """
+        labels = dict(labels, step=self.step_id)
+        registry.gauge(metrics.STEP_DURATION).set(self.measurement.wall, **labels)
+        registry.gauge(metrics.STEP_CPU).set(self.measurement.cpu, **labels)
+        registry.gauge(metrics.STEP_ITEMS).set(self.measurement.items, **labels)
+
+
+def measured(fn):
+    """
+    Decorator used to measure the resource usage of a step's process_main().
+    When profiling is enabled, a cProfile snapshot is written to the
+    working directory as: profile-<step_id>.prof.
+
+    :param fn: The process_main() method of an Instrumented step.
+    :type fn: function
+    :return: wrapping function.
+    :rtype: function
+    """
+    def _fn(step, *args, **kwargs):
+        profile = None
+        if step.profiled:
+            profile = Profile()
+        step.measurement.start()
+        try:
+            if profile:
+                return profile.runcall(fn, step, *args, **kwargs)
+            else:
+                return fn(step, *args, **kwargs)
+        finally:
+            step.measurement.stop()
+            if profile:
+                path = os.path.join(
+                    step.get_working_dir(),
+                    'profile-{0}.prof'.format(step.step_id))
+                profile.dump_stats(path)
+                log.info('profile written: {0}'.format(path))
+    return _fn
@@ -1,5 +1,13 @@
+import ctypes
+import os
+import time
+
+from ctypes.util import find_library
 from logging import getLogger
 
+from pulp_ostree.plugins.tracing import tracer
+
+
 log = getLogger(__name__)
 
 
@@ -14,7 +22,8 @@ def wrapped(fn):
     Decorator used to ensure that functions raising GError are
     re-raised as LibError exceptions.  Using the decorator so that
     this functionality does not need to be replicated in both current
-    and future methods.
+    and future methods.  Each call is traced as a span that includes the
+    repository path and the number of objects returned.
 
     :param fn: A function that raises GError.
     :type fn: function
@@ -24,13 +33,81 @@ def wrapped(fn):
     def _fn(*args, **kwargs):
         lib = Lib()
         lib.load()
+        span = tracer.start(span_name(fn, args), span_path(args))
         try:
-            return fn(*args, **kwargs)
+            result = fn(*args, **kwargs)
         except lib.GLib.GError, ge:
+            tracer.finish(span, ge)
             raise LibError(repr(ge))
+        except Exception, e:
+            tracer.finish(span, e)
+            raise
+        if span is not None and isinstance(result, (list, dict)):
+            span.attributes.setdefault('objects', len(result))
+        tracer.finish(span)
+        return result
     return _fn
 
 
+def span_name(fn, args):
+    """
+    Get the span name for a wrapped function.
+
+    :param fn: A wrapped function.
+    :type fn: function
+    :param args: The function arguments.
+    :type args: tuple
+    :return: The span name.  Eg: Repository.pull
+    :rtype: str
+    """
+    if args and hasattr(type(args[0]), fn.__name__):
+        return '.'.join((type(args[0]).__name__, fn.__name__))
+    else:
+        return fn.__name__
+
+
+def span_path(args):
+    """
+    Get the repository path for a wrapped function.
+
+    :param args: The function arguments.
+    :type args: tuple
+    :return: The absolute path to the ostree repository.
+    :rtype: str
+    """
+    if not args:
+        return
+    thing = args[0]
+    repository = getattr(thing, 'repository', thing)
+    path = getattr(repository, 'path', None)
+    if isinstance(path, basestring):
+        return path
+
+
+def syncfs(path):
+    """
+    Flush the filesystem containing the specified path to disk.
+    Falls back to sync() when syncfs() is not available.
+
+    :param path: An absolute path.
+    :type path: str
+    :raises OSError:
+    """
+    libc = ctypes.CDLL(find_library('c'), use_errno=True)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        try:
+            _syncfs = libc.syncfs
+        except AttributeError:
+            libc.sync()
+            return
+        if _syncfs(fd) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+    finally:
+        os.close(fd)
+
+
 class Lib(object):
     """
     Provides a C library container.
@@ -68,6 +145,8 @@ class ProgressReport(object):
     :type requested: int
     :ivar percent: The percentage of completed downloads.
     :type percent: int
+    :ivar localcache: The total number of objects found in local cache repositories.
+    :type localcache: int
     """
 
     def __init__(self, report):
@@ -78,10 +157,109 @@ class ProgressReport(object):
         self.bytes_transferred = report.get_uint64('bytes-transferred')
         self.fetched = report.get_uint('fetched')
         self.requested = report.get_uint('requested')
+        self.localcache = \
+            report.get_uint('metadata-fetched-localcache') + \
+            report.get_uint('content-objects-fetched-localcache')
+        self.percent = self._percent()
+
+    def _percent(self):
+        """
+        Get the percentage of completed downloads.
+
+        :return: The percentage.
+        :rtype: int
+        """
         if self.requested == 0:
-            self.percent = 0
-        else:
-            self.percent = int((self.fetched * 1.0 / self.requested) * 100)
+            return 0
+        return int((self.fetched * 1.0 / self.requested) * 100)
+
+    def resume(self, previous):
+        """
+        Include the progress of the paused pulls resumed by this pull.
+        The objects fetched before the pull was paused are not requested again.
+
+        :param previous: The progress of the paused pulls.  None = not resumed.
+        :type previous: ProgressReport
+        """
+        if previous is None:
+            return
+        self.bytes_transferred += previous.bytes_transferred
+        self.fetched += previous.fetched
+        self.requested += previous.fetched
+        self.localcache += previous.localcache
+        self.percent = self._percent()
+
+
+class Throttle(object):
+    """
+    Limit the average download rate of a pull.
+    libostree does not support rate limiting.  The progress listener runs in
+    the main loop processing the downloads and must not block so, while the
+    bytes transferred are ahead of the allowed rate, the pull is paused
+    (cancelled) and resumed after waiting outside of the main loop.  The
+    objects fetched before the pull was paused are kept by libostree and
+    are not downloaded again.
+
+    :ivar rate: The maximum rate (bytes/second).  None = unlimited.
+    :type rate: int
+    :ivar started: The start time (epoch seconds).
+    :type started: float
+    :ivar delay: The time (seconds) to wait before resuming.  0 = not paused.
+    :type delay: float
+    :ivar last: The last progress reported.
+    :type last: ProgressReport
+    :ivar previous: The progress of the paused pulls.  None = not resumed.
+    :type previous: ProgressReport
+    """
+
+    def __init__(self, rate):
+        """
+        :param rate: The maximum rate (bytes/second).  None = unlimited.
+        :type rate: int
+        """
+        self.rate = rate
+        self.started = time.time()
+        self.delay = 0.0
+        self.last = None
+        self.previous = None
+
+    @property
+    def paused(self):
+        """
+        The pull has been paused.
+
+        :return: True if paused.
+        :rtype: bool
+        """
+        return self.delay > 0
+
+    def __call__(self, report):
+        """
+        Determine whether the pull must be paused to keep the average
+        rate within the limit.
+
+        :param report: The progress including the paused pulls.
+        :type report: ProgressReport
+        :return: True when the pull must be paused.
+        :rtype: bool
+        """
+        self.last = report
+        if not self.rate:
+            return False
+        elapsed = time.time() - self.started
+        delay = (report.bytes_transferred * 1.0 / self.rate) - elapsed
+        if delay > 0:
+            self.delay = delay
+        return self.paused
+
+    def wait(self):
+        """
+        Wait before the paused pull is resumed.
+        Must not be called by the main loop.
+        """
+        time.sleep(self.delay)
+        self.delay = 0.0
+        self.previous = self.last
 
 
 class Ref(object):
@@ -220,6 +398,41 @@ class Variant(object):
         else:
             return None
 
+    @staticmethod
+    def uint(n):
+        """
+        Encode as a (variant) unsigned integer.
+
+        :param n: An integer.
+        :type  n: int
+        :return: The variant.
+        :rtype: lib.GLib.Variant
+        """
+        tag = 'u'
+        lib = Lib()
+        if isinstance(n, (basestring, int, float)):
+            return lib.GLib.Variant(tag, int(n))
+        else:
+            return None
+
+    @staticmethod
+    def boolean(b):
+        """
+        Encode as a (variant) boolean.
+        Unlike bool(), encoded using the boolean type rather than as a string.
+
+        :param b: A boolean.
+        :type  b: bool
+        :return: The variant.
+        :rtype: lib.GLib.Variant
+        """
+        tag = 'b'
+        lib = Lib()
+        if isinstance(b, bool):
+            return lib.GLib.Variant(tag, b)
+        else:
+            return None
+
     @staticmethod
     def bool(b, negated=False):
         """
@@ -250,6 +463,10 @@ class Repository(object):
     :type path: str
     :ivar impl: The libostree implementation.
     :type impl: OSTree.Repository
+    :ivar metadata: Decoded commit metadata keyed by commit hash.
+    :type metadata: dict
+    :ivar cancellable: Used to cancel pulls.  None = not cancellable.
+    :type cancellable: Gio.Cancellable
     """
 
     def __init__(self, path):
@@ -259,6 +476,18 @@ class Repository(object):
         """
         self.path = path
         self.impl = None
+        self.metadata = {}
+        self.cancellable = None
+
+    @property
+    def cancelled(self):
+        """
+        The pull has been cancelled using the cancellable.
+
+        :return: True if cancelled.
+        :rtype: bool
+        """
+        return self.cancellable is not None and self.cancellable.is_cancelled()
 
     @wrapped
     def open(self):
@@ -297,29 +526,400 @@ class Repository(object):
         Close the repository.
         """
         self.impl = None
+        self.metadata = {}
+
+    @wrapped
+    def disable_fsync(self, disabled=True):
+        """
+        Disable (or enable) the fsync of each object written to the repository.
+        Objects written with fsync disabled are not durable until the
+        repository is sync()ed.
+
+        :param disabled: Disable fsync.
+        :type disabled: bool
+        :raises LibError:
+        """
+        self.open()
+        self.impl.set_disable_fsync(disabled)
+
+    def sync(self):
+        """
+        Flush the repository to disk using a single filesystem sync.
+
+        :raises OSError:
+        """
+        syncfs(self.path)
+
+    def transaction(self):
+        """
+        Get a transaction used to write objects and set refs.
+
+        :return: A transaction (context manager).
+        :rtype: Transaction
+        """
+        return Transaction(self)
+
+    def set_refs(self, refs):
+        """
+        Set many (local) branch refs in a single transaction.
+
+        :param refs: A mapping of branch name to commit hash.
+        :type refs: dict
+        :raises LibError:
+        """
+        with self.transaction() as transaction:
+            transaction.set_refs(refs)
 
     @wrapped
-    def list_refs(self):
+    def commit_metadata(self, commit_id):
+        """
+        Get the metadata for the specified commit.
+        Commits are immutable so the decoded metadata is cached for as
+        long as the repository is open.
+
+        :param commit_id: A commit hash.
+        :type commit_id: str
+        :return: The commit metadata.
+        :rtype: dict
+        :raises LibError:
+        """
+        try:
+            return self.metadata[commit_id]
+        except KeyError:
+            lib = Lib()
+            self.open()
+            _, commit = self.impl.load_variant(lib.OSTree.ObjectType.COMMIT, commit_id)
+            metadata = commit[0]
+            self.metadata[commit_id] = metadata
+            return metadata
+
+    @wrapped
+    def refs(self):
+        """
+        Get the commit referenced by each repository reference.
+        The commit metadata is not read.
+
+        :return: The referenced commits.  {name: commit}
+        :rtype: dict
+        :raises LibError:
+        """
+        self.open()
+        _, refs = self.impl.list_refs(None, None)
+        return dict(refs)
+
+    @wrapped
+    def list_refs(self, names=None):
         """
         Get repository references.
+        The named refs are resolved individually so that only their
+        commit metadata is read.  Refs not found are not listed.
 
+        :param names: The names of the refs.  None = ALL.
+        :type names: list
         :return: list of: Ref
         :rtype: list
         :raises LibError:
         """
         _list = []
-        lib = Lib()
         self.open()
-        _, refs = self.impl.list_refs(None, None)
+        if names is None:
+            _, refs = self.impl.list_refs(None, None)
+        else:
+            refs = {}
+            for name in names:
+                _, commit_id = self.impl.resolve_rev(name, True)
+                if commit_id:
+                    refs[name] = commit_id
         for path, commit_id in sorted(refs.items()):
-            _, commit = self.impl.load_variant(lib.OSTree.ObjectType.COMMIT, commit_id)
-            metadata = commit[0]
+            metadata = self.commit_metadata(commit_id)
             ref = Ref(path, commit_id, metadata)
             _list.append(ref)
         return _list
 
     @wrapped
-    def pull(self, remote_id, refs, listener, depth=0):
+    def list_objects(self):
+        """
+        Get all of the objects stored in the repository.
+
+        :return: A dictionary of object sizes (bytes) keyed by: (checksum, type).
+        :rtype: dict
+        :raises LibError:
+        """
+        lib = Lib()
+        self.open()
+        _, objects = self.impl.list_objects(lib.OSTree.RepoListObjectsFlags.ALL, None)
+        return self._sizes(objects)
+
+    @wrapped
+    def traverse(self, commit, depth=0):
+        """
+        Get the objects reachable from the specified commit.
+
+        :param commit: A commit hash.
+        :type commit: str
+        :param depth: The commit history traversal depth.  Note: -1 is infinite.
+        :type depth: int
+        :return: A dictionary of object sizes (bytes) keyed by: (checksum, type).
+        :rtype: dict
+        :raises LibError:
+        """
+        self.open()
+        _, reachable = self.impl.traverse_commit(commit, depth, None)
+        return self._sizes(reachable)
+
+    def _sizes(self, objects):
+        """
+        Get the storage size of each object.
+
+        :param objects: A collection of (checksum, type) variants.
+        :type objects: iterable
+        :return: A dictionary of object sizes (bytes) keyed by: (checksum, type).
+        :rtype: dict
+        """
+        sizes = {}
+        for key in objects:
+            checksum, object_type = key.unpack()
+            _, size = self.impl.query_object_storage_size(object_type, checksum, None)
+            sizes[(checksum, object_type)] = size
+        return sizes
+
+    @wrapped
+    def partial(self, commit):
+        """
+        Get whether only part of the specified commit has been pulled.
+
+        :param commit: A commit hash.
+        :type commit: str
+        :return: True if partial.
+        :rtype: bool
+        :raises LibError:
+        """
+        lib = Lib()
+        self.open()
+        _, _, state = self.impl.load_commit(commit)
+        return bool(state & lib.OSTree.RepoCommitState.PARTIAL)
+
+    @wrapped
+    def parent(self, commit):
+        """
+        Get the parent of the specified commit.
+
+        :param commit: A commit hash.
+        :type commit: str
+        :return: The parent commit hash.  None = no parent.
+        :rtype: str
+        :raises LibError:
+        """
+        lib = Lib()
+        self.open()
+        _, variant = self.impl.load_variant(lib.OSTree.ObjectType.COMMIT, commit)
+        return lib.OSTree.commit_get_parent(variant) or None
+
+    @wrapped
+    def has_commit(self, commit):
+        """
+        Get whether the specified commit has been pulled into the repository.
+
+        :param commit: A commit hash.
+        :type commit: str
+        :return: True if found.
+        :rtype: bool
+        :raises LibError:
+        """
+        lib = Lib()
+        self.open()
+        _, found = self.impl.has_object(lib.OSTree.ObjectType.COMMIT, commit, None)
+        return bool(found)
+
+    @wrapped
+    def diff(self, from_commit, to_commit):
+        """
+        Get the paths added, removed and modified between two commits.
+        Only the directory trees that differ are walked.
+
+        :param from_commit: The (older) commit hash.
+        :type from_commit: str
+        :param to_commit: The (newer) commit hash.
+        :type to_commit: str
+        :return: A list of: (change, path) sorted by path.
+            The change is one of: A (added), D (removed), M (modified).
+        :rtype: list
+        :raises LibError:
+        """
+        self.open()
+        changes = []
+        root_1 = self._root(from_commit)
+        root_2 = self._root(to_commit)
+        if root_1[1] != root_2[1]:
+            changes.append(('M', '/'))
+        self._diff(root_1, root_2, '/', changes)
+        return sorted(changes, key=lambda c: c[1])
+
+    def _root(self, commit):
+        """
+        Get the root directory of the tree of a commit.
+
+        :param commit: A commit hash.
+        :type commit: str
+        :return: A tuple of: (dirtree checksum, dirmeta checksum).
+        :rtype: tuple
+        """
+        lib = Lib()
+        _, variant = self.impl.load_variant(lib.OSTree.ObjectType.COMMIT, commit)
+        return (
+            lib.OSTree.checksum_from_bytes_v(variant.get_child_value(6)),
+            lib.OSTree.checksum_from_bytes_v(variant.get_child_value(7)))
+
+    def _dirtree(self, checksum):
+        """
+        Load a directory tree.
+
+        :param checksum: The dirtree checksum.
+        :type checksum: str
+        :return: A tuple of: (files, dirs).  The files are a dictionary of file
+            checksums keyed by name.  The dirs are a dictionary of:
+            (dirtree checksum, dirmeta checksum) keyed by name.
+        :rtype: tuple
+        """
+        lib = Lib()
+        _, variant = self.impl.load_variant(lib.OSTree.ObjectType.DIR_TREE, checksum)
+        files = {}
+        entries = variant.get_child_value(0)
+        for n in range(entries.n_children()):
+            entry = entries.get_child_value(n)
+            name = entry.get_child_value(0).get_string()
+            files[name] = lib.OSTree.checksum_from_bytes_v(entry.get_child_value(1))
+        dirs = {}
+        entries = variant.get_child_value(1)
+        for n in range(entries.n_children()):
+            entry = entries.get_child_value(n)
+            name = entry.get_child_value(0).get_string()
+            dirs[name] = (
+                lib.OSTree.checksum_from_bytes_v(entry.get_child_value(1)),
+                lib.OSTree.checksum_from_bytes_v(entry.get_child_value(2)))
+        return files, dirs
+
+    def _diff(self, tree_1, tree_2, path, changes):
+        """
+        Compare two directory trees.
+        Subdirectories with the same dirtree checksum are skipped.
+
+        :param tree_1: The (older) directory: (dirtree checksum, dirmeta checksum).
+        :type tree_1: tuple
+        :param tree_2: The (newer) directory: (dirtree checksum, dirmeta checksum).
+        :type tree_2: tuple
+        :param path: The absolute path of the directory.
+        :type path: str
+        :param changes: Updated with: (change, path).
+        :type changes: list
+        """
+        if tree_1[0] == tree_2[0]:
+            return
+        files_1, dirs_1 = self._dirtree(tree_1[0])
+        files_2, dirs_2 = self._dirtree(tree_2[0])
+        for name, checksum in files_2.items():
+            if name not in files_1:
+                changes.append(('A', os.path.join(path, name)))
+            elif files_1[name] != checksum:
+                changes.append(('M', os.path.join(path, name)))
+        for name in files_1:
+            if name not in files_2:
+                changes.append(('D', os.path.join(path, name)))
+        for name, tree in dirs_2.items():
+            child = os.path.join(path, name)
+            if name not in dirs_1:
+                changes.append(('A', child))
+                continue
+            if dirs_1[name][1] != tree[1]:
+                changes.append(('M', child))
+            self._diff(dirs_1[name], tree, child, changes)
+        for name in dirs_1:
+            if name not in dirs_2:
+                changes.append(('D', os.path.join(path, name)))
+
+    @wrapped
+    def generate_delta(self, from_commit, to_commit, params=None):
+        """
+        Generate a static delta between two commits.
+        The delta is written to the deltas directory of the repository.
+
+        :param from_commit: The (older) commit hash.  None = from scratch.
+        :type from_commit: str
+        :param to_commit: The (newer) commit hash.
+        :type to_commit: str
+        :param params: Generation parameters (unsigned integers) keyed by name.
+        :type params: dict
+        :raises LibError:
+        """
+        lib = Lib()
+        self.open()
+        options = dict((k, Variant.uint(v)) for k, v in (params or {}).items())
+        self.impl.static_delta_generate(
+            lib.OSTree.StaticDeltaGenerateOpt.MAJOR,
+            from_commit,
+            to_commit,
+            None,
+            Variant.dict(options),
+            self.cancellable)
+
+    @wrapped
+    def export(self, commit, subdir, path):
+        """
+        Copy the files in a directory within the tree of the specified commit.
+        Subdirectories are not copied.
+
+        :param commit: A commit hash.
+        :type commit: str
+        :param subdir: The (absolute) directory within the tree.
+        :type subdir: str
+        :param path: The absolute path to an existing destination directory.
+        :type path: str
+        :return: The names of the copied files.  None = the directory is not in the tree.
+        :rtype: list
+        :raises LibError:
+        """
+        lib = Lib()
+        self.open()
+        _, root, _ = self.impl.read_commit(commit, None)
+        directory = root.resolve_relative_path(subdir.lstrip('/'))
+        if not directory.query_exists(None):
+            return None
+        children = directory.enumerate_children(
+            'standard::name,standard::type',
+            lib.Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS,
+            None)
+        copied = []
+        for info in children:
+            if info.get_file_type() != lib.Gio.FileType.REGULAR:
+                continue
+            name = info.get_name()
+            destination = lib.Gio.File.new_for_path(os.path.join(path, name))
+            directory.get_child(name).copy(
+                destination, lib.Gio.FileCopyFlags.OVERWRITE, None, None, None)
+            copied.append(name)
+        return sorted(copied)
+
+    @staticmethod
+    def _flags(subdirs):
+        """
+        Get the pull flags.
+        Subdirectories cannot be pulled in mirror mode.
+
+        :param subdirs: A list of subdirectories to pull.  None = ALL.
+        :type subdirs: list
+        :return: The pull flags.
+        :rtype: int
+        """
+        lib = Lib()
+        if subdirs:
+            return lib.OSTree.RepoPullFlags.NONE
+        else:
+            return lib.OSTree.RepoPullFlags.MIRROR
+
+    @wrapped
+    def pull(self, remote_id, refs, listener, depth=0, subdirs=None,
+             max_speed=None, low_speed_limit=None, low_speed_time=None, localcache=None,
+             transaction=False):
         """
         Run the pull request.
 
@@ -331,34 +931,79 @@ class Repository(object):
         :type listener: callable
         :param depth: The tree traversal depth.  Note: -1 is infinite.
         :type depth: int
+        :param subdirs: A list of (absolute) subdirectories to pull.  None = ALL.
+            The pulled commits are marked partial.
+        :type subdirs: list
+        :param max_speed: The maximum download rate (bytes/second).  None = unlimited.
+            The pull is paused as needed.  See: Throttle.
+        :type max_speed: int
+        :param low_speed_limit: A download slower than this (bytes/second) for
+            *low_speed_time* seconds is aborted.  None = libostree default.
+        :type low_speed_limit: int
+        :param low_speed_time: The low speed time (seconds).  None = libostree default.
+        :type low_speed_time: int
+        :param localcache: A list of paths to local repositories checked for objects
+            before they are downloaded.  Objects found are hard linked when possible.
+        :type localcache: list
+        :param transaction: Pull within the transaction already prepared
+            by the caller instead of a transaction of its own.
+        :type transaction: bool
         :raises LibError:
         """
         lib = Lib()
-        flags = lib.OSTree.RepoPullFlags.MIRROR
-        progress = lib.OSTree.AsyncProgress.new()
+        flags = self._flags(subdirs)
+        throttle = Throttle(max_speed)
 
         options = {
             'flags': Variant.int(flags),
             'depth': Variant.int(depth),
-            'refs': Variant.str_list(refs)
+            'refs': Variant.str_list(refs),
+            'subdirs': Variant.str_list(subdirs),
+            'low-speed-limit-bytes': Variant.uint(low_speed_limit),
+            'low-speed-time-seconds': Variant.uint(low_speed_time),
+            'localcache-repos': Variant.str_list(localcache)
         }
+        if transaction:
+            options['inherit-transaction'] = Variant.boolean(True)
+
+        while True:
+            progress = lib.OSTree.AsyncProgress.new()
+            if throttle.rate:
+                # cancelled to pause the pull
+                cancellable = lib.Gio.Cancellable.new()
+            else:
+                cancellable = self.cancellable
+
+            def report_progress(report, cancellable=cancellable):
+                try:
+                    _report = ProgressReport(report)
+                    _report.resume(throttle.previous)
+                    tracer.annotate(
+                        fetched=_report.fetched,
+                        requested=_report.requested,
+                        bytes_transferred=_report.bytes_transferred)
+                    listener(_report)
+                    if throttle(_report) or self.cancelled:
+                        cancellable.cancel()
+                except Exception:
+                    log.exception('progress listener failed')
 
-        def report_progress(report):
             try:
-                _report = ProgressReport(report)
-                listener(_report)
-            except Exception:
-                log.exception('progress listener failed')
-
-        try:
-            progress.connect('changed', report_progress)
-            self.open()
-            self.impl.pull_with_options(remote_id, Variant.opt_dict(options), progress, None)
-        finally:
-            progress.finish()
+                progress.connect('changed', report_progress)
+                self.open()
+                self.impl.pull_with_options(
+                    remote_id, Variant.opt_dict(options), progress, cancellable)
+                break
+            except lib.GLib.GError:
+                if not throttle.paused or self.cancelled:
+                    raise
+            finally:
+                progress.finish()
+            log.debug('pull paused: {0:.1f} seconds'.format(throttle.delay))
+            throttle.wait()
 
     @wrapped
-    def pull_local(self, path, refs, depth=0):
+    def pull_local(self, path, refs, depth=0, subdirs=None, transaction=False):
         """
         Run the pull (local) request.
         Fast pull from another repository using hard links.
@@ -369,20 +1014,115 @@ class Repository(object):
         :type refs: list
         :param depth: The tree traversal depth.  Note: -1 is infinite.
         :type depth: int
+        :param subdirs: A list of (absolute) subdirectories to pull.  None = ALL.
+        :type subdirs: list
+        :param transaction: Pull within the transaction already prepared
+            by the caller instead of a transaction of its own.
+        :type transaction: bool
         :raises LibError:
         """
-        lib = Lib()
         url = 'file://' + path
-        flags = lib.OSTree.RepoPullFlags.MIRROR
+        flags = self._flags(subdirs)
 
         options = {
             'flags': Variant.int(flags),
             'depth': Variant.int(depth),
-            'refs': Variant.str_list(refs)
+            'refs': Variant.str_list(refs),
+            'subdirs': Variant.str_list(subdirs)
         }
+        if transaction:
+            options['inherit-transaction'] = Variant.boolean(True)
 
         self.open()
-        self.impl.pull_with_options(url, Variant.opt_dict(options), None, None)
+        self.impl.pull_with_options(url, Variant.opt_dict(options), None, self.cancellable)
+
+
+class Transaction(object):
+    """
+    A repository transaction.
+    The objects written and refs set within the transaction are
+    committed together on exit or discarded when an exception is raised.
+
+    :ivar repository: The repository.
+    :type repository: Repository
+    """
+
+    def __init__(self, repository):
+        """
+        :param repository: The repository.
+        :type repository: Repository
+        """
+        self.repository = repository
+
+    @property
+    def impl(self):
+        return self.repository.impl
+
+    @wrapped
+    def prepare(self):
+        """
+        Prepare (begin) the transaction.
+
+        :raises LibError:
+        """
+        self.repository.open()
+        self.impl.prepare_transaction(None)
+
+    @wrapped
+    def commit(self):
+        """
+        Commit the transaction.
+
+        :raises LibError:
+        """
+        self.impl.commit_transaction(None)
+
+    @wrapped
+    def abort(self):
+        """
+        Abort the transaction.
+
+        :raises LibError:
+        """
+        self.impl.abort_transaction(None)
+
+    @wrapped
+    def set_ref(self, branch, commit):
+        """
+        Set a (local) branch ref when the transaction is committed.
+
+        :param branch: The branch name.
+        :type branch: str
+        :param commit: The commit hash.
+        :type commit: str
+        :raises LibError:
+        """
+        self.impl.transaction_set_ref(None, branch, commit)
+
+    @wrapped
+    def set_refs(self, refs):
+        """
+        Set many (local) branch refs when the transaction is committed.
+
+        :param refs: A mapping of branch name to commit hash.
+        :type refs: dict
+        :raises LibError:
+        """
+        for branch, commit in sorted(refs.items()):
+            self.impl.transaction_set_ref(None, branch, commit)
+
+    def __enter__(self):
+        self.prepare()
+        return self
+
+    def __exit__(self, exc_type, *unused):
+        if exc_type is None:
+            self.commit()
+        else:
+            try:
+                self.abort()
+            except LibError:
+                log.exception('abort transaction failed: {0}'.format(self.repository.path))
 
 
 class Remote(object):
@@ -408,6 +1148,13 @@ class Remote(object):
     :type gpg_validation: bool
     :ivar proxy_url: The url for an HTTP proxy.
     :type proxy_url: str
+    :ivar http2: Use HTTP/2 when supported.  None = libostree default.
+    :type http2: bool
+    :ivar content_url: The URL used to fetch file objects.  None = the remote URL.
+    :type content_url: str
+    :ivar mirrorlist: The URL of a list of mirrors used to fetch file objects.
+        Used instead of the content_url when specified.
+    :type mirrorlist: str
     """
 
     @staticmethod
@@ -441,6 +1188,9 @@ class Remote(object):
         self.ssl_validation = False
         self.gpg_validation = False
         self.proxy_url = None
+        self.http2 = None
+        self.content_url = None
+        self.mirrorlist = None
 
     @property
     def impl(self):
@@ -530,8 +1280,7 @@ class Remote(object):
         flags = lib.OSTree.RepoPullFlags.COMMIT_ONLY
         self.impl.pull(self.id, refs, flags, None, None)
         for path, commit_id in sorted(summary.items()):
-            _, commit = self.impl.load_variant(lib.OSTree.ObjectType.COMMIT, commit_id)
-            metadata = commit[0]
+            metadata = self.repository.commit_metadata(commit_id)
             ref = Ref(path, commit_id, metadata)
             _list.append(ref)
         return _list
@@ -544,6 +1293,9 @@ class Remote(object):
         :return: A variant containing options.
         :rtype: GLib.Variant
         """
+        content_url = self.content_url
+        if self.mirrorlist:
+            content_url = 'mirrorlist=' + self.mirrorlist
         options = {
             'tls-client-cert-path': Variant.str(self.ssl_cert_path),
             'tls-client-key-path': Variant.str(self.ssl_key_path),
@@ -551,6 +1303,8 @@ class Remote(object):
             'proxy': Variant.str(self.proxy_url),
             'tls-permissive': Variant.bool(self.ssl_validation, negated=True),
             'gpg-verify': Variant.bool(self.gpg_validation),
+            'http2': Variant.bool(self.http2),
+            'contenturl': Variant.str(content_url),
         }
         return Variant.opt_dict(options)
 
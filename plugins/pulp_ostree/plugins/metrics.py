@@ -0,0 +1,246 @@
+import os
+import time
+
+from logging import getLogger
+from tempfile import NamedTemporaryFile
+
+
+log = getLogger(__name__)
+
+
+# Metric definitions: (name, description)
+DURATION = ('pulp_ostree_duration_seconds', 'The sync or publish wall clock time.')
+SUCCESS = ('pulp_ostree_success', 'The sync or publish succeeded (1) or failed (0).')
+TIMESTAMP = ('pulp_ostree_timestamp_seconds', 'The time the sync or publish finished.')
+STEP_DURATION = ('pulp_ostree_step_duration_seconds', 'The step wall clock time.')
+STEP_CPU = ('pulp_ostree_step_cpu_seconds', 'The step CPU (user + system) time.')
+STEP_ITEMS = ('pulp_ostree_step_items', 'The number of items processed by the step.')
+BYTES_PULLED = ('pulp_ostree_bytes_pulled', 'The bytes downloaded by the pull.')
+OBJECTS_FETCHED = ('pulp_ostree_objects_fetched', 'The objects downloaded by the pull.')
+OBJECTS_LOCALCACHE = (
+    'pulp_ostree_objects_localcache', 'The objects found in local cache repositories by the pull.')
+UNITS_ADDED = ('pulp_ostree_units_added', 'The content units added to the repository.')
+SUMMARY_BYTES = ('pulp_ostree_summary_bytes', 'The size of the published summary file.')
+
+
+class Metric(object):
+    """
+    A (gauge) metric.
+
+    :ivar name: The metric name.
+    :type name: str
+    :ivar description: The metric description.
+    :type description: str
+    :ivar samples: The sample values keyed by sorted tuple of labels.
+    :type samples: dict
+    """
+
+    def __init__(self, name, description):
+        """
+        :param name: The metric name.
+        :type name: str
+        :param description: The metric description.
+        :type description: str
+        """
+        self.name = name
+        self.description = description
+        self.samples = {}
+
+    def set(self, value, **labels):
+        """
+        Set the value for the specified labels.
+
+        :param value: The value.
+        :type value: float
+        :param labels: The sample labels.
+        :type labels: dict
+        """
+        self.samples[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        """
+        Render in the Prometheus text exposition format.
+
+        :return: The rendered lines.
+        :rtype: list
+        """
+        lines = [
+            '# HELP {0} {1}'.format(self.name, self.description),
+            '# TYPE {0} gauge'.format(self.name),
+        ]
+        for labels, value in sorted(self.samples.items()):
+            labels = ','.join('{0}="{1}"'.format(k, escape(v)) for k, v in labels)
+            lines.append('{0}{{{1}}} {2}'.format(self.name, labels, float(value)))
+        return lines
+
+
+class Registry(object):
+    """
+    A collection of metrics.
+
+    :ivar metrics: The metrics keyed by name.
+    :type metrics: dict
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def gauge(self, definition):
+        """
+        Get a gauge by definition.  Created as needed.
+
+        :param definition: The metric definition: (name, description).
+        :type definition: tuple
+        :return: The gauge.
+        :rtype: Metric
+        """
+        name, description = definition
+        try:
+            return self.metrics[name]
+        except KeyError:
+            metric = Metric(name, description)
+            self.metrics[name] = metric
+            return metric
+
+    def render(self):
+        """
+        Render in the Prometheus text exposition format.
+
+        :return: The rendered metrics.
+        :rtype: str
+        """
+        lines = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render())
+        lines.append('')
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """
+        Atomically write the rendered metrics to a (textfile collector) file.
+
+        :param path: The absolute path to the file.
+        :type path: str
+        """
+        directory = os.path.dirname(path)
+        with NamedTemporaryFile(dir=directory, prefix='.', delete=False) as fp:
+            fp.write(self.render())
+        os.chmod(fp.name, 0644)
+        os.rename(fp.name, path)
+
+
+def validate(directory):
+    """
+    Validate a textfile directory.
+    The directory must already exist because metrics are collected by
+    another process from a directory it is configured to read.
+
+    :param directory: The absolute path to the textfile directory.  None = disabled.
+    :type directory: str
+    :raises ValueError: when not the absolute path to an existing directory.
+    """
+    if not directory:
+        return
+    if not isinstance(directory, basestring) or \
+            not os.path.isabs(directory) or \
+            not os.path.isdir(directory):
+        raise ValueError(directory)
+
+
+class Metrics(object):
+    """
+    Context used to collect the metrics reported by the steps of a sync
+    or publish and write them to a Prometheus textfile on exit.
+    The file is named: pulp_ostree_<operation>_<repo_id>.prom.
+
+    :ivar directory: The absolute path to the textfile directory.  None = disabled.
+    :type directory: str
+    :ivar step: The main step.
+    :type step: pulp.plugins.util.publish_step.PluginStep
+    :ivar operation: The operation (sync|publish).
+    :type operation: str
+    :ivar labels: The labels included in every sample.
+    :type labels: dict
+    :ivar started: The start time (epoch seconds).
+    :type started: float
+    """
+
+    def __init__(self, directory, step, operation, repo_id, remote_id=''):
+        """
+        :param directory: The absolute path to the textfile directory.  None = disabled.
+        :type directory: str
+        :param step: The main step.
+        :type step: pulp.plugins.util.publish_step.PluginStep
+        :param operation: The operation (sync|publish).
+        :type operation: str
+        :param repo_id: The repository ID.
+        :type repo_id: str
+        :param remote_id: The remote ID.
+        :type remote_id: str
+        """
+        self.directory = directory
+        self.step = step
+        self.operation = operation
+        self.labels = dict(repo_id=repo_id, remote_id=remote_id)
+        self.started = None
+
+    @property
+    def path(self):
+        """
+        The textfile path.
+
+        :return: The absolute path to the textfile.
+        :rtype: str
+        """
+        name = 'pulp_ostree_{0}_{1}.prom'.format(self.operation, self.labels['repo_id'])
+        return os.path.join(self.directory, name)
+
+    def collect(self, succeeded):
+        """
+        Collect the metrics.
+
+        :param succeeded: The operation succeeded.
+        :type succeeded: bool
+        :return: The populated registry.
+        :rtype: Registry
+        """
+        registry = Registry()
+        finished = time.time()
+        labels = dict(self.labels, step=self.operation)
+        registry.gauge(DURATION).set(round(finished - self.started, 3), **labels)
+        registry.gauge(SUCCESS).set(int(succeeded), **labels)
+        registry.gauge(TIMESTAMP).set(int(finished), **labels)
+        steps = list(self.step.children)
+        while steps:
+            step = steps.pop(0)
+            steps.extend(getattr(step, 'children', []))
+            collect = getattr(step, 'collect', None)
+            if collect:
+                collect(registry, self.labels)
+        return registry
+
+    def __enter__(self):
+        self.started = time.time()
+        return self
+
+    def __exit__(self, exc_type, *unused):
+        if not self.directory:
+            return
+        try:
+            registry = self.collect(exc_type is None)
+            registry.write(self.path)
+        except Exception:
+            log.exception('write metrics failed: {0}'.format(self.directory))
+
+
+def escape(value):
+    """
+    Escape a label value.
+
+    :param value: A label value.
+    :type value: str
+    :return: The escaped value.
+    :rtype: str
+    """
+    value = unicode(value).encode('utf8')
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
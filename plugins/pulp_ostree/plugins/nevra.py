@@ -0,0 +1,270 @@
+"""
+Package NEVRA (name, epoch, version, release, arch) parsing and comparison.
+Versions are compared using the rpm (rpmvercmp) algorithm.
+"""
+
+import re
+
+
+OPERATORS = ('<=', '>=', '<', '>', '=')
+
+DIGITS = re.compile(r'[0-9]+')
+ALPHA = re.compile(r'[a-zA-Z]+')
+SEPARATORS = re.compile(r'[^a-zA-Z0-9~^]+')
+
+
+def rpmvercmp(a, b):
+    """
+    Compare two version (or release) strings using the rpm algorithm.
+
+    :param a: A version.
+    :type a: str
+    :param b: A version.
+    :type b: str
+    :return: -1 when a < b, 0 when equal, 1 when a > b.
+    :rtype: int
+    """
+    if a == b:
+        return 0
+    one = a
+    two = b
+    while one or two:
+        one = _strip(one)
+        two = _strip(two)
+        # a tilde sorts before everything, even the end of the string
+        if one.startswith('~') or two.startswith('~'):
+            if not one.startswith('~'):
+                return 1
+            if not two.startswith('~'):
+                return -1
+            one = one[1:]
+            two = two[1:]
+            continue
+        # a caret sorts after the end of the string but before anything else
+        if one.startswith('^') or two.startswith('^'):
+            if not one:
+                return -1
+            if not two:
+                return 1
+            if not one.startswith('^'):
+                return 1
+            if not two.startswith('^'):
+                return -1
+            one = one[1:]
+            two = two[1:]
+            continue
+        if not (one and two):
+            break
+        numeric = one[0].isdigit()
+        pattern = DIGITS if numeric else ALPHA
+        segment_1 = pattern.match(one).group()
+        match = pattern.match(two)
+        if match is None:
+            # numeric segments are newer than alpha segments
+            return 1 if numeric else -1
+        segment_2 = match.group()
+        one = one[len(segment_1):]
+        two = two[len(segment_2):]
+        if numeric:
+            segment_1 = segment_1.lstrip('0')
+            segment_2 = segment_2.lstrip('0')
+            if len(segment_1) != len(segment_2):
+                return 1 if len(segment_1) > len(segment_2) else -1
+        if segment_1 != segment_2:
+            return 1 if segment_1 > segment_2 else -1
+    if not one and not two:
+        return 0
+    return 1 if one else -1
+
+
+def _strip(version):
+    """
+    Strip the leading separators.
+
+    :param version: A (partial) version.
+    :type version: str
+    :return: The version without leading separators.
+    :rtype: str
+    """
+    match = SEPARATORS.match(version)
+    if match:
+        return version[match.end():]
+    return version
+
+
+def compare_evr(a, b):
+    """
+    Compare two (epoch, version, release) tuples.
+    A release of None matches any release.
+
+    :param a: An (epoch, version, release) tuple.
+    :type a: tuple
+    :param b: An (epoch, version, release) tuple.
+    :type b: tuple
+    :return: -1 when a < b, 0 when equal, 1 when a > b.
+    :rtype: int
+    """
+    epoch_1, version_1, release_1 = a
+    epoch_2, version_2, release_2 = b
+    n = cmp(int(epoch_1 or 0), int(epoch_2 or 0))
+    if n:
+        return n
+    n = rpmvercmp(version_1, version_2)
+    if n:
+        return n
+    if release_1 is None or release_2 is None:
+        return 0
+    return rpmvercmp(release_1, release_2)
+
+
+def parse_evr(evr):
+    """
+    Parse an [epoch:]version[-release] string.
+
+    :param evr: A string representation.
+    :type evr: str
+    :return: An (epoch, version, release) tuple.  The release is None when not specified.
+    :rtype: tuple
+    :raises ValueError: when not valid.
+    """
+    epoch = 0
+    release = None
+    if ':' in evr:
+        epoch, evr = evr.split(':', 1)
+        epoch = int(epoch)
+    if '-' in evr:
+        evr, release = evr.rsplit('-', 1)
+    if not evr:
+        raise ValueError('version must be specified')
+    return epoch, evr, release
+
+
+class NEVRA(object):
+    """
+    A package name, epoch, version, release and architecture.
+
+    :ivar name: The package name.
+    :type name: str
+    :ivar epoch: The epoch.
+    :type epoch: int
+    :ivar version: The version.
+    :type version: str
+    :ivar release: The release.
+    :type release: str
+    :ivar arch: The architecture.
+    :type arch: str
+    """
+
+    def __init__(self, name, epoch, version, release, arch):
+        """
+        :param name: The package name.
+        :type name: str
+        :param epoch: The epoch.  None or '' = 0.
+        :type epoch: int
+        :param version: The version.
+        :type version: str
+        :param release: The release.
+        :type release: str
+        :param arch: The architecture.
+        :type arch: str
+        """
+        self.name = name
+        self.epoch = int(epoch or 0)
+        self.version = version
+        self.release = release
+        self.arch = arch
+
+    @property
+    def evr(self):
+        """
+        :return: An (epoch, version, release) tuple.
+        :rtype: tuple
+        """
+        return self.epoch, self.version, self.release
+
+    def dict(self):
+        """
+        Convert to a dictionary.
+
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return dict(self.__dict__)
+
+    def __eq__(self, other):
+        return isinstance(other, NEVRA) and self.dict() == other.dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __str__(self):
+        if self.epoch:
+            return '{0}-{1}:{2}-{3}.{4}'.format(
+                self.name, self.epoch, self.version, self.release, self.arch)
+        return '{0}-{1}-{2}.{3}'.format(self.name, self.version, self.release, self.arch)
+
+    def __repr__(self):
+        return str(self)
+
+
+class Constraint(object):
+    """
+    A version constraint.  Eg: >= 1:1.0.2k-8
+
+    :ivar operator: The comparison operator.
+    :type operator: str
+    :ivar evr: An (epoch, version, release) tuple.
+    :type evr: tuple
+    """
+
+    @staticmethod
+    def parse(constraint):
+        """
+        Parse a string representation.
+        The operator defaults to: '='.
+
+        :param constraint: A string representation.  Eg: >=1.0.2k
+        :type constraint: str
+        :return: The parsed constraint.
+        :rtype: Constraint
+        :raises ValueError: when not valid.
+        """
+        constraint = constraint.strip()
+        operator = '='
+        for op in OPERATORS:
+            if constraint.startswith(op):
+                operator = op
+                constraint = constraint[len(op):].strip()
+                break
+        return Constraint(operator, parse_evr(constraint))
+
+    def __init__(self, operator, evr):
+        """
+        :param operator: The comparison operator.
+        :type operator: str
+        :param evr: An (epoch, version, release) tuple.
+        :type evr: tuple
+        """
+        self.operator = operator
+        self.evr = evr
+
+    def __call__(self, nevra):
+        """
+        Get whether a package satisfies the constraint.
+
+        :param nevra: A package.
+        :type nevra: NEVRA
+        :return: True if satisfied.
+        :rtype: bool
+        """
+        n = compare_evr(nevra.evr, self.evr)
+        return {
+            '<': n < 0,
+            '<=': n <= 0,
+            '=': n == 0,
+            '>=': n >= 0,
+            '>': n > 0,
+        }[self.operator]
@@ -0,0 +1,264 @@
+"""
+Package index of rpm-ostree commits.
+
+The packages (NEVRA) contained in the tree of each commit are indexed by
+commit and by package name when the commit is added to pulp.  The packages
+are read from the rpm-ostree package list in the commit metadata or from the
+rpm database in the tree when the metadata does not include the list.
+"""
+
+import os
+import shutil
+import sys
+
+from argparse import ArgumentParser
+from logging import basicConfig, getLogger
+from tempfile import mkdtemp
+
+try:
+    import rpm
+except ImportError:
+    rpm = None
+
+from pulp.server.controllers.repository import get_unit_model_querysets
+from pulp.server.db import connection
+
+from pulp_ostree.plugins.db import model
+from pulp_ostree.plugins.lib import LibError
+from pulp_ostree.plugins.nevra import NEVRA, Constraint
+
+
+log = getLogger(__name__)
+
+
+PKGLIST = 'rpmostree.rpmdb.pkglist'
+RPMDB_PATHS = ('/usr/share/rpm', '/usr/lib/sysimage/rpm')
+
+
+def from_metadata(metadata):
+    """
+    Get the packages listed in commit metadata.
+
+    :param metadata: The commit metadata.
+    :type metadata: dict
+    :return: A list of NEVRA.  None = not listed.
+    :rtype: list
+    """
+    pkglist = metadata.get(PKGLIST)
+    if pkglist is None:
+        return None
+    return [NEVRA(*entry) for entry in pkglist]
+
+
+def from_rpmdb(repository, commit):
+    """
+    Get the packages in the rpm database within the tree of a commit.
+    The database is exported into the repository tmp/ directory.
+
+    :param repository: The repository containing the commit.
+    :type repository: pulp_ostree.plugins.lib.Repository
+    :param commit: A commit hash.
+    :type commit: str
+    :return: A list of NEVRA.  Empty = no rpm database in the tree.
+        None = not read (rpm not installed or the database not exported or read).
+    :rtype: list
+    """
+    if rpm is None:
+        log.debug('rpm not installed, packages in: {0} not read'.format(commit))
+        return None
+    tmp_dir = mkdtemp(dir=os.path.join(repository.path, 'tmp'))
+    try:
+        for path in RPMDB_PATHS:
+            try:
+                if repository.export(commit, path, tmp_dir):
+                    return read_rpmdb(tmp_dir)
+            except LibError, e:
+                log.warn('rpm database: {0} in: {1} not exported: {2}'.format(path, commit, e))
+                return None
+        log.debug('no rpm database in: {0}'.format(commit))
+        return []
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def read_rpmdb(path):
+    """
+    Read the packages in an rpm database.
+
+    :param path: The absolute path to the database directory.
+    :type path: str
+    :return: A list of NEVRA.  None = not read.
+    :rtype: list
+    """
+    packages = []
+    rpm.addMacro('_dbpath', path)
+    try:
+        ts = rpm.TransactionSet()
+        ts.setVSFlags(rpm._RPMVSF_NOSIGNATURES)
+        for header in ts.dbMatch():
+            if header['name'] == 'gpg-pubkey':
+                continue
+            packages.append(
+                NEVRA(
+                    header['name'],
+                    header['epoch'],
+                    header['version'],
+                    header['release'],
+                    header['arch']))
+        ts.closeDB()
+    except rpm.error, e:
+        log.warn('rpm database: {0} not read: {1}'.format(path, e))
+        packages = None
+    finally:
+        rpm.delMacro('_dbpath')
+    return packages
+
+
+def index(repository, commit, metadata, partial=False):
+    """
+    Index the packages in a commit.
+    Each commit indexed is recorded, including commits without packages,
+    so that commits already indexed are skipped without reading the
+    rpm database again.  Commits with packages indexed before they were
+    recorded are recorded and skipped.  Commits are not recorded when the
+    packages cannot be read: rpm is not installed, the rpm database cannot
+    be exported or read, or only subdirectories of the commit are stored
+    so the rpm database may not have been pulled.  These commits are
+    indexed once they can be read.
+
+    :param repository: The repository containing the commit.
+    :type repository: pulp_ostree.plugins.lib.Repository
+    :param commit: A commit hash.
+    :type commit: str
+    :param metadata: The commit metadata.
+    :type metadata: dict
+    :param partial: Only subdirectories of the commit are stored.
+    :type partial: bool
+    :return: The number of packages indexed.
+    :rtype: int
+    """
+    if model.PackageIndex.objects(commit=commit).first() is not None:
+        return 0
+    indexed = model.Package.objects(commit=commit).count()
+    if indexed:
+        model.PackageIndex(commit=commit, packages=indexed).save()
+        return 0
+    packages = from_metadata(metadata)
+    if packages is None:
+        if partial:
+            log.debug('commit: {0} partial, packages not read'.format(commit))
+            return 0
+        packages = from_rpmdb(repository, commit)
+    if packages is None:
+        return 0
+    documents = [model.Package(commit=commit, **p.dict()) for p in packages]
+    if documents:
+        model.Package.objects.insert(documents, load_bulk=False)
+    model.PackageIndex(commit=commit, packages=len(documents)).save()
+    return len(documents)
+
+
+def search(name, constraints=(), repo_id=None):
+    """
+    Find the commits containing a package.
+
+    :param name: A package name.
+    :type name: str
+    :param constraints: A list of version constraints.  Eg: ['>=1.0.2', '<1.1']
+    :type constraints: list
+    :param repo_id: Only commits in this repository.  None = ALL.
+    :type repo_id: str
+    :return: A list of dict(created, branch, commit, version, package) sorted
+        by created so the first commit containing the package is listed first.
+    :rtype: list
+    """
+    constraints = [Constraint.parse(c) for c in constraints]
+    packages = {}
+    for document in model.Package.objects(name=name):
+        nevra = document.nevra
+        if all(c(nevra) for c in constraints):
+            packages.setdefault(document.commit, []).append(nevra)
+    if repo_id:
+        querysets = get_unit_model_querysets(repo_id, model.Branch)
+    else:
+        querysets = [model.Branch.objects]
+    found = []
+    for queryset in querysets:
+        for unit in queryset.filter(commit__in=packages.keys()):
+            for nevra in packages[unit.commit]:
+                found.append(
+                    dict(
+                        created=unit.created,
+                        branch=unit.branch,
+                        commit=unit.commit,
+                        version=unit.commit_metadata.get('version'),
+                        package=str(nevra)))
+    return sorted(found, key=lambda d: (d['created'], d['package']))
+
+
+def diff(commit_1, commit_2):
+    """
+    Compare the packages in two commits.
+
+    :param commit_1: The (older) commit hash.
+    :type commit_1: str
+    :param commit_2: The (newer) commit hash.
+    :type commit_2: str
+    :return: dict(added=[], removed=[], changed=[(old, new)]) of package NEVRA strings.
+    :rtype: dict
+    """
+    packages = []
+    for commit in (commit_1, commit_2):
+        packages.append(
+            dict(((d.name, d.arch), d.nevra) for d in model.Package.objects(commit=commit)))
+    old, new = packages
+    added = [str(new[k]) for k in sorted(set(new) - set(old))]
+    removed = [str(old[k]) for k in sorted(set(old) - set(new))]
+    changed = [
+        (str(old[k]), str(new[k])) for k in sorted(set(old) & set(new)) if old[k] != new[k]
+    ]
+    return dict(added=added, removed=removed, changed=changed)
+
+
+def get_parser():
+    parser = ArgumentParser(description='Search the packages in ostree commits.')
+    commands = parser.add_subparsers(dest='command')
+    _search = commands.add_parser('search', help='list the commits containing a package')
+    _search.add_argument('name', help='package name')
+    _search.add_argument('--version', action='append', default=[], dest='constraints',
+                         help='version constraint (eg: ">=1:1.0.2k-8"), may be repeated')
+    _search.add_argument('--repo-id', help='only commits in this repository')
+    _diff = commands.add_parser('diff', help='compare the packages in two commits')
+    _diff.add_argument('commit_1', help='the older commit')
+    _diff.add_argument('commit_2', help='the newer commit')
+    return parser
+
+
+def main(argv=None):
+    """
+    Search the package index.
+    """
+    args = get_parser().parse_args(argv)
+    basicConfig(level='INFO', format='%(message)s')
+    connection.initialize()
+    if args.command == 'search':
+        try:
+            found = search(args.name, args.constraints, args.repo_id)
+        except ValueError, e:
+            log.error('invalid version constraint: {0}'.format(e))
+            return 1
+        for d in found:
+            log.info('{created} {branch} {commit} {version} {package}'.format(**d))
+    else:
+        changes = diff(args.commit_1, args.commit_2)
+        for package in changes['added']:
+            log.info('+ {0}'.format(package))
+        for package in changes['removed']:
+            log.info('- {0}'.format(package))
+        for old, new in changes['changed']:
+            log.info('~ {0} -> {1}'.format(old, new))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
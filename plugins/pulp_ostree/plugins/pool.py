@@ -0,0 +1,314 @@
+"""
+Content-addressed object pool.
+
+The pool keeps a single copy of each object for all of the repositories
+in shared storage on the same filesystem.  The objects in each repository
+are hard links into the pool so identical objects pulled from different
+feeds are stored once.  The repositories remain complete ostree
+repositories and are used by libostree as usual.
+
+The pool is laid out like the objects directory of an ostree repository:
+  <root>/pool/objects/<checksum[:2]>/<checksum[2:]>.<type>
+
+The time each repository was last pooled is recorded by the modification
+time of a stamp file in the repository so the objects written since can be
+found using the (inode) change time.  The change time is used because it is
+set by the kernel when an object is written, linked or renamed into place
+and libostree resets the modification time of content objects.
+"""
+
+import errno
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+from logging import basicConfig, getLogger
+from multiprocessing import Pool as Workers
+
+
+log = getLogger(__name__)
+
+
+POOL = 'pool'
+OBJECTS = 'objects'
+CONTENT = 'content'
+TMP = '.pool'
+STAMP = '.pooled'
+
+# File times are set using a coarse clock so they may lag behind time.time().
+SLACK = 1.0
+
+DEFAULT_ROOT = '/var/lib/pulp/content/shared/ostree'
+
+
+class Summary(object):
+    """
+    The result of pooling the objects in a repository.
+
+    :ivar objects: The number of objects found.
+    :type objects: int
+    :ivar linked: The number of objects replaced by links into the pool.
+    :type linked: int
+    :ivar added: The number of objects added to the pool.
+    :type added: int
+    :ivar skipped: The number of objects that could not be pooled.
+    :type skipped: int
+    :ivar bytes: The bytes freed by objects replaced by links into the pool.
+    :type bytes: int
+    """
+
+    def __init__(self):
+        self.objects = 0
+        self.linked = 0
+        self.added = 0
+        self.skipped = 0
+        self.bytes = 0
+
+    def update(self, other):
+        """
+        Add the counts of another summary.
+
+        :param other: A summary.
+        :type other: Summary
+        """
+        for name, value in other.dict().items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def dict(self):
+        """
+        Convert to a dictionary.
+
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return dict(self.__dict__)
+
+
+class ObjectPool(object):
+    """
+    A content-addressed object pool.
+
+    :ivar path: The absolute path to the pool.
+    :type path: str
+    """
+
+    @staticmethod
+    def find(storage_dir):
+        """
+        Get the pool for a repository in shared storage.
+
+        :param storage_dir: The absolute path to a repository in shared storage.
+        :type storage_dir: str
+        :return: The pool.
+        :rtype: ObjectPool
+        """
+        root = os.path.dirname(os.path.dirname(storage_dir))
+        return ObjectPool(os.path.join(root, POOL))
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the pool.
+        :type path: str
+        """
+        self.path = path
+
+    def add(self, repository, incremental=False):
+        """
+        Add the objects in a repository to the pool.
+        Objects already pooled are replaced in the repository by links
+        into the pool.  Objects not yet pooled are linked into the pool.
+        Repositories on another filesystem are skipped.  When incremental,
+        only the objects changed since the repository was last pooled are
+        added.  All objects are added when the repository has not been pooled.
+
+        :param repository: The absolute path to a repository.
+        :type repository: str
+        :param incremental: Add only the objects changed since last pooled.
+        :type incremental: bool
+        :return: What was done.
+        :rtype: Summary
+        """
+        summary = Summary()
+        since = self.pooled(repository) if incremental else None
+        started = time.time()
+        objects = os.path.join(repository, OBJECTS)
+        for path in self.objects(objects, since):
+            summary.objects += 1
+            pooled = os.path.join(self.path, OBJECTS, os.path.relpath(path, objects))
+            try:
+                self._add(path, pooled, summary)
+            except OSError, e:
+                if e.errno != errno.EXDEV:
+                    raise
+                summary.skipped += 1
+        stamp = os.path.join(repository, STAMP)
+        with open(stamp, 'a'):
+            pass
+        os.utime(stamp, (started, started))
+        return summary
+
+    @staticmethod
+    def pooled(repository):
+        """
+        Get when a repository was last pooled.
+
+        :param repository: The absolute path to a repository.
+        :type repository: str
+        :return: When the last pooling started (epoch seconds) less SLACK.
+            None = never pooled.
+        :rtype: float
+        """
+        try:
+            return os.stat(os.path.join(repository, STAMP)).st_mtime - SLACK
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+
+    def _add(self, path, pooled, summary):
+        """
+        Add an object to the pool.
+
+        :param path: The absolute path to an object in a repository.
+        :type path: str
+        :param pooled: The absolute path to the object in the pool.
+        :type pooled: str
+        :param summary: Updated with what was done.
+        :type summary: Summary
+        """
+        try:
+            os.makedirs(os.path.dirname(pooled))
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        try:
+            os.link(path, pooled)
+            summary.added += 1
+            return
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        st = os.stat(path)
+        if os.path.samestat(st, os.stat(pooled)):
+            return
+        tmp = path + TMP
+        try:
+            os.unlink(tmp)
+        except OSError, e:
+            if e.errno != errno.ENOENT:
+                raise
+        os.link(pooled, tmp)
+        os.rename(tmp, path)
+        summary.linked += 1
+        if st.st_nlink == 1:
+            summary.bytes += st.st_size
+
+    def prune(self):
+        """
+        Remove the pooled objects no longer linked by any repository.
+
+        :return: The number of objects removed.
+        :rtype: int
+        """
+        removed = 0
+        for path in self.objects(os.path.join(self.path, OBJECTS)):
+            if os.stat(path).st_nlink == 1:
+                os.unlink(path)
+                removed += 1
+        return removed
+
+    @staticmethod
+    def objects(path, since=None):
+        """
+        Generate the paths to objects in an objects directory.
+        When since is specified, directories without entries changed since
+        are not listed and objects not changed since are skipped.
+
+        :param path: The absolute path to an objects directory.
+        :type path: str
+        :param since: Only objects changed since (epoch seconds).  None = ALL.
+        :type since: float
+        :return: A generator of absolute paths.
+        :rtype: generator
+        """
+        for root, dirs, files in os.walk(path):
+            if since is not None:
+                dirs[:] = [d for d in dirs if os.stat(os.path.join(root, d)).st_ctime >= since]
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(TMP):
+                    continue
+                object_path = os.path.join(root, name)
+                if since is not None and os.lstat(object_path).st_ctime < since:
+                    continue
+                yield object_path
+
+
+def repositories(root):
+    """
+    Get the repositories in shared storage.
+
+    :param root: The absolute path to the ostree shared storage.
+    :type root: str
+    :return: A list of absolute paths.
+    :rtype: list
+    """
+    paths = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, CONTENT)
+        if name != POOL and os.path.isdir(os.path.join(path, OBJECTS)):
+            paths.append(path)
+    return paths
+
+
+def migrate(args):
+    """
+    Add the objects in a repository to the pool.
+    Used by the worker processes.
+
+    :param args: A tuple of: (pool path, repository path).
+    :type args: tuple
+    :return: A tuple of: (repository path, summary).
+    :rtype: tuple
+    """
+    path, repository = args
+    return repository, ObjectPool(path).add(repository)
+
+
+def get_parser():
+    parser = ArgumentParser(
+        description='Convert ostree shared storage to use a content-addressed object pool.')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='ostree shared storage')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--prune', action='store_true',
+                        help='remove pooled objects no longer used by any repository')
+    return parser
+
+
+def main(argv=None):
+    """
+    Convert existing shared storage in place using a process per repository.
+    """
+    args = get_parser().parse_args(argv)
+    basicConfig(level='INFO', format='%(message)s')
+    pool = ObjectPool(os.path.join(args.root, POOL))
+    total = Summary()
+    workers = Workers(args.processes)
+    try:
+        jobs = [(pool.path, r) for r in repositories(args.root)]
+        for repository, summary in workers.imap_unordered(migrate, jobs):
+            log.info('{0}: {1}'.format(repository, summary.dict()))
+            total.update(summary)
+    finally:
+        workers.close()
+        workers.join()
+    log.info('total: {0}'.format(total.dict()))
+    if args.prune:
+        log.info('pruned: {0}'.format(pool.prune()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,831 @@
+"""
+Local ostree worker service.
+
+GLib (and thus libostree) cannot be loaded in one process and used in
+another.  The service is a long-lived local process that owns the GI bindings
+and the open repository handles.  Clients use proxies that provide the same
+API as the lib module over a Unix socket without loading GLib.
+
+Each connection carries a single request.  Messages are JSON documents, one per line:
+  request:  {session, target, path, remote, method, args, kwargs}
+  replies:  any number of {progress: {...}} followed by {result: ...} or {error: ...}
+The client cancels the request by sending {cancel: true} or closing the connection.
+
+Repositories and the other paths used by requests must be within the roots
+served (by default, the Pulp storage, publish and working directories).  A
+read-only service (eg: for the web tier) serves only the methods that do not
+write to repositories or to the filesystem.
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from argparse import ArgumentParser
+from logging import basicConfig, getLogger
+from SocketServer import StreamRequestHandler, ThreadingUnixStreamServer
+
+from pulp_ostree.plugins import lib
+
+
+log = getLogger(__name__)
+
+
+DEFAULT_PATH = '/var/run/pulp/ostree.sock'
+
+# The directories containing the paths that may be used by requests.
+DEFAULT_ROOTS = ('/var/lib/pulp', '/var/cache/pulp')
+
+# Seconds a repository handle may be unused before it is closed.
+IDLE = 3600
+
+# Seconds a repository handle with a prepared transaction may be unused before
+# the transaction is aborted and the handle is closed (the client has gone away).
+PREPARED_IDLE = 2 * IDLE
+
+REPOSITORY = 'Repository'
+REMOTE = 'Remote'
+SUMMARY = 'Summary'
+TRANSACTION = 'Transaction'
+
+# The methods served for each target.
+METHODS = {
+    REPOSITORY: (
+        'open',
+        'create',
+        'close',
+        'disable_fsync',
+        'sync',
+        'set_refs',
+        'commit_metadata',
+        'list_refs',
+        'refs',
+        'list_objects',
+        'traverse',
+        'partial',
+        'parent',
+        'has_commit',
+        'diff',
+        'generate_delta',
+        'export',
+        'pull',
+        'pull_local',
+    ),
+    REMOTE: (
+        'list',
+        'open',
+        'add',
+        'update',
+        'delete',
+        'import_key',
+        'list_refs',
+    ),
+    SUMMARY: (
+        'open',
+        'generate',
+    ),
+    TRANSACTION: (
+        'prepare',
+        'commit',
+        'abort',
+        'set_ref',
+        'set_refs',
+    ),
+}
+
+# The methods served for each target by a read-only service.
+READ_ONLY_METHODS = {
+    REPOSITORY: (
+        'open',
+        'close',
+        'commit_metadata',
+        'list_refs',
+        'refs',
+        'list_objects',
+        'traverse',
+        'partial',
+        'parent',
+        'has_commit',
+        'diff',
+    ),
+    REMOTE: (
+        'list',
+    ),
+}
+
+# The positions of the arguments that are paths keyed by: (target, method).
+PATH_ARGUMENTS = {
+    (REPOSITORY, 'export'): (2,),
+    (REPOSITORY, 'pull_local'): (0,),
+    (REMOTE, 'import_key'): (0,),
+}
+
+# The remote attributes that are paths.
+REMOTE_PATHS = (
+    'ssl_key_path',
+    'ssl_cert_path',
+    'ssl_ca_path',
+)
+
+# The remote attributes sent with each remote request.
+REMOTE_ATTRIBUTES = (
+    'url',
+    'ssl_key_path',
+    'ssl_cert_path',
+    'ssl_ca_path',
+    'ssl_validation',
+    'gpg_validation',
+    'proxy_url',
+    'http2',
+    'content_url',
+    'mirrorlist',
+)
+
+# Tags used to encode results that are not plain JSON.
+REF = '__ref__'
+OBJECTS = '__objects__'
+
+
+def encode(thing):
+    """
+    Encode a result as JSON compatible data.
+
+    :param thing: A result returned by the lib API.
+    :return: The encoded result.
+    """
+    if isinstance(thing, lib.Ref):
+        return {REF: encode(thing.dict())}
+    if isinstance(thing, dict):
+        if any(isinstance(k, tuple) for k in thing):
+            return {OBJECTS: [[list(k), v] for k, v in sorted(thing.items())]}
+        return dict((k, encode(v)) for k, v in thing.items())
+    if isinstance(thing, (list, tuple)):
+        return [encode(t) for t in thing]
+    return thing
+
+
+def decode(thing):
+    """
+    Decode a result encoded using encode().
+
+    :param thing: An encoded result.
+    :return: The decoded result.
+    """
+    if isinstance(thing, dict):
+        if thing.keys() == [REF]:
+            ref = thing[REF]
+            return lib.Ref(ref['name'], ref['commit'], ref['metadata'])
+        if thing.keys() == [OBJECTS]:
+            return dict((tuple(k), v) for k, v in thing[OBJECTS])
+        return dict((k, decode(v)) for k, v in thing.items())
+    if isinstance(thing, list):
+        return [decode(t) for t in thing]
+    return thing
+
+
+class Handle(object):
+    """
+    A repository held open for a client session.
+
+    :ivar repository: The open repository.
+    :type repository: lib.Repository
+    :ivar transaction: The repository transaction.
+    :type transaction: lib.Transaction
+    :ivar prepared: The transaction has been prepared and not yet committed or aborted.
+    :type prepared: bool
+    :ivar lock: Serializes the requests using the repository.
+    :type lock: threading.Lock
+    :ivar used: When last used (epoch seconds).
+    :type used: float
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the repository.
+        :type path: str
+        """
+        self.repository = lib.Repository(path)
+        self.transaction = lib.Transaction(self.repository)
+        self.prepared = False
+        self.lock = threading.Lock()
+        self.used = time.time()
+
+
+class Service(ThreadingUnixStreamServer):
+    """
+    The service.
+    Requests are processed concurrently using a thread per connection.
+    Requests using the same repository handle are serialized.
+
+    :ivar handles: Open repository handles keyed by: (session, path).
+    :type handles: dict
+    :ivar lock: Protects the handles.
+    :type lock: threading.Lock
+    :ivar roots: The (real) directories containing the paths that may be used.
+    :type roots: list
+    :ivar methods: The methods served for each target.
+    :type methods: dict
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, roots=DEFAULT_ROOTS, read_only=False):
+        """
+        :param path: The absolute path to the Unix socket.
+        :type path: str
+        :param roots: The directories containing the paths that may be used.
+        :type roots: list
+        :param read_only: Serve only the methods that do not write.
+        :type read_only: bool
+        """
+        self.handles = {}
+        self.lock = threading.Lock()
+        self.roots = [os.path.realpath(r) for r in roots]
+        self.methods = READ_ONLY_METHODS if read_only else METHODS
+        if os.path.exists(path):
+            os.unlink(path)
+        ThreadingUnixStreamServer.__init__(self, path, Handler)
+        os.chmod(path, 0660)
+
+    def allowed(self, path):
+        """
+        Get whether a path may be used by requests.
+
+        :param path: An absolute path.
+        :type path: str
+        :return: True if within one of the roots.
+        :rtype: bool
+        """
+        if not isinstance(path, basestring) or not os.path.isabs(path):
+            return False
+        path = os.path.realpath(path)
+        return any(path == r or path.startswith(r.rstrip(os.sep) + os.sep) for r in self.roots)
+
+    def handle(self, session, path):
+        """
+        Get the repository handle for a client session.
+        Handles not used recently are closed.
+
+        :param session: The client session ID.
+        :type session: str
+        :param path: The absolute path to the repository.
+        :type path: str
+        :return: The handle.
+        :rtype: Handle
+        """
+        with self.lock:
+            self.expire()
+            key = (session, path)
+            try:
+                handle = self.handles[key]
+            except KeyError:
+                handle = Handle(path)
+                self.handles[key] = handle
+            handle.used = time.time()
+            return handle
+
+    def release(self, session, path):
+        """
+        Forget the (closed) repository handle for a client session.
+
+        :param session: The client session ID.
+        :type session: str
+        :param path: The absolute path to the repository.
+        :type path: str
+        """
+        with self.lock:
+            self.handles.pop((session, path), None)
+
+    def expire(self):
+        """
+        Close the handles not used recently.
+        Handles with a prepared transaction are kept longer (PREPARED_IDLE) and
+        the transaction is aborted before the handle is closed so the staged
+        objects of a client that has gone away are discarded.
+        """
+        now = time.time()
+        for key, handle in self.handles.items():
+            idle = PREPARED_IDLE if handle.prepared else IDLE
+            if now - handle.used <= idle or not handle.lock.acquire(False):
+                continue
+            try:
+                if handle.prepared:
+                    try:
+                        handle.transaction.abort()
+                    except lib.LibError:
+                        log.exception('abort transaction failed: {0}'.format(key[1]))
+                    handle.prepared = False
+                handle.repository.close()
+            finally:
+                handle.lock.release()
+            del self.handles[key]
+
+
+class Handler(StreamRequestHandler):
+    """
+    Process a request.
+    """
+
+    def handle(self):
+        """
+        Read and dispatch the request.  Progress is streamed to the client
+        as it is reported.  The request is cancelled when the client sends
+        a cancel or closes the connection.
+        """
+        line = self.rfile.readline()
+        if not line:
+            return
+        _lib = lib.Lib()
+        cancellable = _lib.Gio.Cancellable.new()
+        watcher = threading.Thread(target=self.watch, args=(cancellable,))
+        watcher.daemon = True
+        watcher.start()
+        try:
+            result = self.dispatch(json.loads(line), cancellable)
+        except Exception, e:
+            log.debug('request failed', exc_info=True)
+            self.send(error=str(e))
+        else:
+            self.send(result=encode(result))
+
+    def watch(self, cancellable):
+        """
+        Cancel the request when the client sends a cancel or closes the connection.
+
+        :param cancellable: Used to cancel the request.
+        :type cancellable: Gio.Cancellable
+        """
+        try:
+            self.rfile.readline()
+        except (socket.error, ValueError, AttributeError):
+            # closed
+            pass
+        cancellable.cancel()
+
+    def dispatch(self, request, cancellable):
+        """
+        Perform the requested operation.
+
+        :param request: The request.
+        :type request: dict
+        :param cancellable: Used to cancel the request.
+        :type cancellable: Gio.Cancellable
+        :return: The result.
+        :raises ValueError: when the method is not supported or a path is not allowed.
+        """
+        target = request['target']
+        method = request['method']
+        if method not in self.server.methods.get(target, ()):
+            raise ValueError('{0}.{1} not supported'.format(target, method))
+        session = request['session']
+        path = request['path']
+        args = list(request.get('args', []))
+        kwargs = dict((str(k), v) for k, v in request.get('kwargs', {}).items())
+        self.authorize(request, args)
+        handle = self.server.handle(session, path)
+        with handle.lock:
+            repository = handle.repository
+            repository.cancellable = cancellable
+            try:
+                if target == REPOSITORY:
+                    thing = repository
+                    if method == 'pull':
+                        args.insert(2, self.progress)
+                elif target == REMOTE and method == 'list':
+                    thing = lib.Remote
+                    args.insert(0, repository)
+                elif target == REMOTE:
+                    thing = lib.Remote(request['remote']['id'], repository)
+                    for name in REMOTE_ATTRIBUTES:
+                        setattr(thing, name, request['remote'].get(name))
+                elif target == SUMMARY:
+                    thing = lib.Summary(repository)
+                else:
+                    thing = handle.transaction
+                result = getattr(thing, method)(*args, **kwargs)
+                if target == TRANSACTION and method in ('prepare', 'commit', 'abort'):
+                    handle.prepared = method == 'prepare'
+            finally:
+                repository.cancellable = None
+        if target == REPOSITORY and method == 'close':
+            self.server.release(session, path)
+        return result
+
+    def authorize(self, request, args):
+        """
+        Ensure the repository and the other paths used by a request are allowed.
+        Remotes on the local filesystem must also be within the roots.
+
+        :param request: The request.
+        :type request: dict
+        :param args: The method arguments.
+        :type args: list
+        :raises ValueError: when a path is not allowed.
+        """
+        target = request['target']
+        paths = [request['path']]
+        for n in PATH_ARGUMENTS.get((target, request['method']), ()):
+            if n < len(args):
+                paths.append(args[n])
+        if target == REMOTE:
+            remote = request.get('remote') or {}
+            paths.extend(remote[name] for name in REMOTE_PATHS if remote.get(name))
+            for name in ('url', 'content_url', 'mirrorlist'):
+                url = remote.get(name) or ''
+                if url.startswith('file://'):
+                    paths.append(url[len('file://'):])
+        for path in paths:
+            if not self.server.allowed(path):
+                raise ValueError('path: {0} not allowed'.format(path))
+
+    def progress(self, report):
+        """
+        Stream pull progress to the client.
+
+        :param report: The progress report.
+        :type report: lib.ProgressReport
+        """
+        self.send(progress=dict(report.__dict__))
+
+    def finish(self):
+        """
+        Finish the request.
+        Clients that have gone away are ignored.
+        """
+        try:
+            StreamRequestHandler.finish(self)
+        except socket.error:
+            pass
+
+    def send(self, **reply):
+        """
+        Send a reply to the client.
+        Replies to clients that have gone away are discarded.
+        """
+        try:
+            self.wfile.write(json.dumps(reply, default=repr) + '\n')
+            self.wfile.flush()
+        except socket.error:
+            pass
+
+
+class Progress(object):
+    """
+    Pull progress reported by the service.
+    Has the same attributes as lib.ProgressReport.
+    """
+
+    def __init__(self, report):
+        """
+        :param report: The reported progress.
+        :type report: dict
+        """
+        self.__dict__.update(report)
+
+
+class Client(object):
+    """
+    A service client.
+
+    :ivar path: The absolute path to the Unix socket.
+    :type path: str
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the Unix socket.
+        :type path: str
+        """
+        self.path = path
+
+    def call(self, request, listener=None):
+        """
+        Send a request and wait for the result.
+
+        :param request: The request.
+        :type request: dict
+        :param listener: Called with the reported progress.
+        :type listener: callable
+        :return: The result.
+        :raises lib.LibError: when the request fails.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+            rfile = sock.makefile('rb')
+            wfile = sock.makefile('wb', 0)
+            wfile.write(json.dumps(request) + '\n')
+            try:
+                return self._read(rfile, listener)
+            except BaseException:
+                self._cancel(wfile)
+                raise
+        except socket.error, e:
+            raise lib.LibError('{0}: {1}'.format(self.path, e))
+        finally:
+            sock.close()
+
+    @staticmethod
+    def _read(rfile, listener):
+        """
+        Read replies until the result.
+
+        :param rfile: The connection.
+        :type rfile: file
+        :param listener: Called with the reported progress.
+        :type listener: callable
+        :return: The result.
+        :raises lib.LibError: when the request fails.
+        """
+        for line in iter(rfile.readline, ''):
+            reply = json.loads(line)
+            if 'progress' in reply:
+                if listener is not None:
+                    listener(Progress(reply['progress']))
+                continue
+            if 'error' in reply:
+                raise lib.LibError(reply['error'])
+            return decode(reply['result'])
+        raise lib.LibError('connection closed by service')
+
+    @staticmethod
+    def _cancel(wfile):
+        """
+        Cancel the request.
+
+        :param wfile: The connection.
+        :type wfile: file
+        """
+        try:
+            wfile.write(json.dumps(dict(cancel=True)) + '\n')
+        except socket.error:
+            pass
+
+
+def proxy(target, method):
+    """
+    Build a proxy method.
+
+    :param target: The target class name.
+    :type target: str
+    :param method: The method name.
+    :type method: str
+    :return: A method that calls the service.
+    :rtype: function
+    """
+    def _fn(self, *args, **kwargs):
+        return self.call(target, method, args, kwargs)
+    _fn.__name__ = method
+    return _fn
+
+
+class Repository(object):
+    """
+    An ostree repository served by the service.
+    Each instance is a client session with its own repository handle.
+
+    :ivar path: The absolute path to an ostree repository.
+    :type path: str
+    :ivar client: The service client.
+    :type client: Client
+    :ivar session: The session ID.
+    :type session: str
+    """
+
+    def __init__(self, path, client):
+        """
+        :param path: The absolute path to an ostree repository.
+        :type path: str
+        :param client: The service client.
+        :type client: Client
+        """
+        self.path = path
+        self.client = client
+        self.session = uuid.uuid4().hex
+
+    def call(self, target, method, args=(), kwargs=None, listener=None, remote=None):
+        """
+        Call the service.
+
+        :param target: The target class name.
+        :type target: str
+        :param method: The method name.
+        :type method: str
+        :param args: The method arguments.
+        :type args: tuple
+        :param kwargs: The method keyword arguments.
+        :type kwargs: dict
+        :param listener: Called with the reported progress.
+        :type listener: callable
+        :param remote: The remote definition.
+        :type remote: dict
+        :return: The result.
+        :raises lib.LibError:
+        """
+        request = dict(
+            session=self.session,
+            target=target,
+            path=self.path,
+            remote=remote,
+            method=method,
+            args=list(args),
+            kwargs=kwargs or {})
+        return self.client.call(request, listener)
+
+    open = proxy(REPOSITORY, 'open')
+    create = proxy(REPOSITORY, 'create')
+    close = proxy(REPOSITORY, 'close')
+    disable_fsync = proxy(REPOSITORY, 'disable_fsync')
+    sync = proxy(REPOSITORY, 'sync')
+    set_refs = proxy(REPOSITORY, 'set_refs')
+    commit_metadata = proxy(REPOSITORY, 'commit_metadata')
+    list_refs = proxy(REPOSITORY, 'list_refs')
+    refs = proxy(REPOSITORY, 'refs')
+    list_objects = proxy(REPOSITORY, 'list_objects')
+    traverse = proxy(REPOSITORY, 'traverse')
+    partial = proxy(REPOSITORY, 'partial')
+    parent = proxy(REPOSITORY, 'parent')
+    has_commit = proxy(REPOSITORY, 'has_commit')
+    diff = proxy(REPOSITORY, 'diff')
+    generate_delta = proxy(REPOSITORY, 'generate_delta')
+    export = proxy(REPOSITORY, 'export')
+    pull_local = proxy(REPOSITORY, 'pull_local')
+
+    def pull(self, remote_id, refs, listener, *args, **kwargs):
+        """
+        Run the pull request.  See: lib.Repository.pull().
+        """
+        return self.call(REPOSITORY, 'pull', (remote_id, refs) + args, kwargs, listener)
+
+    def transaction(self):
+        """
+        Get a transaction used to write objects and set refs.
+
+        :return: A transaction (context manager).
+        :rtype: Transaction
+        """
+        return Transaction(self)
+
+
+class Transaction(lib.Transaction):
+    """
+    A repository transaction served by the service.
+    """
+
+    def _call(self, method, *args):
+        return self.repository.call(TRANSACTION, method, args)
+
+    def prepare(self):
+        self._call('prepare')
+
+    def commit(self):
+        self._call('commit')
+
+    def abort(self):
+        self._call('abort')
+
+    def set_ref(self, branch, commit):
+        self._call('set_ref', branch, commit)
+
+    def set_refs(self, refs):
+        self._call('set_refs', refs)
+
+
+class Remote(object):
+    """
+    An OSTree remote served by the service.
+    Has the same attributes as lib.Remote.
+    """
+
+    @staticmethod
+    def list(repository):
+        """
+        List remotes defined within the repository.
+
+        :param repository: The repository.
+        :type repository: Repository
+        :return: A list of remote IDs.
+        :rtype: list
+        """
+        return repository.call(REMOTE, 'list', remote=dict(id=None))
+
+    def __init__(self, remote_id, repository):
+        """
+        :param remote_id: The remote ID.
+        :type remote_id: str
+        :param repository: A repository.
+        :type repository: Repository
+        """
+        self.id = remote_id
+        self.repository = repository
+        self.url = ''
+        self.ssl_key_path = None
+        self.ssl_cert_path = None
+        self.ssl_ca_path = None
+        self.ssl_validation = False
+        self.gpg_validation = False
+        self.proxy_url = None
+        self.http2 = None
+        self.content_url = None
+        self.mirrorlist = None
+
+    def call(self, target, method, args=(), kwargs=None):
+        remote = dict((name, getattr(self, name)) for name in REMOTE_ATTRIBUTES)
+        remote['id'] = self.id
+        return self.repository.call(target, method, args, kwargs, remote=remote)
+
+    open = proxy(REMOTE, 'open')
+    add = proxy(REMOTE, 'add')
+    update = proxy(REMOTE, 'update')
+    delete = proxy(REMOTE, 'delete')
+    import_key = proxy(REMOTE, 'import_key')
+    list_refs = proxy(REMOTE, 'list_refs')
+
+
+class Summary(object):
+    """
+    A repository summary served by the service.
+    """
+
+    def __init__(self, repository):
+        """
+        :param repository: A repository.
+        :type repository: Repository
+        """
+        self.repository = repository
+
+    def call(self, target, method, args=(), kwargs=None):
+        return self.repository.call(target, method, args, kwargs)
+
+    open = proxy(SUMMARY, 'open')
+    generate = proxy(SUMMARY, 'generate')
+
+
+class Library(object):
+    """
+    The lib API served by the service.
+    Used in place of the lib module.
+
+    :ivar client: The service client.
+    :type client: Client
+    """
+
+    LibError = lib.LibError
+    Remote = Remote
+    Summary = Summary
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the Unix socket.
+        :type path: str
+        """
+        self.client = Client(path)
+
+    def Repository(self, path):
+        """
+        Get a repository served by the service.
+
+        :param path: The absolute path to an ostree repository.
+        :type path: str
+        :rtype: Repository
+        """
+        return Repository(path, self.client)
+
+
+def get_parser():
+    parser = ArgumentParser(
+        description='Serve libostree operations to pulp-ostree on a Unix socket.')
+    parser.add_argument('--socket', default=DEFAULT_PATH, help='the Unix socket path')
+    parser.add_argument('--root', action='append', dest='roots',
+                        help='a directory containing the repositories and other paths that '
+                             'may be used, may be repeated (default: {0})'.format(
+                                 ', '.join(DEFAULT_ROOTS)))
+    parser.add_argument('--read-only', action='store_true',
+                        help='serve only the operations that do not write')
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the service until interrupted.
+    """
+    args = get_parser().parse_args(argv)
+    basicConfig(level='INFO', format='%(message)s')
+    service = Service(args.socket, args.roots or DEFAULT_ROOTS, args.read_only)
+    log.info('listening on: {0}'.format(args.socket))
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+        os.unlink(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+from datetime import datetime
+from hashlib import sha256
+from logging import getLogger
+
+from pulp_ostree.common import constants
+from pulp_ostree.plugins import lib
+from pulp_ostree.plugins.db import model
+
+
+log = getLogger(__name__)
+
+
+class Storage(object):
+    """
+    The content in shared storage for a remote.
+
+    :ivar remote_id: Uniquely identifies a *remote* OSTree repository.
+    :type remote_id: str
+    :ivar repository: The repository in shared storage.
+    :type repository: lib.Repository
+    :ivar refs: The refs contained in shared storage.  {name: commit}
+    :type refs: dict
+    :ivar cache: The objects reachable from each commit already loaded.
+    :type cache: dict
+    """
+
+    def __init__(self, remote_id, path, library=None):
+        """
+        :param remote_id: Uniquely identifies a *remote* OSTree repository.
+        :type remote_id: str
+        :param path: The absolute path to the repository in shared storage.
+        :type path: str
+        :param library: The lib module or the service library.  None = the lib module.
+        """
+        self.remote_id = remote_id
+        self.repository = (library or lib).Repository(path)
+        self.refs = self.repository.refs()
+        self.cache = {}
+
+    def reachable(self, commits):
+        """
+        Get the objects reachable from the specified commits.
+
+        :param commits: A collection of commit hashes.
+        :type commits: iterable
+        :return: A dictionary of object sizes (bytes) keyed by: (checksum, type).
+        :rtype: dict
+        """
+        objects = {}
+        for commit in commits:
+            objects.update(self.objects(commit))
+        return objects
+
+    def objects(self, commit):
+        """
+        Get the objects reachable from a commit.
+        Only commits not already traversed are traversed.  See: model.CommitObjects.
+
+        :param commit: A commit hash.
+        :type commit: str
+        :return: A dictionary of object sizes (bytes) keyed by: (checksum, type).
+        :rtype: dict
+        """
+        try:
+            return self.cache[commit]
+        except KeyError:
+            pass
+        document = model.CommitObjects.objects(commit=commit).first()
+        if document is not None:
+            objects = document.load()
+        else:
+            objects = self.repository.traverse(commit)
+            model.CommitObjects.store(commit, objects)
+        self.cache[commit] = objects
+        return objects
+
+    def fingerprint(self):
+        """
+        Generate a fingerprint of the refs in shared storage.
+
+        :return: The fingerprint.
+        :rtype: str
+        """
+        h = sha256()
+        for name, commit in sorted(self.refs.items()):
+            h.update('{0}:{1}\n'.format(name, commit))
+        return h.hexdigest()
+
+
+def heads(units):
+    """
+    Get the newest unit for each branch.
+
+    :param units: A collection of units.
+    :type units: iterable
+    :return: The newest unit for each branch sorted by branch.
+    :rtype: list
+    """
+    units_by_branch = {}
+    for unit in sorted(units, key=lambda u: u.created):
+        units_by_branch[unit.branch] = unit
+    return [units_by_branch[b] for b in sorted(units_by_branch)]
+
+
+def fingerprint(units, storage):
+    """
+    Generate a fingerprint of the content used to compute statistics.
+    The fingerprint changes only when a branch head or a ref
+    in shared storage has changed.
+
+    :param units: The newest unit for each branch.
+    :type units: list
+    :param storage: Shared storage keyed by remote_id.
+    :type storage: dict
+    :return: The fingerprint.
+    :rtype: str
+    """
+    h = sha256()
+    for unit in units:
+        h.update('{0}:{1}:{2}\n'.format(unit.remote_id, unit.branch, unit.commit))
+    for remote_id in sorted(storage):
+        for name, commit in sorted(storage[remote_id].refs.items()):
+            h.update('{0}:{1}:{2}\n'.format(remote_id, name, commit))
+    return h.hexdigest()
+
+
+def update(repository, units, library=None):
+    """
+    Update the statistics stored in the repository scratchpad.
+    Nothing is computed when nothing has changed since the statistics
+    were last computed.  Otherwise, only the commits not traversed before
+    are traversed and the storage totals are listed again only for the
+    remotes with changed refs.
+
+    Statistics include:
+     - The objects and bytes reachable from each branch head.
+     - The objects and bytes reachable from all branch heads.
+     - The objects and bytes not shared with other refs in shared storage.
+     - The objects and bytes contained in shared storage for each remote.
+
+    :param repository: A pulp repository.
+    :type repository: pulp.server.db.model.Repository
+    :param units: The units associated with the repository.
+    :type units: iterable
+    :param library: The lib module or the service library.  None = the lib module.
+    :return: The statistics.
+    :rtype: dict
+    """
+    units = heads(units)
+    storage = {}
+    try:
+        for unit in units:
+            if unit.remote_id not in storage:
+                storage[unit.remote_id] = Storage(unit.remote_id, unit.storage_path, library)
+        return _update(repository, units, storage)
+    finally:
+        for st in storage.values():
+            st.repository.close()
+
+
+def _update(repository, units, storage):
+    """
+    Update the statistics stored in the repository scratchpad.
+
+    :param repository: A pulp repository.
+    :type repository: pulp.server.db.model.Repository
+    :param units: The newest unit for each branch.
+    :type units: list
+    :param storage: Shared storage keyed by remote_id.
+    :type storage: dict
+    :return: The statistics.
+    :rtype: dict
+    """
+    digest = fingerprint(units, storage)
+    previous = repository.scratchpad.get(constants.STATISTICS, {})
+    if previous.get('fingerprint') == digest:
+        log.debug('statistics unchanged for repository: {0}'.format(repository.repo_id))
+        return previous
+
+    listed = dict((s['remote_id'], s) for s in previous.get('storage', []))
+    statistics = {
+        'fingerprint': digest,
+        'computed': datetime.utcnow().isoformat(),
+        'branches': [],
+        'objects': 0,
+        'bytes': 0,
+        'unique_objects': 0,
+        'unique_bytes': 0,
+        'storage': [],
+    }
+
+    for remote_id in sorted(storage):
+        st = storage[remote_id]
+        selected = [u for u in units if u.remote_id == remote_id]
+        commits = set(u.commit for u in selected)
+        reachable = {}
+        for unit in selected:
+            objects = st.reachable([unit.commit])
+            reachable.update(objects)
+            statistics['branches'].append({
+                'branch': unit.branch,
+                'commit': unit.commit,
+                'remote_id': remote_id,
+                'objects': len(objects),
+                'bytes': sum(objects.values()),
+            })
+        shared = st.reachable(c for c in set(st.refs.values()) if c not in commits)
+        unique = dict((k, v) for k, v in reachable.items() if k not in shared)
+        statistics['objects'] += len(reachable)
+        statistics['bytes'] += sum(reachable.values())
+        statistics['unique_objects'] += len(unique)
+        statistics['unique_bytes'] += sum(unique.values())
+        refs = st.fingerprint()
+        totals = listed.get(remote_id, {})
+        if totals.get('fingerprint') != refs:
+            objects = st.repository.list_objects()
+            totals = {
+                'remote_id': remote_id,
+                'fingerprint': refs,
+                'objects': len(objects),
+                'bytes': sum(objects.values()),
+            }
+        statistics['storage'].append(totals)
+
+    repository.scratchpad.update({
+        constants.STATISTICS: statistics
+    })
+    repository.save()
+    return statistics
@@ -0,0 +1,327 @@
+import errno
+import json
+import os
+import threading
+import time
+import uuid
+
+from logging import getLogger
+
+from pulp_ostree.common import constants
+
+
+log = getLogger(__name__)
+
+
+def mkdir(path):
+    """
+    Create a directory (and parents) as needed.
+
+    :param path: The absolute path to a directory.
+    :type path: str
+    """
+    try:
+        os.makedirs(path)
+    except OSError, e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class Span(object):
+    """
+    A timed libostree operation.
+
+    :ivar id: The span ID.
+    :type id: str
+    :ivar parent: The ID of the enclosing span.
+    :type parent: str
+    :ivar name: The operation name.  Eg: Repository.pull
+    :type name: str
+    :ivar path: The absolute path to the ostree repository.
+    :type path: str
+    :ivar started: The start time (epoch seconds).
+    :type started: float
+    :ivar duration: The elapsed time in seconds.
+    :type duration: float
+    :ivar outcome: The operation outcome (ok|failed).
+    :type outcome: str
+    :ivar error: The error description when failed.
+    :type error: str
+    :ivar attributes: Operation attributes.  Eg: object counts.
+    :type attributes: dict
+    """
+
+    OK = 'ok'
+    FAILED = 'failed'
+
+    def __init__(self, name, path, parent=None):
+        """
+        :param name: The operation name.
+        :type name: str
+        :param path: The absolute path to the ostree repository.
+        :type path: str
+        :param parent: The ID of the enclosing span.
+        :type parent: str
+        """
+        self.id = uuid.uuid4().hex
+        self.parent = parent
+        self.name = name
+        self.path = path
+        self.started = time.time()
+        self.duration = 0.0
+        self.outcome = Span.OK
+        self.error = None
+        self.attributes = {}
+
+    def finish(self, error=None):
+        """
+        Mark the span finished.
+
+        :param error: The exception raised by the operation.
+        :type error: Exception
+        """
+        self.duration = round(time.time() - self.started, 6)
+        if error is not None:
+            self.outcome = Span.FAILED
+            self.error = repr(error)
+
+    def dict(self):
+        """
+        Convert to a dictionary.
+
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return dict(self.__dict__)
+
+
+class Exporter(object):
+    """
+    Span exporter.
+    The base exporter discards spans.  Subclasses override export() to
+    write each finished span.  Export is called by the thread that
+    performed the operation so implementations must be thread safe.
+    Exceptions raised are logged by the tracer and otherwise ignored.
+    """
+
+    def export(self, span):
+        """
+        Export a finished span.
+
+        :param span: A finished span.
+        :type span: Span
+        """
+        pass
+
+
+class JsonLinesExporter(Exporter):
+    """
+    Export spans to a file as JSON documents, one per line.
+
+    :ivar path: The absolute path to the file.
+    :type path: str
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The absolute path to the file.
+        :type path: str
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, span):
+        """
+        Append the span to the file.
+
+        :param span: A finished span.
+        :type span: Span
+        """
+        line = json.dumps(span.dict(), sort_keys=True)
+        with self.lock:
+            with open(self.path, 'a') as fp:
+                fp.write(line)
+                fp.write(os.linesep)
+
+
+class Tracer(object):
+    """
+    Emits spans to the registered exporters.
+    Spans are not created when no exporters are registered.
+
+    :ivar exporters: The registered exporters.
+    :type exporters: list
+    :ivar local: Thread local storage used for the stack of open spans.
+    :type local: threading.local
+    """
+
+    def __init__(self):
+        self.exporters = []
+        self.local = threading.local()
+
+    @property
+    def stack(self):
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    @property
+    def current(self):
+        """
+        The innermost open span.
+
+        :return: The current span or None.
+        :rtype: Span
+        """
+        stack = self.stack
+        if stack:
+            return stack[-1]
+
+    def register(self, exporter):
+        """
+        Register an exporter.
+
+        :param exporter: The exporter to register.
+        :type exporter: Exporter
+        """
+        self.exporters.append(exporter)
+
+    def unregister(self, exporter):
+        """
+        Unregister an exporter.
+
+        :param exporter: The exporter to unregister.
+        :type exporter: Exporter
+        """
+        try:
+            self.exporters.remove(exporter)
+        except ValueError:
+            pass
+
+    def start(self, name, path):
+        """
+        Start a span.
+
+        :param name: The operation name.
+        :type name: str
+        :param path: The absolute path to the ostree repository.
+        :type path: str
+        :return: The started span or None when there are no exporters.
+        :rtype: Span
+        """
+        if not self.exporters:
+            return
+        current = self.current
+        parent = current.id if current else None
+        span = Span(name, path, parent=parent)
+        self.stack.append(span)
+        return span
+
+    def finish(self, span, error=None):
+        """
+        Finish a span and pass it to the registered exporters.
+        Exporter failures are logged and do not affect the operation.
+
+        :param span: A span returned by start().
+        :type span: Span
+        :param error: The exception raised by the operation.
+        :type error: Exception
+        """
+        if span is None:
+            return
+        span.finish(error)
+        stack = self.stack
+        if span in stack:
+            stack.remove(span)
+        for exporter in list(self.exporters):
+            try:
+                exporter.export(span)
+            except Exception:
+                log.exception('span export failed')
+
+    def annotate(self, **attributes):
+        """
+        Add attributes to the current span.
+
+        :param attributes: The attributes to add.
+        :type attributes: dict
+        """
+        span = self.current
+        if span is not None:
+            span.attributes.update(attributes)
+
+
+def validate(name):
+    """
+    Validate a trace file name.
+    Trace files are only written in the trace directory so the
+    name must not include a directory.
+
+    :param name: A trace file name.  None = disabled.
+    :type name: str
+    :raises ValueError: when not a valid file name.
+    """
+    if not name:
+        return
+    if not isinstance(name, basestring) or \
+            os.path.basename(name) != name or \
+            name in (os.curdir, os.pardir):
+        raise ValueError(name)
+
+
+class Tracing(object):
+    """
+    Context used to emit spans to a JSON-lines file in the trace directory
+    for the duration of a sync or publish.
+
+    :ivar name: The name of the JSON-lines file.  None = disabled.
+    :type name: str
+    :ivar root: The absolute path to the pulp working directory.
+    :type root: str
+    :ivar exporter: The exporter registered while in context.
+    :type exporter: JsonLinesExporter
+    """
+
+    def __init__(self, name, root):
+        """
+        :param name: The name of the JSON-lines file.  None = disabled.
+        :type name: str
+        :param root: The absolute path to the pulp working directory.
+        :type root: str
+        """
+        self.name = name
+        self.root = root
+        self.exporter = None
+
+    @property
+    def path(self):
+        """
+        The absolute path to the JSON-lines file.
+
+        :return: The path.  None = disabled.
+        :rtype: str
+        :raises ValueError: when the name is not valid.
+        """
+        if not self.name:
+            return
+        validate(self.name)
+        return os.path.join(self.root, constants.TRACE_DIRECTORY, self.name)
+
+    def __enter__(self):
+        path = self.path
+        if path:
+            mkdir(os.path.dirname(path))
+            self.exporter = JsonLinesExporter(path)
+            tracer.register(self.exporter)
+        return self
+
+    def __exit__(self, *unused):
+        if self.exporter:
+            tracer.unregister(self.exporter)
+            self.exporter = None
+
+
+# The (process) tracer
+tracer = Tracer()
@@ -21,6 +21,13 @@ setup(
         ],
         'pulp.unit_models': [
             'ostree=pulp_ostree.plugins.db.model:Branch'
+        ],
+        'console_scripts': [
+            'pulp-ostree-diff = pulp_ostree.plugins.diff:main',
+            'pulp-ostree-history = pulp_ostree.plugins.history:main',
+            'pulp-ostree-packages = pulp_ostree.plugins.packages:main',
+            'pulp-ostree-pool = pulp_ostree.plugins.pool:main',
+            'pulp-ostree-service = pulp_ostree.plugins.service:main'
         ]
     }
 )
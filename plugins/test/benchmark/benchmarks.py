@@ -0,0 +1,275 @@
+"""
+Benchmarks of the importer and distributor steps.
+
+The real steps are run against a generated repository using a stub conduit
+and a throwaway database (see: DATABASE) so that the measurements include
+the lib calls, the unit (database) operations and the step overhead of an
+actual sync and publish:
+
+ - sync: importers.steps.Main with each (Instrumented) child step measured.
+ - publish: distributors.steps.MainStep.
+
+The shared storage and publish directories are located in the benchmark
+working directory rather than in the locations configured for the server.
+"""
+
+import os
+import shutil
+import time
+
+from pulp.common.plugins import importer_constants
+from pulp.plugins.util.publish_step import PluginStep
+from pulp.server.db import connection
+from pulp.server.db.model import Repository
+
+from pulp_ostree.common import constants
+from pulp_ostree.plugins import lib
+from pulp_ostree.plugins.distributors.steps import MainStep
+from pulp_ostree.plugins.importers.steps import Main
+from pulp_ostree.plugins.instrumentation import Instrumented
+
+from .results import Result
+from .server import Server
+
+
+DATABASE = 'pulp_ostree_benchmark'
+
+
+def measure(name, fn, *args):
+    """
+    Measure the wall and CPU time of a function call.
+
+    :param name: The benchmark name.
+    :type name: str
+    :param fn: The function to measure.
+    :type fn: callable
+    :param args: The function arguments.
+    :type args: tuple
+    :return: The result.
+    :rtype: Result
+    """
+    cpu = sum(os.times()[:2])
+    wall = time.time()
+    fn(*args)
+    wall = time.time() - wall
+    cpu = sum(os.times()[:2]) - cpu
+    return Result(name, wall, cpu)
+
+
+def measured(name, step):
+    """
+    Get the results measured by the (Instrumented) child steps.
+
+    :param name: The benchmark name format.  Eg: file.{0}
+    :type name: str
+    :param step: A parent step.
+    :type step: PluginStep
+    :return: The results named by step_id.
+    :rtype: list
+    """
+    results = []
+    for child in step.children:
+        if not isinstance(child, Instrumented):
+            continue
+        measurement = child.measurement
+        results.append(Result(name.format(child.step_id), measurement.wall, measurement.cpu))
+    return results
+
+
+class Report(object):
+    """
+    The final report built by the stub conduit.
+
+    :ivar success: The steps succeeded.
+    :type success: bool
+    :ivar summary: The summary report.
+    :type summary: dict
+    :ivar details: The detailed report.
+    :type details: dict
+    """
+
+    def __init__(self, success, summary, details):
+        """
+        :param success: The steps succeeded.
+        :type success: bool
+        :param summary: The summary report.
+        :type summary: dict
+        :param details: The detailed report.
+        :type details: dict
+        """
+        self.success = success
+        self.summary = summary
+        self.details = details
+        self.canceled_flag = False
+
+
+class Conduit(object):
+    """
+    A stub conduit.
+    Progress is discarded and the final report is built without the platform.
+    """
+
+    def set_progress(self, report):
+        pass
+
+    def build_success_report(self, summary, details):
+        return Report(True, summary, details)
+
+    def build_failure_report(self, summary, details):
+        return Report(False, summary, details)
+
+
+class Sync(Main):
+    """
+    The main synchronization step using storage in the benchmark working
+    directory rather than shared storage.
+
+    :ivar path: The absolute path to the storage repository.
+    :type path: str
+    """
+
+    def __init__(self, path, **kwargs):
+        """
+        :param path: The absolute path to the storage repository.
+        :type path: str
+        """
+        super(Sync, self).__init__(**kwargs)
+        self.path = path
+
+    @property
+    def storage_dir(self):
+        return self.path
+
+
+class Publish(PluginStep):
+    """
+    The web publisher without the atomic publish to the server publish
+    directories.  The repository is published in the specified directory.
+
+    :ivar publish_dir: The absolute path to the published repository.
+    :type publish_dir: str
+    """
+
+    def __init__(self, publish_dir, repo, conduit, config, working_dir):
+        """
+        :param publish_dir: The absolute path to the published repository.
+        :type publish_dir: str
+        :param repo: The repository being published.
+        :type  repo: pulp.plugins.model.Repository
+        :param conduit: The (stub) conduit.
+        :type  conduit: Conduit
+        :param config: The distributor configuration.
+        :type  config: dict
+        :param working_dir: The working directory.
+        :type  working_dir: str
+        """
+        super(Publish, self).__init__(
+            step_type=constants.PUBLISH_STEP_WEB_PUBLISHER,
+            repo=repo,
+            conduit=conduit,
+            config=config,
+            working_dir=working_dir,
+            plugin_type=constants.WEB_DISTRIBUTOR_TYPE_ID)
+        self.publish_dir = publish_dir
+        self.add_child(MainStep(config=config))
+
+
+class Suite(object):
+    """
+    The benchmark suite.
+
+    :ivar source: The absolute path to the generated (source) repository.
+    :type source: str
+    :ivar root: The absolute path to the working directory.
+    :type root: str
+    :ivar depth: The pull depth.
+    :type depth: int
+    """
+
+    def __init__(self, source, root, depth=0):
+        """
+        :param source: The absolute path to the generated (source) repository.
+        :type source: str
+        :param root: The absolute path to the working directory.
+        :type root: str
+        :param depth: The pull depth.
+        :type depth: int
+        """
+        self.source = source
+        self.root = root
+        self.depth = depth
+
+    def directory(self, transport, name):
+        """
+        Create an empty directory.
+
+        :param transport: The transport (file|http) used in the benchmark names.
+        :type transport: str
+        :param name: The directory name.
+        :type name: str
+        :return: The absolute path.
+        :rtype: str
+        """
+        path = os.path.join(self.root, transport, name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def sync(self, transport, url):
+        """
+        Benchmark a sync from the specified URL followed by a publish.
+        The storage repository is created by the sync.
+
+        :param transport: The transport (file|http) used in the benchmark names.
+        :type transport: str
+        :param url: The URL of the source repository.
+        :type url: str
+        :return: The results.
+        :rtype: list
+        """
+        repo_id = 'benchmark-{0}'.format(transport)
+        repo_obj = Repository(repo_id=repo_id)
+        repo_obj.save()
+        repo = repo_obj.to_transfer_repo()
+        storage = self.directory(transport, 'storage')
+        working_dir = self.directory(transport, 'working')
+        name = '{0}.{1}'.format(transport, '{0}')
+        results = []
+
+        config = {
+            importer_constants.KEY_FEED: url,
+            constants.IMPORTER_CONFIG_KEY_DEPTH: self.depth,
+        }
+        step = Sync(storage, repo=repo, conduit=Conduit(), config=config, working_dir=working_dir)
+        results.append(measure(name.format('sync'), step.process_lifecycle))
+        results.extend(measured(name, step))
+
+        config = {
+            constants.DISTRIBUTOR_CONFIG_KEY_DEPTH: self.depth,
+        }
+        published = os.path.join(self.root, transport, 'published')
+        shutil.rmtree(published, ignore_errors=True)
+        step = Publish(published, repo, Conduit(), config, working_dir)
+        results.append(measure(name.format('publish'), step.process_lifecycle))
+        results.extend(measured(name, step))
+        return results
+
+    def __call__(self):
+        """
+        Run the suite.
+        The benchmark database is dropped before the run.
+
+        :return: The results.
+        :rtype: list
+        """
+        connection.initialize(name=DATABASE)
+        database = connection.get_database()
+        database.client.drop_database(database.name)
+        results = []
+        source = lib.Repository(self.source)
+        results.append(measure('source.list_refs', source.list_refs))
+        results.extend(self.sync('file', 'file://' + self.source))
+        with Server(os.path.dirname(self.source)) as server:
+            url = '/'.join((server.url, os.path.basename(self.source)))
+            results.extend(self.sync('http', url))
+        return results
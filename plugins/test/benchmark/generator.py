@@ -0,0 +1,158 @@
+"""
+Synthetic ostree repository generator.
+
+Repositories are built using the ostree command line tool so that
+benchmarks measure the plugin (lib) code against real repositories.
+"""
+
+import os
+import random
+import shutil
+import subprocess
+
+
+class Profile(object):
+    """
+    Describes the shape of a generated repository.
+
+    :ivar branches: The number of branches.
+    :type branches: int
+    :ivar commits: The number of commits on each branch.
+    :type commits: int
+    :ivar files: The number of files in each tree.
+    :type files: int
+    :ivar churn: The fraction (0.0 - 1.0) of files changed by each commit.
+    :type churn: float
+    :ivar size: The size (bytes) of each file.
+    :type size: int
+    :ivar seed: The random seed.  The same profile always generates the same content.
+    :type seed: int
+    """
+
+    def __init__(self, branches=10, commits=5, files=1000, churn=0.1, size=4096, seed=0):
+        self.branches = branches
+        self.commits = commits
+        self.files = files
+        self.churn = churn
+        self.size = size
+        self.seed = seed
+
+    def dict(self):
+        """
+        Convert to a dictionary.
+
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return dict(self.__dict__)
+
+
+class Generator(object):
+    """
+    Generates a local ostree repository using a profile.
+
+    :ivar profile: The repository profile.
+    :type profile: Profile
+    :ivar path: The absolute path to the generated repository.
+    :type path: str
+    """
+
+    DIRS = 16
+
+    def __init__(self, profile, path):
+        """
+        :param profile: The repository profile.
+        :type profile: Profile
+        :param path: The absolute path to the generated repository.
+        :type path: str
+        """
+        self.profile = profile
+        self.path = path
+        self.random = random.Random(profile.seed)
+
+    @staticmethod
+    def branch(n):
+        """
+        The name of the Nth branch.
+
+        :param n: The branch number.
+        :type n: int
+        :return: The branch name.
+        :rtype: str
+        """
+        return 'benchmark/x86_64/branch-{0}'.format(n)
+
+    def ostree(self, *args):
+        """
+        Run an ostree command against the generated repository.
+
+        :param args: The command arguments.
+        :type args: tuple
+        """
+        command = ['ostree', '--repo={0}'.format(self.path)]
+        command.extend(args)
+        with open(os.devnull, 'w') as null:
+            subprocess.check_call(command, stdout=null)
+
+    def content(self):
+        """
+        Generate file content.
+
+        :return: The file content.
+        :rtype: str
+        """
+        size = self.profile.size
+        return ('%0*x' % (size * 2, self.random.getrandbits(size * 8))).decode('hex')
+
+    def populate(self, tree):
+        """
+        Populate a tree with files.
+
+        :param tree: The absolute path to the tree.
+        :type tree: str
+        """
+        for n in xrange(self.profile.files):
+            path = os.path.join(tree, 'dir-{0}'.format(n % self.DIRS), 'file-{0}'.format(n))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as fp:
+                fp.write(self.content())
+
+    def churn(self, tree):
+        """
+        Change a fraction of the files in a tree.
+
+        :param tree: The absolute path to the tree.
+        :type tree: str
+        """
+        changed = int(self.profile.files * self.profile.churn)
+        for n in self.random.sample(xrange(self.profile.files), changed):
+            path = os.path.join(tree, 'dir-{0}'.format(n % self.DIRS), 'file-{0}'.format(n))
+            with open(path, 'w') as fp:
+                fp.write(self.content())
+
+    def __call__(self):
+        """
+        Generate the repository.
+        An existing repository at the path is replaced.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path)
+        self.ostree('init', '--mode=archive-z2')
+        tree = self.path + '.tree'
+        shutil.rmtree(tree, ignore_errors=True)
+        os.makedirs(tree)
+        try:
+            self.populate(tree)
+            for b in xrange(self.profile.branches):
+                for c in xrange(self.profile.commits):
+                    self.churn(tree)
+                    self.ostree(
+                        'commit',
+                        '--branch={0}'.format(self.branch(b)),
+                        '--tree=dir={0}'.format(tree),
+                        '--subject=commit {0}'.format(c),
+                        '--add-metadata-string=version={0}.{1}'.format(b, c))
+            self.ostree('summary', '-u')
+        finally:
+            shutil.rmtree(tree, ignore_errors=True)
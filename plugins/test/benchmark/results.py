@@ -0,0 +1,194 @@
+"""
+Benchmark results store.
+"""
+
+import json
+import os
+
+from datetime import datetime
+
+
+class Result(object):
+    """
+    The result of a single benchmark.
+
+    :ivar name: The benchmark name.
+    :type name: str
+    :ivar wall: The elapsed (wall clock) time in seconds.
+    :type wall: float
+    :ivar cpu: The CPU (user + system) time in seconds.
+    :type cpu: float
+    """
+
+    def __init__(self, name, wall, cpu):
+        """
+        :param name: The benchmark name.
+        :type name: str
+        :param wall: The elapsed (wall clock) time in seconds.
+        :type wall: float
+        :param cpu: The CPU (user + system) time in seconds.
+        :type cpu: float
+        """
+        self.name = name
+        self.wall = wall
+        self.cpu = cpu
+
+    def dict(self):
+        """
+        Convert to a dictionary.
+
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return dict(self.__dict__)
+
+
+class Run(object):
+    """
+    The results of a benchmark run.
+
+    :ivar profile: The profile of the generated repository.
+    :type profile: dict
+    :ivar results: The results keyed by benchmark name.
+    :type results: dict
+    :ivar timestamp: When the run was recorded (UTC).
+    :type timestamp: str
+    """
+
+    def __init__(self, profile, results=None, timestamp=None):
+        """
+        :param profile: The profile of the generated repository.
+        :type profile: dict
+        :param results: The results keyed by benchmark name.
+        :type results: dict
+        :param timestamp: When the run was recorded (UTC).
+        :type timestamp: str
+        """
+        self.profile = profile
+        self.results = results or {}
+        self.timestamp = timestamp or datetime.utcnow().isoformat()
+
+    def add(self, result):
+        """
+        Add a result.
+
+        :param result: A benchmark result.
+        :type result: Result
+        """
+        self.results[result.name] = result
+
+    def dict(self):
+        """
+        Convert to a dictionary.
+
+        :return: A dictionary representation.
+        :rtype: dict
+        """
+        return dict(
+            profile=self.profile,
+            timestamp=self.timestamp,
+            results=dict((n, r.dict()) for n, r in self.results.items()))
+
+    @staticmethod
+    def build(d):
+        """
+        Build a run from a dictionary representation.
+
+        :param d: A dictionary representation.
+        :type d: dict
+        :return: The built run.
+        :rtype: Run
+        """
+        results = dict((n, Result(**r)) for n, r in d['results'].items())
+        return Run(d['profile'], results, d['timestamp'])
+
+
+class Store(object):
+    """
+    Stores benchmark runs as JSON documents in a directory.
+    The *baseline* is the run used for comparison.
+
+    :ivar root: The absolute path to the store directory.
+    :type root: str
+    """
+
+    BASELINE = 'baseline.json'
+
+    def __init__(self, root):
+        """
+        :param root: The absolute path to the store directory.
+        :type root: str
+        """
+        self.root = root
+
+    def _write(self, name, run):
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+        path = os.path.join(self.root, name)
+        with open(path, 'w') as fp:
+            json.dump(run.dict(), fp, indent=2, sort_keys=True)
+        return path
+
+    def save(self, run):
+        """
+        Save a run.
+
+        :param run: A benchmark run.
+        :type run: Run
+        :return: The absolute path to the saved document.
+        :rtype: str
+        """
+        name = 'run-{0}.json'.format(run.timestamp.replace(':', ''))
+        return self._write(name, run)
+
+    def save_baseline(self, run):
+        """
+        Save a run as the baseline.
+
+        :param run: A benchmark run.
+        :type run: Run
+        :return: The absolute path to the saved document.
+        :rtype: str
+        """
+        return self._write(self.BASELINE, run)
+
+    def baseline(self):
+        """
+        Load the baseline.
+
+        :return: The baseline run or None when not saved.
+        :rtype: Run
+        """
+        path = os.path.join(self.root, self.BASELINE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as fp:
+            return Run.build(json.load(fp))
+
+
+def compare(baseline, run, threshold=0.1):
+    """
+    Compare a run against the baseline.
+
+    :param baseline: The baseline run.
+    :type baseline: Run
+    :param run: The run to compare.
+    :type run: Run
+    :param threshold: The (wall time) change ratio considered significant.
+    :type threshold: float
+    :return: A list of: (name, baseline wall, wall, change, regressed).
+        The *change* is the ratio of change in wall time.
+    :rtype: list
+    """
+    report = []
+    for name in sorted(run.results):
+        if name not in baseline.results:
+            continue
+        before = baseline.results[name].wall
+        after = run.results[name].wall
+        if before:
+            change = (after - before) / before
+        else:
+            change = 0.0
+        report.append((name, before, after, change, change > threshold))
+    return report
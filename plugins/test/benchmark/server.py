@@ -0,0 +1,89 @@
+"""
+Local HTTP server used to serve generated repositories.
+"""
+
+import os
+import threading
+
+from BaseHTTPServer import HTTPServer
+from SimpleHTTPServer import SimpleHTTPRequestHandler
+
+
+class Handler(SimpleHTTPRequestHandler):
+    """
+    Serve files relative to the server root without logging each request.
+    """
+
+    def translate_path(self, path):
+        """
+        Translate the URL path to a path relative to the server root.
+
+        :param path: The URL path.
+        :type path: str
+        :return: The absolute path to the file.
+        :rtype: str
+        """
+        relative = SimpleHTTPRequestHandler.translate_path(self, path)
+        relative = os.path.relpath(relative, os.getcwd())
+        return os.path.join(self.server.root, relative)
+
+    def log_message(self, *unused):
+        pass
+
+
+class Server(object):
+    """
+    A local (loopback) HTTP server running in a thread.
+
+    :ivar root: The absolute path to the served directory.
+    :type root: str
+    :ivar impl: The HTTP server.
+    :type impl: HTTPServer
+    :ivar thread: The thread running the server.
+    :type thread: threading.Thread
+    """
+
+    def __init__(self, root):
+        """
+        :param root: The absolute path to the served directory.
+        :type root: str
+        """
+        self.root = root
+        self.impl = None
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        The server URL.
+
+        :return: The URL.
+        :rtype: str
+        """
+        host, port = self.impl.server_address
+        return 'http://{0}:{1}'.format(host, port)
+
+    def start(self):
+        """
+        Start the server on an ephemeral port.
+        """
+        self.impl = HTTPServer(('127.0.0.1', 0), Handler)
+        self.impl.root = self.root
+        self.thread = threading.Thread(target=self.impl.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        self.impl.shutdown()
+        self.impl.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *unused):
+        self.stop()
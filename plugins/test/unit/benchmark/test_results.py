@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from test.benchmark.results import Result, Run, Store, compare
+
+
+PROFILE = dict(branches=2, commits=1)
+
+
+class TestRun(TestCase):
+
+    def test_add(self):
+        result = Result('pull', 1.0, 0.5)
+
+        # test
+        run = Run(PROFILE)
+        run.add(result)
+
+        # validation
+        self.assertEqual(run.results, {'pull': result})
+
+    def test_build(self):
+        run = Run(PROFILE, timestamp='2016-01-01T00:00:00')
+        run.add(Result('pull', 1.0, 0.5))
+
+        # test
+        built = Run.build(run.dict())
+
+        # validation
+        self.assertEqual(built.profile, PROFILE)
+        self.assertEqual(built.timestamp, run.timestamp)
+        self.assertEqual(built.results['pull'].dict(), run.results['pull'].dict())
+
+
+class TestStore(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.root = os.path.join(self.tmp_dir, 'results')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save(self):
+        run = Run(PROFILE, timestamp='2016-01-01T00:00:00')
+        run.add(Result('pull', 1.0, 0.5))
+
+        # test
+        store = Store(self.root)
+        path = store.save(run)
+
+        # validation
+        self.assertEqual(path, os.path.join(self.root, 'run-2016-01-01T000000.json'))
+        with open(path) as fp:
+            self.assertEqual(json.load(fp), run.dict())
+        self.assertEqual(store.baseline(), None)
+
+    def test_baseline(self):
+        run = Run(PROFILE)
+        run.add(Result('pull', 1.0, 0.5))
+
+        # test
+        store = Store(self.root)
+        path = store.save_baseline(run)
+        baseline = store.baseline()
+
+        # validation
+        self.assertEqual(path, os.path.join(self.root, Store.BASELINE))
+        self.assertEqual(baseline.dict(), run.dict())
+
+    def test_baseline_replaced(self):
+        store = Store(self.root)
+        store.save_baseline(Run(PROFILE))
+        run = Run(dict(PROFILE, commits=2))
+
+        # test
+        store.save_baseline(run)
+
+        # validation
+        self.assertEqual(store.baseline().profile, run.profile)
+
+
+class TestCompare(TestCase):
+
+    def test_compare(self):
+        baseline = Run(PROFILE)
+        baseline.add(Result('add', 2.0, 1.0))
+        baseline.add(Result('pull', 1.0, 1.0))
+        baseline.add(Result('removed', 1.0, 1.0))
+        run = Run(PROFILE)
+        run.add(Result('add', 1.0, 1.0))
+        run.add(Result('new', 1.0, 1.0))
+        run.add(Result('pull', 1.5, 1.0))
+
+        # test
+        report = compare(baseline, run, 0.1)
+
+        # validation
+        self.assertEqual(
+            report,
+            [
+                ('add', 2.0, 1.0, -0.5, False),
+                ('pull', 1.0, 1.5, 0.5, True),
+            ])
+
+    def test_threshold(self):
+        baseline = Run(PROFILE)
+        baseline.add(Result('pull', 1.0, 1.0))
+        run = Run(PROFILE)
+        run.add(Result('pull', 1.05, 1.0))
+
+        # test
+        within = compare(baseline, run, 0.1)
+        exceeded = compare(baseline, run, 0.01)
+
+        # validation
+        self.assertFalse(within[0][4])
+        self.assertTrue(exceeded[0][4])
+
+    def test_zero(self):
+        baseline = Run(PROFILE)
+        baseline.add(Result('pull', 0.0, 0.0))
+        run = Run(PROFILE)
+        run.add(Result('pull', 1.0, 1.0))
+
+        # test
+        report = compare(baseline, run)
+
+        # validation
+        self.assertEqual(report, [('pull', 0.0, 1.0, 0.0, False)])
@@ -1,3 +1,6 @@
+import json
+import zlib
+
 from hashlib import sha256
 from unittest import TestCase
 
@@ -5,7 +8,10 @@ from mock import patch, Mock
 import mongoengine
 
 from pulp_ostree.common import constants
-from pulp_ostree.plugins.db.model import Branch, MetadataField, generate_remote_id
+from pulp_ostree.plugins.db.model import (
+    Branch, CommitDiff, CommitMetadata, CommitObjects, MetadataField, Package,
+    generate_remote_id, split_metadata)
+from pulp_ostree.plugins.nevra import NEVRA
 
 
 class TestUtils(TestCase):
@@ -17,6 +23,17 @@ class TestUtils(TestCase):
         h.update(url)
         self.assertEqual(remote_id, h.hexdigest())
 
+    def test_split_metadata(self):
+        metadata = {
+            'version': '25.1',
+            'ostree.endoflife': 'eol',
+            'rpmostree.rpmdb.pkglist': [['bash', 0, '4.3', '1', 'x86_64']],
+        }
+        inline, extra = split_metadata(metadata, ['version', 'ostree.*'])
+        self.assertEqual(inline, {'version': '25.1', 'ostree.endoflife': 'eol'})
+        self.assertEqual(extra, {'rpmostree.rpmdb.pkglist': [['bash', 0, '4.3', '1', 'x86_64']]})
+        self.assertEqual(split_metadata(metadata, ['*']), (metadata, {}))
+
 
 class TestMetadataField(TestCase):
 
@@ -71,6 +88,33 @@ class TestBranch(TestCase):
         base.assert_called_once_with(sender, unit, **kwargs)
         self.assertEqual(unit.created, datetime.utcnow.return_value)
 
+    @patch('pulp_ostree.plugins.db.model.CommitMetadata.objects')
+    def test_commit_metadata(self, objects):
+        objects.return_value.first.return_value.load.return_value = {
+            'version': '1',
+            'rpmostree-rpmdb-pkglist': [],
+        }
+        unit = Branch(commit='c1', metadata={}, extra_metadata=True)
+
+        # test
+        metadata = unit.commit_metadata
+
+        # validation
+        objects.assert_called_once_with(commit='c1')
+        self.assertEqual(metadata, {'version': '1', 'rpmostree-rpmdb-pkglist': []})
+
+    @patch('pulp_ostree.plugins.db.model.CommitMetadata.objects')
+    def test_commit_metadata_not_stored(self, objects):
+        objects.return_value.first.return_value = None
+        unit = Branch(commit='c1', metadata={'version': '1'}, extra_metadata=True)
+        self.assertEqual(unit.commit_metadata, {'version': '1'})
+
+    @patch('pulp_ostree.plugins.db.model.CommitMetadata.objects')
+    def test_commit_metadata_inline(self, objects):
+        unit = Branch(commit='c1', metadata={'ostree.endoflife': 'eol'})
+        self.assertEqual(unit.commit_metadata, {'ostree-endoflife': 'eol'})
+        self.assertFalse(objects.called)
+
     def test_storage_provider(self):
         unit = Branch()
         self.assertEqual(unit.storage_provider, constants.STORAGE_PROVIDER)
@@ -78,3 +122,64 @@ class TestBranch(TestCase):
     def test_storage_id(self):
         unit = Branch(remote_id='123')
         self.assertEqual(unit.storage_id, unit.remote_id)
+
+
+class TestCommitMetadata(TestCase):
+
+    @patch('pulp_ostree.plugins.db.model.CommitMetadata.save')
+    def test_store(self, save):
+        metadata = {'rpmostree.rpmdb.pkglist': [['bash', 0, '4.3', '1', 'x86_64']]}
+
+        # test
+        document = CommitMetadata.store('c1', metadata)
+
+        # validation
+        save.assert_called_once_with()
+        self.assertEqual(document.commit, 'c1')
+        self.assertEqual(
+            json.loads(zlib.decompress(document.data)),
+            {'rpmostree-rpmdb-pkglist': [['bash', 0, '4.3', '1', 'x86_64']]})
+
+    def test_load(self):
+        data = zlib.compress(json.dumps({'rpmostree-inputhash': 'abc'}))
+        document = CommitMetadata(commit='c1', data=data)
+        self.assertEqual(document.load(), {'rpmostree-inputhash': 'abc'})
+
+
+class TestCommitDiff(TestCase):
+
+    @patch('pulp_ostree.plugins.db.model.CommitDiff.save')
+    def test_store(self, save):
+        changes = [('A', '/usr/bin/zsh'), ('D', '/usr/bin/bash')]
+
+        # test
+        document = CommitDiff.store('c1', 'c2', changes)
+
+        # validation
+        save.assert_called_once_with()
+        self.assertEqual(document.commits, 'c1..c2')
+        self.assertEqual(document.load(), changes)
+
+
+class TestCommitObjects(TestCase):
+
+    @patch('pulp_ostree.plugins.db.model.CommitObjects.save')
+    def test_store(self, save):
+        objects = {('a1', 1): 10, ('b2', 2): 20}
+
+        # test
+        document = CommitObjects.store('c1', objects)
+
+        # validation
+        save.assert_called_once_with()
+        self.assertEqual(document.commit, 'c1')
+        self.assertEqual(json.loads(zlib.decompress(document.data)), [['a1', 1, 10], ['b2', 2, 20]])
+        self.assertEqual(document.load(), objects)
+
+
+class TestPackage(TestCase):
+
+    def test_nevra(self):
+        document = Package(
+            commit='c1', name='openssl', epoch=1, version='1.0.2k', release='8.el7', arch='x86_64')
+        self.assertEqual(document.nevra, NEVRA('openssl', 1, '1.0.2k', '8.el7', 'x86_64'))
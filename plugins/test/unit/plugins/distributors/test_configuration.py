@@ -48,6 +48,19 @@ class TestConfigurationGetters(unittest.TestCase):
         directory = configuration.get_repo_relative_path(self.repo, config)
         self.assertEquals(directory, relative_path[1:])
 
+    @mock.patch('pulp_ostree.plugins.distributors.configuration.model.Importer.objects')
+    def test_get_importer_subdirs(self, importers):
+        importers.return_value.first.return_value = mock.Mock(
+            config={constants.IMPORTER_CONFIG_KEY_SUBDIRS: ['/usr/share']})
+        subdirs = configuration.get_importer_subdirs(self.repo)
+        importers.assert_called_once_with(repo_id=self.repo.repo_id)
+        self.assertEquals(subdirs, ['/usr/share'])
+
+    @mock.patch('pulp_ostree.plugins.distributors.configuration.model.Importer.objects')
+    def test_get_importer_subdirs_no_importer(self, importers):
+        importers.return_value.first.return_value = None
+        self.assertEquals(configuration.get_importer_subdirs(self.repo), None)
+
 
 @mock.patch('pulp_ostree.plugins.distributors.configuration.model.Distributor.objects')
 class TestValidateConfig(unittest.TestCase):
@@ -57,3 +70,82 @@ class TestValidateConfig(unittest.TestCase):
         config = PluginCallConfiguration({}, {})
         self.assertEquals(
             (True, None), configuration.validate_config(m_repo, config))
+
+    def test_depth(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        config = PluginCallConfiguration({}, {
+            constants.DISTRIBUTOR_CONFIG_KEY_DEPTH: '3',
+            constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH: {'fedora/*': 1, '^centos/': -1},
+        })
+        self.assertEquals(
+            (True, None), configuration.validate_config(m_repo, config))
+
+    def test_depth_invalid(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        config = PluginCallConfiguration({}, {constants.DISTRIBUTOR_CONFIG_KEY_DEPTH: 'x'})
+        valid, message = configuration.validate_config(m_repo, config)
+        self.assertFalse(valid)
+        config = PluginCallConfiguration({}, {
+            constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH: {'fedora/*': 'x'}})
+        valid, message = configuration.validate_config(m_repo, config)
+        self.assertFalse(valid)
+
+    def test_branch_depth_invalid_pattern(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        config = PluginCallConfiguration({}, {
+            constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH: {'^fedora/(': 1}})
+        valid, message = configuration.validate_config(m_repo, config)
+        self.assertFalse(valid)
+
+    def test_branch_depth_not_dict(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        for value in (['fedora/*'], 'fedora/*', 3):
+            config = PluginCallConfiguration({}, {
+                constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH: value})
+            valid, message = configuration.validate_config(m_repo, config)
+            self.assertFalse(valid)
+
+    def test_static_deltas(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        config = PluginCallConfiguration({}, {
+            constants.DISTRIBUTOR_CONFIG_KEY_STATIC_DELTAS: True,
+            constants.DISTRIBUTOR_CONFIG_KEY_DELTA_CACHE_SIZE: '512',
+        })
+        self.assertEquals(
+            (True, None), configuration.validate_config(m_repo, config))
+
+    def test_trace(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        config = PluginCallConfiguration({}, {constants.CONFIG_KEY_TRACE: 'publish.json'})
+        self.assertEquals(
+            (True, None), configuration.validate_config(m_repo, config))
+        config = PluginCallConfiguration({}, {constants.CONFIG_KEY_TRACE: '/etc/passwd'})
+        valid, message = configuration.validate_config(m_repo, config)
+        self.assertFalse(valid)
+
+    def test_metrics_directory(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            config = PluginCallConfiguration({}, {constants.CONFIG_KEY_METRICS_DIRECTORY: tmp_dir})
+            self.assertEquals(
+                (True, None), configuration.validate_config(m_repo, config))
+            for path in ('metrics', os.path.join(tmp_dir, 'missing'), 42):
+                config = PluginCallConfiguration(
+                    {}, {constants.CONFIG_KEY_METRICS_DIRECTORY: path})
+                valid, message = configuration.validate_config(m_repo, config)
+                self.assertFalse(valid)
+                self.assertTrue(constants.CONFIG_KEY_METRICS_DIRECTORY in message)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_static_deltas_invalid(self, mock_dist_qs):
+        m_repo = mock.MagicMock()
+        config = PluginCallConfiguration({}, {
+            constants.DISTRIBUTOR_CONFIG_KEY_STATIC_DELTAS: 'yes'})
+        valid, message = configuration.validate_config(m_repo, config)
+        self.assertFalse(valid)
+        config = PluginCallConfiguration({}, {
+            constants.DISTRIBUTOR_CONFIG_KEY_DELTA_CACHE_SIZE: 0})
+        valid, message = configuration.validate_config(m_repo, config)
+        self.assertFalse(valid)
@@ -5,18 +5,23 @@ import unittest
 from mock import Mock, patch, call
 
 from pulp_ostree.common import constants
+from pulp_ostree.plugins import metrics, service
 from pulp_ostree.plugins.db import model
 from pulp_ostree.plugins.distributors import steps
+from pulp_ostree.plugins.lib import LibError
 
 
 MODULE = 'pulp_ostree.plugins.distributors.steps'
 
+# Disable profiling for steps with a mocked parent (configuration)
+PROFILED = 'pulp_ostree.plugins.instrumentation.Instrumented.profiled'
+
 
 class TestWebPublisher(unittest.TestCase):
 
     @patch(MODULE + '.mkdir')
     @patch(MODULE + '.configuration')
-    @patch(MODULE + '.AtomicDirectoryPublishStep')
+    @patch(MODULE + '.AtomicPublish')
     @patch(MODULE + '.MainStep')
     def test_init(self, mock_main, mock_atomic, mock_configuration, mock_mkdir):
         repo = Mock(id='test', working_dir='/tmp/working')
@@ -43,21 +48,60 @@ class TestWebPublisher(unittest.TestCase):
         mock_mkdir.assert_called_once_with(publisher.publish_dir)
 
 
+@patch(PROFILED, False)
+@patch(MODULE + '.configuration.get_importer_subdirs', Mock(return_value=None))
 class TestMainStep(unittest.TestCase):
 
     def test_init(self):
         main = steps.MainStep()
         self.assertEqual(main.step_id, constants.PUBLISH_STEP_MAIN)
 
-    @patch(MODULE + '.MainStep._add_ref')
+    @patch('os.path.getsize')
     @patch(MODULE + '.lib')
-    def test_process_main(self, lib, add_ref):
+    def test_process_main_branch_depth(self, lib, getsize):
+        units = [
+            Mock(branch='fedora/25/x86_64', commit='commit:1', storage_path='path:1'),
+            Mock(branch='centos/7/x86_64', commit='commit:2', storage_path='path:2'),
+        ]
+        transaction = Mock()
+        transaction.__enter__ = Mock(return_value=transaction)
+        transaction.__exit__ = Mock(return_value=None)
+        repository = Mock()
+        repository.transaction.return_value = transaction
+        lib.Repository.return_value = repository
+        config = {
+            constants.DISTRIBUTOR_CONFIG_KEY_DEPTH: 0,
+            constants.DISTRIBUTOR_CONFIG_KEY_BRANCH_DEPTH: {'fedora/*': 5},
+        }
+
+        # test
+        main = steps.MainStep()
+        main._get_units = Mock(return_value=units)
+        main._update_statistics = Mock()
+        main.parent = Mock(publish_dir='/tmp/dir-1234', config=config)
+        main.process_main()
+
+        # validation
+        self.assertEqual(
+            repository.pull_local.call_args_list,
+            [
+                call('path:1', ['commit:1'], 5, None, transaction=True),
+                call('path:2', ['commit:2'], 0, None, transaction=True),
+            ])
+
+    @patch('os.path.getsize')
+    @patch(MODULE + '.lib')
+    def test_process_main(self, lib, getsize):
         depth = 3
         units = [
             Mock(branch='branch:1', commit='commit:1', storage_path='path:1'),
             Mock(branch='branch:2', commit='commit:2', storage_path='path:2'),
         ]
+        transaction = Mock()
+        transaction.__enter__ = Mock(return_value=transaction)
+        transaction.__exit__ = Mock(return_value=None)
         repository = Mock()
+        repository.transaction.return_value = transaction
         lib.Repository.return_value = repository
         config = {
             constants.DISTRIBUTOR_CONFIG_KEY_DEPTH: '3'
@@ -67,24 +111,207 @@ class TestMainStep(unittest.TestCase):
         # test
         main = steps.MainStep()
         main._get_units = Mock(return_value=units)
+        main._update_statistics = Mock()
         main.parent = parent
         main.process_main()
 
         # validation
         lib.Repository.assert_called_once_with(parent.publish_dir)
         repository.create.assert_called_once_with()
+        repository.disable_fsync.assert_called_once_with()
         self.assertEqual(
             repository.pull_local.call_args_list,
             [
-                call(u.storage_path, [u.commit], depth) for u in units
-            ])
-        self.assertEqual(
-            add_ref.call_args_list,
-            [
-                call(parent.publish_dir, u.branch, u.commit) for u in units
+                call('path:1', ['commit:1'], depth, None, transaction=True),
+                call('path:2', ['commit:2'], depth, None, transaction=True),
             ])
+        transaction.set_refs.assert_called_once_with(
+            dict((u.branch, u.commit) for u in units))
+        transaction.__exit__.assert_called_once_with(None, None, None)
         lib.Summary.assert_called_once_with(repository)
         lib.Summary.return_value.generate.assert_called_once_with()
+        repository.sync.assert_called_once_with()
+        getsize.assert_called_once_with(os.path.join(parent.publish_dir, 'summary'))
+        self.assertEqual(main.summary_size, getsize.return_value)
+        main._update_statistics.assert_called_once_with(units)
+        self.assertFalse(repository.generate_delta.called)
+
+    @patch('os.path.getsize', Mock())
+    @patch(MODULE + '.lib')
+    def test_process_main_static_deltas(self, lib):
+        units = [Mock(branch='branch:1', commit='commit:1', storage_path='path:1')]
+        transaction = Mock()
+        transaction.__enter__ = Mock(return_value=transaction)
+        transaction.__exit__ = Mock(return_value=None)
+        repository = Mock()
+        repository.transaction.return_value = transaction
+        lib.Repository.return_value = repository
+        config = {
+            constants.DISTRIBUTOR_CONFIG_KEY_STATIC_DELTAS: True,
+        }
+
+        # test
+        main = steps.MainStep()
+        main._get_units = Mock(return_value=units)
+        main._publish_deltas = Mock()
+        main._update_statistics = Mock()
+        main.parent = Mock(publish_dir='/tmp/dir-1234', config=config)
+        main.process_main()
+
+        # validation
+        main._publish_deltas.assert_called_once_with(repository, units)
+
+    @patch('os.path.getsize', Mock())
+    @patch(MODULE + '.lib')
+    @patch(MODULE + '.configuration.get_importer_subdirs')
+    def test_process_main_subdirs(self, get_importer_subdirs, lib):
+        units = [Mock(branch='branch:1', commit='commit:1', storage_path='path:1')]
+        transaction = Mock()
+        transaction.__enter__ = Mock(return_value=transaction)
+        transaction.__exit__ = Mock(return_value=None)
+        repository = Mock()
+        repository.transaction.return_value = transaction
+        lib.Repository.return_value = repository
+        get_importer_subdirs.return_value = ['/usr/share']
+        parent = Mock(publish_dir='/tmp/dir-1234', config={})
+
+        # test
+        main = steps.MainStep()
+        main._get_units = Mock(return_value=units)
+        main._update_statistics = Mock()
+        main.parent = parent
+        main.process_main()
+
+        # validation
+        get_importer_subdirs.assert_called_once_with(parent.get_repo.return_value.repo_obj)
+        repository.pull_local.assert_called_once_with(
+            'path:1', ['commit:1'], 0, ['/usr/share'], transaction=True)
+
+    @patch(MODULE + '.deltas')
+    def test_publish_deltas(self, deltas):
+        units = [
+            Mock(commit='commit:1', storage_path='/tmp/ostree/r1/content'),
+            Mock(commit='commit:2', storage_path='/tmp/ostree/r2/content'),
+            Mock(commit='commit:3', storage_path='/tmp/ostree/r2/content'),
+        ]
+        store = Mock(path='/tmp/ostree/deltas')
+        deltas.DeltaStore.find.return_value = store
+        repository = Mock()
+        repository.partial.return_value = False
+        repository.parent.side_effect = [None, 'commit:0', 'commit:2']
+        repository.has_commit.side_effect = [False, True]
+        config = {
+            constants.DISTRIBUTOR_CONFIG_KEY_DELTA_CACHE_SIZE: 10,
+        }
+
+        # test
+        main = steps.MainStep()
+        main.parent = Mock(config=config)
+        main._publish_deltas(repository, units)
+
+        # validation
+        deltas.DeltaStore.find.assert_called_once_with(units[2].storage_path)
+        deltas.publish.assert_called_once_with(store, repository, 'commit:2', 'commit:3')
+        store.evict.assert_called_once_with(10 * 1024 * 1024)
+
+    @patch(MODULE + '.deltas')
+    def test_publish_deltas_partial(self, deltas):
+        units = [
+            Mock(commit='commit:1', storage_path='/tmp/ostree/r1/content'),
+            Mock(commit='commit:3', storage_path='/tmp/ostree/r1/content'),
+        ]
+        repository = Mock()
+        repository.partial.side_effect = lambda commit: commit in ('commit:1', 'commit:2')
+        repository.parent.return_value = 'commit:2'
+        repository.has_commit.return_value = True
+
+        # test
+        main = steps.MainStep()
+        main.parent = Mock(config={})
+        main._publish_deltas(repository, units)
+
+        # validation
+        repository.parent.assert_called_once_with('commit:3')
+        self.assertFalse(deltas.publish.called)
+
+    @patch(MODULE + '.deltas')
+    def test_publish_deltas_failed(self, deltas):
+        units = [
+            Mock(commit='commit:2', storage_path='/tmp/ostree/r1/content'),
+            Mock(commit='commit:4', storage_path='/tmp/ostree/r1/content'),
+        ]
+        store = Mock(path='/tmp/ostree/deltas')
+        deltas.DeltaStore.find.return_value = store
+        deltas.publish.side_effect = [LibError, True]
+        repository = Mock()
+        repository.partial.return_value = False
+        repository.parent.side_effect = ['commit:1', 'commit:3']
+        repository.has_commit.return_value = True
+
+        # test
+        main = steps.MainStep()
+        main.parent = Mock(config={})
+        main._publish_deltas(repository, units)
+
+        # validation
+        self.assertEqual(deltas.publish.call_count, 2)
+        self.assertEqual(store.evict.call_count, 1)
+
+    def test_collect(self):
+        registry = Mock()
+
+        # test
+        main = steps.MainStep()
+        main.summary_size = 100
+        main.collect(registry, dict(repo_id='r1'))
+
+        # validation
+        registry.gauge.assert_called_with(metrics.SUMMARY_BYTES)
+        registry.gauge.return_value.set.assert_called_with(
+            100, repo_id='r1', step=constants.PUBLISH_STEP_MAIN)
+
+    @patch(MODULE + '.stats')
+    def test_update_statistics(self, stats):
+        units = [Mock(), Mock()]
+        repository = Mock(id='repo-1')
+
+        # test
+        main = steps.MainStep()
+        main.parent = Mock(config={})
+        main.get_repo = Mock(return_value=repository)
+        main._update_statistics(units)
+
+        # validation
+        stats.update.assert_called_once_with(repository.repo_obj, units, steps.lib)
+
+    @patch(MODULE + '.stats')
+    def test_update_statistics_service(self, stats):
+        units = [Mock(), Mock()]
+        repository = Mock(id='repo-1')
+
+        # test
+        main = steps.MainStep()
+        main.parent = Mock(config={constants.CONFIG_KEY_SERVICE: '/tmp/ostree.sock'})
+        main.get_repo = Mock(return_value=repository)
+        main._update_statistics(units)
+
+        # validation
+        library = stats.update.call_args[0][2]
+        self.assertTrue(isinstance(library, service.Library))
+        self.assertEqual(library.client.path, '/tmp/ostree.sock')
+
+    @patch(MODULE + '.stats')
+    def test_update_statistics_failed(self, stats):
+        stats.update.side_effect = LibError
+
+        # test
+        main = steps.MainStep()
+        main.parent = Mock(config={})
+        main.get_repo = Mock()
+        main._update_statistics([])
+
+        # validation
+        self.assertTrue(stats.update.called)
 
     @patch(MODULE + '.get_unit_model_querysets')
     def test_get_units(self, find):
@@ -97,7 +324,9 @@ class TestMainStep(unittest.TestCase):
             Mock(name='5', branch='branch:3', created=5),
         ]
 
-        find.return_value = [reversed(units)]
+        queryset = Mock()
+        queryset.filter.return_value.exclude.return_value = reversed(units)
+        find.return_value = [queryset]
 
         parent = Mock()
         parent.get_repo.return_value = Mock(id='id-1234')
@@ -110,6 +339,8 @@ class TestMainStep(unittest.TestCase):
         # validation
         find.assert_called_once_with(
             parent.get_repo.return_value.id, model.Branch)
+        queryset.filter.assert_called_once_with(historical__ne=True)
+        queryset.filter.return_value.exclude.assert_called_once_with('metadata')
         self.assertEqual(
             sorted(unit_list),
             sorted(
@@ -118,27 +349,3 @@ class TestMainStep(unittest.TestCase):
                     units[4],
                     units[5]
                 ]))
-
-    @patch('__builtin__.open')
-    @patch(MODULE + '.mkdir')
-    def test_add_ref(self, mkdir, _open):
-        path = '/tmp/path'
-        branch = 'fedora/x86/core'
-        commit = 'test_commit'
-
-        fp = Mock()
-        fp.__enter__ = Mock(return_value=fp)
-        fp.__exit__ = Mock()
-        _open.return_value = fp
-
-        # test
-        steps.MainStep._add_ref(path, branch, commit)
-
-        # validation
-        path = os.path.join(path, 'refs', 'heads', os.path.dirname(branch))
-        mkdir.assert_called_once_with(path)
-        path = os.path.join(path, os.path.basename(branch))
-        _open.assert_called_once_with(path, 'w+')
-        fp.write.assert_called_once_with(commit)
-        self.assertTrue(fp.__enter__.called)
-        self.assertTrue(fp.__exit__.called)
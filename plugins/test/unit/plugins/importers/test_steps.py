@@ -1,4 +1,8 @@
 import os
+import shutil
+import threading
+
+from tempfile import mkdtemp
 
 from pulp.common.compat import unittest
 
@@ -9,14 +13,19 @@ from pulp.server.exceptions import PulpCodedException
 
 from mongoengine import NotUniqueError
 
-from pulp_ostree.plugins.lib import LibError
-from pulp_ostree.plugins.importers.steps import Main, Create, Summary, Pull, Add, Clean, Remote
+from pulp_ostree.plugins.lib import LibError, Ref
+from pulp_ostree.plugins.importers.steps import (
+    Main, Create, Summary, Pull, Pool, Add, Diff, Statistics, Clean, Remote)
 from pulp_ostree.common import constants, errors
+from pulp_ostree.plugins import metrics, service
 
 
 # The module being tested
 MODULE = 'pulp_ostree.plugins.importers.steps'
 
+# Disable profiling for steps with a mocked parent (configuration)
+PROFILED = 'pulp_ostree.plugins.instrumentation.Instrumented.profiled'
+
 
 class TestMainStep(unittest.TestCase):
 
@@ -51,12 +60,40 @@ class TestMainStep(unittest.TestCase):
         self.assertEqual(step.branches, branches)
         self.assertEqual(step.depth, depth)
         self.assertEqual(step.repo_id, repo.id)
-        self.assertEqual(len(step.children), 5)
+        self.assertEqual(len(step.children), 7)
         self.assertTrue(isinstance(step.children[0], Create))
         self.assertTrue(isinstance(step.children[1], Summary))
         self.assertTrue(isinstance(step.children[2], Pull))
         self.assertTrue(isinstance(step.children[3], Add))
-        self.assertTrue(isinstance(step.children[4], Clean))
+        self.assertEqual(step.children[3], step.add_units)
+        self.assertTrue(isinstance(step.children[4], Diff))
+        self.assertTrue(isinstance(step.children[5], Statistics))
+        self.assertTrue(isinstance(step.children[6], Clean))
+
+    def test_init_object_pool(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_OBJECT_POOL: True,
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+
+        # validation
+        self.assertEqual(len(step.children), 8)
+        self.assertTrue(isinstance(step.children[2], Pull))
+        self.assertTrue(isinstance(step.children[3], Pool))
+        self.assertTrue(isinstance(step.children[4], Add))
+
+    def test_metadata_keys(self):
+        step = Main(repo=Mock(id='id-123'), config={importer_constants.KEY_FEED: 'url-123'})
+        self.assertEqual(step.metadata_keys, constants.DEFAULT_METADATA_KEYS)
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_METADATA_KEYS: ['*'],
+        }
+        step = Main(repo=Mock(id='id-123'), config=config)
+        self.assertEqual(step.metadata_keys, ['*'])
 
     def test_init_no_feed(self):
         repo = Mock(id='id-123')
@@ -89,12 +126,334 @@ class TestMainStep(unittest.TestCase):
         # test
         step = Main(repo=repo, config=config)
         path = step.storage_dir
+        self.assertEqual(step.storage_dir, path)
         storage.assert_called_once_with(constants.STORAGE_PROVIDER, step.remote_id)
         st.__enter__.assert_called_once_with()
         st.__exit__.assert_called_once_with(None, None, None)
         self.assertEqual(path, st.content_dir)
 
+    @patch(MODULE + '.lib')
+    @patch(MODULE + '.Main.storage_dir', PropertyMock(return_value='/tmp/storage'))
+    def test_repository(self, fake_lib):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        repository = step.repository
+
+        # validation
+        fake_lib.Repository.assert_called_once_with('/tmp/storage')
+        self.assertEqual(repository, fake_lib.Repository.return_value)
+        self.assertEqual(step.repository, repository)
+
+    @patch(MODULE + '.Main.storage_dir', PropertyMock(return_value='/tmp/storage'))
+    def test_repository_service(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.CONFIG_KEY_SERVICE: '/tmp/ostree.sock',
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        repository = step.repository
+
+        # validation
+        self.assertTrue(isinstance(repository, service.Repository))
+        self.assertEqual(repository.path, '/tmp/storage')
+        self.assertEqual(repository.client.path, '/tmp/ostree.sock')
+
+    def test_resolve(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_BRANCHES: ['fedora/*', 'centos/7'],
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: ['^.+/testing'],
+        }
+        branches = ['fedora/24', 'fedora/24/testing', 'centos/7', 'centos/6']
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        resolved = step.resolve(branches)
+
+        # validation
+        self.assertEqual(resolved, ['fedora/24', 'centos/7'])
+        self.assertEqual(step.branches, resolved)
+
+    def test_resolve_all(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        resolved = step.resolve(['fedora/24'])
+
+        # validation
+        self.assertEqual(resolved, None)
+        self.assertEqual(step.branches, None)
+
+    def test_resolve_all_excluded(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: ['fedora/*'],
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        resolved = step.resolve(['fedora/24', 'centos/7'])
+
+        # validation
+        self.assertEqual(resolved, ['centos/7'])
+
+    def test_resolve_no_summary(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_BRANCHES: ['fedora/*', 'centos/7', 'centos/6'],
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: ['centos/6'],
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        resolved = step.resolve([])
+
+        # validation
+        self.assertEqual(resolved, ['centos/7'])
+
+    def test_groups(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_DEPTH: 0,
+            constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: {
+                'fedora/*/lts': -1,
+                'centos/7': 5,
+            },
+        }
+        branches = ['fedora/24', 'fedora/24/lts', 'centos/7', 'fedora/25/lts', 'fedora/25']
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step.resolve(branches)
+        groups = step.groups
+
+        # validation
+        self.assertEqual(
+            groups,
+            [
+                (['fedora/24/lts', 'fedora/25/lts'], -1),
+                (['fedora/24', 'fedora/25'], 0),
+                (['centos/7'], 5),
+            ])
+
+    def test_network(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            importer_constants.KEY_MAX_SPEED: '1024',
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME: 30,
+            constants.IMPORTER_CONFIG_KEY_HTTP2: False,
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+
+        # validation
+        self.assertEqual(
+            step.network,
+            {
+                importer_constants.KEY_MAX_SPEED: 1024,
+                constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT: None,
+                constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME: 30,
+                constants.IMPORTER_CONFIG_KEY_HTTP2: False,
+            })
+
+    @patch(MODULE + '.glob')
+    @patch(MODULE + '.os.stat')
+    @patch(MODULE + '.Main.storage_dir', PropertyMock(return_value='/storage/ostree/1/content'))
+    def test_localcache(self, stat, _glob):
+        _glob.return_value = [
+            '/storage/ostree/3/content',
+            '/storage/ostree/1/content',
+            '/storage/ostree/2/content',
+            '/storage/ostree/4/content',
+        ]
+        stat.side_effect = [Mock(st_dev=1), Mock(st_dev=1), OSError(), Mock(st_dev=2)]
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config={importer_constants.KEY_FEED: 'http://origin'})
+        paths = step.localcache
+
+        # validation
+        _glob.assert_called_once_with('/storage/ostree/*/content')
+        self.assertEqual(
+            stat.call_args_list,
+            [
+                (('/storage/ostree/1/content',), {}),
+                (('/storage/ostree/2/content/objects',), {}),
+                (('/storage/ostree/3/content/objects',), {}),
+                (('/storage/ostree/4/content/objects',), {}),
+            ])
+        self.assertEqual(paths, ['/storage/ostree/2/content'])
+
+    def test_localcache_disabled(self):
+        config = {
+            importer_constants.KEY_FEED: 'http://origin',
+            constants.IMPORTER_CONFIG_KEY_LOCALCACHE: False,
+        }
+        step = Main(repo=Mock(id='id-123'), config=config)
+        self.assertEqual(step.localcache, [])
+
+    def test_local_path(self):
+        repo = Mock(id='id-123')
+        step = Main(repo=repo, config={importer_constants.KEY_FEED: 'file:///tmp/repo'})
+        self.assertEqual(step.local_path, '/tmp/repo')
+        step = Main(repo=repo, config={importer_constants.KEY_FEED: 'http://origin'})
+        self.assertEqual(step.local_path, None)
+
+    def test_local_path_remote(self):
+        repo = Mock(id='id-123')
+        for key, value in (
+                (constants.IMPORTER_CONFIG_KEY_GPG_KEYS, ['key-1']),
+                (constants.IMPORTER_CONFIG_KEY_CONTENT_URL, 'http://content'),
+                (constants.IMPORTER_CONFIG_KEY_MIRRORLIST, 'http://mirrors'),
+                (constants.IMPORTER_CONFIG_KEY_SUBDIRS, ['/usr/share'])):
+            config = {
+                importer_constants.KEY_FEED: 'file:///tmp/repo',
+                key: value,
+            }
+            step = Main(repo=repo, config=config)
+            self.assertEqual(step.local_path, None)
+
+    def test_content(self):
+        config = {
+            importer_constants.KEY_FEED: 'http://origin',
+            constants.IMPORTER_CONFIG_KEY_MIRRORLIST: 'http://origin/mirrors',
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+
+        # validation
+        self.assertEqual(
+            step.content,
+            dict(url='http://origin', content_url=None, mirrorlist='http://origin/mirrors'))
+
+    def test_groups_pipelined(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_DEPTH: 0,
+            constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: {'centos/7': 5},
+            constants.IMPORTER_CONFIG_KEY_PIPELINED: True,
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step.resolve(['fedora/24', 'centos/7', 'fedora/25'])
+
+        # validation
+        self.assertEqual(
+            step.groups,
+            [
+                (['fedora/24', 'fedora/25'], 0),
+                (['centos/7'], 5),
+            ])
+
+    @patch(MODULE + '.constants.PIPELINE_CHUNK_SIZE', 2)
+    def test_groups_pipelined_chunks(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_DEPTH: 0,
+            constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: {'centos/7': 5},
+            constants.IMPORTER_CONFIG_KEY_PIPELINED: True,
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step.resolve(['fedora/24', 'centos/7', 'fedora/25', 'fedora/26', 'fedora/27'])
+
+        # validation
+        self.assertEqual(
+            step.groups,
+            [
+                (['fedora/24', 'fedora/25'], 0),
+                (['fedora/26', 'fedora/27'], 0),
+                (['centos/7'], 5),
+            ])
+
+    def test_groups_pipelined_all(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_PIPELINED: True,
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step.resolve(['fedora/24', 'fedora/25'])
+
+        # validation
+        self.assertEqual(step.groups, [(['fedora/24', 'fedora/25'], 0)])
+
+    def test_groups_all(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_DEPTH: 3,
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step.resolve(['fedora/24'])
+
+        # validation
+        self.assertEqual(step.groups, [(None, 3)])
+
+    def test_groups_all_resolved(self):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+            constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: {'fedora/24': 2},
+        }
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step.resolve(['fedora/24', 'fedora/25'])
+
+        # validation
+        self.assertEqual(step.groups, [(['fedora/25'], 0), (['fedora/24'], 2)])
+
+    @patch(MODULE + '.PluginStep.process_lifecycle')
+    def test_process_lifecycle(self, process_lifecycle):
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+        }
+        repository = Mock()
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step._repository = repository
+        report = step.process_lifecycle()
+
+        # validation
+        process_lifecycle.assert_called_once_with()
+        self.assertEqual(report, process_lifecycle.return_value)
+        repository.close.assert_called_once_with()
+        self.assertEqual(step._repository, None)
+
+    @patch(MODULE + '.PluginStep.process_lifecycle')
+    def test_process_lifecycle_failed(self, process_lifecycle):
+        process_lifecycle.side_effect = ValueError
+        config = {
+            importer_constants.KEY_FEED: 'url-123',
+        }
+        repository = Mock()
+
+        # test
+        step = Main(repo=Mock(id='id-123'), config=config)
+        step._repository = repository
+        self.assertRaises(ValueError, step.process_lifecycle)
+
+        # validation
+        repository.close.assert_called_once_with()
+
 
+@patch(PROFILED, False)
 class TestCreate(unittest.TestCase):
 
     def test_init(self):
@@ -115,7 +474,7 @@ class TestCreate(unittest.TestCase):
             storage_dir='root/path-123')
 
         fake_lib.LibError = LibError
-        fake_lib.Repository.return_value.open.side_effect = LibError
+        parent.repository.open.side_effect = LibError
 
         # test
         step = Create()
@@ -123,10 +482,9 @@ class TestCreate(unittest.TestCase):
         step.process_main()
 
         # validation
-        fake_remote.assert_called_once_with(step, fake_lib.Repository.return_value)
-        fake_lib.Repository.assert_called_once_with(parent.storage_dir)
-        fake_lib.Repository.return_value.open.assert_called_once_with()
-        fake_lib.Repository.return_value.create.assert_called_once_with()
+        fake_remote.assert_called_once_with(step, parent.repository)
+        parent.repository.open.assert_called_once_with()
+        parent.repository.create.assert_called_once_with()
         fake_remote.return_value.add.assert_called_once_with()
 
     @patch(MODULE + '.lib')
@@ -135,7 +493,6 @@ class TestCreate(unittest.TestCase):
         url = 'url-123'
         remote_id = 'remote-123'
         repo_id = 'repo-xyz'
-        path = 'root/path-123'
         parent = Mock(
             feed_url=url,
             remote_id=remote_id,
@@ -148,24 +505,27 @@ class TestCreate(unittest.TestCase):
         step.process_main()
 
         # validation
-        fake_remote.assert_called_once_with(step, fake_lib.Repository.return_value)
-        fake_lib.Repository.assert_called_once_with(path)
-        fake_lib.Repository.return_value.open.assert_called_once_with()
+        fake_remote.assert_called_once_with(step, parent.repository)
+        parent.repository.open.assert_called_once_with()
+        self.assertFalse(parent.repository.create.called)
         fake_remote.return_value.add.assert_called_once_with()
 
     @patch(MODULE + '.lib')
     def test_process_main_repository_exception(self, fake_lib):
         fake_lib.LibError = LibError
-        fake_lib.Repository.side_effect = LibError
+        parent = Mock(feed_url='', remote_id='')
+        parent.repository.open.side_effect = LibError
+        parent.repository.create.side_effect = LibError
         try:
             step = Create()
-            step.parent = Mock(feed_url='', remote_id='')
+            step.parent = parent
             step.process_main()
             self.assertTrue(False, msg='Create exception expected')
         except PulpCodedException, pe:
             self.assertEqual(pe.error_code, errors.OST0001)
 
 
+@patch(PROFILED, False)
 class TestPull(unittest.TestCase):
 
     def test_init(self):
@@ -175,30 +535,366 @@ class TestPull(unittest.TestCase):
 
     def test_process_main(self):
         repo_id = 'repo-xyz'
-        path = 'root/path-123'
+        repository = Mock()
         branches = ['branch-1', 'branch-2']
         depth = 3
 
         # test
         step = Pull()
-        step.parent = Mock(storage_dir=path, repo_id=repo_id, branches=branches, depth=depth)
+        step.parent = Mock(
+            repository=repository,
+            repo_id=repo_id,
+            branches=branches,
+            groups=[(branches, depth)],
+            local_path=None)
         step._pull = Mock()
         step.process_main()
 
         # validation
-        step._pull.assert_called_once_with(path, repo_id, branches, depth)
+        step._pull.assert_called_once_with(
+            repository, repo_id, branches, depth, step.parent.subdirs)
+        self.assertEqual(step.groups, [dict(branches=branches, depth=depth)])
+        self.assertEqual(step.network, step.parent.network)
+        self.assertEqual(step.source, step.parent.content)
+        self.assertEqual(step.method, constants.PULL_METHOD_FETCH)
+        self.assertEqual(step.caches, step.parent.localcache)
+        self.assertEqual(step.group, '')
+
+    def test_process_main_grouped(self):
+        repo_id = 'repo-xyz'
+        repository = Mock()
+        groups = [
+            (['branch-1'], -1),
+            (['branch-2', 'branch-3'], 0),
+        ]
+
+        # test
+        step = Pull()
+        step.parent = Mock(
+            repository=repository,
+            repo_id=repo_id,
+            branches=['branch-1', 'branch-2', 'branch-3'],
+            groups=groups,
+            subdirs=None,
+            local_path=None,
+            pipelined=False)
+        step._pull = Mock()
+        step.process_main()
+
+        # validation
+        self.assertEqual(
+            step._pull.call_args_list,
+            [
+                ((repository, repo_id, ['branch-1'], -1, None), {}),
+                ((repository, repo_id, ['branch-2', 'branch-3'], 0, None), {}),
+            ])
+        self.assertEqual(
+            step.groups,
+            [
+                dict(branches=['branch-1'], depth=-1),
+                dict(branches=['branch-2', 'branch-3'], depth=0),
+            ])
+        self.assertEqual(step.group, 'group 2/2 depth=0: ')
+
+    @patch(MODULE + '.Pull._method')
+    def test_process_main_local(self, method):
+        repository = Mock()
+        branches = ['branch-1']
+        method.return_value = constants.PULL_METHOD_HARDLINK
+
+        # test
+        step = Pull()
+        step.parent = Mock(
+            repository=repository,
+            branches=branches,
+            groups=[(branches, 0)],
+            subdirs=None,
+            local_path='/mnt/builds/repo')
+        step._pull = Mock()
+        step._import = Mock()
+        step.process_main()
+
+        # validation
+        method.assert_called_once_with(repository, '/mnt/builds/repo')
+        step._import.assert_called_once_with(repository, '/mnt/builds/repo', branches, 0, None)
+        self.assertFalse(step._pull.called)
+        self.assertEqual(step.method, constants.PULL_METHOD_HARDLINK)
+        self.assertEqual(step.caches, [])
+
+    @patch(MODULE + '.os.stat')
+    @patch(MODULE + '.Pull._mode')
+    def test_method(self, mode, stat):
+        repository = Mock(path='/var/lib/pulp/content/ostree/1')
+        stat.side_effect = [Mock(st_dev=1), Mock(st_dev=1), Mock(st_dev=1), Mock(st_dev=2)]
+        mode.return_value = 'archive-z2'
+
+        # test and validation
+        self.assertEqual(Pull._method(repository, None), constants.PULL_METHOD_FETCH)
+        self.assertEqual(Pull._method(repository, '/tmp/repo'), constants.PULL_METHOD_HARDLINK)
+        self.assertEqual(Pull._method(repository, '/tmp/repo'), constants.PULL_METHOD_COPY)
+        self.assertEqual(
+            mode.call_args_list,
+            [
+                (('/tmp/repo',), {}),
+                (('/var/lib/pulp/content/ostree/1',), {}),
+            ])
+        self.assertEqual(
+            stat.call_args_list[:2],
+            [
+                (('/tmp/repo/objects',), {}),
+                (('/var/lib/pulp/content/ostree/1/objects',), {}),
+            ])
+
+    @patch(MODULE + '.os.stat')
+    def test_method_not_found(self, stat):
+        stat.side_effect = OSError
+        self.assertEqual(Pull._method(Mock(path='/tmp/1'), '/tmp/2'), constants.PULL_METHOD_COPY)
+
+    @patch(MODULE + '.os.stat', Mock(return_value=Mock(st_dev=1)))
+    @patch(MODULE + '.Pull._mode')
+    def test_method_mode_differs(self, mode):
+        mode.side_effect = ['bare-user', 'archive-z2']
+        self.assertEqual(Pull._method(Mock(path='/tmp/1'), '/tmp/2'), constants.PULL_METHOD_COPY)
+
+    def test_mode(self):
+        tmp_dir = mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'config')
+            for content, mode in (
+                    ('[core]\nrepo_version=1\nmode=archive\n', 'archive-z2'),
+                    ('[core]\nrepo_version=1\nmode=bare-user\n', 'bare-user'),
+                    ('[core]\nrepo_version=1\n', 'bare'),
+                    ('invalid', None)):
+                with open(path, 'w') as fp:
+                    fp.write(content)
+                self.assertEqual(Pull._mode(tmp_dir), mode)
+            os.unlink(path)
+            self.assertEqual(Pull._mode(tmp_dir), None)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_import(self):
+        repository = Mock()
+
+        # test
+        step = Pull()
+        step.report_progress = Mock()
+        step.method = constants.PULL_METHOD_COPY
+        step._import(repository, '/tmp/repo', ['branch-1'], 3, ['/usr'])
+
+        # validation
+        repository.pull_local.assert_called_once_with(
+            '/tmp/repo', ['branch-1'], 3, ['/usr'], transaction=False)
+        self.assertEqual(step.progress_details, 'importing (copy)')
+        self.assertTrue(step.elapsed >= 0)
 
     @patch(MODULE + '.lib')
-    def test_pull(self, fake_lib):
+    def test_import_failed(self, fake_lib):
+        fake_lib.LibError = LibError
+        repository = Mock()
+        repository.pull_local.side_effect = LibError
+        step = Pull()
+        step.report_progress = Mock()
+        try:
+            step._import(repository, '/tmp/repo', None, 0)
+            self.assertTrue(False, msg='Pull exception expected')
+        except PulpCodedException, pe:
+            self.assertEqual(pe.error_code, errors.OST0002)
+
+    def test_process_main_pipelined(self):
+        repository = Mock()
+        worker = Mock()
+        groups = [
+            (['branch-1'], 0),
+            (['branch-2'], 0),
+        ]
+        threads = []
+
+        def add(branches):
+            threads.append(threading.current_thread())
+
+        def prepare(repository):
+            step.transaction = Mock()
+
+        # test
+        step = Pull()
+        step.parent = Mock(
+            repository=repository,
+            repo_id='repo-xyz',
+            branches=['branch-1', 'branch-2'],
+            groups=groups,
+            subdirs=None,
+            local_path=None,
+            pipelined=True,
+            fsync=False)
+        step.parent.lib.Repository.return_value = worker
+        step.parent.add_units.add.side_effect = add
+        step._pull = Mock()
+        step._prepare = Mock(side_effect=prepare)
+        step._barrier = Mock(side_effect=lambda r: setattr(step, 'transaction', None))
+        step.process_main()
+
+        # validation
+        step.parent.lib.Repository.assert_called_once_with(step.parent.storage_dir)
+        self.assertEqual(
+            step._pull.call_args_list,
+            [
+                ((worker, 'repo-xyz', ['branch-1'], 0, None), {}),
+                ((worker, 'repo-xyz', ['branch-2'], 0, None), {}),
+            ])
+        self.assertEqual(step._prepare.call_args_list, [((worker,), {}), ((worker,), {})])
+        self.assertEqual(
+            step._barrier.call_args_list,
+            [
+                ((worker,), {}),
+                ((worker,), {}),
+                ((repository,), {}),
+            ])
+        self.assertEqual(
+            step.parent.add_units.add.call_args_list,
+            [
+                ((['branch-1'],), {}),
+                ((['branch-2'],), {}),
+            ])
+        self.assertEqual(threads, [threading.current_thread()] * 2)
+        worker.disable_fsync.assert_called_once_with()
+        worker.close.assert_called_once_with()
+
+    def test_process_main_pipelined_pull_failed(self):
+        worker = Mock()
+        groups = [
+            (['branch-1'], 0),
+            (['branch-2'], 0),
+        ]
+
+        # test
+        step = Pull()
+        step.parent = Mock(
+            repository=Mock(),
+            branches=['branch-1', 'branch-2'],
+            groups=groups,
+            subdirs=None,
+            local_path=None,
+            pipelined=True)
+        step.parent.lib.Repository.return_value = worker
+        step._pull = Mock(side_effect=[None, ValueError()])
+        step.report_progress = Mock()
+        self.assertRaises(ValueError, step.process_main)
+
+        # validation
+        step.parent.add_units.add.assert_called_once_with(['branch-1'])
+        worker.close.assert_called_once_with()
+
+    @patch(MODULE + '.threading')
+    def test_process_main_pipelined_add_failed(self, fake_threading):
+        worker = Mock()
+        groups = [
+            (['branch-1'], 0),
+            (['branch-2'], 0),
+            (['branch-3'], 0),
+        ]
+        stopped = threading.Event()
+        fake_threading.Event.return_value = stopped
+        fake_threading.Thread = threading.Thread
+
+        def pull(repository, remote_id, branches, *unused):
+            if branches != ['branch-1']:
+                # still pulling when adding units fails
+                stopped.wait(10)
+
+        # test
+        step = Pull()
+        step.parent = Mock(
+            repository=Mock(),
+            branches=['branch-1', 'branch-2', 'branch-3'],
+            groups=groups,
+            subdirs=None,
+            local_path=None,
+            pipelined=True)
+        step.parent.lib.Repository.return_value = worker
+        step.parent.add_units.add.side_effect = ValueError
+        step._pull = Mock(side_effect=pull)
+        step.report_progress = Mock()
+        self.assertRaises(ValueError, step.process_main)
+
+        # validation
+        pulled = [c[0][2] for c in step._pull.call_args_list]
+        self.assertFalse(['branch-3'] in pulled)
+        step.parent.add_units.add.assert_called_once_with(['branch-1'])
+        worker.close.assert_called_once_with()
+
+    def test_process_main_fsync_disabled(self):
+        repository = Mock()
+        groups = [
+            (['branch-1'], 0),
+            (['branch-2'], 3),
+        ]
+
+        def prepare(repository):
+            step.transaction = Mock()
+
+        # test
+        step = Pull()
+        step.parent = Mock(
+            repository=repository,
+            repo_id='repo-xyz',
+            branches=['branch-1', 'branch-2'],
+            groups=groups,
+            subdirs=None,
+            local_path=None,
+            pipelined=False,
+            fsync=False)
+        step._pull = Mock()
+        step._prepare = Mock(side_effect=prepare)
+        step._barrier = Mock()
+        step.process_main()
+
+        # validation
+        repository.disable_fsync.assert_called_once_with()
+        step._prepare.assert_called_once_with(repository)
+        self.assertEqual(step._pull.call_count, 2)
+        step._barrier.assert_called_once_with(repository)
+        self.assertFalse(step.fsync)
+
+    def test_process_main_failed(self):
+        transaction = Mock()
+        repository = Mock()
+
+        def prepare(repository):
+            step.transaction = transaction
+
+        # test
+        step = Pull()
+        step.parent = Mock(
+            repository=repository,
+            branches=['branch-1'],
+            groups=[(['branch-1'], 0)],
+            local_path=None,
+            fsync=False)
+        step._prepare = Mock(side_effect=prepare)
+        step._pull = Mock(side_effect=ValueError)
+        self.assertRaises(ValueError, step.process_main)
+
+        # validation
+        transaction.abort.assert_called_once_with()
+        self.assertFalse(transaction.commit.called)
+        self.assertEqual(step.transaction, None)
+
+    def test_process_main_nothing_selected(self):
+        step = Pull()
+        step.parent = Mock(branches=[])
+        step._pull = Mock()
+        step.process_main()
+        self.assertFalse(step._pull.called)
+
+    def test_pull(self):
         remote_id = 'remote-123'
-        path = 'root/path-123'
         branches = ['branch-1']
         depth = 3
         repo = Mock()
-        fake_lib.Repository.return_value = repo
-        report = Mock(fetched=1, requested=2, percent=50)
+        report = Mock(fetched=1, requested=2, percent=50, bytes_transferred=10, localcache=4)
 
-        def fake_pull(remote_id, branch, listener, depth):
+        def fake_pull(remote_id, branch, listener, depth, subdirs, **network):
             listener(report)
 
         repo.pull.side_effect = fake_pull
@@ -206,26 +902,233 @@ class TestPull(unittest.TestCase):
         # test
         step = Pull()
         step.report_progress = Mock()
-        step._pull(path, remote_id, branches, depth)
+        step.caches = ['/tmp/storage/2/content']
+        step.network = {
+            importer_constants.KEY_MAX_SPEED: 1024,
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT: 10,
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME: 30,
+        }
+        step._pull(repo, remote_id, branches, depth)
 
         # validation
-        fake_lib.Repository.assert_called_once_with(path)
-        repo.pull.assert_called_once_with(remote_id, branches, ANY, depth)
+        repo.pull.assert_called_once_with(
+            remote_id, branches, ANY, depth, None,
+            max_speed=1024, low_speed_limit=10, low_speed_time=30,
+            localcache=step.caches, transaction=False)
         step.report_progress.assert_called_with(force=True)
         self.assertEqual(step.progress_details, 'fetching 1/2 50%')
+        self.assertEqual(step.progress, report)
+        self.assertEqual(step.fetched, 1)
+        self.assertEqual(step.bytes_transferred, 10)
+        self.assertEqual(step.cached, 4)
+        self.assertTrue(step.elapsed >= 0)
+
+    def test_pull_group(self):
+        repo = Mock()
+        report = Mock(fetched=1, requested=2, percent=50, bytes_transferred=10, localcache=0)
+
+        def fake_pull(remote_id, branch, listener, depth, subdirs, **network):
+            listener(report)
+
+        repo.pull.side_effect = fake_pull
+
+        # test
+        step = Pull()
+        step.report_progress = Mock()
+        step.group = 'group 2/2 depth=0: '
+        step.fetched = 5
+        step.bytes_transferred = 100
+        step._pull(repo, 'remote-123', ['branch-1'], 0)
+
+        # validation
+        self.assertEqual(step.progress_details, 'group 2/2 depth=0: fetching 1/2 50%')
+        self.assertEqual(step.measurement.items, 6)
+        self.assertEqual(step.fetched, 6)
+        self.assertEqual(step.bytes_transferred, 110)
+
+    @patch(MODULE + '.Instrumented.get_progress_report')
+    def test_get_progress_report(self, get_progress_report):
+        get_progress_report.return_value = {}
+        step = Pull()
+        step.groups = [dict(branches=['branch-1'], depth=0)]
+        step.network = {constants.IMPORTER_CONFIG_KEY_HTTP2: True}
+        step.source = dict(url='http://origin', content_url='http://mirror', mirrorlist=None)
+        step.bytes_transferred = 4096
+        step.elapsed = 2.0
+        report = step.get_progress_report()
+        self.assertEqual(
+            report,
+            {
+                constants.PULL_GROUPS: step.groups,
+                constants.PULL_NETWORK: step.network,
+                constants.PULL_CONTENT: dict(
+                    step.source,
+                    bytes_transferred=4096,
+                    seconds=2.0,
+                    throughput=2048),
+                constants.PULL_METHOD: None,
+                constants.PULL_LOCALCACHE: dict(repositories=[], objects=0),
+                constants.PULL_FSYNC: dict(enabled=True),
+            })
+
+    def test_import_transaction(self):
+        repository = Mock()
+
+        # test
+        step = Pull()
+        step.report_progress = Mock()
+        step.transaction = Mock()
+        step._import(repository, '/tmp/repo', ['branch-1'], 0)
+
+        # validation
+        repository.pull_local.assert_called_once_with(
+            '/tmp/repo', ['branch-1'], 0, None, transaction=True)
+
+    def test_content_not_pulled(self):
+        step = Pull()
+        self.assertEqual(
+            step.content,
+            dict(bytes_transferred=0, seconds=0.0, throughput=0))
 
     @patch(MODULE + '.lib')
     def test_pull_raising_exception(self, fake_lib):
         fake_lib.LibError = LibError
-        fake_lib.Repository.return_value.pull.side_effect = LibError
+        repository = Mock()
+        repository.pull.side_effect = LibError
         try:
             step = Pull()
-            step._pull('', '', '', 0)
+            step._pull(repository, '', '', 0)
             self.assertTrue(False, msg='Pull exception expected')
         except PulpCodedException, pe:
             self.assertEqual(pe.error_code, errors.OST0002)
 
+    def test_collect(self):
+        registry = Mock()
+        labels = dict(repo_id='r1', remote_id='remote-1')
 
+        # test
+        step = Pull()
+        step.fetched = 10
+        step.bytes_transferred = 1024
+        step.cached = 3
+        step.collect(registry, labels)
+
+        # validation
+        self.assertEqual(
+            registry.gauge.call_args_list[-3:],
+            [
+                ((metrics.BYTES_PULLED,), {}),
+                ((metrics.OBJECTS_FETCHED,), {}),
+                ((metrics.OBJECTS_LOCALCACHE,), {}),
+            ])
+        self.assertEqual(
+            registry.gauge.return_value.set.call_args_list[-3:],
+            [
+                ((1024,), dict(labels, step=constants.IMPORT_STEP_PULL)),
+                ((10,), dict(labels, step=constants.IMPORT_STEP_PULL)),
+                ((3,), dict(labels, step=constants.IMPORT_STEP_PULL)),
+            ])
+
+    def test_collect_not_pulled(self):
+        registry = Mock()
+
+        # test
+        step = Pull()
+        step.collect(registry, {})
+
+        # validation
+        self.assertEqual(
+            registry.gauge.return_value.set.call_args_list[-2:],
+            [
+                ((0,), dict(step=constants.IMPORT_STEP_PULL)),
+                ((0,), dict(step=constants.IMPORT_STEP_PULL)),
+            ])
+
+
+@patch(PROFILED, False)
+class TestBarrier(unittest.TestCase):
+
+    def test_prepare(self):
+        repository = Mock()
+        step = Pull()
+        step._prepare(repository)
+        repository.transaction.return_value.prepare.assert_called_once_with()
+        self.assertEqual(step.transaction, repository.transaction.return_value)
+
+    def test_barrier(self):
+        repository = Mock()
+        transaction = Mock()
+        transaction.commit.side_effect = lambda: self.assertEqual(
+            repository.sync.call_count, 1)
+
+        # test
+        step = Pull()
+        step.report_progress = Mock()
+        step.transaction = transaction
+        step._barrier(repository)
+
+        # validation
+        transaction.commit.assert_called_once_with()
+        self.assertEqual(repository.sync.call_count, 2)
+        self.assertEqual(step.transaction, None)
+
+    def test_barrier_nothing(self):
+        repository = Mock()
+        step = Pull()
+        step._barrier(repository)
+        self.assertFalse(repository.sync.called)
+
+    @patch(MODULE + '.lib')
+    def test_barrier_failed(self, fake_lib):
+        fake_lib.LibError = LibError
+        transaction = Mock()
+        transaction.commit.side_effect = LibError
+        step = Pull()
+        step.report_progress = Mock()
+        step.transaction = transaction
+        try:
+            step._barrier(Mock())
+            self.assertTrue(False, msg='Pull exception expected')
+        except PulpCodedException, pe:
+            self.assertEqual(pe.error_code, errors.OST0002)
+        self.assertEqual(step.transaction, transaction)
+
+
+class TestPool(unittest.TestCase):
+
+    def test_init(self):
+        step = Pool()
+        self.assertEqual(step.step_id, constants.IMPORT_STEP_POOL)
+        self.assertTrue(step.description is not None)
+
+    @patch(MODULE + '.ObjectPool')
+    def test_process_main(self, pool):
+        summary = Mock(objects=10)
+        pool.find.return_value.add.return_value = summary
+
+        # test
+        step = Pool()
+        step.parent = Mock(storage_dir='/storage/ostree/1/content')
+        step.process_main()
+
+        # validation
+        pool.find.assert_called_once_with('/storage/ostree/1/content')
+        pool.find.return_value.add.assert_called_once_with(
+            '/storage/ostree/1/content', incremental=True)
+        self.assertEqual(step.summary, summary)
+        self.assertEqual(step.measurement.items, 10)
+
+    @patch(MODULE + '.Instrumented.get_progress_report')
+    def test_get_progress_report(self, get_progress_report):
+        get_progress_report.return_value = {}
+        step = Pool()
+        self.assertEqual(step.get_progress_report(), {})
+        step.summary = Mock()
+        report = step.get_progress_report()
+        self.assertEqual(report, {constants.POOL_SUMMARY: step.summary.dict.return_value})
+
+
+@patch(PROFILED, False)
 class TestAdd(unittest.TestCase):
 
     def test_init(self):
@@ -233,32 +1136,50 @@ class TestAdd(unittest.TestCase):
         self.assertEqual(step.step_id, constants.IMPORT_STEP_ADD_UNITS)
         self.assertTrue(step.description is not None)
 
+    @patch(MODULE + '.history.ancestry', Mock(return_value=[]))
+    @patch(MODULE + '.packages')
     @patch(MODULE + '.lib')
     @patch(MODULE + '.model')
     @patch(MODULE + '.associate_single_unit')
-    def test_process_main(self, fake_associate, fake_model, fake_lib):
+    def test_process_main(self, fake_associate, fake_model, fake_lib, fake_packages):
         repo_id = 'r-1234'
         remote_id = 'remote-1'
         refs = [
-            Mock(path='branch:1', commit='commit:1', metadata='md:1'),
-            Mock(path='branch:2', commit='commit:2', metadata='md:2'),
-            Mock(path='branch:3', commit='commit:3', metadata='md:3'),
-            Mock(path='branch:4', commit='commit:4', metadata='md:4'),
-            Mock(path='branch:5', commit='commit:5', metadata='md:5'),
+            Mock(path='r-1234:1', commit='commit:1', metadata='md:1'),
+            Mock(path='r-1234:2', commit='commit:2', metadata='md:2'),
+            Mock(path='r-1234:3', commit='commit:3', metadata='md:3'),
+            Mock(path='r-1234:4', commit='commit:4', metadata='md:4'),
+            Mock(path='r-1234:5', commit='commit:5', metadata='md:5'),
         ]
-        units = [Mock(ref=r, unit_key={}) for r in refs]
+        other = [
+            Mock(path='1', commit='commit:6', metadata='md:6'),
+            Mock(path='r-5678:2', commit='commit:7', metadata='md:7'),
+        ]
+        units = [Mock(ref=r, unit_key={}, partial=True, historical=False) for r in refs]
         units[0].save.side_effect = NotUniqueError  # duplicate
 
         fake_model.Branch.side_effect = units
         fake_model.Branch.objects.get.return_value = units[0]
+        fake_model.CommitMetadata.objects.return_value.only.return_value.first.return_value = None
+        fake_model.split_metadata.side_effect = [
+            ({}, {}),
+            ({'version': '2'}, {'rpmostree.rpmdb.pkglist': [2]}),
+            ({}, {}),
+            ({}, {}),
+        ]
 
         branches = [r.path.split(':')[-1] for r in refs[:-1]]
 
         repository = Mock()
-        repository.list_refs.return_value = refs
-        fake_lib.Repository.return_value = repository
+        repository.list_refs.return_value = other + refs
+        repository.partial.side_effect = [False, True, False, False]
 
-        parent = Mock(remote_id=remote_id, storage_dir='/tmp/xyz', branches=branches)
+        parent = Mock(
+            repo_id=repo_id,
+            remote_id=remote_id,
+            repository=repository,
+            branches=branches,
+            subdirs=['/usr/share'])
         parent.get_repo.return_value = Mock(id=repo_id)
 
         fake_conduit = Mock()
@@ -270,7 +1191,8 @@ class TestAdd(unittest.TestCase):
         step.process_main()
 
         # validation
-        fake_lib.Repository.assert_called_once_with(step.parent.storage_dir)
+        repository.list_refs.assert_called_once_with(
+            ['{0}:{1}'.format(repo_id, b) for b in branches])
         self.assertEqual(
             fake_model.Branch.call_args_list,
             [
@@ -278,16 +1200,293 @@ class TestAdd(unittest.TestCase):
                     remote_id=remote_id,
                     branch=r.path.split(':')[-1],
                     commit=r.commit,
-                    metadata=r.metadata))
-                for r in refs[:-1]
+                    metadata=m,
+                    extra_metadata=e,
+                    partial=p,
+                    historical=False,
+                    parent=None,
+                    generation=None,
+                    disconnected=False))
+                for r, m, e, p in zip(
+                    refs[:-1],
+                    [{}, {'version': '2'}, {}, {}],
+                    [False, True, False, False],
+                    [False, True, False, False])
             ])
+        self.assertEqual(
+            fake_model.split_metadata.call_args_list,
+            [((r.metadata, parent.metadata_keys), {}) for r in refs[:-1]])
+        fake_model.CommitMetadata.objects.assert_called_once_with(commit='commit:2')
+        fake_model.CommitMetadata.store.assert_called_once_with('commit:2', refs[1].metadata)
+        fake_model.Branch.objects.assert_called_once_with(id=units[0].id)
+        fake_model.Branch.objects.return_value.update.assert_called_once_with(
+            set__partial=False)
         self.assertEqual(
             fake_associate.call_args_list,
             [
                 ((parent.get_repo.return_value.repo_obj, u), {}) for u in units[:-1]
             ])
+        self.assertEqual(
+            fake_packages.index.call_args_list,
+            [
+                ((repository, r.commit, r.metadata, p), {})
+                for r, p in zip(refs[:-1], [False, True, False, False])
+            ])
+        self.assertEqual(step.measurement.items, 4)
+        self.assertEqual(step.added, set((r.path.split(':')[-1], r.commit) for r in refs[:-1]))
+
+    @patch(MODULE + '.history.ancestry', Mock(return_value=[]))
+    @patch(MODULE + '.packages', Mock())
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.associate_single_unit')
+    def test_add_skip_added(self, fake_associate, fake_model):
+        refs = [
+            Mock(path='1', commit='commit:1', metadata={}),
+            Mock(path='2', commit='commit:2', metadata={}),
+            Mock(path='3', commit='commit:3', metadata={}),
+        ]
+        repository = Mock()
+        repository.list_refs.return_value = refs
+        repository.partial.return_value = False
+        fake_model.split_metadata.return_value = ({}, {})
+
+        # test
+        step = Add()
+        step.parent = Mock(repository=repository, subdirs=None)
+        step.added.add(('1', 'commit:1'))
+        step.add(['1', '2'])
+
+        # validation
+        fake_model.Branch.assert_called_once_with(
+            remote_id=step.parent.remote_id,
+            branch='2',
+            commit='commit:2',
+            metadata={},
+            extra_metadata=False,
+            partial=False,
+            historical=False,
+            parent=None,
+            generation=None,
+            disconnected=False)
+        self.assertEqual(step.added, set([('1', 'commit:1'), ('2', 'commit:2')]))
+        self.assertEqual(step.measurement.items, 1)
+
+    @patch(MODULE + '.history.ancestry', Mock(return_value=[]))
+    @patch(MODULE + '.packages', Mock())
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.associate_single_unit', Mock())
+    def test_add_all(self, fake_model):
+        refs = [
+            Mock(path='1', commit='commit:1', metadata={}),
+            Mock(path='2', commit='commit:2', metadata={}),
+        ]
+        repository = Mock()
+        repository.list_refs.return_value = refs
+        repository.partial.return_value = False
+        fake_model.split_metadata.return_value = ({}, {})
+
+        # test
+        step = Add()
+        step.parent = Mock(repository=repository, subdirs=None)
+        step.add(None)
+
+        # validation
+        repository.list_refs.assert_called_once_with()
+        self.assertEqual(step.added, set([('1', 'commit:1'), ('2', 'commit:2')]))
+
+    @patch(MODULE + '.log')
+    @patch(MODULE + '.history.ancestry', Mock(return_value=[]))
+    @patch(MODULE + '.packages')
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.associate_single_unit')
+    def test_add_index_failed(self, fake_associate, fake_model, fake_packages, log):
+        ref = Mock(path='b1', commit='commit:1', metadata={})
+        repository = Mock()
+        repository.list_refs.return_value = [ref]
+        repository.partial.return_value = False
+        fake_model.split_metadata.return_value = ({}, {})
+        fake_packages.index.side_effect = ValueError()
+
+        # test
+        step = Add()
+        step.parent = Mock(repository=repository, subdirs=None)
+        step.add(['b1'])
+
+        # validation
+        fake_associate.assert_called_once_with(
+            step.parent.get_repo.return_value.repo_obj, fake_model.Branch.return_value)
+        self.assertTrue(log.exception.called)
+        self.assertEqual(step.added, set([('b1', 'commit:1')]))
+        self.assertEqual(step.measurement.items, 1)
+
+    @patch(MODULE + '.packages')
+    @patch(MODULE + '.history.ancestry')
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.associate_single_unit')
+    def test_add_history(self, fake_associate, fake_model, ancestry, fake_packages):
+        ref = Mock(path='b1', commit='commit:3', metadata={'version': '3'})
+        repository = Mock()
+        repository.list_refs.return_value = [ref]
+        repository.partial.return_value = False
+        repository.commit_metadata.side_effect = [{'version': '1'}, {'version': '2'}]
+        ancestry.return_value = [
+            ('commit:1', None, 0, False),
+            ('commit:2', 'commit:1', 1, False),
+            ('commit:3', 'commit:2', 2, False),
+        ]
+        fake_model.split_metadata.side_effect = lambda md, keys: (md, {})
+
+        # test
+        step = Add()
+        step.parent = Mock(repository=repository, subdirs=None)
+        step.add(['b1'])
+
+        # validation
+        ancestry.assert_called_once_with(repository, step.parent.remote_id, 'b1', 'commit:3')
+        self.assertEqual(
+            fake_model.Branch.call_args_list,
+            [
+                ((), dict(
+                    remote_id=step.parent.remote_id,
+                    branch='b1',
+                    commit=c,
+                    metadata={'version': v},
+                    extra_metadata=False,
+                    partial=False,
+                    historical=h,
+                    parent=p,
+                    generation=g,
+                    disconnected=False))
+                for c, v, h, p, g in [
+                    ('commit:1', '1', True, None, 0),
+                    ('commit:2', '2', True, 'commit:1', 1),
+                    ('commit:3', '3', False, 'commit:2', 2),
+                ]
+            ])
+        self.assertEqual(fake_packages.index.call_count, 3)
+        self.assertEqual(step.added, set([('b1', 'commit:3')]))
+        self.assertEqual(step.measurement.items, 3)
+
+    @patch(MODULE + '.packages', Mock())
+    @patch(MODULE + '.history.ancestry', Mock(return_value=[]))
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.associate_single_unit', Mock())
+    def test_add_metadata_stored(self, fake_model):
+        ref = Mock(path='b1', commit='commit:1', metadata={'rpmostree.inputhash': '1'})
+        repository = Mock()
+        repository.list_refs.return_value = [ref]
+        fake_model.split_metadata.return_value = ({}, ref.metadata)
+
+        # test
+        step = Add()
+        step.parent = Mock(repository=repository, subdirs=None)
+        step.add(['b1'])
+
+        # validation
+        fake_model.CommitMetadata.objects.assert_called_once_with(commit='commit:1')
+        self.assertFalse(fake_model.CommitMetadata.store.called)
+        self.assertTrue(fake_model.Branch.call_args[1]['extra_metadata'])
+
+    @patch(MODULE + '.packages', Mock())
+    @patch(MODULE + '.history.ancestry')
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.associate_single_unit', Mock())
+    def test_add_history_known(self, fake_model, ancestry):
+        ref = Mock(path='b1', commit='commit:2', metadata={})
+        repository = Mock()
+        repository.list_refs.return_value = [ref]
+        repository.partial.return_value = False
+        ancestry.return_value = [('commit:2', 'commit:1', 4, True)]
+        fake_model.split_metadata.return_value = ({}, {})
+        fake_model.Branch.return_value.save.side_effect = NotUniqueError
+        unit = Mock(partial=False, historical=True, generation=None)
+        fake_model.Branch.objects.get.return_value = unit
+
+        # test
+        step = Add()
+        step.parent = Mock(repository=repository, subdirs=None)
+        step.add(['b1'])
+
+        # validation
+        fake_model.Branch.objects.return_value.update.assert_called_once_with(
+            set__historical=False,
+            set__parent='commit:1',
+            set__generation=4,
+            set__disconnected=True)
+        self.assertFalse(unit.historical)
+        self.assertEqual(unit.generation, 4)
+        self.assertTrue(unit.disconnected)
+
+    def test_collect(self):
+        registry = Mock()
+
+        # test
+        step = Add()
+        step.measurement.items = 3
+        step.collect(registry, dict(repo_id='r1'))
+
+        # validation
+        registry.gauge.assert_called_with(metrics.UNITS_ADDED)
+        registry.gauge.return_value.set.assert_called_with(
+            3, repo_id='r1', step=constants.IMPORT_STEP_ADD_UNITS)
 
 
+@patch(PROFILED, False)
+class TestAddServed(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        path = os.path.join(self.tmp_dir, 'ostree.sock')
+        self.patchers = [
+            patch('pulp_ostree.plugins.service.lib.Lib'),
+            patch('pulp_ostree.plugins.service.lib.Repository'),
+        ]
+        _, self.impl = [p.start() for p in self.patchers]
+        self.service = service.Service(path, roots=['/tmp'])
+        self.thread = threading.Thread(target=self.service.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.library = service.Library(path)
+
+    def tearDown(self):
+        self.service.shutdown()
+        self.service.server_close()
+        for p in self.patchers:
+            p.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    @patch(MODULE + '.packages', Mock())
+    @patch('pulp_ostree.plugins.history.model')
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.associate_single_unit', Mock())
+    def test_add(self, fake_model, history_model):
+        impl = self.impl.return_value
+        impl.list_refs.return_value = [Ref('b1', 'commit:2', {'version': '2'})]
+        impl.has_commit.side_effect = lambda commit: commit in ('commit:1', 'commit:2')
+        impl.parent.side_effect = {'commit:2': 'commit:1', 'commit:1': None}.get
+        impl.partial.return_value = False
+        impl.commit_metadata.return_value = {'version': '1'}
+        history_model.Branch.objects.return_value.only.return_value = []
+        fake_model.split_metadata.side_effect = lambda md, keys: (md, {})
+
+        # test
+        step = Add()
+        step.parent = Mock(repository=self.library.Repository('/tmp/repo-1'), subdirs=None)
+        step.add(['b1'])
+
+        # validation
+        self.assertEqual(
+            [(c[1]['commit'], c[1]['historical'], c[1]['parent'], c[1]['generation'])
+             for c in fake_model.Branch.call_args_list],
+            [
+                ('commit:1', True, None, 0),
+                ('commit:2', False, 'commit:1', 1),
+            ])
+        impl.list_refs.assert_called_once_with(['b1'])
+        impl.commit_metadata.assert_called_once_with('commit:1')
+
+
+@patch(PROFILED, False)
 class TestSummary(unittest.TestCase):
 
     @patch(MODULE + '.lib')
@@ -306,11 +1505,9 @@ class TestSummary(unittest.TestCase):
             ref.dict.return_value = d
         remote = Mock()
         remote.list_refs.return_value = refs
-        lib_repository = Mock()
         repository = Mock(id='1234')
         fake_lib.Remote.return_value = remote
-        fake_lib.Repository.return_value = lib_repository
-        parent = Mock(storage_dir='/tmp/xx', repo_id=repository.id)
+        parent = Mock(repo_id=repository.id, lib=fake_lib)
         parent.get_repo.return_value = repository
 
         # test
@@ -319,8 +1516,9 @@ class TestSummary(unittest.TestCase):
         step.process_main()
 
         # validation
-        fake_lib.Repository.assert_called_once_with(step.parent.storage_dir)
-        fake_lib.Remote.assert_called_once_with(step.parent.repo_id, lib_repository)
+        fake_lib.Remote.assert_called_once_with(step.parent.repo_id, parent.repository)
+        parent.resolve.assert_called_once_with(['foo', 'bar', 'baz'])
+        self.assertEqual(step.selected, parent.resolve.return_value)
         repository.repo_obj.scratchpad.update.assert_called_once_with(
             {
                 constants.REMOTE: {
@@ -337,12 +1535,10 @@ class TestSummary(unittest.TestCase):
     def test_process_main_fetch_failed(self, fake_lib):
         remote = Mock()
         remote.list_refs.side_effect = LibError
-        lib_repository = Mock()
         repository = Mock(id='1234')
         fake_lib.Remote.return_value = remote
-        fake_lib.Repository.return_value = lib_repository
         fake_lib.LibError = LibError
-        parent = Mock(storage_dir='/tmp/xx', repo_id=repository.id)
+        parent = Mock(repo_id=repository.id, lib=fake_lib)
         parent.get_repo.return_value = repository
 
         # test and validation
@@ -354,6 +1550,14 @@ class TestSummary(unittest.TestCase):
         except PulpCodedException, pe:
             self.assertEqual(pe.error_code, errors.OST0005)
 
+    @patch(MODULE + '.Instrumented.get_progress_report')
+    def test_get_progress_report(self, get_progress_report):
+        get_progress_report.return_value = {}
+        step = Summary()
+        step.selected = ['branch-1']
+        report = step.get_progress_report()
+        self.assertEqual(report, {constants.SELECTED_BRANCHES: ['branch-1']})
+
     def test_clean_metadata(self):
         commit = 'abc'
         name = 'foo'
@@ -383,6 +1587,101 @@ class TestSummary(unittest.TestCase):
             })
 
 
+@patch(PROFILED, False)
+class TestDiff(unittest.TestCase):
+
+    def test_init(self):
+        step = Diff()
+        self.assertEqual(step.step_id, constants.IMPORT_STEP_DIFF)
+        self.assertTrue(step.description is not None)
+
+    @patch(MODULE + '.diff')
+    @patch(MODULE + '.model')
+    def test_process_main(self, fake_model, fake_diff):
+        previous = fake_model.Branch.objects.return_value.order_by.return_value.only.return_value
+        previous.first.side_effect = [None, Mock(commit='c1'), Mock(commit='c2')]
+        repository = Mock()
+        repository.has_commit.side_effect = [True, False]
+        parent = Mock(remote_id='remote-1', repository=repository)
+        parent.add_units.added = set([('b1', 'c0'), ('b2', 'c3'), ('b3', 'c4')])
+
+        # test
+        step = Diff()
+        step.parent = parent
+        step.process_main()
+
+        # validation
+        self.assertEqual(
+            fake_model.Branch.objects.call_args_list[0],
+            ((), dict(remote_id='remote-1', branch='b1', historical__ne=True, commit__ne='c0')))
+        fake_model.Branch.objects.return_value.order_by.assert_called_with('-created')
+        fake_diff.get.assert_called_once_with(repository, 'c1', 'c3')
+        self.assertEqual(step.measurement.items, 1)
+
+    @patch(MODULE + '.diff')
+    @patch(MODULE + '.model')
+    def test_process_main_failed(self, fake_model, fake_diff):
+        previous = fake_model.Branch.objects.return_value.order_by.return_value.only.return_value
+        previous.first.return_value = Mock(commit='c1')
+        fake_diff.get.side_effect = [LibError, ValueError]
+        parent = Mock(remote_id='remote-1')
+        parent.add_units.added = set([('b1', 'c2'), ('b2', 'c3')])
+
+        # test
+        step = Diff()
+        step.parent = parent
+        step.process_main()
+
+        # validation
+        self.assertEqual(fake_diff.get.call_count, 2)
+        self.assertEqual(step.measurement.items, 0)
+
+
+@patch(PROFILED, False)
+class TestStatistics(unittest.TestCase):
+
+    def test_init(self):
+        step = Statistics()
+        self.assertEqual(step.step_id, constants.IMPORT_STEP_STATISTICS)
+        self.assertTrue(step.description is not None)
+
+    @patch(MODULE + '.stats')
+    @patch(MODULE + '.get_unit_model_querysets')
+    def test_process_main(self, find, stats):
+        units = [Mock(), Mock()]
+        queryset = Mock()
+        queryset.filter.return_value = units
+        find.return_value = [queryset]
+        repository = Mock(id='repo-1')
+
+        # test
+        step = Statistics()
+        step.parent = Mock()
+        step.get_repo = Mock(return_value=repository)
+        step.process_main()
+
+        # validation
+        find.assert_called_once_with(repository.id, ANY)
+        queryset.filter.assert_called_once_with(historical__ne=True)
+        stats.update.assert_called_once_with(repository.repo_obj, ANY, step.parent.lib)
+        self.assertEqual(list(stats.update.call_args[0][1]), units)
+
+    @patch(MODULE + '.stats')
+    @patch(MODULE + '.get_unit_model_querysets', Mock(return_value=[]))
+    def test_process_main_failed(self, stats):
+        stats.update.side_effect = LibError
+
+        # test
+        step = Statistics()
+        step.parent = Mock()
+        step.get_repo = Mock()
+        step.process_main()
+
+        # validation
+        self.assertTrue(stats.update.called)
+
+
+@patch(PROFILED, False)
 class TestClean(unittest.TestCase):
 
     def test_init(self):
@@ -392,22 +1691,19 @@ class TestClean(unittest.TestCase):
 
     @patch(MODULE + '.lib')
     def test_process_main(self, fake_lib):
-        path = 'root/path-123'
         repo_id = 'repo-123'
 
         # test
         step = Clean()
-        step.parent = Mock(storage_dir=path, repo_id=repo_id)
+        step.parent = Mock(repo_id=repo_id, lib=fake_lib)
         step.process_main()
 
         # validation
-        fake_lib.Repository.assert_called_once_with(path)
-        fake_lib.Remote.assert_called_once_with(repo_id, fake_lib.Repository.return_value)
+        fake_lib.Remote.assert_called_once_with(repo_id, step.parent.repository)
         fake_lib.Remote.return_value.delete.assert_called_once_with()
 
     @patch(MODULE + '.lib')
     def test_process_main_exception(self, fake_lib):
-        path = 'root/path-123'
         importer_id = 'importer-xyz'
 
         fake_lib.LibError = LibError
@@ -416,7 +1712,7 @@ class TestClean(unittest.TestCase):
         # test
         try:
             step = Clean()
-            step.parent = Mock(storage_dir=path, importer_id=importer_id)
+            step.parent = Mock(importer_id=importer_id, lib=fake_lib)
             step.process_main()
             self.assertTrue(False, msg='Delete remote exception expected')
         except PulpCodedException, pe:
@@ -438,6 +1734,13 @@ class TestRemote(unittest.TestCase):
         remote = Remote(step, None)
         self.assertEqual(remote.url, step.parent.feed_url)
 
+    def test_content_url(self):
+        step = Mock()
+        step.parent = Mock(content_url='http://mirror', mirrorlist='http://mirrors')
+        remote = Remote(step, None)
+        self.assertEqual(remote.content_url, step.parent.content_url)
+        self.assertEqual(remote.mirrorlist, step.parent.mirrorlist)
+
     def test_remote_id(self):
         step = Mock()
         step.parent = Mock(repo_id='123')
@@ -672,6 +1975,14 @@ class TestRemote(unittest.TestCase):
         # validation
         self.assertEqual(remote.proxy_url, proxy_url)
 
+    def test_http2(self):
+        step = Mock()
+        step.get_config.return_value = {constants.IMPORTER_CONFIG_KEY_HTTP2: False}
+        remote = Remote(step, None)
+        self.assertFalse(remote.http2)
+        step.get_config.return_value = {}
+        self.assertEqual(remote.http2, None)
+
     def test_proxy_without_host(self):
         config = {
         }
@@ -692,9 +2003,13 @@ class TestRemote(unittest.TestCase):
     @patch(MODULE + '.Remote.ssl_ca_path', PropertyMock())
     @patch(MODULE + '.Remote.ssl_validation', PropertyMock())
     @patch(MODULE + '.Remote.proxy_url', PropertyMock())
+    @patch(MODULE + '.Remote.http2', PropertyMock())
+    @patch(MODULE + '.Remote.content_url', PropertyMock())
+    @patch(MODULE + '.Remote.mirrorlist', PropertyMock())
     @patch(MODULE + '.Remote.gpg_keys', new_callable=PropertyMock)
     def test_add(self, fake_gpg, fake_lib):
         step = Mock()
+        step.parent.lib = fake_lib
         repository = Mock()
         path = Mock()
         key_ids = [1, 2, 3]
@@ -714,4 +2029,7 @@ class TestRemote(unittest.TestCase):
         self.assertEqual(fake_lib.Remote.return_value.ssl_ca_path, remote.ssl_ca_path)
         self.assertEqual(fake_lib.Remote.return_value.ssl_validation, remote.ssl_validation)
         self.assertEqual(fake_lib.Remote.return_value.proxy_url, remote.proxy_url)
+        self.assertEqual(fake_lib.Remote.return_value.http2, remote.http2)
+        self.assertEqual(fake_lib.Remote.return_value.content_url, remote.content_url)
+        self.assertEqual(fake_lib.Remote.return_value.mirrorlist, remote.mirrorlist)
         self.assertTrue(fake_lib.Remote.return_value.gpg_validation, remote.ssl_validation)
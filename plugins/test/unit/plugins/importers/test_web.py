@@ -1,7 +1,13 @@
+import os
+import shutil
+
+from tempfile import mkdtemp
 from unittest import TestCase
 
 from mock import patch, Mock
 
+from pulp.common.plugins import importer_constants
+
 from pulp_ostree.common import constants
 from pulp_ostree.plugins.importers.web import WebImporter, entry_point
 
@@ -22,15 +28,159 @@ class TestImporter(TestCase):
         self.assertTrue(len(md['display_name']) > 0)
 
     def test_validate_config(self):
+        config = {
+            constants.IMPORTER_CONFIG_KEY_BRANCHES: ['fedora/*', '^centos/'],
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: ['^.+/testing/'],
+        }
+        importer = WebImporter()
+        result = importer.validate_config(Mock(), config)
+        self.assertEqual(result, (True, ''))
+
+    def test_validate_config_branch_depth(self):
+        config = {
+            constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: {'fedora/*': '3', '^centos/': -1},
+        }
+        importer = WebImporter()
+        result = importer.validate_config(Mock(), config)
+        self.assertEqual(result, (True, ''))
+
+    def test_validate_config_invalid_branch_depth(self):
+        importer = WebImporter()
+        config = {
+            constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: {'^fedora/(': 1},
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+        config = {
+            constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: {'fedora/*': 'all'},
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+        for value in (['fedora/*'], 'fedora/*', 3):
+            config = {
+                constants.IMPORTER_CONFIG_KEY_BRANCH_DEPTH: value,
+            }
+            self.assertFalse(importer.validate_config(Mock(), config)[0])
+
+    def test_validate_config_subdirs(self):
+        importer = WebImporter()
+        config = {
+            constants.IMPORTER_CONFIG_KEY_SUBDIRS: ['/usr/share'],
+        }
+        self.assertTrue(importer.validate_config(Mock(), config)[0])
+        config = {
+            constants.IMPORTER_CONFIG_KEY_SUBDIRS: ['usr/share'],
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+
+    def test_validate_config_subdirs_not_list(self):
+        importer = WebImporter()
+        for value in ('/usr/share', {'/usr': 1}, ['/usr', 3], 42):
+            config = {
+                constants.IMPORTER_CONFIG_KEY_SUBDIRS: value,
+            }
+            valid, message = importer.validate_config(Mock(), config)
+            self.assertFalse(valid)
+            self.assertTrue(constants.IMPORTER_CONFIG_KEY_SUBDIRS in message)
+
+    def test_validate_config_network(self):
+        importer = WebImporter()
+        config = {
+            importer_constants.KEY_MAX_SPEED: '1024',
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_LIMIT: 10,
+            constants.IMPORTER_CONFIG_KEY_HTTP2: False,
+        }
+        self.assertTrue(importer.validate_config(Mock(), config)[0])
+        config = {
+            constants.IMPORTER_CONFIG_KEY_LOW_SPEED_TIME: 0,
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+        config = {
+            constants.IMPORTER_CONFIG_KEY_HTTP2: 'yes',
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+        config = {
+            importer_constants.KEY_MAX_DOWNLOADS: 2,
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+
+    def test_validate_config_metadata_keys(self):
+        importer = WebImporter()
+        config = {
+            constants.IMPORTER_CONFIG_KEY_METADATA_KEYS: ['version', 'ostree.*'],
+        }
+        self.assertTrue(importer.validate_config(Mock(), config)[0])
+        config = {
+            constants.IMPORTER_CONFIG_KEY_METADATA_KEYS: 'version',
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+
+    def test_validate_config_trace(self):
+        importer = WebImporter()
+        config = {
+            constants.CONFIG_KEY_TRACE: 'sync.json',
+        }
+        self.assertTrue(importer.validate_config(Mock(), config)[0])
+        for name in ('../sync.json', '/tmp/sync.json', '..'):
+            config = {
+                constants.CONFIG_KEY_TRACE: name,
+            }
+            self.assertFalse(importer.validate_config(Mock(), config)[0])
+
+    def test_validate_config_metrics_directory(self):
         importer = WebImporter()
-        result = importer.validate_config(Mock(), Mock())
+        tmp_dir = mkdtemp()
+        try:
+            config = {
+                constants.CONFIG_KEY_METRICS_DIRECTORY: tmp_dir,
+            }
+            self.assertTrue(importer.validate_config(Mock(), config)[0])
+            for path in ('metrics', os.path.join(tmp_dir, 'missing'), ['/tmp']):
+                config = {
+                    constants.CONFIG_KEY_METRICS_DIRECTORY: path,
+                }
+                valid, message = importer.validate_config(Mock(), config)
+                self.assertFalse(valid)
+                self.assertTrue(constants.CONFIG_KEY_METRICS_DIRECTORY in message)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_validate_config_content(self):
+        importer = WebImporter()
+        config = {
+            constants.IMPORTER_CONFIG_KEY_MIRRORLIST: 'http://mirrors',
+        }
+        self.assertTrue(importer.validate_config(Mock(), config)[0])
+        config = {
+            constants.IMPORTER_CONFIG_KEY_CONTENT_URL: 'http://mirror',
+            constants.IMPORTER_CONFIG_KEY_MIRRORLIST: 'http://mirrors',
+        }
+        self.assertFalse(importer.validate_config(Mock(), config)[0])
+
+    def test_validate_config_no_branches(self):
+        importer = WebImporter()
+        result = importer.validate_config(Mock(), {})
         self.assertEqual(result, (True, ''))
 
+    def test_validate_config_invalid_pattern(self):
+        config = {
+            constants.IMPORTER_CONFIG_KEY_EXCLUDE_BRANCHES: ['^fedora/(24'],
+        }
+        importer = WebImporter()
+        valid, message = importer.validate_config(Mock(), config)
+        self.assertFalse(valid)
+        self.assertTrue('^fedora/(24' in message)
+
+    @patch('pulp_ostree.plugins.importers.web.pulp_conf')
+    @patch('pulp_ostree.plugins.importers.web.Metrics')
+    @patch('pulp_ostree.plugins.importers.web.Tracing')
     @patch('pulp_ostree.plugins.importers.web.Main')
-    def test_sync(self, main):
+    def test_sync(self, main, tracing, metrics, pulp_conf):
         repo = Mock(id='123')
         conduit = Mock()
         config = Mock()
+        tracing.return_value.__enter__ = Mock()
+        tracing.return_value.__exit__ = Mock()
+        metrics.return_value.__enter__ = Mock()
+        metrics.return_value.__exit__ = Mock()
 
         # test
         importer = WebImporter()
@@ -39,6 +189,22 @@ class TestImporter(TestCase):
         # validation
         main.assert_called_once_with(repo=repo, conduit=conduit, config=config)
         main.return_value.process_lifecycle.assert_called_once_with()
+        tracing.assert_called_once_with(config.get.return_value, pulp_conf.get.return_value)
+        pulp_conf.get.assert_called_once_with('server', 'working_directory')
+        metrics.assert_called_once_with(
+            config.get.return_value,
+            main.return_value,
+            constants.METRICS_SYNC,
+            repo.id,
+            main.return_value.remote_id)
+        self.assertEqual(
+            config.get.call_args_list,
+            [
+                ((constants.CONFIG_KEY_METRICS_DIRECTORY,), {}),
+                ((constants.CONFIG_KEY_TRACE,), {}),
+            ])
+        self.assertTrue(tracing.return_value.__exit__.called)
+        self.assertTrue(metrics.return_value.__exit__.called)
         self.assertEqual(report, main.return_value.process_lifecycle.return_value)
 
     def test_import(self):
@@ -0,0 +1,141 @@
+import errno
+import os
+import shutil
+
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.plugins import deltas
+from pulp_ostree.plugins.deltas import DeltaStore
+
+
+MODULE = 'pulp_ostree.plugins.deltas'
+
+COMMIT_1 = '0' * 63 + '1'
+COMMIT_2 = 'f' * 64
+
+
+def write(path, content):
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError:
+        pass
+    with open(path, 'w') as fp:
+        fp.write(content)
+
+
+class TestPaths(TestCase):
+
+    def test_b64(self):
+        self.assertEqual(deltas.b64(COMMIT_2), '_' * 42 + '8')
+        self.assertEqual(len(deltas.b64(COMMIT_1)), 43)
+
+    def test_relative_path(self):
+        to_commit = deltas.b64(COMMIT_2)
+        from_commit = deltas.b64(COMMIT_1)
+        self.assertEqual(
+            deltas.relative_path(COMMIT_1, COMMIT_2),
+            os.path.join('deltas', from_commit[:2], from_commit[2:] + '-' + to_commit))
+        self.assertEqual(
+            deltas.relative_path(None, COMMIT_2),
+            os.path.join('deltas', to_commit[:2], to_commit[2:]))
+
+
+class TestDeltaStore(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.store = DeltaStore(os.path.join(self.tmp_dir, 'deltas'))
+        self.delta = os.path.join(self.tmp_dir, 'repo', 'deltas', 'ab', 'cdef')
+        write(os.path.join(self.delta, 'superblock'), 'super')
+        write(os.path.join(self.delta, '0'), 'part-0')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_find(self):
+        store = DeltaStore.find('/var/lib/ostree/remote-1/content')
+        self.assertEqual(store.path, '/var/lib/ostree/deltas')
+
+    def test_key(self):
+        key = DeltaStore.key(COMMIT_1, COMMIT_2, {'a': 1, 'b': 2})
+        self.assertEqual(key, DeltaStore.key(COMMIT_1, COMMIT_2, {'b': 2, 'a': 1}))
+        self.assertNotEqual(key, DeltaStore.key(COMMIT_1, COMMIT_2, {'a': 1}))
+        self.assertNotEqual(key, DeltaStore.key(None, COMMIT_2, {'a': 1, 'b': 2}))
+
+    def test_add_and_get(self):
+        destination = os.path.join(self.tmp_dir, 'other', 'deltas', 'ab', 'cdef')
+
+        # test
+        self.assertFalse(self.store.get('1234', destination))
+        self.store.add('1234', self.delta)
+        self.store.add('1234', self.delta)
+        found = self.store.get('1234', destination)
+
+        # validation
+        self.assertTrue(found)
+        self.assertEqual(sorted(os.listdir(destination)), ['0', 'superblock'])
+        self.assertEqual(
+            os.stat(os.path.join(destination, 'superblock')).st_ino,
+            os.stat(os.path.join(self.delta, 'superblock')).st_ino)
+        self.assertEqual(os.listdir(os.path.join(self.store.path, '12')), ['34'])
+
+    @patch(MODULE + '.os.link')
+    def test_other_filesystem(self, link):
+        link.side_effect = OSError(errno.EXDEV, 'cross-device')
+        self.store.add('1234', self.delta)
+        with open(os.path.join(self.store.path, '12', '34', 'superblock')) as fp:
+            self.assertEqual(fp.read(), 'super')
+
+    def test_evict(self):
+        self.store.add('1234', self.delta)
+        self.store.add('5678', self.delta)
+        os.utime(os.path.join(self.store.path, '12', '34'), (1, 1))
+
+        # test
+        removed = self.store.evict(11)
+
+        # validation
+        self.assertEqual(removed, 1)
+        self.assertEqual([e[1] for e in self.store.entries()], [11])
+        self.assertFalse(os.path.exists(os.path.join(self.store.path, '12', '34')))
+        self.assertEqual(self.store.evict(0), 1)
+        self.assertEqual(self.store.entries(), [])
+
+    def test_entries_empty(self):
+        self.assertEqual(self.store.entries(), [])
+
+
+class TestPublish(TestCase):
+
+    def test_linked(self):
+        store = Mock()
+        store.get.return_value = True
+        repository = Mock(path='/tmp/repo')
+
+        # test
+        linked = deltas.publish(store, repository, COMMIT_1, COMMIT_2)
+
+        # validation
+        self.assertTrue(linked)
+        store.get.assert_called_once_with(
+            DeltaStore.key(COMMIT_1, COMMIT_2, deltas.PARAMS),
+            os.path.join('/tmp/repo', deltas.relative_path(COMMIT_1, COMMIT_2)))
+        self.assertFalse(repository.generate_delta.called)
+
+    def test_generated(self):
+        store = Mock()
+        store.get.return_value = False
+        repository = Mock(path='/tmp/repo')
+
+        # test
+        linked = deltas.publish(store, repository, COMMIT_1, COMMIT_2, {'a': 1})
+
+        # validation
+        self.assertFalse(linked)
+        repository.generate_delta.assert_called_once_with(COMMIT_1, COMMIT_2, {'a': 1})
+        store.add.assert_called_once_with(
+            DeltaStore.key(COMMIT_1, COMMIT_2, {'a': 1}),
+            os.path.join('/tmp/repo', deltas.relative_path(COMMIT_1, COMMIT_2)))
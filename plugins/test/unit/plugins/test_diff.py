@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.plugins import diff
+from pulp_ostree.plugins.lib import LibError
+
+
+MODULE = 'pulp_ostree.plugins.diff'
+
+
+class TestGet(TestCase):
+
+    @patch(MODULE + '.model')
+    def test_cached(self, model):
+        repository = Mock()
+
+        # test
+        changes = diff.get(repository, 'c1', 'c2')
+
+        # validation
+        model.CommitDiff.key.assert_called_once_with('c1', 'c2')
+        model.CommitDiff.objects.assert_called_once_with(commits=model.CommitDiff.key.return_value)
+        self.assertEqual(
+            changes, model.CommitDiff.objects.return_value.first.return_value.load.return_value)
+        self.assertFalse(repository.diff.called)
+
+    @patch(MODULE + '.model')
+    def test_computed(self, model):
+        model.CommitDiff.objects.return_value.first.return_value = None
+        repository = Mock()
+        repository.diff.return_value = [('A', '/usr/bin/zsh')]
+
+        # test
+        changes = diff.get(repository, 'c1', 'c2')
+
+        # validation
+        repository.diff.assert_called_once_with('c1', 'c2')
+        model.CommitDiff.store.assert_called_once_with('c1', 'c2', [('A', '/usr/bin/zsh')])
+        self.assertEqual(changes, [('A', '/usr/bin/zsh')])
+
+
+class TestMain(TestCase):
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection')
+    @patch(MODULE + '.lib.Repository')
+    @patch(MODULE + '.get')
+    @patch(MODULE + '.model')
+    def test_main(self, model, get, repository, connection):
+        unit = model.Branch.objects.return_value.only.return_value.first.return_value
+        get.return_value = [('A', '/a'), ('A', '/b'), ('D', '/c')]
+
+        # test
+        code = diff.main(['c1', 'c2', '--offset', '1', '--limit', '1'])
+
+        # validation
+        self.assertEqual(code, 0)
+        connection.initialize.assert_called_once_with()
+        model.Branch.objects.assert_called_once_with(commit='c2')
+        repository.assert_called_once_with(unit.storage_path)
+        get.assert_called_once_with(repository.return_value, 'c1', 'c2')
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection', Mock())
+    @patch(MODULE + '.model')
+    def test_main_not_found(self, model):
+        model.Branch.objects.return_value.only.return_value.first.return_value = None
+        self.assertEqual(diff.main(['c1', 'c2']), 1)
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection', Mock())
+    @patch(MODULE + '.lib.Repository', Mock())
+    @patch(MODULE + '.get')
+    @patch(MODULE + '.model', Mock())
+    def test_main_failed(self, get):
+        get.side_effect = LibError('missing')
+        self.assertEqual(diff.main(['c1', 'c2']), 1)
@@ -0,0 +1,298 @@
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.plugins import history
+
+
+MODULE = 'pulp_ostree.plugins.history'
+
+
+class Repository(object):
+
+    def __init__(self, parents):
+        self.parents = parents
+
+    def has_commit(self, commit):
+        return commit in self.parents
+
+    def parent(self, commit):
+        return self.parents[commit]
+
+
+def unit(commit, parent, generation, disconnected=False):
+    _unit = Mock(commit=commit, generation=generation, disconnected=disconnected)
+    _unit.parent = parent
+    return _unit
+
+
+class TestAncestry(TestCase):
+
+    @patch(MODULE + '.model')
+    def test_new(self, model):
+        model.Branch.objects.return_value.only.return_value = []
+        repository = Repository({'c3': 'c2', 'c2': 'c1', 'c1': None})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c3')
+
+        # validation
+        model.Branch.objects.assert_called_once_with(
+            remote_id='r1', branch='b1', generation__ne=None)
+        self.assertEqual(
+            ancestry,
+            [('c1', None, 0, False), ('c2', 'c1', 1, False), ('c3', 'c2', 2, False)])
+
+    @patch(MODULE + '.model')
+    def test_new_disconnected(self, model):
+        model.Branch.objects.return_value.only.return_value = []
+        repository = Repository({'c3': 'c2', 'c2': 'c1'})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c3')
+
+        # validation
+        self.assertEqual(ancestry, [('c2', 'c1', 0, True), ('c3', 'c2', 1, False)])
+
+    @patch(MODULE + '.model')
+    def test_incremental(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c1', None, 0),
+            unit('c2', 'c1', 1),
+        ]
+        repository = Repository({'c4': 'c3', 'c3': 'c2', 'c2': 'c1', 'c1': None})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c4')
+
+        # validation
+        self.assertEqual(ancestry, [('c3', 'c2', 2, False), ('c4', 'c3', 3, False)])
+        self.assertFalse(model.Branch.objects.return_value.update.called)
+
+    @patch(MODULE + '.model')
+    def test_advanced_beyond_depth(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c1', None, 0),
+            unit('c2', 'c1', 1),
+        ]
+        # upstream advanced by 3 commits and only 2 were pulled
+        repository = Repository({'c5': 'c4', 'c4': 'c3', 'c2': 'c1', 'c1': None})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c5')
+
+        # validation
+        self.assertEqual(ancestry, [('c4', 'c3', 2, True), ('c5', 'c4', 3, False)])
+        self.assertFalse(model.Branch.objects.return_value.update.called)
+
+    @patch(MODULE + '.model')
+    def test_advanced_beyond_depth_higher(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c1', None, 4),
+            unit('x2', 'c1', 9),
+        ]
+        repository = Repository({'c5': 'c4', 'c1': None, 'x2': 'c1'})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c5')
+
+        # validation
+        self.assertEqual(ancestry, [('c5', 'c4', 10, True)])
+
+    @patch(MODULE + '.model')
+    def test_deeper(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c3', 'c2', 5, True),
+        ]
+        repository = Repository({'c3': 'c2', 'c2': 'c1', 'c1': 'c0'})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c3')
+
+        # validation
+        self.assertEqual(ancestry, [('c1', 'c0', 3, True), ('c2', 'c1', 4, False)])
+        model.Branch.objects.assert_called_with(remote_id='r1', branch='b1', commit='c3')
+        model.Branch.objects.return_value.update.assert_called_once_with(
+            set__disconnected=False)
+
+    @patch(MODULE + '.model')
+    def test_deeper_after_gap(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c1', None, 0),
+            unit('c2', 'c1', 1),
+            unit('c4', 'c3', 2, True),
+            unit('c5', 'c4', 3),
+        ]
+        # the depth was increased and the missing commit: c3 pulled
+        repository = Repository({'c5': 'c4', 'c4': 'c3', 'c3': 'c2', 'c2': 'c1', 'c1': None})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c5')
+
+        # validation
+        self.assertEqual(ancestry, [('c3', 'c2', 2, False)])
+        self.assertEqual(
+            model.Branch.objects.call_args_list[1:],
+            [
+                ((), dict(remote_id='r1', branch='b1', generation__gte=2)),
+                ((), dict(remote_id='r1', branch='b1', commit='c4')),
+            ])
+        self.assertEqual(
+            model.Branch.objects.return_value.update.call_args_list,
+            [
+                ((), dict(inc__generation=1)),
+                ((), dict(set__disconnected=False)),
+            ])
+
+    @patch(MODULE + '.model')
+    def test_deeper_after_gaps(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c1', None, 0),
+            unit('c3', 'c2', 1, True),
+            unit('c5', 'c4', 2, True),
+        ]
+        repository = Repository({'c5': 'c4', 'c4': 'c3', 'c3': 'c2', 'c2': 'c1', 'c1': None})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c5')
+
+        # validation
+        self.assertEqual(ancestry, [('c2', 'c1', 1, False), ('c4', 'c3', 3, False)])
+        self.assertEqual(
+            model.Branch.objects.call_args_list[1:],
+            [
+                ((), dict(remote_id='r1', branch='b1', generation__gte=2)),
+                ((), dict(remote_id='r1', branch='b1', commit='c5')),
+                ((), dict(remote_id='r1', branch='b1', generation__gte=1)),
+                ((), dict(remote_id='r1', branch='b1', commit='c3')),
+            ])
+
+    @patch(MODULE + '.model')
+    def test_deeper_with_room(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c1', None, 0),
+            unit('c4', 'c3', 5, True),
+        ]
+        repository = Repository({'c4': 'c3', 'c3': 'c2', 'c2': 'c1', 'c1': None})
+
+        # test
+        ancestry = history.ancestry(repository, 'r1', 'b1', 'c4')
+
+        # validation
+        self.assertEqual(ancestry, [('c2', 'c1', 3, False), ('c3', 'c2', 4, False)])
+        model.Branch.objects.return_value.update.assert_called_once_with(
+            set__disconnected=False)
+
+    @patch(MODULE + '.model')
+    def test_known(self, model):
+        model.Branch.objects.return_value.only.return_value = [
+            unit('c1', None, 0),
+        ]
+        repository = Repository({'c1': None})
+        self.assertEqual(history.ancestry(repository, 'r1', 'b1', 'c1'), [])
+
+
+class TestBetween(TestCase):
+
+    def setUp(self):
+        self.units = [
+            unit('c2', 'c1', 1),
+            unit('c3', 'c2', 2),
+            unit('c4', 'c3', 3),
+            unit('x3', 'c2', 2),
+        ]
+
+    @patch(MODULE + '.model')
+    def test_between(self, model):
+        model.Branch.objects.return_value.only.return_value.first.return_value = unit('c2', 'c1', 1)
+        model.Branch.objects.return_value.only.return_value.__iter__ = \
+            Mock(return_value=iter(self.units))
+
+        # test
+        commits = history.between('r1', 'b1', 'c2', 'c4')
+
+        # validation
+        self.assertEqual(commits, ['c4', 'c3'])
+        self.assertEqual(
+            [c[1] for c in model.Branch.objects.call_args_list],
+            [
+                dict(remote_id='r1', branch='b1', commit='c2'),
+                dict(remote_id='r1', branch='b1', generation__gte=1),
+            ])
+
+    @patch(MODULE + '.model')
+    def test_not_ancestor(self, model):
+        model.Branch.objects.return_value.only.return_value.first.return_value = unit('x3', 'c2', 2)
+        model.Branch.objects.return_value.only.return_value.__iter__ = \
+            Mock(return_value=iter(self.units))
+        self.assertEqual(history.between('r1', 'b1', 'x3', 'c4'), None)
+
+    @patch(MODULE + '.model')
+    def test_not_recorded(self, model):
+        model.Branch.objects.return_value.only.return_value.first.return_value = None
+        self.assertEqual(history.between('r1', 'b1', 'c0', 'c4'), None)
+
+    @patch(MODULE + '.model')
+    def test_disconnected(self, model):
+        units = [
+            unit('c1', None, 0),
+            unit('c4', 'c3', 1, True),
+            unit('c5', 'c4', 2),
+        ]
+        model.Branch.objects.return_value.only.return_value.first.return_value = units[0]
+        model.Branch.objects.return_value.only.return_value.__iter__ = \
+            Mock(return_value=iter(units))
+        self.assertRaises(history.Unknown, history.between, 'r1', 'b1', 'c1', 'c5')
+
+    @patch(MODULE + '.between')
+    def test_is_ancestor(self, between):
+        between.side_effect = [['c4'], [], None, history.Unknown('c1', 'c4')]
+        self.assertTrue(history.is_ancestor('r1', 'b1', 'c3', 'c4'))
+        self.assertTrue(history.is_ancestor('r1', 'b1', 'c4', 'c4'))
+        self.assertFalse(history.is_ancestor('r1', 'b1', 'x3', 'c4'))
+        self.assertEqual(history.is_ancestor('r1', 'b1', 'c1', 'c4'), None)
+
+
+class TestMain(TestCase):
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection')
+    @patch(MODULE + '.between')
+    @patch(MODULE + '.model')
+    def test_between(self, model, between, connection):
+        unit = model.Branch.objects.return_value.only.return_value.first.return_value
+        between.return_value = ['c3', 'c2']
+
+        # test
+        code = history.main(['between', 'b1', 'c1', 'c3'])
+
+        # validation
+        self.assertEqual(code, 0)
+        connection.initialize.assert_called_once_with()
+        model.Branch.objects.assert_called_once_with(branch='b1', commit='c3')
+        between.assert_called_once_with(unit.remote_id, 'b1', 'c1', 'c3')
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection', Mock())
+    @patch(MODULE + '.between')
+    @patch(MODULE + '.model', Mock())
+    def test_between_failed(self, between):
+        between.side_effect = [None, history.Unknown('c1', 'c3')]
+        self.assertEqual(history.main(['between', 'b1', 'c1', 'c3']), 1)
+        self.assertEqual(history.main(['between', 'b1', 'c1', 'c3']), 2)
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection', Mock())
+    @patch(MODULE + '.is_ancestor')
+    @patch(MODULE + '.model', Mock())
+    def test_is_ancestor(self, is_ancestor):
+        is_ancestor.side_effect = [True, False, None]
+        for code in (0, 1, 2):
+            self.assertEqual(history.main(['is-ancestor', 'b1', 'c1', 'c3']), code)
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection', Mock())
+    @patch(MODULE + '.model')
+    def test_not_found(self, model):
+        model.Branch.objects.return_value.only.return_value.first.return_value = None
+        self.assertEqual(history.main(['between', 'b1', 'c1', 'c3']), 1)
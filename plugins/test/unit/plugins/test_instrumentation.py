@@ -0,0 +1,142 @@
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.common import constants
+from pulp_ostree.plugins import instrumentation, metrics
+
+
+MODULE = 'pulp_ostree.plugins.instrumentation'
+
+
+class Step(object):
+
+    def __init__(self, config=None):
+        self.config = config or {}
+        self.step_id = 'step-1'
+
+    def get_config(self):
+        return self.config
+
+    def get_working_dir(self):
+        return '/tmp/working'
+
+    def get_progress_report(self):
+        return {'state': 'done'}
+
+
+class InstrumentedStep(instrumentation.Instrumented, Step):
+
+    @instrumentation.measured
+    def process_main(self, item=None):
+        self.measurement.items += 1
+        return item
+
+
+class TestMeasurement(TestCase):
+
+    @patch(MODULE + '.resource')
+    @patch(MODULE + '.time')
+    def test_measure(self, _time, resource):
+        _time.time.side_effect = [10.0, 12.5, 20.0, 21.0]
+        resource.getrusage.side_effect = [
+            Mock(ru_utime=1.0, ru_stime=0.5, ru_maxrss=100),
+            Mock(ru_utime=2.0, ru_stime=1.0, ru_maxrss=150),
+            Mock(ru_utime=2.0, ru_stime=1.0, ru_maxrss=150),
+            Mock(ru_utime=2.5, ru_stime=1.0, ru_maxrss=160),
+        ]
+
+        # test
+        measurement = instrumentation.Measurement()
+        measurement.start()
+        measurement.stop()
+        measurement.start()
+        measurement.stop()
+        measurement.stop()
+
+        # validation
+        self.assertEqual(
+            measurement.dict(),
+            {
+                'wall': 3.5,
+                'cpu': 2.0,
+                'rss': 60,
+                'items': 0,
+            })
+
+
+class TestInstrumented(TestCase):
+
+    def test_profiled(self):
+        self.assertFalse(InstrumentedStep().profiled)
+        self.assertTrue(InstrumentedStep({constants.CONFIG_KEY_PROFILE: True}).profiled)
+
+    def test_get_progress_report(self):
+        step = InstrumentedStep()
+        step.measurement.items = 3
+
+        # test
+        report = step.get_progress_report()
+
+        # validation
+        self.assertEqual(report['state'], 'done')
+        self.assertEqual(report[constants.MEASUREMENT]['items'], 3)
+
+    def test_collect(self):
+        registry = metrics.Registry()
+        step = InstrumentedStep()
+        step.measurement.wall = 1.5
+        step.measurement.cpu = 0.5
+        step.measurement.items = 3
+        labels = dict(repo_id='r1', remote_id='remote-1')
+
+        # test
+        step.collect(registry, labels)
+
+        # validation
+        key = (('remote_id', 'remote-1'), ('repo_id', 'r1'), ('step', 'step-1'))
+        self.assertEqual(registry.gauge(metrics.STEP_DURATION).samples, {key: 1.5})
+        self.assertEqual(registry.gauge(metrics.STEP_CPU).samples, {key: 0.5})
+        self.assertEqual(registry.gauge(metrics.STEP_ITEMS).samples, {key: 3})
+
+
+class TestMeasured(TestCase):
+
+    @patch(MODULE + '.Profile')
+    def test_measured(self, profile):
+        step = InstrumentedStep()
+
+        # test
+        item = step.process_main(item=1)
+
+        # validation
+        self.assertEqual(item, 1)
+        self.assertEqual(step.measurement.items, 1)
+        self.assertIsNone(step.measurement._started)
+        self.assertFalse(profile.called)
+
+    @patch(MODULE + '.Profile')
+    def test_profiled(self, profile):
+        profile.return_value.runcall.side_effect = lambda fn, *args, **kwargs: fn(*args, **kwargs)
+        step = InstrumentedStep({constants.CONFIG_KEY_PROFILE: True})
+
+        # test
+        item = step.process_main(item=1)
+
+        # validation
+        self.assertEqual(item, 1)
+        self.assertEqual(step.measurement.items, 1)
+        profile.return_value.dump_stats.assert_called_once_with(
+            '/tmp/working/profile-step-1.prof')
+
+    @patch(MODULE + '.Profile')
+    def test_failed(self, profile):
+        step = InstrumentedStep({constants.CONFIG_KEY_PROFILE: True})
+        profile.return_value.runcall.side_effect = ValueError
+
+        # test
+        self.assertRaises(ValueError, step.process_main)
+
+        # validation
+        self.assertIsNone(step.measurement._started)
+        self.assertTrue(profile.return_value.dump_stats.called)
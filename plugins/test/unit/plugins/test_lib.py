@@ -1,3 +1,7 @@
+import os
+import shutil
+
+from tempfile import mkdtemp
 from unittest import TestCase
 
 from mock import patch, Mock, ANY
@@ -11,6 +15,11 @@ from pulp_ostree.plugins.lib import (
     Variant,
     Repository,
     Summary,
+    Throttle,
+    Transaction,
+    span_name,
+    span_path,
+    syncfs,
     wrapped)
 
 
@@ -39,6 +48,79 @@ def variant(encoding, value):
     return encoding, value
 
 
+class Tuple(tuple):
+    """
+    Fake (container) Variant.
+    """
+
+    def get_child_value(self, n):
+        return self[n]
+
+    def n_children(self):
+        return len(self)
+
+
+class String(str):
+    """
+    Fake (string) Variant.
+    """
+
+    def get_string(self):
+        return str(self)
+
+
+class TestThrottle(TestCase):
+
+    @patch('pulp_ostree.plugins.lib.time')
+    def test_call(self, _time):
+        _time.time.side_effect = [100.0, 101.0, 104.0]
+        report = Mock(bytes_transferred=4096)
+
+        # test
+        throttle = Throttle(1024)
+        paused = throttle(report)
+
+        # validation
+        self.assertTrue(paused)
+        self.assertTrue(throttle.paused)
+        self.assertEqual(throttle.delay, 3.0)
+        self.assertEqual(throttle.last, report)
+        self.assertFalse(_time.sleep.called)
+
+    @patch('pulp_ostree.plugins.lib.time')
+    def test_call_within_rate(self, _time):
+        _time.time.side_effect = [100.0, 105.0]
+
+        # test
+        throttle = Throttle(1024)
+        paused = throttle(Mock(bytes_transferred=4096))
+
+        # validation
+        self.assertFalse(paused)
+        self.assertFalse(throttle.paused)
+
+    @patch('pulp_ostree.plugins.lib.time')
+    def test_wait(self, _time):
+        report = Mock()
+        throttle = Throttle(1024)
+        throttle.delay = 3.0
+        throttle.last = report
+
+        # test
+        throttle.wait()
+
+        # validation
+        _time.sleep.assert_called_once_with(3.0)
+        self.assertFalse(throttle.paused)
+        self.assertEqual(throttle.previous, report)
+
+    @patch('pulp_ostree.plugins.lib.time')
+    def test_unlimited(self, _time):
+        throttle = Throttle(None)
+        self.assertFalse(throttle(Mock(bytes_transferred=4096)))
+        self.assertFalse(_time.sleep.called)
+
+
 class TestRef(TestCase):
 
     def test_init(self):
@@ -73,7 +155,7 @@ class TestProgressReport(TestCase):
 
     def test_init(self):
         lib_report = Mock()
-        lib_report.get_uint = Mock(side_effect=[10, 20])
+        lib_report.get_uint = Mock(side_effect=[10, 20, 1, 2])
         lib_report.get_uint64 = Mock(return_value=30)
 
         # test
@@ -85,10 +167,11 @@ class TestProgressReport(TestCase):
         self.assertEqual(report.fetched, 10)
         self.assertEqual(report.requested, 20)
         self.assertEqual(report.percent, 50)
+        self.assertEqual(report.localcache, 3)
 
     def test_init_zero_percent(self):
         lib_report = Mock()
-        lib_report.get_uint = Mock(side_effect=[10, 0])
+        lib_report.get_uint = Mock(side_effect=[10, 0, 0, 0])
         lib_report.get_uint64 = Mock(return_value=30)
 
         # test
@@ -101,6 +184,37 @@ class TestProgressReport(TestCase):
         self.assertEqual(report.requested, 0)
         self.assertEqual(report.percent, 0)
 
+    def test_resume(self):
+        lib_report = Mock()
+        lib_report.get_uint = Mock(side_effect=[10, 20, 1, 2])
+        lib_report.get_uint64 = Mock(return_value=30)
+        previous = Mock(bytes_transferred=100, fetched=20, localcache=4)
+
+        # test
+        report = ProgressReport(lib_report)
+        report.resume(previous)
+
+        # validation
+        self.assertEqual(report.bytes_transferred, 130)
+        self.assertEqual(report.fetched, 30)
+        self.assertEqual(report.requested, 40)
+        self.assertEqual(report.percent, 75)
+        self.assertEqual(report.localcache, 7)
+
+    def test_resume_not_paused(self):
+        lib_report = Mock()
+        lib_report.get_uint = Mock(side_effect=[10, 20, 1, 2])
+        lib_report.get_uint64 = Mock(return_value=30)
+
+        # test
+        report = ProgressReport(lib_report)
+        report.resume(None)
+
+        # validation
+        self.assertEqual(report.bytes_transferred, 30)
+        self.assertEqual(report.fetched, 10)
+        self.assertEqual(report.requested, 20)
+
 
 class TestVariant(TestCase):
 
@@ -130,6 +244,18 @@ class TestVariant(TestCase):
         # none
         self.assertTrue(Variant.int(None) is None)
 
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_uint(self, lib):
+        _lib = Mock()
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        lib.return_value = _lib
+        # integer
+        tag, value = Variant.uint('10')
+        self.assertEqual(tag, 'u')
+        self.assertEqual(value, 10)
+        # none
+        self.assertTrue(Variant.uint(None) is None)
+
     @patch('pulp_ostree.plugins.lib.Lib')
     def test_bool(self, lib):
         _lib = Mock()
@@ -148,6 +274,15 @@ class TestVariant(TestCase):
         # none
         self.assertTrue(Variant.bool(None) is None)
 
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_boolean(self, lib):
+        _lib = Mock()
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        lib.return_value = _lib
+        self.assertEqual(Variant.boolean(True), ('b', True))
+        self.assertEqual(Variant.boolean(False), ('b', False))
+        self.assertTrue(Variant.boolean(None) is None)
+
     @patch('pulp_ostree.plugins.lib.Lib')
     def test_str_list(self, lib):
         _lib = Mock()
@@ -189,6 +324,7 @@ class TestRepository(TestCase):
         repo = Repository(path)
         self.assertEqual(repo.path, path)
         self.assertEqual(repo.impl, None)
+        self.assertEqual(repo.metadata, {})
 
     @patch('pulp_ostree.plugins.lib.Lib')
     def test_open(self, lib):
@@ -264,12 +400,94 @@ class TestRepository(TestCase):
     def test_close(self):
         repository = Repository('')
         repository.impl = Mock()
+        repository.metadata = {'commit:1': {}}
 
         # test
         repository.close()
 
         # validation
         self.assertEqual(repository.impl, None)
+        self.assertEqual(repository.metadata, {})
+
+    @patch('pulp_ostree.plugins.lib.Lib', Mock())
+    def test_disable_fsync(self):
+        repository = Repository('/tmp/path-1')
+        repository.open = Mock()
+        repository.impl = Mock()
+
+        # test
+        repository.disable_fsync()
+
+        # validation
+        repository.open.assert_called_once_with()
+        repository.impl.set_disable_fsync.assert_called_once_with(True)
+
+    @patch('pulp_ostree.plugins.lib.syncfs')
+    def test_sync(self, _syncfs):
+        repository = Repository('/tmp/path-1')
+        repository.sync()
+        _syncfs.assert_called_once_with(repository.path)
+
+    @patch('pulp_ostree.plugins.lib.Transaction')
+    def test_set_refs(self, transaction):
+        refs = {'branch-1': 'commit-1'}
+        _transaction = Mock()
+        transaction.return_value.__enter__ = Mock(return_value=_transaction)
+        transaction.return_value.__exit__ = Mock(return_value=None)
+
+        # test
+        repository = Repository('/tmp/path-1')
+        repository.set_refs(refs)
+
+        # validation
+        transaction.assert_called_once_with(repository)
+        _transaction.set_refs.assert_called_once_with(refs)
+        transaction.return_value.__exit__.assert_called_once_with(None, None, None)
+
+    def test_transaction(self):
+        repository = Repository('/tmp/path-1')
+        transaction = repository.transaction()
+        self.assertTrue(isinstance(transaction, Transaction))
+        self.assertEqual(transaction.repository, repository)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_commit_metadata(self, lib):
+        _lib = Mock()
+        _lib.OSTree.ObjectType.COMMIT = 'COMMIT'
+        lib.return_value = _lib
+        lib_repo = Mock()
+        lib_repo.load_variant.return_value = (True, [{'version': 1}])
+
+        # test
+        repo = Repository('')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        metadata = repo.commit_metadata('commit:1')
+        cached = repo.commit_metadata('commit:1')
+
+        # validation
+        repo.open.assert_called_once_with()
+        lib_repo.load_variant.assert_called_once_with('COMMIT', 'commit:1')
+        self.assertEqual(metadata, {'version': 1})
+        self.assertEqual(cached, metadata)
+        self.assertEqual(repo.metadata, {'commit:1': metadata})
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_commit_metadata_failed(self, lib):
+        _lib = Mock()
+        _lib.GLib.GError = GError
+        lib.return_value = _lib
+        lib_repo = Mock()
+        lib_repo.load_variant.side_effect = GError()
+
+        # test
+        repo = Repository('')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        self.assertRaises(LibError, repo.commit_metadata, 'commit:1')
+
+        # validation
+        self.assertEqual(repo.metadata, {})
 
     @patch('pulp_ostree.plugins.lib.Ref')
     @patch('pulp_ostree.plugins.lib.Lib')
@@ -306,7 +524,7 @@ class TestRepository(TestCase):
 
         # validation
         lib.assert_called_with()
-        repo.open.assert_called_once_with()
+        self.assertEqual(repo.open.call_args_list, [((), {})] * 3)
         lib_repo.list_refs.assert_called_once_with(None, None)
         self.assertEqual(
             ref.call_args_list,
@@ -322,6 +540,104 @@ class TestRepository(TestCase):
             ])
         self.assertEqual(listed, ref_objects)
 
+    @patch('pulp_ostree.plugins.lib.Ref')
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_list_refs_named(self, lib, ref):
+        _lib = Mock()
+        lib_repo = Mock()
+        lib_repo.resolve_rev.side_effect = [(True, 'commit:1'), (True, None)]
+        lib_repo.load_variant.return_value = (1, [{'version': 1}])
+        _lib.OSTree.ObjectType.COMMIT = 'COMMIT'
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        listed = repo.list_refs(['branch:1', 'branch:2'])
+
+        # validation
+        self.assertFalse(lib_repo.list_refs.called)
+        self.assertEqual(
+            lib_repo.resolve_rev.call_args_list,
+            [
+                (('branch:1', True), {}),
+                (('branch:2', True), {}),
+            ])
+        ref.assert_called_once_with('branch:1', 'commit:1', {'version': 1})
+        lib_repo.load_variant.assert_called_once_with('COMMIT', 'commit:1')
+        self.assertEqual(listed, [ref.return_value])
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_refs(self, lib):
+        lib_repo = Mock()
+        lib_repo.list_refs.return_value = (True, {'branch:1': 'commit:1'})
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        refs = repo.refs()
+
+        # validation
+        repo.open.assert_called_once_with()
+        lib_repo.list_refs.assert_called_once_with(None, None)
+        self.assertFalse(lib_repo.load_variant.called)
+        self.assertEqual(refs, {'branch:1': 'commit:1'})
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_list_objects(self, lib):
+        objects = [
+            Mock(unpack=Mock(return_value=('abc', 1))),
+            Mock(unpack=Mock(return_value=('def', 2))),
+        ]
+        _lib = Mock()
+        lib_repo = Mock()
+        lib_repo.list_objects.return_value = (True, objects)
+        lib_repo.query_object_storage_size.side_effect = [(True, 10), (True, 20)]
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        listed = repo.list_objects()
+
+        # validation
+        repo.open.assert_called_once_with()
+        lib_repo.list_objects.assert_called_once_with(
+            _lib.OSTree.RepoListObjectsFlags.ALL, None)
+        self.assertEqual(
+            lib_repo.query_object_storage_size.call_args_list,
+            [
+                ((1, 'abc', None), {}),
+                ((2, 'def', None), {}),
+            ])
+        self.assertEqual(listed, {('abc', 1): 10, ('def', 2): 20})
+
+    @patch('pulp_ostree.plugins.lib.Lib', Mock())
+    def test_traverse(self):
+        commit = 'commit-1'
+        depth = 3
+        objects = [
+            Mock(unpack=Mock(return_value=('abc', 1))),
+        ]
+        lib_repo = Mock()
+        lib_repo.traverse_commit.return_value = (True, objects)
+        lib_repo.query_object_storage_size.return_value = (True, 10)
+
+        # test
+        repo = Repository('')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        reachable = repo.traverse(commit, depth)
+
+        # validation
+        repo.open.assert_called_once_with()
+        lib_repo.traverse_commit.assert_called_once_with(commit, depth, None)
+        lib_repo.query_object_storage_size.assert_called_once_with(1, 'abc', None)
+        self.assertEqual(reachable, {('abc', 1): 10})
+
     @patch('pulp_ostree.plugins.lib.Lib')
     def test_pull(self, lib):
         path = '/tmp/path-1'
@@ -357,6 +673,358 @@ class TestRepository(TestCase):
         lib_repo.pull_with_options.assert_called_once_with(remote_id, options, progress, None)
         progress.finish.assert_called_once_with()
 
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_pull_transaction(self, lib):
+        remote_id = 'remote-1'
+        refs = ['branch-1']
+        _lib = Mock()
+        lib_repo = Mock()
+        progress = Mock()
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        _lib.OSTree.AsyncProgress.new.return_value = progress
+        _lib.OSTree.RepoPullFlags.MIRROR = 0xFF
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.pull(remote_id, refs, Mock(), 0, transaction=True)
+
+        # validation
+        options = (
+            'a{sv}', {
+                'refs': ('as', tuple(refs)),
+                'depth': ('i', 0),
+                'flags': ('i', 0xFF),
+                'inherit-transaction': ('b', True)
+            })
+        lib_repo.pull_with_options.assert_called_once_with(remote_id, options, progress, None)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_pull_subdirs(self, lib):
+        remote_id = 'remote-1'
+        refs = ['branch-1']
+        subdirs = ['/usr/share/doc']
+        _lib = Mock()
+        lib_repo = Mock()
+        progress = Mock()
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        _lib.OSTree.AsyncProgress.new.return_value = progress
+        _lib.OSTree.RepoPullFlags.MIRROR = 0xFF
+        _lib.OSTree.RepoPullFlags.NONE = 0x01
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.pull(remote_id, refs, Mock(), 0, subdirs)
+
+        # validation
+        options = (
+            'a{sv}', {
+                'refs': ('as', tuple(refs)),
+                'depth': ('i', 0),
+                'subdirs': ('as', tuple(subdirs)),
+                'flags': ('i', 0x01)
+            })
+        lib_repo.pull_with_options.assert_called_once_with(remote_id, options, progress, None)
+
+    @patch('pulp_ostree.plugins.lib.Throttle')
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_pull_network(self, lib, throttle):
+        remote_id = 'remote-1'
+        refs = ['branch-1']
+        _lib = Mock()
+        lib_repo = Mock()
+        progress = Mock()
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        _lib.OSTree.AsyncProgress.new.return_value = progress
+        _lib.OSTree.RepoPullFlags.MIRROR = 0xFF
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.pull(
+            remote_id, refs, Mock(), 0,
+            max_speed=1024, low_speed_limit=10, low_speed_time=30,
+            localcache=['/tmp/path-2'])
+
+        # validation
+        options = (
+            'a{sv}', {
+                'refs': ('as', tuple(refs)),
+                'depth': ('i', 0),
+                'flags': ('i', 0xFF),
+                'low-speed-limit-bytes': ('u', 10),
+                'low-speed-time-seconds': ('u', 30),
+                'localcache-repos': ('as', ('/tmp/path-2',))
+            })
+        throttle.assert_called_once_with(1024)
+        lib_repo.pull_with_options.assert_called_once_with(
+            remote_id, options, progress, _lib.Gio.Cancellable.new.return_value)
+        self.assertFalse(throttle.return_value.wait.called)
+
+    @patch('pulp_ostree.plugins.lib.ProgressReport')
+    @patch('pulp_ostree.plugins.lib.Throttle')
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_pull_paused(self, lib, throttle, report):
+        remote_id = 'remote-1'
+        refs = ['branch-1']
+        listener = Mock()
+        _lib = Mock()
+        _lib.GLib.GError = ValueError
+        lib_repo = Mock()
+        progress = Mock()
+        cancellables = [Mock(), Mock()]
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        _lib.OSTree.AsyncProgress.new.return_value = progress
+        _lib.Gio.Cancellable.new.side_effect = cancellables
+        lib.return_value = _lib
+        throttle.return_value.rate = 1024
+        throttle.return_value.paused = False
+        throttle.return_value.delay = 3.0
+
+        def pull(remote_id, options, progress, cancellable):
+            if cancellable == cancellables[0]:
+                throttle.return_value.return_value = True
+                throttle.return_value.paused = True
+                report_progress = progress.connect.call_args[0][1]
+                report_progress(Mock())
+                raise ValueError('cancelled')
+            throttle.return_value.paused = False
+
+        lib_repo.pull_with_options.side_effect = pull
+
+        def wait():
+            throttle.return_value.paused = False
+
+        throttle.return_value.wait.side_effect = wait
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.pull(remote_id, refs, listener, 0, max_speed=1024)
+
+        # validation
+        cancellables[0].cancel.assert_called_once_with()
+        self.assertFalse(cancellables[1].cancel.called)
+        throttle.return_value.wait.assert_called_once_with()
+        self.assertEqual(lib_repo.pull_with_options.call_count, 2)
+        self.assertEqual(
+            [c[0][3] for c in lib_repo.pull_with_options.call_args_list],
+            cancellables)
+        listener.assert_called_once_with(report.return_value)
+        report.return_value.resume.assert_called_once_with(throttle.return_value.previous)
+        self.assertEqual(progress.finish.call_count, 2)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_pull_cancelled(self, lib):
+        remote_id = 'remote-1'
+        _lib = Mock()
+        _lib.GLib.GError = ValueError
+        lib_repo = Mock()
+        lib_repo.pull_with_options.side_effect = ValueError('cancelled')
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.cancellable = Mock()
+        repo.cancellable.is_cancelled.return_value = True
+        self.assertRaises(LibError, repo.pull, remote_id, ['branch-1'], Mock(), 0, max_speed=1)
+
+        # validation
+        self.assertEqual(lib_repo.pull_with_options.call_count, 1)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_partial(self, lib):
+        _lib = Mock()
+        _lib.OSTree.RepoCommitState.PARTIAL = 0x01
+        lib.return_value = _lib
+        lib_repo = Mock()
+        lib_repo.load_commit.side_effect = [(True, Mock(), 0x01), (True, Mock(), 0x00)]
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+
+        # validation
+        self.assertTrue(repo.partial('commit-1'))
+        self.assertFalse(repo.partial('commit-2'))
+        lib_repo.load_commit.assert_called_with('commit-2')
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_parent(self, lib):
+        _lib = Mock()
+        _lib.OSTree.commit_get_parent.side_effect = ['commit-1', None]
+        lib.return_value = _lib
+        lib_repo = Mock()
+        lib_repo.load_variant.return_value = (True, Mock())
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+
+        # validation
+        self.assertEqual(repo.parent('commit-2'), 'commit-1')
+        self.assertEqual(repo.parent('commit-1'), None)
+        lib_repo.load_variant.assert_called_with(_lib.OSTree.ObjectType.COMMIT, 'commit-1')
+        _lib.OSTree.commit_get_parent.assert_called_with(lib_repo.load_variant.return_value[1])
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_has_commit(self, lib):
+        _lib = Mock()
+        lib.return_value = _lib
+        lib_repo = Mock()
+        lib_repo.has_object.side_effect = [(True, True), (True, False)]
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+
+        # validation
+        self.assertTrue(repo.has_commit('commit-1'))
+        self.assertFalse(repo.has_commit('commit-2'))
+        lib_repo.has_object.assert_called_with(
+            _lib.OSTree.ObjectType.COMMIT, 'commit-2', None)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_diff(self, lib):
+        _lib = Mock()
+        _lib.OSTree.ObjectType.COMMIT = 'commit'
+        _lib.OSTree.ObjectType.DIR_TREE = 'dirtree'
+        _lib.OSTree.checksum_from_bytes_v.side_effect = lambda v: v
+        lib.return_value = _lib
+        commit_1 = Tuple([None, None, None, None, None, None, 'root-1', 'meta-1'])
+        commit_2 = Tuple([None, None, None, None, None, None, 'root-2', 'meta-1'])
+        objects = {
+            ('commit', 'c1'): commit_1,
+            ('commit', 'c2'): commit_2,
+            ('dirtree', 'root-1'): Tuple([
+                Tuple([Tuple([String('README'), 'f1'])]),
+                Tuple([
+                    Tuple([String('usr'), 'usr-1', 'meta-2']),
+                    Tuple([String('etc'), 'etc-1', 'meta-2']),
+                    Tuple([String('opt'), 'opt-1', 'meta-2']),
+                ]),
+            ]),
+            ('dirtree', 'root-2'): Tuple([
+                Tuple([Tuple([String('README'), 'f2']), Tuple([String('NEWS'), 'f3'])]),
+                Tuple([
+                    Tuple([String('usr'), 'usr-2', 'meta-3']),
+                    Tuple([String('etc'), 'etc-1', 'meta-2']),
+                ]),
+            ]),
+            ('dirtree', 'usr-1'): Tuple([Tuple([Tuple([String('bash'), 'f4'])]), Tuple([])]),
+            ('dirtree', 'usr-2'): Tuple([Tuple([Tuple([String('zsh'), 'f5'])]), Tuple([])]),
+        }
+        lib_repo = Mock()
+        lib_repo.load_variant.side_effect = lambda t, c: (True, objects[(t, c)])
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        changes = repo.diff('c1', 'c2')
+
+        # validation
+        self.assertEqual(
+            changes,
+            [
+                ('A', '/NEWS'),
+                ('M', '/README'),
+                ('D', '/opt'),
+                ('M', '/usr'),
+                ('D', '/usr/bash'),
+                ('A', '/usr/zsh'),
+            ])
+        loaded = [c[0][1] for c in lib_repo.load_variant.call_args_list]
+        self.assertFalse('etc-1' in loaded)
+
+    @patch('pulp_ostree.plugins.lib.Variant')
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_generate_delta(self, lib, variant):
+        _lib = Mock()
+        lib.return_value = _lib
+        lib_repo = Mock()
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.generate_delta('commit-1', 'commit-2', {'max-chunk-size': 32})
+
+        # validation
+        variant.uint.assert_called_once_with(32)
+        variant.dict.assert_called_once_with({'max-chunk-size': variant.uint.return_value})
+        lib_repo.static_delta_generate.assert_called_once_with(
+            _lib.OSTree.StaticDeltaGenerateOpt.MAJOR,
+            'commit-1',
+            'commit-2',
+            None,
+            variant.dict.return_value,
+            None)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_export(self, lib):
+        _lib = Mock()
+        _lib.Gio.FileType.REGULAR = 1
+        _lib.Gio.FileType.DIRECTORY = 2
+        lib.return_value = _lib
+        root = Mock()
+        directory = root.resolve_relative_path.return_value
+        directory.enumerate_children.return_value = [
+            Mock(get_name=Mock(return_value='Packages'), get_file_type=Mock(return_value=1)),
+            Mock(get_name=Mock(return_value='tmp'), get_file_type=Mock(return_value=2)),
+            Mock(get_name=Mock(return_value='Name'), get_file_type=Mock(return_value=1)),
+        ]
+        lib_repo = Mock()
+        lib_repo.read_commit.return_value = (True, root, 'commit-1')
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        copied = repo.export('commit-1', '/usr/share/rpm', '/tmp/rpm')
+
+        # validation
+        self.assertEqual(copied, ['Name', 'Packages'])
+        lib_repo.read_commit.assert_called_once_with('commit-1', None)
+        root.resolve_relative_path.assert_called_once_with('usr/share/rpm')
+        self.assertEqual(
+            _lib.Gio.File.new_for_path.call_args_list,
+            [(('/tmp/rpm/Packages',), {}), (('/tmp/rpm/Name',), {})])
+        self.assertEqual(directory.get_child.return_value.copy.call_count, 2)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_export_not_found(self, lib):
+        root = Mock()
+        directory = root.resolve_relative_path.return_value
+        directory.query_exists.return_value = False
+        lib_repo = Mock()
+        lib_repo.read_commit.return_value = (True, root, 'commit-1')
+
+        # test
+        repo = Repository('/tmp/path-1')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        copied = repo.export('commit-1', '/usr/share/rpm', '/tmp/rpm')
+
+        # validation
+        self.assertEqual(copied, None)
+        directory.query_exists.assert_called_once_with(None)
+        self.assertFalse(directory.enumerate_children.called)
+
     @patch('pulp_ostree.plugins.lib.Lib')
     def test_pull_all(self, lib):
         path = '/tmp/path-1'
@@ -422,6 +1090,62 @@ class TestRepository(TestCase):
         repo.open.assert_called_once_with()
         lib_repo.pull_with_options.assert_called_once_with(url, options, None, None)
 
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_pull_local_subdirs(self, lib):
+        path_in = '/tmp/path-1'
+        refs = ['commit-1']
+        subdirs = ['/usr/share/doc']
+        _lib = Mock()
+        lib_repo = Mock()
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        _lib.OSTree.RepoPullFlags.MIRROR = 0xFF
+        _lib.OSTree.RepoPullFlags.NONE = 0x01
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('/tmp/path-2')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.pull_local(path_in, refs, 3, subdirs)
+
+        # validation
+        options = (
+            'a{sv}', {
+                'refs': ('as', tuple(refs)),
+                'depth': ('i', 3),
+                'subdirs': ('as', tuple(subdirs)),
+                'flags': ('i', 0x01)
+            })
+        lib_repo.pull_with_options.assert_called_once_with(
+            'file://' + path_in, options, None, None)
+
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_pull_local_transaction(self, lib):
+        path_in = '/tmp/path-1'
+        refs = ['commit-1']
+        _lib = Mock()
+        lib_repo = Mock()
+        _lib.GLib.Variant.side_effect = Mock(side_effect=variant)
+        _lib.OSTree.RepoPullFlags.MIRROR = 0xFF
+        lib.return_value = _lib
+
+        # test
+        repo = Repository('/tmp/path-2')
+        repo.open = Mock()
+        repo.impl = lib_repo
+        repo.pull_local(path_in, refs, 3, transaction=True)
+
+        # validation
+        options = (
+            'a{sv}', {
+                'refs': ('as', tuple(refs)),
+                'depth': ('i', 3),
+                'flags': ('i', 0xFF),
+                'inherit-transaction': ('b', True)
+            })
+        lib_repo.pull_with_options.assert_called_once_with(
+            'file://' + path_in, options, None, None)
+
     @patch('pulp_ostree.plugins.lib.Lib')
     def test_pull_local_all(self, lib):
         path = '/tmp/path-2'
@@ -520,6 +1244,92 @@ class TestRepository(TestCase):
         progress.finish.assert_called_once_with()
 
 
+class TestTransaction(TestCase):
+
+    def setUp(self):
+        self.lib = patch('pulp_ostree.plugins.lib.Lib')
+        self.lib.start().return_value.GLib.GError = GError
+        self.repository = Repository('/tmp/path-1')
+        self.repository.open = Mock()
+        self.repository.impl = Mock()
+
+    def tearDown(self):
+        self.lib.stop()
+
+    def test_commit(self):
+        impl = self.repository.impl
+
+        # test
+        with Transaction(self.repository) as transaction:
+            transaction.set_ref('branch-1', 'commit-1')
+
+        # validation
+        self.repository.open.assert_called_once_with()
+        impl.prepare_transaction.assert_called_once_with(None)
+        impl.transaction_set_ref.assert_called_once_with(None, 'branch-1', 'commit-1')
+        impl.commit_transaction.assert_called_once_with(None)
+        self.assertFalse(impl.abort_transaction.called)
+
+    def test_set_refs(self):
+        impl = self.repository.impl
+
+        # test
+        with Transaction(self.repository) as transaction:
+            transaction.set_refs({'branch-2': 'commit-2', 'branch-1': 'commit-1'})
+
+        # validation
+        self.assertEqual(
+            impl.transaction_set_ref.call_args_list,
+            [
+                ((None, 'branch-1', 'commit-1'), {}),
+                ((None, 'branch-2', 'commit-2'), {}),
+            ])
+        impl.commit_transaction.assert_called_once_with(None)
+
+    def test_abort(self):
+        impl = self.repository.impl
+
+        # test
+        try:
+            with Transaction(self.repository):
+                raise ValueError()
+        except ValueError:
+            pass
+
+        # validation
+        impl.abort_transaction.assert_called_once_with(None)
+        self.assertFalse(impl.commit_transaction.called)
+
+    def test_abort_failed(self):
+        impl = self.repository.impl
+        impl.abort_transaction.side_effect = GError('failed', 1)
+
+        # test
+        try:
+            with Transaction(self.repository):
+                raise ValueError()
+        except ValueError:
+            pass
+
+        # validation
+        impl.abort_transaction.assert_called_once_with(None)
+
+
+class TestSyncfs(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_syncfs(self):
+        syncfs(self.tmp_dir)
+
+    def test_not_found(self):
+        self.assertRaises(OSError, syncfs, os.path.join(self.tmp_dir, 'none'))
+
+
 class TestRemote(TestCase):
 
     @patch('pulp_ostree.plugins.lib.Lib', Mock())
@@ -652,16 +1462,12 @@ class TestRemote(TestCase):
             'branch:1': 'commit:1',
             'branch:2': 'commit:2'
         }
-        commits = [
-            ('commit:1', [{'version': 1}]),
-            ('commit:2', [{'version': 2}])
-        ]
 
         _lib = Mock()
         lib_repo = Mock()
         lib_repo.remote_list_refs.return_value = (1, summary)
-        lib_repo.load_variant.side_effect = commits
-        _lib.OSTree.ObjectType.COMMIT = 'COMMIT'
+        repository = Mock(impl=lib_repo)
+        repository.commit_metadata.side_effect = [{'version': 1}, {'version': 2}]
         _lib.OSTree.RepoPullFlags.COMMIT_ONLY = 'COMMIT_ONLY'
         lib.return_value = _lib
 
@@ -669,7 +1475,7 @@ class TestRemote(TestCase):
         ref.side_effect = ref_objects
 
         # test
-        remote = Remote(remote_id, Mock(impl=lib_repo))
+        remote = Remote(remote_id, repository)
         remote.open = Mock()
         listed = remote.list_refs(required=True)
 
@@ -690,10 +1496,10 @@ class TestRemote(TestCase):
                 (('branch:2', 'commit:2', {'version': 2}), {}),
             ])
         self.assertEqual(
-            lib_repo.load_variant.call_args_list,
+            repository.commit_metadata.call_args_list,
             [
-                ((_lib.OSTree.ObjectType.COMMIT, 'commit:1'), {}),
-                ((_lib.OSTree.ObjectType.COMMIT, 'commit:2'), {}),
+                (('commit:1',), {}),
+                (('commit:2',), {}),
             ])
         self.assertEqual(listed, ref_objects)
 
@@ -746,6 +1552,8 @@ class TestRemote(TestCase):
         remote.ssl_validation = True
         remote.gpg_validation = True
         remote.proxy_url = 'http://proxy'
+        remote.http2 = False
+        remote.content_url = 'http://content'
         options = remote.options
 
         # validation
@@ -757,10 +1565,27 @@ class TestRemote(TestCase):
                 'tls-permissive': ('s', 'false'),
                 'gpg-verify': ('s', 'true'),
                 'tls-ca-path': ('s', '/tmp/ca'),
-                'proxy': ('s', 'http://proxy')
+                'proxy': ('s', 'http://proxy'),
+                'http2': ('s', 'false'),
+                'contenturl': ('s', 'http://content')
             })
         )
 
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_options_mirrorlist(self, lib):
+        _lib = Mock()
+        _lib.GLib.Variant.side_effect = variant
+        lib.return_value = _lib
+
+        # test
+        remote = Remote('', '')
+        remote.content_url = 'http://content'
+        remote.mirrorlist = 'http://mirrors'
+        options = remote.options
+
+        # validation
+        self.assertEqual(options[1]['contenturl'], ('s', 'mirrorlist=http://mirrors'))
+
 
 class TestDecorator(TestCase):
 
@@ -782,6 +1607,80 @@ class TestDecorator(TestCase):
         except LibError, le:
             self.assertEqual(le.args[0], repr(g_error))
 
+    @patch('pulp_ostree.plugins.lib.tracer')
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_traced(self, lib, tracer):
+        repository = Repository('/tmp/repo')
+
+        @wrapped
+        def function(repository):
+            return [1, 2, 3]
+
+        # test
+        result = function(repository)
+
+        # validation
+        span = tracer.start.return_value
+        self.assertEqual(result, [1, 2, 3])
+        tracer.start.assert_called_once_with('function', '/tmp/repo')
+        tracer.finish.assert_called_once_with(span)
+        span.attributes.setdefault.assert_called_once_with('objects', 3)
+
+    @patch('pulp_ostree.plugins.lib.tracer')
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_traced_failed(self, lib, tracer):
+        _lib = Mock()
+        _lib.GLib.GError = GError
+        lib.return_value = _lib
+        g_error = GError()
+
+        @wrapped
+        def function():
+            raise g_error
+
+        # test
+        self.assertRaises(LibError, function)
+
+        # validation
+        tracer.finish.assert_called_once_with(tracer.start.return_value, g_error)
+
+    @patch('pulp_ostree.plugins.lib.tracer')
+    @patch('pulp_ostree.plugins.lib.Lib')
+    def test_traced_other_failed(self, lib, tracer):
+        _lib = Mock()
+        _lib.GLib.GError = GError
+        lib.return_value = _lib
+
+        @wrapped
+        def function():
+            raise ValueError()
+
+        # test
+        self.assertRaises(ValueError, function)
+
+        # validation
+        self.assertTrue(tracer.finish.called)
+
+    def test_span_name(self):
+        def pull():
+            pass
+
+        def list():
+            pass
+
+        repository = Repository('')
+        self.assertEqual(span_name(pull, (repository,)), 'Repository.pull')
+        self.assertEqual(span_name(list, (repository,)), 'list')
+        self.assertEqual(span_name(list, ()), 'list')
+
+    def test_span_path(self):
+        repository = Repository('/tmp/repo')
+        self.assertEqual(span_path((repository,)), '/tmp/repo')
+        self.assertEqual(span_path((Remote('r1', repository),)), '/tmp/repo')
+        self.assertEqual(span_path((Summary(repository),)), '/tmp/repo')
+        self.assertEqual(span_path((1,)), None)
+        self.assertEqual(span_path(()), None)
+
 
 class TestSummary(TestCase):
 
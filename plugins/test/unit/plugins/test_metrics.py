@@ -0,0 +1,174 @@
+import os
+import shutil
+
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.plugins import metrics
+
+
+MODULE = 'pulp_ostree.plugins.metrics'
+
+
+class TestMetric(TestCase):
+
+    def test_render(self):
+        metric = metrics.Metric('pulp_ostree_test', 'A test.')
+        metric.set(2, repo_id='r2', step='s1')
+        metric.set(1, step='s1', repo_id='r1')
+        metric.set(3, step='s1', repo_id='r1')
+        self.assertEqual(
+            metric.render(),
+            [
+                '# HELP pulp_ostree_test A test.',
+                '# TYPE pulp_ostree_test gauge',
+                'pulp_ostree_test{repo_id="r1",step="s1"} 3.0',
+                'pulp_ostree_test{repo_id="r2",step="s1"} 2.0',
+            ])
+
+    def test_escape(self):
+        self.assertEqual(metrics.escape('a"b\\c\nd'), 'a\\"b\\\\c\\nd')
+        self.assertEqual(metrics.escape(u'\xe9'), '\xc3\xa9')
+
+
+class TestRegistry(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_gauge(self):
+        registry = metrics.Registry()
+        gauge = registry.gauge(metrics.DURATION)
+        self.assertEqual(gauge.name, metrics.DURATION[0])
+        self.assertEqual(gauge.description, metrics.DURATION[1])
+        self.assertEqual(registry.gauge(metrics.DURATION), gauge)
+
+    def test_render(self):
+        registry = metrics.Registry()
+        registry.gauge(metrics.SUCCESS).set(1, repo_id='r1')
+        registry.gauge(metrics.DURATION).set(10, repo_id='r1')
+        self.assertEqual(
+            registry.render(),
+            '\n'.join(
+                registry.gauge(metrics.DURATION).render() +
+                registry.gauge(metrics.SUCCESS).render() +
+                ['']))
+
+    def test_write(self):
+        path = os.path.join(self.tmp_dir, 'test.prom')
+        registry = metrics.Registry()
+        registry.gauge(metrics.DURATION).set(10, repo_id='r1')
+
+        # test
+        registry.write(path)
+
+        # validation
+        self.assertEqual(os.listdir(self.tmp_dir), ['test.prom'])
+        with open(path) as fp:
+            self.assertEqual(fp.read(), registry.render())
+
+
+class TestValidate(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_valid(self):
+        metrics.validate(self.tmp_dir)
+        metrics.validate(None)
+        metrics.validate('')
+
+    def test_invalid(self):
+        path = os.path.join(self.tmp_dir, 'file')
+        with open(path, 'w'):
+            pass
+        for directory in ('relative', os.path.join(self.tmp_dir, 'missing'), path, 10):
+            self.assertRaises(ValueError, metrics.validate, directory)
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_path(self):
+        context = metrics.Metrics('/tmp/metrics', None, 'sync', 'r1', 'remote-1')
+        self.assertEqual(context.path, '/tmp/metrics/pulp_ostree_sync_r1.prom')
+        self.assertEqual(context.labels, dict(repo_id='r1', remote_id='remote-1'))
+
+    @patch(MODULE + '.time')
+    def test_collect(self, _time):
+        _time.time.side_effect = [10.0, 12.5]
+        nested = Mock(children=[])
+        children = [
+            Mock(children=[nested]),
+            Mock(spec=['children'], children=[]),
+        ]
+        step = Mock(children=children)
+
+        # test
+        context = metrics.Metrics(None, step, 'sync', 'r1', 'remote-1')
+        with context:
+            pass
+        registry = context.collect(True)
+
+        # validation
+        key = (('remote_id', 'remote-1'), ('repo_id', 'r1'), ('step', 'sync'))
+        self.assertEqual(registry.gauge(metrics.DURATION).samples, {key: 2.5})
+        self.assertEqual(registry.gauge(metrics.SUCCESS).samples, {key: 1})
+        self.assertEqual(registry.gauge(metrics.TIMESTAMP).samples, {key: 12})
+        children[0].collect.assert_called_once_with(registry, context.labels)
+        nested.collect.assert_called_once_with(registry, context.labels)
+
+    def test_exit(self):
+        step = Mock(children=[])
+
+        # test
+        context = metrics.Metrics(self.tmp_dir, step, 'sync', 'r1')
+        with context:
+            pass
+
+        # validation
+        with open(context.path) as fp:
+            content = fp.read()
+        self.assertTrue('pulp_ostree_success{remote_id="",repo_id="r1",step="sync"} 1.0' in content)
+
+    def test_exit_failed(self):
+        step = Mock(children=[])
+
+        # test
+        context = metrics.Metrics(self.tmp_dir, step, 'sync', 'r1')
+        try:
+            with context:
+                raise ValueError()
+        except ValueError:
+            pass
+
+        # validation
+        with open(context.path) as fp:
+            content = fp.read()
+        self.assertTrue('pulp_ostree_success{remote_id="",repo_id="r1",step="sync"} 0.0' in content)
+
+    @patch(MODULE + '.Registry.write')
+    def test_exit_write_failed(self, write):
+        write.side_effect = OSError
+        context = metrics.Metrics(self.tmp_dir, Mock(children=[]), 'sync', 'r1')
+        with context:
+            pass
+
+    @patch(MODULE + '.Metrics.collect')
+    def test_disabled(self, collect):
+        with metrics.Metrics(None, Mock(), 'sync', 'r1'):
+            pass
+        self.assertFalse(collect.called)
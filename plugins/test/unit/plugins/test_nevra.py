@@ -0,0 +1,82 @@
+from unittest import TestCase
+
+from pulp_ostree.plugins.nevra import NEVRA, Constraint, compare_evr, parse_evr, rpmvercmp
+
+
+class TestRpmvercmp(TestCase):
+
+    def test_compare(self):
+        tests = [
+            ('1.0', '1.0', 0),
+            ('1.0', '2.0', -1),
+            ('2.0.1', '2.0', 1),
+            ('1.01', '1.1', 0),
+            ('10', '9', 1),
+            ('1.0a', '1.0', 1),
+            ('a', '1', -1),
+            ('1.0.2k', '1.0.2', 1),
+            ('fc4', 'fc.4', 0),
+        ]
+        for a, b, expected in tests:
+            self.assertEqual(rpmvercmp(a, b), expected, msg=(a, b))
+            self.assertEqual(rpmvercmp(b, a), -expected, msg=(b, a))
+
+    def test_tilde(self):
+        self.assertEqual(rpmvercmp('1.0~rc1', '1.0'), -1)
+        self.assertEqual(rpmvercmp('1.0~rc1', '1.0~rc2'), -1)
+
+    def test_caret(self):
+        self.assertEqual(rpmvercmp('1.0^', '1.0'), 1)
+        self.assertEqual(rpmvercmp('1.0^git1', '1.0.1'), -1)
+        self.assertEqual(rpmvercmp('1.0^', '1.0~'), 1)
+
+
+class TestEVR(TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_evr('1:1.0.2k-8.el7'), (1, '1.0.2k', '8.el7'))
+        self.assertEqual(parse_evr('1.0.2k'), (0, '1.0.2k', None))
+        self.assertRaises(ValueError, parse_evr, '1:')
+        self.assertRaises(ValueError, parse_evr, 'x:1.0')
+
+    def test_compare(self):
+        self.assertEqual(compare_evr((1, '1.0', '1'), (0, '2.0', '1')), 1)
+        self.assertEqual(compare_evr((0, '1.0', '1'), ('', '1.0', '2')), -1)
+        self.assertEqual(compare_evr((0, '1.0', '1'), (0, '1.0', None)), 0)
+
+
+class TestNEVRA(TestCase):
+
+    def test_str(self):
+        self.assertEqual(
+            str(NEVRA('openssl', '1', '1.0.2k', '8.el7', 'x86_64')),
+            'openssl-1:1.0.2k-8.el7.x86_64')
+        self.assertEqual(
+            str(NEVRA('bash', '', '4.3', '42', 'x86_64')),
+            'bash-4.3-42.x86_64')
+
+    def test_equal(self):
+        self.assertEqual(
+            NEVRA('bash', None, '4.3', '42', 'x86_64'),
+            NEVRA('bash', 0, '4.3', '42', 'x86_64'))
+        self.assertNotEqual(
+            NEVRA('bash', 0, '4.3', '42', 'x86_64'),
+            NEVRA('bash', 0, '4.3', '43', 'x86_64'))
+
+
+class TestConstraint(TestCase):
+
+    def test_parse(self):
+        constraint = Constraint.parse('>= 1:1.0.2k')
+        self.assertEqual(constraint.operator, '>=')
+        self.assertEqual(constraint.evr, (1, '1.0.2k', None))
+        self.assertEqual(Constraint.parse('1.0').operator, '=')
+
+    def test_call(self):
+        package = NEVRA('openssl', 1, '1.0.2k', '8.el7', 'x86_64')
+        self.assertTrue(Constraint.parse('>=1:1.0.2k')(package))
+        self.assertTrue(Constraint.parse('=1:1.0.2k')(package))
+        self.assertFalse(Constraint.parse('<1:1.0.2k-8.el7')(package))
+        self.assertTrue(Constraint.parse('<=1:1.0.2k-8.el7')(package))
+        self.assertTrue(Constraint.parse('>1.1')(package))
+        self.assertFalse(Constraint.parse('<1:1.0.2')(package))
@@ -0,0 +1,300 @@
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.plugins import packages
+from pulp_ostree.plugins.lib import LibError
+from pulp_ostree.plugins.nevra import NEVRA
+
+
+MODULE = 'pulp_ostree.plugins.packages'
+
+
+def package(commit, name, version, release='1', arch='x86_64', epoch=0):
+    _package = Mock(commit=commit, nevra=NEVRA(name, epoch, version, release, arch))
+    _package.name = name
+    _package.arch = arch
+    return _package
+
+
+class TestExtract(TestCase):
+
+    def test_from_metadata(self):
+        metadata = {
+            packages.PKGLIST: [
+                ('bash', '0', '4.3', '42', 'x86_64'),
+                ('openssl', '1', '1.0.2k', '8.el7', 'x86_64'),
+            ]
+        }
+        self.assertEqual(
+            packages.from_metadata(metadata),
+            [
+                NEVRA('bash', 0, '4.3', '42', 'x86_64'),
+                NEVRA('openssl', 1, '1.0.2k', '8.el7', 'x86_64'),
+            ])
+        self.assertEqual(packages.from_metadata({}), None)
+
+    @patch(MODULE + '.rpm', None)
+    def test_from_rpmdb_no_rpm(self):
+        repository = Mock()
+        self.assertEqual(packages.from_rpmdb(repository, 'commit-1'), None)
+        self.assertFalse(repository.export.called)
+
+    @patch(MODULE + '.shutil.rmtree')
+    @patch(MODULE + '.mkdtemp')
+    @patch(MODULE + '.read_rpmdb')
+    @patch(MODULE + '.rpm', Mock())
+    def test_from_rpmdb(self, read_rpmdb, mkdtemp, rmtree):
+        repository = Mock(path='/tmp/repo-1')
+        repository.export.side_effect = [None, ['Packages']]
+
+        # test
+        found = packages.from_rpmdb(repository, 'commit-1')
+
+        # validation
+        mkdtemp.assert_called_once_with(dir='/tmp/repo-1/tmp')
+        self.assertEqual(found, read_rpmdb.return_value)
+        self.assertEqual(
+            [c[0][1:] for c in repository.export.call_args_list],
+            [(p, mkdtemp.return_value) for p in packages.RPMDB_PATHS])
+        rmtree.assert_called_once_with(mkdtemp.return_value, ignore_errors=True)
+
+    @patch(MODULE + '.shutil.rmtree', Mock())
+    @patch(MODULE + '.mkdtemp', Mock())
+    @patch(MODULE + '.read_rpmdb')
+    @patch(MODULE + '.rpm', Mock())
+    def test_from_rpmdb_not_found(self, read_rpmdb):
+        repository = Mock(path='/tmp/repo-1')
+        repository.export.return_value = None
+        self.assertEqual(packages.from_rpmdb(repository, 'commit-1'), [])
+        self.assertEqual(repository.export.call_count, len(packages.RPMDB_PATHS))
+        self.assertFalse(read_rpmdb.called)
+
+    @patch(MODULE + '.shutil.rmtree')
+    @patch(MODULE + '.mkdtemp', Mock())
+    @patch(MODULE + '.read_rpmdb')
+    @patch(MODULE + '.rpm', Mock())
+    def test_from_rpmdb_export_failed(self, read_rpmdb, rmtree):
+        repository = Mock(path='/tmp/repo-1')
+        repository.export.side_effect = LibError()
+        self.assertEqual(packages.from_rpmdb(repository, 'commit-1'), None)
+        self.assertEqual(repository.export.call_count, 1)
+        self.assertFalse(read_rpmdb.called)
+        self.assertTrue(rmtree.called)
+
+    @patch(MODULE + '.rpm')
+    def test_read_rpmdb(self, rpm):
+        headers = [
+            dict(name='bash', epoch=None, version='4.3', release='42', arch='x86_64'),
+            dict(name='gpg-pubkey', epoch=None, version='f4a80eb5', release='53a7ff4b', arch=None),
+        ]
+        rpm.TransactionSet.return_value.dbMatch.return_value = headers
+
+        # test
+        found = packages.read_rpmdb('/tmp/rpm')
+
+        # validation
+        self.assertEqual(found, [NEVRA('bash', 0, '4.3', '42', 'x86_64')])
+        rpm.addMacro.assert_called_once_with('_dbpath', '/tmp/rpm')
+        rpm.delMacro.assert_called_once_with('_dbpath')
+
+    @patch(MODULE + '.rpm')
+    def test_read_rpmdb_failed(self, rpm):
+        rpm.error = ValueError
+        rpm.TransactionSet.return_value.dbMatch.side_effect = ValueError()
+        self.assertEqual(packages.read_rpmdb('/tmp/rpm'), None)
+        rpm.delMacro.assert_called_once_with('_dbpath')
+
+
+class TestIndex(TestCase):
+
+    @patch(MODULE + '.model')
+    def test_index(self, model):
+        model.PackageIndex.objects.return_value.first.return_value = None
+        model.Package.objects.return_value.count.return_value = 0
+        metadata = {packages.PKGLIST: [('bash', '0', '4.3', '42', 'x86_64')]}
+
+        # test
+        indexed = packages.index(Mock(), 'commit-1', metadata)
+
+        # validation
+        self.assertEqual(indexed, 1)
+        model.Package.assert_called_once_with(
+            commit='commit-1', name='bash', epoch=0, version='4.3', release='42', arch='x86_64')
+        model.Package.objects.insert.assert_called_once_with(
+            [model.Package.return_value], load_bulk=False)
+        model.PackageIndex.assert_called_once_with(commit='commit-1', packages=1)
+        model.PackageIndex.return_value.save.assert_called_once_with()
+
+    @patch(MODULE + '.from_rpmdb')
+    @patch(MODULE + '.model')
+    def test_index_rpmdb(self, model, from_rpmdb):
+        model.PackageIndex.objects.return_value.first.return_value = None
+        model.Package.objects.return_value.count.return_value = 0
+        from_rpmdb.return_value = []
+        repository = Mock()
+
+        # test
+        indexed = packages.index(repository, 'commit-1', {})
+
+        # validation
+        self.assertEqual(indexed, 0)
+        from_rpmdb.assert_called_once_with(repository, 'commit-1')
+        self.assertFalse(model.Package.objects.insert.called)
+        model.PackageIndex.assert_called_once_with(commit='commit-1', packages=0)
+        model.PackageIndex.return_value.save.assert_called_once_with()
+
+    @patch(MODULE + '.from_rpmdb')
+    @patch(MODULE + '.model')
+    def test_index_not_read(self, model, from_rpmdb):
+        model.PackageIndex.objects.return_value.first.return_value = None
+        model.Package.objects.return_value.count.return_value = 0
+        from_rpmdb.return_value = None
+
+        # test
+        indexed = packages.index(Mock(), 'commit-1', {})
+
+        # validation
+        self.assertEqual(indexed, 0)
+        self.assertFalse(model.Package.objects.insert.called)
+        self.assertFalse(model.PackageIndex.called)
+
+    @patch(MODULE + '.from_rpmdb')
+    @patch(MODULE + '.model')
+    def test_index_partial(self, model, from_rpmdb):
+        model.PackageIndex.objects.return_value.first.return_value = None
+        model.Package.objects.return_value.count.return_value = 0
+
+        # test
+        indexed = packages.index(Mock(), 'commit-1', {}, partial=True)
+
+        # validation
+        self.assertEqual(indexed, 0)
+        self.assertFalse(from_rpmdb.called)
+        self.assertFalse(model.PackageIndex.called)
+
+    @patch(MODULE + '.model')
+    def test_index_partial_metadata(self, model):
+        model.PackageIndex.objects.return_value.first.return_value = None
+        model.Package.objects.return_value.count.return_value = 0
+        metadata = {packages.PKGLIST: [('bash', '0', '4.3', '42', 'x86_64')]}
+
+        # test
+        indexed = packages.index(Mock(), 'commit-1', metadata, partial=True)
+
+        # validation
+        self.assertEqual(indexed, 1)
+        model.PackageIndex.assert_called_once_with(commit='commit-1', packages=1)
+
+    @patch(MODULE + '.from_rpmdb')
+    @patch(MODULE + '.model')
+    def test_index_indexed(self, model, from_rpmdb):
+        self.assertEqual(packages.index(Mock(), 'commit-1', {}), 0)
+        model.PackageIndex.objects.assert_called_once_with(commit='commit-1')
+        self.assertFalse(model.Package.objects.called)
+        self.assertFalse(from_rpmdb.called)
+
+    @patch(MODULE + '.from_rpmdb')
+    @patch(MODULE + '.model')
+    def test_index_not_recorded(self, model, from_rpmdb):
+        model.PackageIndex.objects.return_value.first.return_value = None
+        model.Package.objects.return_value.count.return_value = 3
+
+        # test
+        indexed = packages.index(Mock(), 'commit-1', {})
+
+        # validation
+        self.assertEqual(indexed, 0)
+        model.Package.objects.assert_called_once_with(commit='commit-1')
+        model.PackageIndex.assert_called_once_with(commit='commit-1', packages=3)
+        self.assertFalse(model.Package.objects.insert.called)
+        self.assertFalse(from_rpmdb.called)
+
+
+class TestSearch(TestCase):
+
+    @patch(MODULE + '.get_unit_model_querysets')
+    @patch(MODULE + '.model')
+    def test_search(self, model, querysets):
+        model.Package.objects.return_value = [
+            package('commit-1', 'openssl', '1.0.2j'),
+            package('commit-2', 'openssl', '1.0.2k'),
+            package('commit-3', 'openssl', '1.1.0'),
+        ]
+        units = [
+            Mock(created=2, branch='b1', commit='commit-2', commit_metadata={'version': '7.3'}),
+            Mock(created=3, branch='b1', commit='commit-3', commit_metadata={}),
+        ]
+        querysets.return_value = [Mock(filter=Mock(return_value=units))]
+
+        # test
+        found = packages.search('openssl', ['>=1.0.2k'], 'repo-1')
+
+        # validation
+        model.Package.objects.assert_called_once_with(name='openssl')
+        querysets.assert_called_once_with('repo-1', model.Branch)
+        self.assertEqual(
+            sorted(querysets.return_value[0].filter.call_args[1]['commit__in']),
+            ['commit-2', 'commit-3'])
+        self.assertEqual(
+            found,
+            [
+                dict(created=2, branch='b1', commit='commit-2', version='7.3',
+                     package='openssl-1.0.2k-1.x86_64'),
+                dict(created=3, branch='b1', commit='commit-3', version=None,
+                     package='openssl-1.1.0-1.x86_64'),
+            ])
+
+    @patch(MODULE + '.model')
+    def test_diff(self, model):
+        model.Package.objects.side_effect = [
+            [
+                package('commit-1', 'bash', '4.3'),
+                package('commit-1', 'openssl', '1.0.2j'),
+                package('commit-1', 'vim', '8.0'),
+            ],
+            [
+                package('commit-2', 'bash', '4.3'),
+                package('commit-2', 'openssl', '1.0.2k'),
+                package('commit-2', 'zsh', '5.2'),
+            ],
+        ]
+
+        # test
+        changes = packages.diff('commit-1', 'commit-2')
+
+        # validation
+        self.assertEqual(
+            changes,
+            dict(
+                added=['zsh-5.2-1.x86_64'],
+                removed=['vim-8.0-1.x86_64'],
+                changed=[('openssl-1.0.2j-1.x86_64', 'openssl-1.0.2k-1.x86_64')]))
+
+
+class TestMain(TestCase):
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection')
+    @patch(MODULE + '.search')
+    def test_search(self, search, connection):
+        search.return_value = []
+        code = packages.main(['search', 'openssl', '--version', '>=1.0.2k', '--repo-id', 'r1'])
+        self.assertEqual(code, 0)
+        connection.initialize.assert_called_once_with()
+        search.assert_called_once_with('openssl', ['>=1.0.2k'], 'r1')
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection', Mock())
+    @patch(MODULE + '.search')
+    def test_search_invalid(self, search):
+        search.side_effect = ValueError()
+        self.assertEqual(packages.main(['search', 'openssl', '--version', '>=']), 1)
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.connection', Mock())
+    @patch(MODULE + '.diff')
+    def test_diff(self, diff):
+        diff.return_value = dict(added=['a'], removed=['b'], changed=[('c-1', 'c-2')])
+        self.assertEqual(packages.main(['diff', 'commit-1', 'commit-2']), 0)
+        diff.assert_called_once_with('commit-1', 'commit-2')
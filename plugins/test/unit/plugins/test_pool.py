@@ -0,0 +1,215 @@
+import errno
+import os
+import shutil
+import time
+
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.plugins import pool
+from pulp_ostree.plugins.pool import ObjectPool, Summary
+
+
+MODULE = 'pulp_ostree.plugins.pool'
+
+
+def write(path, content):
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError:
+        pass
+    with open(path, 'w') as fp:
+        fp.write(content)
+
+
+class TestSummary(TestCase):
+
+    def test_update(self):
+        summary = Summary()
+        other = Summary()
+        other.objects = 3
+        other.bytes = 10
+        summary.update(other)
+        summary.update(other)
+        self.assertEqual(
+            summary.dict(),
+            dict(objects=6, linked=0, added=0, skipped=0, bytes=20))
+
+
+class TestObjectPool(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.root = os.path.join(self.tmp_dir, 'ostree')
+        self.repo_1 = os.path.join(self.root, '1', 'content')
+        self.repo_2 = os.path.join(self.root, '2', 'content')
+        write(os.path.join(self.repo_1, 'objects', 'ab', 'cdef.filez'), 'shared')
+        write(os.path.join(self.repo_1, 'objects', '12', '3456.commit'), 'commit-1')
+        write(os.path.join(self.repo_2, 'objects', 'ab', 'cdef.filez'), 'shared')
+        write(os.path.join(self.repo_2, 'objects', '78', '9012.commit'), 'commit-2')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def inode(self, path):
+        return os.stat(path).st_ino
+
+    def test_find(self):
+        _pool = ObjectPool.find(self.repo_1)
+        self.assertEqual(_pool.path, os.path.join(self.root, 'pool'))
+
+    def test_add(self):
+        _pool = ObjectPool.find(self.repo_1)
+
+        # test
+        summary_1 = _pool.add(self.repo_1)
+        summary_2 = _pool.add(self.repo_2)
+        summary_3 = _pool.add(self.repo_2)
+
+        # validation
+        self.assertEqual(
+            summary_1.dict(),
+            dict(objects=2, linked=0, added=2, skipped=0, bytes=0))
+        self.assertEqual(
+            summary_2.dict(),
+            dict(objects=2, linked=1, added=1, skipped=0, bytes=6))
+        self.assertEqual(
+            summary_3.dict(),
+            dict(objects=2, linked=0, added=0, skipped=0, bytes=0))
+        shared = os.path.join('objects', 'ab', 'cdef.filez')
+        self.assertEqual(
+            self.inode(os.path.join(self.repo_1, shared)),
+            self.inode(os.path.join(self.repo_2, shared)))
+        self.assertEqual(
+            self.inode(os.path.join(self.repo_1, shared)),
+            self.inode(os.path.join(_pool.path, shared)))
+        self.assertEqual(
+            list(ObjectPool.objects(os.path.join(_pool.path, 'objects'))),
+            [
+                os.path.join(_pool.path, 'objects', '12', '3456.commit'),
+                os.path.join(_pool.path, 'objects', '78', '9012.commit'),
+                os.path.join(_pool.path, shared),
+            ])
+
+    def test_add_incremental(self):
+        _pool = ObjectPool.find(self.repo_1)
+        stamp = os.path.join(self.repo_1, pool.STAMP)
+
+        # test
+        self.assertEqual(_pool.pooled(self.repo_1), None)
+        summary_1 = _pool.add(self.repo_1, incremental=True)
+        future = time.time() + 100
+        os.utime(stamp, (future, future))
+        summary_2 = _pool.add(self.repo_1, incremental=True)
+        os.utime(stamp, (0, 0))
+        summary_3 = _pool.add(self.repo_1, incremental=True)
+
+        # validation
+        self.assertEqual(summary_1.objects, 2)
+        self.assertEqual(summary_1.added, 2)
+        self.assertEqual(summary_2.objects, 0)
+        self.assertEqual(summary_3.objects, 2)
+        self.assertEqual(summary_3.added, 0)
+        self.assertTrue(os.stat(stamp).st_mtime > 0)
+
+    def test_add_stamp(self):
+        _pool = ObjectPool.find(self.repo_1)
+        started = time.time()
+        _pool.add(self.repo_1)
+        pooled = _pool.pooled(self.repo_1)
+        self.assertTrue(started - pool.SLACK - 1 <= pooled <= started)
+
+    def test_objects_since(self):
+        objects = os.path.join(self.repo_1, 'objects')
+        since = time.time() + 100
+        os.utime(os.path.join(objects, 'ab'), (since, since))
+        self.assertEqual(list(ObjectPool.objects(objects, since)), [])
+        self.assertEqual(len(list(ObjectPool.objects(objects, 0))), 2)
+
+    @patch(MODULE + '.os.link')
+    def test_add_other_filesystem(self, link):
+        link.side_effect = OSError(errno.EXDEV, 'cross-device')
+        _pool = ObjectPool.find(self.repo_1)
+        summary = _pool.add(self.repo_1)
+        self.assertEqual(summary.skipped, 2)
+
+    @patch(MODULE + '.os.link')
+    def test_add_failed(self, link):
+        link.side_effect = OSError(errno.EACCES, 'denied')
+        _pool = ObjectPool.find(self.repo_1)
+        self.assertRaises(OSError, _pool.add, self.repo_1)
+
+    def test_prune(self):
+        _pool = ObjectPool.find(self.repo_1)
+        _pool.add(self.repo_1)
+        _pool.add(self.repo_2)
+        shutil.rmtree(self.repo_2)
+
+        # test
+        removed = _pool.prune()
+
+        # validation
+        self.assertEqual(removed, 1)
+        shutil.rmtree(self.repo_1)
+        self.assertEqual(_pool.prune(), 2)
+        self.assertEqual(list(ObjectPool.objects(os.path.join(_pool.path, 'objects'))), [])
+
+    def test_objects_tmp(self):
+        path = os.path.join(self.repo_1, 'objects', 'ab', 'cdef.filez' + pool.TMP)
+        write(path, 'partial')
+        objects = list(ObjectPool.objects(os.path.join(self.repo_1, 'objects')))
+        self.assertFalse(path in objects)
+        self.assertEqual(len(objects), 2)
+
+
+class TestMigration(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_repositories(self):
+        os.makedirs(os.path.join(self.tmp_dir, '2', 'content', 'objects'))
+        os.makedirs(os.path.join(self.tmp_dir, '1', 'content', 'objects'))
+        os.makedirs(os.path.join(self.tmp_dir, '3', 'content'))
+        os.makedirs(os.path.join(self.tmp_dir, 'pool', 'objects'))
+        self.assertEqual(
+            pool.repositories(self.tmp_dir),
+            [
+                os.path.join(self.tmp_dir, '1', 'content'),
+                os.path.join(self.tmp_dir, '2', 'content'),
+            ])
+
+    @patch(MODULE + '.ObjectPool')
+    def test_migrate(self, _pool):
+        repository, summary = pool.migrate(('/tmp/pool', '/tmp/1/content'))
+        _pool.assert_called_once_with('/tmp/pool')
+        _pool.return_value.add.assert_called_once_with('/tmp/1/content')
+        self.assertEqual(repository, '/tmp/1/content')
+        self.assertEqual(summary, _pool.return_value.add.return_value)
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.ObjectPool.prune')
+    @patch(MODULE + '.Workers')
+    def test_main(self, workers, prune):
+        os.makedirs(os.path.join(self.tmp_dir, '1', 'content', 'objects'))
+        summary = Summary()
+        summary.objects = 5
+        workers.return_value.imap_unordered.return_value = [('/tmp/1/content', summary)]
+
+        # test
+        code = pool.main(['--root', self.tmp_dir, '--processes', '2', '--prune'])
+
+        # validation
+        self.assertEqual(code, 0)
+        workers.assert_called_once_with(2)
+        workers.return_value.imap_unordered.assert_called_once_with(
+            pool.migrate,
+            [(os.path.join(self.tmp_dir, 'pool'), os.path.join(self.tmp_dir, '1', 'content'))])
+        workers.return_value.close.assert_called_once_with()
+        workers.return_value.join.assert_called_once_with()
+        prune.assert_called_once_with()
@@ -0,0 +1,395 @@
+import os
+import shutil
+import threading
+import time
+
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.plugins import service
+from pulp_ostree.plugins.lib import LibError, Ref
+
+
+MODULE = 'pulp_ostree.plugins.service'
+
+
+class Report(object):
+
+    def __init__(self, fetched, requested):
+        self.fetched = fetched
+        self.requested = requested
+
+
+class TestEncoding(TestCase):
+
+    def test_ref(self):
+        ref = Ref('branch-1', 'commit-1', {'version': '1'})
+        decoded = service.decode(service.encode([ref]))
+        self.assertEqual([r.dict() for r in decoded], [ref.dict()])
+
+    def test_objects(self):
+        objects = {('abc', 1): 10, ('def', 4): 20}
+        self.assertEqual(service.decode(service.encode(objects)), objects)
+
+    def test_plain(self):
+        result = {'a': [1, 2, {'b': None}], 'c': True}
+        self.assertEqual(service.decode(service.encode(result)), result)
+
+
+class TestService(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'ostree.sock')
+        self.patchers = [
+            patch(MODULE + '.lib.Lib'),
+            patch(MODULE + '.lib.Repository'),
+            patch(MODULE + '.lib.Remote'),
+            patch(MODULE + '.lib.Summary'),
+        ]
+        self.lib, self.repository, self.remote, self.summary = \
+            [p.start() for p in self.patchers]
+        self.service = service.Service(self.path, roots=['/tmp'])
+        self.thread = threading.Thread(target=self.service.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+        self.thread.start()
+        self.library = service.Library(self.path)
+
+    def tearDown(self):
+        self.service.shutdown()
+        self.service.server_close()
+        for p in self.patchers:
+            p.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_list_refs(self):
+        ref = Ref('branch-1', 'commit-1', {})
+        self.repository.return_value.list_refs.return_value = [ref]
+
+        # test
+        repository = self.library.Repository('/tmp/repo-1')
+        refs = repository.list_refs()
+
+        # validation
+        self.repository.assert_called_once_with('/tmp/repo-1')
+        self.assertEqual([r.dict() for r in refs], [ref.dict()])
+        self.assertEqual(self.service.handles.keys(), [(repository.session, '/tmp/repo-1')])
+
+    def test_refs(self):
+        self.repository.return_value.refs.return_value = {'branch-1': 'commit-1'}
+        repository = self.library.Repository('/tmp/repo-1')
+        self.assertEqual(repository.refs(), {'branch-1': 'commit-1'})
+
+    def test_handle_reused(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        repository.open()
+        repository.partial('commit-1')
+        other = self.library.Repository('/tmp/repo-1')
+        other.open()
+        self.assertEqual(self.repository.call_count, 2)
+        self.assertEqual(len(self.service.handles), 2)
+
+    def test_history(self):
+        self.repository.return_value.parent.return_value = 'commit-1'
+        self.repository.return_value.has_commit.return_value = True
+
+        # test
+        repository = self.library.Repository('/tmp/repo-1')
+        parent = repository.parent('commit-2')
+        found = repository.has_commit('commit-1')
+
+        # validation
+        self.repository.return_value.parent.assert_called_once_with('commit-2')
+        self.repository.return_value.has_commit.assert_called_once_with('commit-1')
+        self.assertEqual(parent, 'commit-1')
+        self.assertTrue(found)
+
+    def test_export(self):
+        self.repository.return_value.export.return_value = True
+
+        # test
+        repository = self.library.Repository('/tmp/repo-1')
+        exported = repository.export('commit-1', '/usr/share/rpm', '/tmp/rpmdb')
+
+        # validation
+        self.repository.return_value.export.assert_called_once_with(
+            'commit-1', '/usr/share/rpm', '/tmp/rpmdb')
+        self.assertTrue(exported)
+
+    def test_diff(self):
+        self.repository.return_value.diff.return_value = [('A', '/usr/bin/ls')]
+
+        # test
+        repository = self.library.Repository('/tmp/repo-1')
+        changes = repository.diff('commit-1', 'commit-2')
+
+        # validation
+        self.repository.return_value.diff.assert_called_once_with('commit-1', 'commit-2')
+        self.assertEqual(changes, [['A', '/usr/bin/ls']])
+
+    def test_generate_delta(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        repository.generate_delta('commit-1', 'commit-2', {'max-chunk-size': 32})
+        self.repository.return_value.generate_delta.assert_called_once_with(
+            'commit-1', 'commit-2', {'max-chunk-size': 32})
+
+    def test_proxied(self):
+        for method in service.METHODS[service.REPOSITORY]:
+            self.assertTrue(hasattr(service.Repository, method), msg=method)
+        for method in service.METHODS[service.REMOTE]:
+            self.assertTrue(hasattr(service.Remote, method), msg=method)
+        for method in service.METHODS[service.SUMMARY]:
+            self.assertTrue(hasattr(service.Summary, method), msg=method)
+        for method in service.METHODS[service.TRANSACTION]:
+            self.assertTrue(hasattr(service.Transaction, method), msg=method)
+
+    def test_close(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        repository.open()
+        repository.close()
+        self.repository.return_value.close.assert_called_once_with()
+        self.assertEqual(self.service.handles, {})
+
+    def test_pull(self):
+        listener = Mock()
+
+        def pull(remote_id, refs, _listener, depth, **kwargs):
+            _listener(Report(1, 2))
+            _listener(Report(2, 2))
+
+        self.repository.return_value.pull.side_effect = pull
+
+        # test
+        repository = self.library.Repository('/tmp/repo-1')
+        repository.pull('remote-1', ['branch-1'], listener, 3, max_speed=10)
+
+        # validation
+        self.assertEqual(
+            [(c[0][0].fetched, c[0][0].requested) for c in listener.call_args_list],
+            [(1, 2), (2, 2)])
+        pulled = self.repository.return_value.pull.call_args
+        self.assertEqual(pulled[0][:2], ('remote-1', ['branch-1']))
+        self.assertEqual(pulled[0][3], 3)
+        self.assertEqual(pulled[1], dict(max_speed=10))
+        self.assertEqual(
+            self.repository.return_value.cancellable, None)
+
+    def test_cancel(self):
+        cancelled = threading.Event()
+        self.lib.return_value.Gio.Cancellable.new.return_value = Mock(cancel=cancelled.set)
+
+        def pull(remote_id, refs, _listener):
+            _listener(Report(1, 2))
+            cancelled.wait(5)
+
+        self.repository.return_value.pull.side_effect = pull
+        listener = Mock(side_effect=KeyboardInterrupt)
+
+        # test
+        repository = self.library.Repository('/tmp/repo-1')
+        self.assertRaises(KeyboardInterrupt, repository.pull, 'remote-1', None, listener)
+
+        # validation
+        self.assertTrue(cancelled.wait(5))
+
+    def test_failed(self):
+        self.repository.return_value.open.side_effect = ValueError('failed')
+        repository = self.library.Repository('/tmp/repo-1')
+        self.assertRaises(LibError, repository.open)
+
+    def test_not_supported(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        self.assertRaises(LibError, repository.call, service.REPOSITORY, 'impl')
+
+    def test_remote(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        remote = self.library.Remote('remote-1', repository)
+        remote.url = 'http://example.com/repo'
+        remote.http2 = False
+
+        # test
+        remote.add()
+
+        # validation
+        self.remote.assert_called_once_with('remote-1', self.repository.return_value)
+        self.assertEqual(self.remote.return_value.url, 'http://example.com/repo')
+        self.assertEqual(self.remote.return_value.http2, False)
+        self.remote.return_value.add.assert_called_once_with()
+
+    def test_remote_list(self):
+        self.remote.list.return_value = ['remote-1']
+        repository = self.library.Repository('/tmp/repo-1')
+        self.assertEqual(self.library.Remote.list(repository), ['remote-1'])
+        self.remote.list.assert_called_once_with(self.repository.return_value)
+
+    def test_summary(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        self.library.Summary(repository).generate()
+        self.summary.assert_called_once_with(self.repository.return_value)
+        self.summary.return_value.generate.assert_called_once_with()
+
+    @patch(MODULE + '.lib.Transaction')
+    def test_transaction(self, transaction):
+        repository = self.library.Repository('/tmp/repo-1')
+
+        # test
+        with repository.transaction() as _transaction:
+            _transaction.set_refs({'branch-1': 'commit-1'})
+
+        # validation
+        impl = transaction.return_value
+        impl.prepare.assert_called_once_with()
+        impl.set_refs.assert_called_once_with({'branch-1': 'commit-1'})
+        impl.commit.assert_called_once_with()
+
+    def test_expire(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        repository.open()
+        for handle in self.service.handles.values():
+            handle.used = 0
+        self.service.expire()
+        self.assertEqual(self.service.handles, {})
+        self.repository.return_value.close.assert_called_once_with()
+
+    @patch(MODULE + '.lib.Transaction', Mock())
+    def test_expire_prepared(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        transaction = repository.transaction()
+        transaction.prepare()
+        for handle in self.service.handles.values():
+            handle.used = time.time() - service.IDLE - 10
+
+        # test
+        self.service.expire()
+
+        # validation
+        self.assertEqual(len(self.service.handles), 1)
+        self.assertFalse(self.repository.return_value.close.called)
+        transaction.commit()
+        for handle in self.service.handles.values():
+            handle.used = 0
+        self.service.expire()
+        self.assertEqual(self.service.handles, {})
+
+    @patch(MODULE + '.lib.Transaction')
+    def test_expire_prepared_abandoned(self, fake_transaction):
+        repository = self.library.Repository('/tmp/repo-1')
+        repository.transaction().prepare()
+        handle = self.service.handles.values()[0]
+        handle.used = time.time() - service.PREPARED_IDLE - 10
+
+        # test
+        self.service.expire()
+
+        # validation
+        fake_transaction.return_value.abort.assert_called_once_with()
+        self.repository.return_value.close.assert_called_once_with()
+        self.assertFalse(handle.prepared)
+        self.assertEqual(self.service.handles, {})
+
+    def test_expire_in_use(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        repository.open()
+        handle = self.service.handles.values()[0]
+        handle.used = 0
+        handle.lock.acquire()
+        try:
+            self.service.expire()
+        finally:
+            handle.lock.release()
+        self.assertEqual(len(self.service.handles), 1)
+        self.assertFalse(self.repository.return_value.close.called)
+
+    def test_path_not_allowed(self):
+        for path in ('/etc/repo-1', '/tmp/../etc/repo-1', 'repo-1'):
+            repository = self.library.Repository(path)
+            self.assertRaises(LibError, repository.open)
+        self.assertFalse(self.repository.called)
+
+    def test_argument_not_allowed(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        self.assertRaises(LibError, repository.pull_local, '/etc', ['branch-1'])
+        self.assertRaises(LibError, repository.export, 'commit-1', '/usr', '/etc/usr')
+        self.assertFalse(self.repository.return_value.pull_local.called)
+        self.assertFalse(self.repository.return_value.export.called)
+
+    def test_remote_not_allowed(self):
+        repository = self.library.Repository('/tmp/repo-1')
+        remote = self.library.Remote('remote-1', repository)
+        remote.url = 'file:///etc/repo'
+        self.assertRaises(LibError, remote.add)
+        remote.url = 'http://example.com/repo'
+        remote.ssl_key_path = '/etc/pki/key.pem'
+        self.assertRaises(LibError, remote.add)
+        self.assertFalse(self.remote.called)
+
+    def test_read_only(self):
+        self.service.methods = service.READ_ONLY_METHODS
+        self.repository.return_value.list_refs.return_value = []
+        repository = self.library.Repository('/tmp/repo-1')
+        self.assertEqual(repository.list_refs(), [])
+        self.assertRaises(LibError, repository.create)
+        self.assertRaises(LibError, repository.pull, 'remote-1', None, None)
+        self.assertRaises(LibError, repository.transaction().prepare)
+        self.assertFalse(self.repository.return_value.create.called)
+
+
+class TestClient(TestCase):
+
+    def test_not_running(self):
+        client = service.Client('/tmp/none/ostree.sock')
+        self.assertRaises(LibError, client.call, {})
+
+    def test_listener_failed(self):
+        rfile = Mock()
+        rfile.readline.side_effect = ['{"progress": {"fetched": 1}}\n']
+        listener = Mock(side_effect=KeyboardInterrupt)
+        self.assertRaises(KeyboardInterrupt, service.Client._read, rfile, listener)
+
+    def test_closed(self):
+        rfile = Mock()
+        rfile.readline.return_value = ''
+        self.assertRaises(LibError, service.Client._read, rfile, None)
+
+
+class TestAllowed(TestCase):
+
+    @patch('os.path.realpath', lambda path: path.replace('/link', '/storage'))
+    def test_allowed(self):
+        server = Mock(roots=['/storage'])
+        self.assertTrue(service.Service.allowed.__func__(server, '/storage/ostree/1'))
+        self.assertTrue(service.Service.allowed.__func__(server, '/link/ostree/1'))
+        self.assertFalse(service.Service.allowed.__func__(server, '/storage2/ostree/1'))
+        self.assertFalse(service.Service.allowed.__func__(server, None))
+
+
+class TestMain(TestCase):
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.os.unlink')
+    @patch(MODULE + '.Service')
+    def test_main(self, _service, unlink):
+        _service.return_value.serve_forever.side_effect = KeyboardInterrupt
+
+        # test
+        code = service.main(['--socket', '/tmp/ostree.sock'])
+
+        # validation
+        self.assertEqual(code, 0)
+        _service.assert_called_once_with('/tmp/ostree.sock', service.DEFAULT_ROOTS, False)
+        _service.return_value.server_close.assert_called_once_with()
+        unlink.assert_called_once_with('/tmp/ostree.sock')
+
+    @patch(MODULE + '.basicConfig', Mock())
+    @patch(MODULE + '.os.unlink', Mock())
+    @patch(MODULE + '.Service')
+    def test_main_options(self, _service):
+        _service.return_value.serve_forever.side_effect = KeyboardInterrupt
+
+        # test
+        service.main(['--root', '/srv/ostree', '--root', '/srv/pub', '--read-only'])
+
+        # validation
+        _service.assert_called_once_with(service.DEFAULT_PATH, ['/srv/ostree', '/srv/pub'], True)
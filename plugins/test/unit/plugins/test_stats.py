@@ -0,0 +1,218 @@
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.common import constants
+from pulp_ostree.plugins import stats
+from pulp_ostree.plugins.lib import LibError
+
+
+MODULE = 'pulp_ostree.plugins.stats'
+
+
+class TestStorage(TestCase):
+
+    @patch(MODULE + '.lib')
+    def test_init(self, lib):
+        refs = {'b1': 'c1', 'b2': 'c2'}
+        lib.Repository.return_value.refs.return_value = refs
+
+        # test
+        storage = stats.Storage('remote-1', '/tmp/path')
+
+        # validation
+        lib.Repository.assert_called_once_with('/tmp/path')
+        self.assertEqual(storage.remote_id, 'remote-1')
+        self.assertEqual(storage.repository, lib.Repository.return_value)
+        self.assertEqual(storage.refs, {'b1': 'c1', 'b2': 'c2'})
+        self.assertEqual(storage.cache, {})
+
+    @patch(MODULE + '.lib')
+    def test_reachable(self, lib):
+        lib.Repository.return_value.refs.return_value = {}
+        storage = stats.Storage('', '')
+        storage.objects = Mock(side_effect=[
+            {('a', 1): 10, ('b', 2): 20},
+            {('b', 2): 20, ('c', 3): 30},
+        ])
+
+        # test
+        reachable = storage.reachable(['c1', 'c2'])
+
+        # validation
+        self.assertEqual(storage.objects.call_args_list, [(('c1',), {}), (('c2',), {})])
+        self.assertEqual(reachable, {('a', 1): 10, ('b', 2): 20, ('c', 3): 30})
+
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.lib')
+    def test_objects(self, lib, model):
+        objects = {('a', 1): 10}
+        lib.Repository.return_value.refs.return_value = {}
+        model.CommitObjects.objects.return_value.first.return_value = None
+        storage = stats.Storage('', '')
+        storage.repository.traverse.return_value = objects
+
+        # test
+        self.assertEqual(storage.objects('c1'), objects)
+        self.assertEqual(storage.objects('c1'), objects)
+
+        # validation
+        storage.repository.traverse.assert_called_once_with('c1')
+        model.CommitObjects.objects.assert_called_once_with(commit='c1')
+        model.CommitObjects.store.assert_called_once_with('c1', objects)
+        self.assertEqual(storage.cache, {'c1': objects})
+
+    @patch(MODULE + '.model')
+    @patch(MODULE + '.lib')
+    def test_objects_stored(self, lib, model):
+        lib.Repository.return_value.refs.return_value = {}
+        document = model.CommitObjects.objects.return_value.first.return_value
+        storage = stats.Storage('', '')
+
+        # test
+        objects = storage.objects('c1')
+
+        # validation
+        self.assertEqual(objects, document.load.return_value)
+        self.assertFalse(storage.repository.traverse.called)
+        self.assertFalse(model.CommitObjects.store.called)
+
+    @patch(MODULE + '.lib')
+    def test_fingerprint(self, lib):
+        lib.Repository.return_value.refs.return_value = {'b1': 'c1'}
+        storage = stats.Storage('', '')
+        digest = storage.fingerprint()
+        self.assertEqual(digest, storage.fingerprint())
+        storage.refs['b2'] = 'c2'
+        self.assertNotEqual(digest, storage.fingerprint())
+
+
+class TestHeads(TestCase):
+
+    def test_heads(self):
+        units = [
+            Mock(branch='b2', created=3),
+            Mock(branch='b1', created=2),
+            Mock(branch='b1', created=1),
+        ]
+        self.assertEqual(stats.heads(units), [units[1], units[0]])
+
+
+class TestFingerprint(TestCase):
+
+    def test_changed(self):
+        units = [Mock(remote_id='r1', branch='b1', commit='c1')]
+        storage = {'r1': Mock(refs={'b1': 'c1'})}
+        digest = stats.fingerprint(units, storage)
+        self.assertEqual(digest, stats.fingerprint(units, storage))
+        storage['r1'].refs['b2'] = 'c2'
+        self.assertNotEqual(digest, stats.fingerprint(units, storage))
+
+
+class TestUpdate(TestCase):
+
+    @patch(MODULE + '.Storage')
+    def test_update(self, storage):
+        units = [
+            Mock(remote_id='r1', branch='b1', commit='c1', storage_path='p1', created=1),
+            Mock(remote_id='r1', branch='b2', commit='c2', storage_path='p1', created=2),
+        ]
+        st = Mock(refs={'b1': 'c1', 'b2': 'c2', 'b3': 'c3'})
+        st.reachable.side_effect = [
+            {('a', 1): 10, ('b', 1): 20},
+            {('b', 1): 20, ('c', 1): 30},
+            {('c', 1): 30, ('d', 1): 40},
+        ]
+        st.repository.list_objects.return_value = {
+            ('a', 1): 10, ('b', 1): 20, ('c', 1): 30, ('d', 1): 40, ('e', 1): 50
+        }
+        storage.return_value = st
+        repository = Mock(scratchpad={})
+
+        # test
+        statistics = stats.update(repository, units)
+
+        # validation
+        storage.assert_called_once_with('r1', 'p1', None)
+        st.repository.close.assert_called_once_with()
+        self.assertEqual(st.reachable.call_args_list[0][0][0], ['c1'])
+        self.assertEqual(st.reachable.call_args_list[1][0][0], ['c2'])
+        self.assertEqual(list(st.reachable.call_args_list[2][0][0]), ['c3'])
+        self.assertEqual(
+            statistics['branches'],
+            [
+                {'branch': 'b1', 'commit': 'c1', 'remote_id': 'r1', 'objects': 2, 'bytes': 30},
+                {'branch': 'b2', 'commit': 'c2', 'remote_id': 'r1', 'objects': 2, 'bytes': 50},
+            ])
+        self.assertEqual(statistics['objects'], 3)
+        self.assertEqual(statistics['bytes'], 60)
+        self.assertEqual(statistics['unique_objects'], 2)
+        self.assertEqual(statistics['unique_bytes'], 30)
+        self.assertEqual(
+            statistics['storage'],
+            [
+                {
+                    'remote_id': 'r1',
+                    'fingerprint': st.fingerprint.return_value,
+                    'objects': 5,
+                    'bytes': 150
+                }
+            ])
+        self.assertEqual(repository.scratchpad[constants.STATISTICS], statistics)
+        repository.save.assert_called_once_with()
+
+    @patch(MODULE + '.Storage')
+    def test_update_storage_unchanged(self, storage):
+        units = [
+            Mock(remote_id='r1', branch='b1', commit='c1', storage_path='p1', created=1),
+        ]
+        st = Mock(refs={'b1': 'c1'})
+        st.fingerprint.return_value = 'refs-1'
+        st.reachable.return_value = {}
+        storage.return_value = st
+        totals = {'remote_id': 'r1', 'fingerprint': 'refs-1', 'objects': 5, 'bytes': 150}
+        previous = {'fingerprint': 'changed', 'storage': [totals]}
+        repository = Mock(scratchpad={constants.STATISTICS: previous})
+
+        # test
+        statistics = stats.update(repository, units)
+
+        # validation
+        self.assertFalse(st.repository.list_objects.called)
+        self.assertEqual(statistics['storage'], [totals])
+        repository.save.assert_called_once_with()
+
+    @patch(MODULE + '.fingerprint')
+    @patch(MODULE + '.Storage')
+    def test_update_unchanged(self, storage, fingerprint):
+        units = [
+            Mock(remote_id='r1', branch='b1', commit='c1', storage_path='p1', created=1),
+        ]
+        previous = {'fingerprint': fingerprint.return_value}
+        repository = Mock(scratchpad={constants.STATISTICS: previous})
+
+        # test
+        statistics = stats.update(repository, units)
+
+        # validation
+        self.assertEqual(statistics, previous)
+        self.assertFalse(storage.return_value.reachable.called)
+        self.assertFalse(repository.save.called)
+        storage.return_value.repository.close.assert_called_once_with()
+
+    @patch(MODULE + '.Storage')
+    def test_update_library(self, storage):
+        units = [
+            Mock(remote_id='r1', branch='b1', commit='c1', storage_path='p1', created=1),
+        ]
+        st = Mock(refs={})
+        st.reachable.side_effect = LibError
+        storage.return_value = st
+        library = Mock()
+
+        # test
+        self.assertRaises(LibError, stats.update, Mock(scratchpad={}), units, library)
+
+        # validation
+        storage.assert_called_once_with('r1', 'p1', library)
+        st.repository.close.assert_called_once_with()
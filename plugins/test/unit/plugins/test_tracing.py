@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from mock import patch, Mock
+
+from pulp_ostree.common import constants
+from pulp_ostree.plugins import tracing
+
+
+MODULE = 'pulp_ostree.plugins.tracing'
+
+
+class TestSpan(TestCase):
+
+    @patch(MODULE + '.time')
+    def test_finish(self, _time):
+        _time.time.side_effect = [10.0, 12.5]
+
+        # test
+        span = tracing.Span('Repository.pull', '/tmp/repo', parent='p1')
+        span.finish()
+
+        # validation
+        self.assertEqual(span.name, 'Repository.pull')
+        self.assertEqual(span.path, '/tmp/repo')
+        self.assertEqual(span.parent, 'p1')
+        self.assertEqual(span.started, 10.0)
+        self.assertEqual(span.duration, 2.5)
+        self.assertEqual(span.outcome, tracing.Span.OK)
+        self.assertEqual(span.error, None)
+
+    def test_finish_failed(self):
+        error = ValueError('bad')
+
+        # test
+        span = tracing.Span('Repository.pull', '/tmp/repo')
+        span.finish(error)
+
+        # validation
+        self.assertEqual(span.outcome, tracing.Span.FAILED)
+        self.assertEqual(span.error, repr(error))
+
+    def test_dict(self):
+        span = tracing.Span('Repository.pull', '/tmp/repo')
+        self.assertEqual(span.dict(), span.__dict__)
+
+
+class TestExporter(TestCase):
+
+    def test_export(self):
+        exporter = tracing.Exporter()
+        exporter.export(tracing.Span('Repository.open', '/tmp/repo'))
+
+
+class TestJsonLinesExporter(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_export(self):
+        path = os.path.join(self.tmp_dir, 'trace.json')
+        spans = [
+            tracing.Span('Repository.open', '/tmp/repo'),
+            tracing.Span('Repository.pull', '/tmp/repo'),
+        ]
+
+        # test
+        exporter = tracing.JsonLinesExporter(path)
+        for span in spans:
+            exporter.export(span)
+
+        # validation
+        with open(path) as fp:
+            lines = fp.readlines()
+        self.assertEqual([json.loads(ln) for ln in lines], [s.dict() for s in spans])
+
+
+class TestTracer(TestCase):
+
+    def test_register(self):
+        exporter = Mock()
+        tracer = tracing.Tracer()
+        tracer.register(exporter)
+        self.assertEqual(tracer.exporters, [exporter])
+        tracer.unregister(exporter)
+        tracer.unregister(exporter)
+        self.assertEqual(tracer.exporters, [])
+
+    def test_start_no_exporters(self):
+        tracer = tracing.Tracer()
+        self.assertEqual(tracer.start('open', '/tmp/repo'), None)
+        self.assertEqual(tracer.stack, [])
+
+    def test_nested(self):
+        exporter = Mock()
+        tracer = tracing.Tracer()
+        tracer.register(exporter)
+
+        # test
+        outer = tracer.start('Repository.list_refs', '/tmp/repo')
+        inner = tracer.start('Repository.open', '/tmp/repo')
+        tracer.annotate(objects=3)
+        tracer.finish(inner)
+        tracer.annotate(objects=10)
+        tracer.finish(outer)
+
+        # validation
+        self.assertEqual(outer.parent, None)
+        self.assertEqual(inner.parent, outer.id)
+        self.assertEqual(inner.attributes, {'objects': 3})
+        self.assertEqual(outer.attributes, {'objects': 10})
+        self.assertEqual(
+            exporter.export.call_args_list,
+            [((inner,), {}), ((outer,), {})])
+        self.assertEqual(tracer.stack, [])
+
+    def test_finish_failed(self):
+        error = ValueError()
+        exporter = Mock()
+        tracer = tracing.Tracer()
+        tracer.register(exporter)
+
+        # test
+        span = tracer.start('Repository.open', '/tmp/repo')
+        tracer.finish(span, error)
+
+        # validation
+        self.assertEqual(span.outcome, tracing.Span.FAILED)
+        exporter.export.assert_called_once_with(span)
+
+    def test_finish_export_failed(self):
+        exporters = [Mock(), Mock()]
+        exporters[0].export.side_effect = ValueError
+        tracer = tracing.Tracer()
+        map(tracer.register, exporters)
+
+        # test
+        span = tracer.start('Repository.open', '/tmp/repo')
+        tracer.finish(span)
+
+        # validation
+        exporters[1].export.assert_called_once_with(span)
+
+    def test_finish_none(self):
+        tracer = tracing.Tracer()
+        tracer.finish(None)
+
+    def test_annotate_no_span(self):
+        tracer = tracing.Tracer()
+        tracer.annotate(objects=1)
+
+
+class TestValidate(TestCase):
+
+    def test_valid(self):
+        for name in (None, '', 'sync.json'):
+            tracing.validate(name)
+
+    def test_invalid(self):
+        for name in ('/tmp/sync.json', '../sync.json', 'ostree/sync.json', '..', '.', 10):
+            self.assertRaises(ValueError, tracing.validate, name)
+
+
+class TestTracing(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @patch(MODULE + '.tracer')
+    def test_context(self, tracer):
+        path = os.path.join(self.tmp_dir, constants.TRACE_DIRECTORY, 'trace.json')
+        with tracing.Tracing('trace.json', self.tmp_dir) as context:
+            exporter = context.exporter
+            self.assertEqual(exporter.path, path)
+            self.assertTrue(os.path.isdir(os.path.dirname(path)))
+            tracer.register.assert_called_once_with(exporter)
+        tracer.unregister.assert_called_once_with(exporter)
+        self.assertEqual(context.exporter, None)
+
+    @patch(MODULE + '.tracer')
+    def test_disabled(self, tracer):
+        with tracing.Tracing(None, self.tmp_dir) as context:
+            self.assertEqual(context.exporter, None)
+        self.assertFalse(tracer.register.called)
+        self.assertFalse(tracer.unregister.called)
+
+    @patch(MODULE + '.tracer')
+    def test_invalid(self, tracer):
+        context = tracing.Tracing('../trace.json', self.tmp_dir)
+        self.assertRaises(ValueError, context.__enter__)
+        self.assertFalse(tracer.register.called)
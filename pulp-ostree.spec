@@ -4,6 +4,11 @@
 # Required platform version
 %global platform_version 2.8
 
+# Required libostree version
+# Pull options: inherit-transaction, localcache-repos, low-speed-limit-bytes,
+# low-speed-time-seconds and the http2 remote option.
+%global ostree_version 2019.2
+
 
 Name: pulp-ostree
 Version: 1.2.0
@@ -96,7 +101,7 @@ Requires: python-pulp-common >= %{platform_version}
 Requires: python-pulp-ostree-common = %{version} 
 Requires: pulp-server >= %{platform_version}
 Requires: python-setuptools
-Requires: ostree >= 2015.8
+Requires: ostree >= %{ostree_version}
 Requires: python-gnupg
 Requires: gnupg
 Requires: pygobject3
@@ -108,6 +113,10 @@ to provide OSTree specific support.
 %files plugins
 %defattr(-,root,root,-)
 %{python_sitelib}/pulp_ostree/plugins/
+%{_bindir}/pulp-ostree-diff
+%{_bindir}/pulp-ostree-packages
+%{_bindir}/pulp-ostree-pool
+%{_bindir}/pulp-ostree-service
 %config(noreplace) %{_sysconfdir}/httpd/conf.d/pulp_ostree.conf
 %config(noreplace) %{_sysconfdir}/pulp/server/plugins.conf.d/ostree_*.json
 %{python_sitelib}/pulp_ostree_plugins*.egg-info
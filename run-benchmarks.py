@@ -0,0 +1,88 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+"""
+Run the benchmark suite against a generated repository.
+
+Requires the pulp platform (with a running MongoDB), the ostree command
+line tool and the OSTree GObject introspection bindings (pygobject3).
+Everything runs locally; no network access is needed.
+"""
+
+import os
+import sys
+
+from argparse import ArgumentParser
+
+PROJECT_DIR = os.path.abspath(os.path.dirname(__file__))
+
+for _path in ('common', 'plugins', os.path.join('plugins', 'test')):
+    sys.path.insert(0, os.path.join(PROJECT_DIR, _path))
+
+from benchmark.benchmarks import Suite  # noqa
+from benchmark.generator import Generator, Profile  # noqa
+from benchmark.results import Run, Store, compare  # noqa
+
+
+def get_parser():
+    parser = ArgumentParser(description='Run the pulp_ostree benchmarks.')
+    parser.add_argument('--root', default='/tmp/pulp_ostree_benchmark',
+                        help='working directory')
+    parser.add_argument('--results', default=os.path.join(PROJECT_DIR, '.benchmarks'),
+                        help='results store directory')
+    parser.add_argument('--branches', type=int, default=10)
+    parser.add_argument('--commits', type=int, default=5, help='commits per branch')
+    parser.add_argument('--files', type=int, default=1000, help='files per tree')
+    parser.add_argument('--churn', type=float, default=0.1,
+                        help='fraction of files changed by each commit')
+    parser.add_argument('--size', type=int, default=4096, help='file size (bytes)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=0, help='pull depth')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='wall time change ratio reported as a regression')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='save the run as the baseline')
+    parser.add_argument('--reuse', action='store_true',
+                        help='reuse a previously generated repository')
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    profile = Profile(
+        branches=args.branches,
+        commits=args.commits,
+        files=args.files,
+        churn=args.churn,
+        size=args.size,
+        seed=args.seed)
+    source = os.path.join(args.root, 'source')
+    if not (args.reuse and os.path.isdir(source)):
+        print 'generating: {0}'.format(source)
+        Generator(profile, source)()
+
+    run = Run(profile.dict())
+    for result in Suite(source, args.root, args.depth)():
+        run.add(result)
+        print '{0:<24} wall: {1:8.3f}s cpu: {2:8.3f}s'.format(
+            result.name, result.wall, result.cpu)
+
+    store = Store(args.results)
+    print 'saved: {0}'.format(store.save(run))
+    baseline = store.baseline()
+    if baseline is not None:
+        if baseline.profile != run.profile:
+            print 'baseline profile differs: {0}'.format(baseline.profile)
+        regressed = False
+        for name, before, after, change, worse in compare(baseline, run, args.threshold):
+            regressed |= worse
+            print '{0:<24} {1:8.3f}s -> {2:8.3f}s {3:+7.1%}{4}'.format(
+                name, before, after, change, ' REGRESSED' if worse else '')
+    else:
+        regressed = False
+    if args.save_baseline:
+        print 'baseline: {0}'.format(store.save_baseline(run))
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())